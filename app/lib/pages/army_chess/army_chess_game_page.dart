@@ -2,6 +2,7 @@ import 'package:flutter/material.dart';
 import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../config.dart';
+import '../../socket_events.dart';
 import '../../widgets/army_chess_board_widget.dart';
 
 class ArmyChessGamePage extends StatefulWidget {
@@ -84,13 +85,14 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
     _availablePieces = Map.from(_pieceCount);
   }
 
-  void _initSocket() {
-    final String serverUrl = serverUrlConfig;
+  void _initSocket([String? url]) {
+    final String serverUrl = url ?? serverUrlConfig;
 
     _socket = IO.io(
       serverUrl,
       IO.OptionBuilder()
           .setTransports(['websocket'])
+          .setQuery({'batch': '1'})
           .setReconnectionAttempts(3)
           .setReconnectionDelay(1000)
           .setTimeout(5000)
@@ -134,12 +136,18 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       setState(() => _isConnected = false);
     });
 
-    _socket.on('connected', (data) {
+    _socket.onEvent('connected', (data) {
       if (!mounted) return;
       setState(() => _mySid = data['sid']);
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
       if (!mounted) return;
       setState(() {
         _myRoomId = data['room_id'];
@@ -147,7 +155,7 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       setState(() {
         _myRoomId = data['room_id'];
         _playerColor = data['player_color'];
@@ -156,14 +164,14 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('waiting_for_choices', (data) {
+    _socket.onEvent('waiting_for_choices', (data) {
       setState(() {
         _isWaitingForOpponent = false;
         _isChoosingColor = true;
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
       setState(() {
         _isChoosingColor = false;
         _isArranging = true;
@@ -179,14 +187,14 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('arrange_complete', (data) {
+    _socket.onEvent('arrange_complete', (data) {
       setState(() {
         _hasArranged = true;
         _gameMessage = '布阵完成，等待对方...';
       });
     });
 
-    _socket.on('game_begin', (data) {
+    _socket.onEvent('game_begin', (data) {
       setState(() {
         _isArranging = false;
         _isPlaying = true;
@@ -208,7 +216,7 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('move_made', (data) {
+    _socket.onEvent('move_made', (data) {
       setState(() {
         int fromRow = data['from_row'];
         int fromCol = data['from_col'];
@@ -231,7 +239,7 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('battle_result', (data) {
+    _socket.onEvent('battle_result', (data) {
       setState(() {
         int attackRow = data['attack_row'];
         int attackCol = data['attack_col'];
@@ -276,14 +284,14 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('lost_pieces', (data) {
+    _socket.onEvent('lost_pieces', (data) {
       setState(() {
         // 更新自己的阵亡棋子列表
         _myLostPieces = List<String>.from(data['pieces'] ?? []);
       });
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       setState(() {
         _isGameOver = true;
         _isPlaying = false;
@@ -292,7 +300,7 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('player_disconnected', (data) {
+    _socket.onEvent('player_disconnected', (data) {
       setState(() {
         _gameMessage = data['message'];
         _isPlaying = false;
@@ -300,7 +308,7 @@ class _ArmyChessGamePageState extends State<ArmyChessGamePage> {
       });
     });
 
-    _socket.on('error', (data) {
+    _socket.onEvent('error', (data) {
       if (!mounted) return;
       ScaffoldMessenger.of(
         context,
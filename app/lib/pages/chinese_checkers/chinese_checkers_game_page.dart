@@ -3,6 +3,7 @@ import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../widgets/chinese_checkers_board_widget.dart';
 import '../../config.dart';
+import '../../socket_events.dart';
 
 class ChineseCheckersGamePage extends StatefulWidget {
   final String? roomId;
@@ -143,13 +144,14 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
     _initSocket();
   }
 
-  void _initSocket() {
-    final String serverUrl = serverUrlConfig;
+  void _initSocket([String? url]) {
+    final String serverUrl = url ?? serverUrlConfig;
 
     _socket = IO.io(
       serverUrl,
       IO.OptionBuilder()
           .setTransports(['websocket'])
+          .setQuery({'batch': '1'})
           .setReconnectionAttempts(3)
           .setReconnectionDelay(1000)
           .setTimeout(5000)
@@ -181,7 +183,13 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
       setState(() => _isConnected = false);
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
 
       if (!mounted) return;
       setState(() {
@@ -193,7 +201,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       if (!mounted) return;
       setState(() {
         _myRoomId = data['room_id'];
@@ -207,7 +215,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
       });
     });
 
-    _socket.on('player_status_update', (data) {
+    _socket.onEvent('player_status_update', (data) {
 
       if (!mounted) return;
       setState(() {
@@ -217,7 +225,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
 
       if (!mounted) return;
       setState(() {
@@ -249,7 +257,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
       });
     });
 
-    _socket.on('move_made', (data) {
+    _socket.onEvent('move_made', (data) {
       if (!mounted) return;
       setState(() {
         // 更新棋盘
@@ -287,7 +295,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
       });
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       if (!mounted) return;
       setState(() {
         _isGameOver = true;
@@ -299,7 +307,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
 
     // 悔棋请求
 
-    _socket.on('undo_request', (data) {
+    _socket.onEvent('undo_request', (data) {
       if (!mounted) return;
       setState(() {
         _undoRequested = true;
@@ -313,7 +321,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
     });
 
     // 悔棋响应
-    _socket.on('undo_response', (data) {
+    _socket.onEvent('undo_response', (data) {
       
       if (!mounted) return;
       setState(() {
@@ -334,7 +342,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
     });
 
     // 悔棋执行
-    _socket.on('undo_move', (data) {
+    _socket.onEvent('undo_move', (data) {
       if (!mounted) return;
       setState(() {
         // 恢复棋子位置
@@ -362,7 +370,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
       });
     });
 
-    _socket.on('error', (data) {
+    _socket.onEvent('error', (data) {
       if (!mounted) return;
       ScaffoldMessenger.of(context).showSnackBar(
         SnackBar(content: Text(data['message'])),
@@ -370,7 +378,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
     });
     
     // 多人悔棋投票
-    _socket.on('undo_vote', (data) {
+    _socket.onEvent('undo_vote', (data) {
       if (!mounted) return;
       final playerId = data['player_id'];
       final approved = data['approved'];
@@ -378,7 +386,7 @@ class _ChineseCheckersGamePageState extends State<ChineseCheckersGamePage> {
     });
     
     // 多人悔棋结果
-    _socket.on('undo_result', (data) {
+    _socket.onEvent('undo_result', (data) {
       if (!mounted) return;
       final success = data['success'];
       setState(() {
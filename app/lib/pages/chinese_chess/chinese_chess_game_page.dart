@@ -3,6 +3,7 @@ import 'package:flutter/material.dart';
 import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../config.dart';
+import '../../socket_events.dart';
 import '../../widgets/chinese_chess_board_widget.dart';
 import '../../widgets/chinese_chess_piece.dart';
 
@@ -100,13 +101,14 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     _board[3][8] = const ChessPiece(name: '卒', type: 'pawn', color: 'black');
   }
 
-  void _initSocket() {
-    final String serverUrl = serverUrlConfig;
+  void _initSocket([String? url]) {
+    final String serverUrl = url ?? serverUrlConfig;
 
     _socket = IO.io(
       serverUrl,
       IO.OptionBuilder()
           .setTransports(['websocket'])
+          .setQuery({'batch': '1'})
           .setReconnectionAttempts(3)
           .setReconnectionDelay(1000)
           .setTimeout(5000)
@@ -151,12 +153,18 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       setState(() => _isConnected = false);
     });
 
-    _socket.on('connected', (data) {
+    _socket.onEvent('connected', (data) {
       if (!mounted) return;
       setState(() => _mySid = data['sid']);
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
       if (!mounted) return;
       setState(() {
         _myRoomId = data['room_id'];
@@ -164,7 +172,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       setState(() {
         _myRoomId = data['room_id'];
         _playerColor = data['player_color'];
@@ -173,7 +181,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       });
     });
 
-    _socket.on('waiting_for_choices', (data) {
+    _socket.onEvent('waiting_for_choices', (data) {
       if (!mounted) return;
       setState(() {
         _isWaitingForOpponent = false;
@@ -181,7 +189,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
       setState(() {
         _isChoosingColor = false;
         _isPlaying = true;
@@ -216,7 +224,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       });
     });
 
-    _socket.on('move_made', (data) {
+    _socket.onEvent('move_made', (data) {
       setState(() {
         _board[data['from_row']][data['from_col']] = null;
         _board[data['to_row']][data['to_col']] = _getPieceByName(
@@ -236,11 +244,11 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       });
     });
 
-    _socket.on('turn_changed', (data) {
+    _socket.onEvent('turn_changed', (data) {
       setState(() => _currentPlayer = data['current_player']);
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       setState(() {
         _isGameOver = true;
         _isPlaying = false;
@@ -249,7 +257,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       });
     });
 
-    _socket.on('reset_game', (data) {
+    _socket.onEvent('reset_game', (data) {
       setState(() {
         _initBoard();
         _currentPlayer = 1;
@@ -269,7 +277,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
       });
     });
 
-    _socket.on('player_disconnected', (data) {
+    _socket.onEvent('player_disconnected', (data) {
       setState(() {
         _gameMessage = data['message'];
         _isPlaying = false;
@@ -278,7 +286,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 认输事件
-    _socket.on('surrender', (data) {
+    _socket.onEvent('surrender', (data) {
       setState(() {
         _isGameOver = true;
         _isPlaying = false;
@@ -287,7 +295,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 悔棋请求事件
-    _socket.on('undo_request', (data) {
+    _socket.onEvent('undo_request', (data) {
       setState(() {
         _undoRequested = true;
       });
@@ -295,7 +303,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 悔棋移动事件
-    _socket.on('undo_move', (data) {
+    _socket.onEvent('undo_move', (data) {
       setState(() {
         _canUndo = false;
         if (data['from_row'] != null) {
@@ -327,7 +335,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 和棋请求事件
-    _socket.on('draw_request', (data) {
+    _socket.onEvent('draw_request', (data) {
       setState(() {
         _drawRequested = true;
         _drawRequestPending = true;
@@ -336,7 +344,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 和棋结果事件
-    _socket.on('draw', (data) {
+    _socket.onEvent('draw', (data) {
       if (!mounted) return;
       setState(() {
         _isGameOver = true;
@@ -349,7 +357,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 和棋响应事件
-    _socket.on('draw_response', (data) {
+    _socket.onEvent('draw_response', (data) {
       if (!mounted) return;
       setState(() {
         _waitingForDrawResponse = false;
@@ -366,7 +374,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 将军事件
-    _socket.on('check', (data) {
+    _socket.onEvent('check', (data) {
       setState(() {
         _checkMessage = data['message'];
       });
@@ -374,7 +382,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 悔棋响应事件
-    _socket.on('undo_response', (data) {
+    _socket.onEvent('undo_response', (data) {
       if (!mounted) return;
       setState(() {
         _waitingForUndoResponse = false;
@@ -391,7 +399,7 @@ class _ChineseChessGamePageState extends State<ChineseChessGamePage> {
     });
 
     // 错误处理
-    _socket.on('error', (data) {
+    _socket.onEvent('error', (data) {
       if (!mounted) return;
       setState(() {
         _waitingForUndoResponse = false;
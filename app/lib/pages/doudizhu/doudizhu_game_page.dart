@@ -2,6 +2,7 @@ import 'package:flutter/material.dart';
 import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../config.dart';
+import '../../socket_events.dart';
 import '../../widgets/doudizhu_playing_card.dart';
 import '../../widgets/doudizhu_hand_widget.dart';
 
@@ -59,13 +60,14 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
     ]);
   }
 
-  void _initSocket() {
-    final String serverUrl = serverUrlConfig;
+  void _initSocket([String? url]) {
+    final String serverUrl = url ?? serverUrlConfig;
 
     _socket = IO.io(
       serverUrl,
       IO.OptionBuilder()
           .setTransports(['websocket'])
+          .setQuery({'batch': '1'})
           .setReconnectionAttempts(3)
           .setReconnectionDelay(1000)
           .setTimeout(5000)
@@ -112,12 +114,18 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       setState(() => _isConnected = false);
     });
 
-    _socket.on('connected', (data) {
+    _socket.onEvent('connected', (data) {
       print('Received connected event: $data');
       if (!mounted) return;
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
       print('Room created: ${data['room_id']}');
       if (!mounted) return;
       setState(() {
@@ -126,7 +134,7 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       print('Room joined: ${data['room_id']}');
       if (!mounted) return;
       setState(() {
@@ -136,7 +144,7 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
       print('Game started');
       if (!mounted) return;
       setState(() {
@@ -153,7 +161,7 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       });
     });
 
-    _socket.on('landlord_chosen', (data) {
+    _socket.onEvent('landlord_chosen', (data) {
       if (!mounted) return;
       setState(() {
         _landlordPlayer = data['landlord_player'];
@@ -172,7 +180,7 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       });
     });
 
-    _socket.on('cards_played', (data) {
+    _socket.onEvent('cards_played', (data) {
       if (!mounted) return;
       setState(() {
         _lastPlayedPlayer = data['player_number'];
@@ -186,7 +194,7 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       });
     });
 
-    _socket.on('cards_removed', (data) {
+    _socket.onEvent('cards_removed', (data) {
       if (!mounted) return;
       setState(() {
         // 更新手牌
@@ -199,7 +207,7 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       });
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       if (!mounted) return;
       setState(() {
         _isGameOver = true;
@@ -208,7 +216,7 @@ class _DoudizhuGamePageState extends State<DoudizhuGamePage> {
       });
     });
 
-    _socket.on('player_disconnected', (data) {
+    _socket.onEvent('player_disconnected', (data) {
       if (!mounted) return;
       setState(() {
         _gameMessage = data['message'];
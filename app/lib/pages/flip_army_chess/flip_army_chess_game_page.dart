@@ -2,6 +2,7 @@ import 'package:flutter/material.dart';
 import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../config.dart';
+import '../../socket_events.dart';
 import '../../widgets/flip_army_chess_board_widget.dart';
 
 class FlipArmyChessGamePage extends StatefulWidget {
@@ -51,13 +52,14 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
     _initSocket();
   }
 
-  void _initSocket() {
-    final String serverUrl = serverUrlConfig;
+  void _initSocket([String? url]) {
+    final String serverUrl = url ?? serverUrlConfig;
 
     _socket = IO.io(
       serverUrl,
       IO.OptionBuilder()
           .setTransports(['websocket'])
+          .setQuery({'batch': '1'})
           .setReconnectionAttempts(3)
           .setReconnectionDelay(1000)
           .setTimeout(5000)
@@ -101,12 +103,18 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       setState(() => _isConnected = false);
     });
 
-    _socket.on('connected', (data) {
+    _socket.onEvent('connected', (data) {
       if (!mounted) return;
       setState(() => _mySid = data['sid']);
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
       if (!mounted) return;
       setState(() {
         _myRoomId = data['room_id'];
@@ -114,7 +122,7 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       setState(() {
         _myRoomId = data['room_id'];
         _playerColor = data['player_color'];
@@ -123,14 +131,14 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('waiting_for_choices', (data) {
+    _socket.onEvent('waiting_for_choices', (data) {
       setState(() {
         _isWaitingForOpponent = false;
         _isChoosingColor = true;
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
       setState(() {
         _isChoosingColor = false;
         _isPlaying = true;
@@ -161,7 +169,7 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('flip_result', (data) {
+    _socket.onEvent('flip_result', (data) {
       setState(() {
         int row = data['row'];
         int col = data['col'];
@@ -178,7 +186,7 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('move_made', (data) {
+    _socket.onEvent('move_made', (data) {
       setState(() {
         int fromRow = data['from_row'];
         int fromCol = data['from_col'];
@@ -206,7 +214,7 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('battle_result', (data) {
+    _socket.onEvent('battle_result', (data) {
       setState(() {
         int attackRow = data['attack_row'];
         int attackCol = data['attack_col'];
@@ -241,13 +249,13 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('lost_pieces', (data) {
+    _socket.onEvent('lost_pieces', (data) {
       setState(() {
         _myLostPieces = List<String>.from(data['pieces'] ?? []);
       });
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       setState(() {
         _isGameOver = true;
         _isPlaying = false;
@@ -256,7 +264,7 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('player_disconnected', (data) {
+    _socket.onEvent('player_disconnected', (data) {
       setState(() {
         _gameMessage = data['message'];
         _isPlaying = false;
@@ -264,7 +272,7 @@ class _FlipArmyChessGamePageState extends State<FlipArmyChessGamePage> {
       });
     });
 
-    _socket.on('error', (data) {
+    _socket.onEvent('error', (data) {
       if (!mounted) return;
       ScaffoldMessenger.of(
         context,
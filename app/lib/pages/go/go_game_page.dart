@@ -2,6 +2,7 @@ import 'package:flutter/material.dart';
 import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../config.dart';
+import '../../socket_events.dart';
 import '../../widgets/go_board_widget.dart';
 
 class GoGamePage extends StatefulWidget {
@@ -24,6 +25,7 @@ class _GoGamePageState extends State<GoGamePage> {
   bool _isPlaying = false;
   bool _isGameOver = false;
 
+  int _boardSize = 19;  // 棋盘路数，以服务器返回的 board_size 为准
   List<List<int>> _board = List.generate(19, (_) => List.filled(19, 0));
   int _currentPlayer = 1;  // 1:黑 2:白
   String? _winner;
@@ -38,19 +40,27 @@ class _GoGamePageState extends State<GoGamePage> {
   int? _lastMoveRow;
   int? _lastMoveCol;
 
+  /// 按服务器返回的棋盘路数重建空棋盘（未返回时保持 19 路）
+  void _setBoardSize(dynamic size) {
+    if (size is! int || size == _boardSize) return;
+    _boardSize = size;
+    _board = List.generate(size, (_) => List.filled(size, 0));
+  }
+
   @override
   void initState() {
     super.initState();
     _initSocket();
   }
 
-  void _initSocket() {
-    final String serverUrl = serverUrlConfig;
+  void _initSocket([String? url]) {
+    final String serverUrl = url ?? serverUrlConfig;
 
     _socket = IO.io(
       serverUrl,
       IO.OptionBuilder()
           .setTransports(['websocket'])
+          .setQuery({'batch': '1'})
           .setReconnectionAttempts(3)
           .setReconnectionDelay(1000)
           .setTimeout(5000)
@@ -95,20 +105,27 @@ class _GoGamePageState extends State<GoGamePage> {
       setState(() => _isConnected = false);
     });
 
-    _socket.on('connected', (data) {
+    _socket.onEvent('connected', (data) {
       if (!mounted) return;
       setState(() => _mySid = data['sid']);
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
       if (!mounted) return;
       setState(() {
         _myRoomId = data['room_id'];
         _isWaitingForOpponent = true;
+        _setBoardSize(data['board_size']);
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       setState(() {
         _myRoomId = data['room_id'];
         _playerColor = data['player_color'];
@@ -117,7 +134,7 @@ class _GoGamePageState extends State<GoGamePage> {
       });
     });
 
-    _socket.on('waiting_for_choices', (data) {
+    _socket.onEvent('waiting_for_choices', (data) {
       setState(() {
         _isWaitingForOpponent = false;
         _isChoosingColor = true;
@@ -125,11 +142,12 @@ class _GoGamePageState extends State<GoGamePage> {
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
       setState(() {
         _isChoosingColor = false;
         _isPlaying = true;
         _gameMessage = data['message'];
+        _setBoardSize(data['board_size']);
         
         if (data['player_color'] == 'black') {
           _myPlayerNumber = 1;
@@ -141,7 +159,7 @@ class _GoGamePageState extends State<GoGamePage> {
       });
     });
 
-    _socket.on('move_made', (data) {
+    _socket.onEvent('move_made', (data) {
       setState(() {
         _board[data['row']][data['col']] = data['player'];
         _lastMoveRow = data['row'];
@@ -160,11 +178,11 @@ class _GoGamePageState extends State<GoGamePage> {
       });
     });
 
-    _socket.on('turn_changed', (data) {
+    _socket.onEvent('turn_changed', (data) {
       setState(() => _currentPlayer = data['current_player']);
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       setState(() {
         _isGameOver = true;
         _isPlaying = false;
@@ -173,9 +191,9 @@ class _GoGamePageState extends State<GoGamePage> {
       });
     });
 
-    _socket.on('reset_game', (data) {
+    _socket.onEvent('reset_game', (data) {
       setState(() {
-        _board = List.generate(19, (_) => List.filled(19, 0));
+        _board = List.generate(_boardSize, (_) => List.filled(_boardSize, 0));
         _currentPlayer = 1;
         _isGameOver = false;
         _isPlaying = false;
@@ -186,7 +204,7 @@ class _GoGamePageState extends State<GoGamePage> {
       });
     });
 
-    _socket.on('player_disconnected', (data) {
+    _socket.onEvent('player_disconnected', (data) {
       setState(() {
         _gameMessage = data['message'];
         _isPlaying = false;
@@ -487,6 +505,7 @@ class _GoGamePageState extends State<GoGamePage> {
               padding: const EdgeInsets.all(8),
               child: GoBoard(
                 board: _board,
+                boardSize: _boardSize,
                 onTap: null,
                 lastMoveRow: _lastMoveRow,
                 lastMoveCol: _lastMoveCol,
@@ -590,6 +609,7 @@ class _GoGamePageState extends State<GoGamePage> {
                       ),
                       child: GoBoard(
                         board: _board,
+                        boardSize: _boardSize,
                         onTap: isMyTurn ? _handleTap : null,
                         previewRow: isMyTurn ? _previewRow : null,
                         previewCol: isMyTurn ? _previewCol : null,
@@ -2,6 +2,7 @@ import 'package:flutter/material.dart';
 import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../config.dart';
+import '../../socket_events.dart';
 import '../../widgets/gobang_board_widget.dart';
 import '../../widgets/gobang_color_choice_button.dart';
 
@@ -50,13 +51,14 @@ class _GobangGamePageState extends State<GobangGamePage> {
     _initSocket();
   }
 
-  void _initSocket() {
-    final String serverUrl = serverUrlConfig;
+  void _initSocket([String? url]) {
+    final String serverUrl = url ?? serverUrlConfig;
 
     _socket = IO.io(
       serverUrl,
       IO.OptionBuilder()
           .setTransports(['websocket'])
+          .setQuery({'batch': '1'})
           .setReconnectionAttempts(3)
           .setReconnectionDelay(1000)
           .setTimeout(5000)
@@ -103,13 +105,19 @@ class _GobangGamePageState extends State<GobangGamePage> {
       setState(() => _isConnected = false);
     });
 
-    _socket.on('connected', (data) {
+    _socket.onEvent('connected', (data) {
       print('Received connected event: $data');
       if (!mounted) return;
       setState(() => _mySid = data['sid']);
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
       print('Room created: ${data['room_id']}');
       if (!mounted) return;
       setState(() {
@@ -118,7 +126,7 @@ class _GobangGamePageState extends State<GobangGamePage> {
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       setState(() {
         _myRoomId = data['room_id'];
         _playerColor = data['player_color'];
@@ -127,14 +135,14 @@ class _GobangGamePageState extends State<GobangGamePage> {
       });
     });
 
-    _socket.on('waiting_for_choices', (data) {
+    _socket.onEvent('waiting_for_choices', (data) {
       setState(() {
         _isWaitingForOpponent = false;
         _isChoosingColor = true;
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
       setState(() {
         _isChoosingColor = false;
         _isPlaying = true;
@@ -150,7 +158,7 @@ class _GobangGamePageState extends State<GobangGamePage> {
       });
     });
 
-    _socket.on('move_made', (data) {
+    _socket.onEvent('move_made', (data) {
       setState(() {
         _board[data['row']][data['col']] = data['player'];
         _currentPlayer = data['player'] == 1 ? 2 : 1;
@@ -162,11 +170,11 @@ class _GobangGamePageState extends State<GobangGamePage> {
       });
     });
 
-    _socket.on('turn_changed', (data) {
+    _socket.onEvent('turn_changed', (data) {
       setState(() => _currentPlayer = data['current_player']);
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       setState(() {
         _isGameOver = true;
         _isPlaying = false;
@@ -175,7 +183,7 @@ class _GobangGamePageState extends State<GobangGamePage> {
       });
     });
 
-    _socket.on('reset_game', (data) {
+    _socket.onEvent('reset_game', (data) {
       setState(() {
         _board = List.generate(15, (_) => List.filled(15, 0));
         _currentPlayer = 1;
@@ -188,7 +196,7 @@ class _GobangGamePageState extends State<GobangGamePage> {
       });
     });
 
-    _socket.on('player_disconnected', (data) {
+    _socket.onEvent('player_disconnected', (data) {
       setState(() {
         _gameMessage = data['message'];
         _isPlaying = false;
@@ -197,14 +205,14 @@ class _GobangGamePageState extends State<GobangGamePage> {
     });
 
     // 悔棋请求
-    _socket.on('undo_request', (data) {
+    _socket.onEvent('undo_request', (data) {
       if (!mounted) return;
       final requestor = data['player'] == 1 ? '黑棋' : '白棋';
       _showUndoRequestDialog(requestor);
     });
 
     // 悔棋响应
-    _socket.on('undo_response', (data) {
+    _socket.onEvent('undo_response', (data) {
       if (!mounted) return;
       setState(() {
         _waitingForUndoResponse = false;
@@ -224,7 +232,7 @@ class _GobangGamePageState extends State<GobangGamePage> {
     });
 
     // 悔棋执行
-    _socket.on('undo_move', (data) {
+    _socket.onEvent('undo_move', (data) {
       if (!mounted) return;
       setState(() {
         _board[data['row']][data['col']] = 0;
@@ -241,7 +249,7 @@ class _GobangGamePageState extends State<GobangGamePage> {
     });
 
     // 错误处理
-    _socket.on('error', (data) {
+    _socket.onEvent('error', (data) {
       if (!mounted) return;
       setState(() {
         _waitingForUndoResponse = false;
@@ -252,7 +260,7 @@ class _GobangGamePageState extends State<GobangGamePage> {
     });
 
     // 认输
-    _socket.on('surrender', (data) {
+    _socket.onEvent('surrender', (data) {
       if (!mounted) return;
       setState(() {
         _isGameOver = true;
@@ -2,6 +2,7 @@ import 'package:flutter/material.dart';
 import 'package:flutter/services.dart';
 import 'package:socket_io_client/socket_io_client.dart' as IO;
 import '../../config.dart';
+import '../../socket_events.dart';
 import '../../widgets/othello/othello_board_widget.dart';
 import '../../widgets/gobang_color_choice_button.dart';
 
@@ -48,9 +49,10 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
     _initializeSocket();
   }
 
-  void _initializeSocket() {
-    _socket = IO.io(serverUrlConfig, <String, dynamic>{
+  void _initializeSocket([String? url]) {
+    _socket = IO.io(url ?? serverUrlConfig, <String, dynamic>{
       'transports': ['websocket'],
+      'query': {'batch': '1'},
       'autoConnect': false,
     });
 
@@ -59,7 +61,13 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
       _joinOrCreateRoom();
     });
 
-    _socket.on('room_created', (data) {
+    // 房间由其他服务器进程负责时，连接到该进程后重新加入
+    _socket.onEvent('shard_redirect', (data) {
+      _socket.dispose();
+      _initializeSocket(data['url']);
+    });
+
+    _socket.onEvent('room_created', (data) {
       print('Room created: ${data['room_id']}');
       setState(() {
         _myRoomId = data['room_id'];
@@ -68,7 +76,7 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
       });
     });
 
-    _socket.on('room_joined', (data) {
+    _socket.onEvent('room_joined', (data) {
       print('Room joined: ${data['room_id']}');
       setState(() {
         _myRoomId = data['room_id'];
@@ -78,13 +86,13 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
       });
     });
 
-    _socket.on('waiting_for_choices', (data) {
+    _socket.onEvent('waiting_for_choices', (data) {
       setState(() {
         _status = GameStatus.selecting;
       });
     });
 
-    _socket.on('game_start', (data) {
+    _socket.onEvent('game_start', (data) {
       print('Game started');
       setState(() {
         _status = GameStatus.playing;
@@ -97,7 +105,7 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
       });
     });
 
-    _socket.on('move_made', (data) {
+    _socket.onEvent('move_made', (data) {
       print('Move made by player ${data['player']}');
       setState(() {
         final move = data['move'];
@@ -115,7 +123,7 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
       });
     });
 
-    _socket.on('player_left', (data) {
+    _socket.onEvent('player_left', (data) {
       print('Player left');
       setState(() {
         _status = GameStatus.gameOver;
@@ -123,7 +131,7 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
       });
     });
 
-    _socket.on('game_over', (data) {
+    _socket.onEvent('game_over', (data) {
       print('Game over: ${data['winner']}');
       setState(() {
         _status = GameStatus.gameOver;
@@ -131,7 +139,7 @@ class _OthelloGamePageState extends State<OthelloGamePage> {
       });
     });
 
-    _socket.on('error', (data) {
+    _socket.onEvent('error', (data) {
       print('Error: ${data['message']}');
       ScaffoldMessenger.of(context).showSnackBar(
         SnackBar(content: Text(data['message'])),
@@ -0,0 +1,24 @@
+import 'package:socket_io_client/socket_io_client.dart' as IO;
+
+/// 连接时带查询参数 batch=1 的客户端，服务器会把一步棋产生的多个事件
+/// （move_made、check、turn_changed 等）合并为一个 batch 事件：[[事件名, 数据], ...]
+final Expando<Map<String, dynamic Function(dynamic)>> _batchHandlers = Expando();
+
+Map<String, dynamic Function(dynamic)> _listenBatch(IO.Socket socket) {
+  final handlers = <String, dynamic Function(dynamic)>{};
+  socket.on('batch', (data) {
+    for (final item in data as List) {
+      handlers[item[0]]?.call(item[1]);
+    }
+  });
+  return handlers;
+}
+
+extension BatchedEvents on IO.Socket {
+  /// 注册事件处理函数：单独发送的事件和 batch 中的同名事件都交给它处理
+  void onEvent(String event, dynamic Function(dynamic) handler) {
+    final handlers = _batchHandlers[this] ??= _listenBatch(this);
+    handlers[event] = handler;
+    on(event, handler);
+  }
+}
@@ -12,19 +12,32 @@ try:
     import eventlet
     eventlet.monkey_patch()
     ASYNC_MODE = 'eventlet'
-    print("Eventlet monkey_patch applied successfully")
 except ImportError:
     ASYNC_MODE = 'threading'
-    print("Eventlet not available, using threading mode")
 
 from flask import Flask, render_template_string, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 import threading
-import random
+import functools
+import time
+import logging
 import yaml
 import os
 
+import game_logging
+import game_records
+import metrics
+import room_index
+import room_ids
+import room_executor
+import room_store
+import room_reaper
+import sessions
+import sharding
+import spectators
+import wire
+
 # 读取配置文件（根目录的 config.yaml）
 def load_config():
     config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
@@ -35,21 +48,32 @@ def load_config():
 
 config = load_config()
 SERVER_URL = config.get('server_url', 'http://localhost:5000')
+game_logging.configure_logging(config.get('logging'))
+logger = logging.getLogger('app')
+room_ids.configure_room_ids(config.get('room_id'))
+room_executor.configure_room_executor(config.get('room_executor'))
+sharding.configure_sharding(config.get('sharding'), SERVER_URL)
+game_records.configure_game_records(config.get('game_records'), sharding.shard_index)
+room_reaper.configure_room_reaper(config.get('room_reaper'))
+sessions.configure_sessions(config.get('session'))
+spectators.configure_spectators(config.get('spectators'))
 
 # 导入游戏模块
-from games import gobang, chinese_chess, go, othello, chinese_checkers, international_chess
-from games.army_chess import handle_army_chess_move, reset_army_chess_game  # 保留以兼容
-from games.doudizhu import handle_choose_landlord, handle_play_cards, handle_pass_turn, initialize_doudizhu_game, assign_doudizhu_player, handle_doudizhu_disconnect, start_doudizhu_game
-from games.flip_army_chess import handle_flip_army_chess_move, reset_flip_army_chess_game  # 翻子军棋
+import games.army_chess as army_chess_module
+import games.go as go_module
+from games import chinese_chess, go_estimate
+from games.doudizhu import handle_choose_landlord, handle_play_cards, handle_pass_turn
+from games import journal, registry, transport
+
+go_estimate.configure_go_estimate(config.get('go_estimate'))
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'game-secret-key-2026'
 CORS(app)
 
-print(f"Initializing Flask-SocketIO with async_mode: {ASYNC_MODE}")
+logger.info("Initializing Flask-SocketIO with async_mode: %s", ASYNC_MODE)
 if ASYNC_MODE == 'threading':
-    print("WARNING: eventlet not installed, using threading mode")
-    print("For better stability, run: pip install eventlet")
+    logger.warning("eventlet not installed, using threading mode; for better stability, run: pip install eventlet")
 
 socketio = SocketIO(
     app, 
@@ -58,73 +82,361 @@ socketio = SocketIO(
     logger=False,
     engineio_logger=False,
     ping_timeout=60,
-    ping_interval=25
+    ping_interval=25,
+    # 多 worker 部署时通过消息队列转发跨 worker 的广播（如 redis://localhost:6379/0）
+    message_queue=config.get('message_queue'),
+    # 事件数据中预先编码的部分（transport.emit_each）直接拼入数据包
+    json=transport.WireJSON,
 )
 
-# 游戏房间管理
-games = {}  # room_id -> game_data
-
-# 设置全局变量到各个游戏模块
-gobang.socketio = socketio
-gobang.games = games
-chinese_chess.socketio = socketio
-chinese_chess.games = games
-go.socketio = socketio
-go.games = games
-othello.socketio = socketio
-othello.games = games
-chinese_checkers.socketio = socketio
-chinese_checkers.games = games
-international_chess.socketio = socketio
-international_chess.games = games
-
-# 导入并设置军棋和斗地主模块的全局变量
-import games.army_chess as army_chess_module
-import games.doudizhu as doudizhu_module
-import games.flip_army_chess as flip_army_chess_module
-army_chess_module.socketio = socketio
-army_chess_module.games = games
-doudizhu_module.socketio = socketio
-doudizhu_module.games = games
-flip_army_chess_module.socketio = socketio
-flip_army_chess_module.games = games
-
-# 游戏模块注册表：game_type -> module
-GAME_MODULES = {
-    'gobang': gobang,
-    'chinese_chess': chinese_chess,
-    'go': go,
-    'othello': othello,
-    'chinese_checkers': chinese_checkers,
-    'international_chess': international_chess,
-    'army_chess': army_chess_module,
-    'flip_army_chess': flip_army_chess_module,
-    'doudizhu': doudizhu_module,
-}
-
-# 不支持悔棋的游戏类型
-UNDO_UNSUPPORTED_GAMES = {'doudizhu', 'army_chess', 'flip_army_chess'}
+# 统计发送给客户端的事件数（flask_socketio.emit 也经由 socketio.emit 发送），
+# 有 MessagePack 协议的客户端在线时按接收方的协议分别编码；发给有观众的房间的事件同时转发到观战子房间
+_socketio_emit = socketio.emit
+
+
+def counted_emit(event, *args, **kwargs):
+    metrics.EMITS.inc(event=event)
+    target = kwargs.get('to') or kwargs.get('room')
+    if len(args) == 1 and spectators.is_watched(target):
+        emit_to_spectators(target, event, args[0])
+    if wire.MSGPACK_CLIENTS and len(args) == 1:
+        if not kwargs.pop('include_self', True) and not kwargs.get('skip_sid'):
+            kwargs['skip_sid'] = request.sid  # pyright: ignore[reportAttributeAccessIssue]
+        return wire.split_emit(_socketio_emit, socketio.server.manager, event, args[0], **kwargs)
+    return _socketio_emit(event, *args, **kwargs)
+
+
+socketio.emit = counted_emit
+
+
+def emit_to_spectators(room_id, event, data):
+    """把房间事件转发到观战子房间：每个事件只发送一次，配置了节流时累积到下一个周期"""
+    if spectators.throttle:
+        spectators.defer(room_id, event, data)
+    else:
+        socketio.emit(event, data, to=spectators.watch_room(room_id))
+
+
+# 游戏房间管理：room_id -> game_data（默认为进程内字典，可配置为多 worker 共享的外部存储）
+games = room_store.create_room_store(config.get('room_store'))
+
+# 连接时声明支持合并事件（查询参数 batch=1）的客户端 sid
+BATCH_CLIENTS = set()
+
+
+class SocketTransport:
+    """规则模块的发送方：经 socketio.emit 发送（计入发送计数）"""
+
+    # 接受 transport.Encoded 数据（由 WireJSON 编码）
+    encoded_payloads = True
+
+    def emit(self, event, data=None, **kwargs):
+        return socketio.emit(event, data, **kwargs)
+
+    def emit_batch(self, events, to):
+        """接收方都支持合并事件时作为一个 batch 事件 [[事件名, 数据], ...] 发送，否则逐个发送
+
+        发给房间的事件会原样转发到观战子房间，观众也都支持合并事件时才能合并
+        """
+        manager = socketio.server.manager
+        participants = list(manager.get_participants('/', to))
+        if spectators.is_watched(to):
+            participants.extend(manager.get_participants('/', spectators.watch_room(to)))
+        if all(sid in BATCH_CLIENTS for sid, _ in participants):
+            socketio.emit('batch', [[event, data] for event, data in events], to=to)
+        else:
+            for event, data in events:
+                socketio.emit(event, data, to=to)
+
+
+# 规则模块通过 games.transport 发送事件，绑定到 SocketIO
+transport.bind_transport(SocketTransport())
+
+# 游戏模块注册表（各游戏模块导入时注册）：game_type -> GameModule
+GAME_REGISTRY = registry.GAME_REGISTRY
+# 事件分发表：(事件, game_type) -> 处理函数
+GAME_HANDLERS = registry.build_dispatch_table()
+# 创建房间时房间号被其他 worker 占用的最大重试次数
+ROOM_ID_ATTEMPTS = 8
+# 事件循环延迟的测量周期（秒）
+EVENT_LOOP_LAG_INTERVAL = 0.5
+# 事件处理耗时超过该值（毫秒）时记录警告日志
+SLOW_EVENT_MS = float((config.get('logging') or {}).get('slow_event_ms', 100))
 
 
 def get_game_current_player_sid(game):
     """根据游戏类型获取当前玩家的 sid"""
-    game_type = game['game_type']
-    module = GAME_MODULES.get(game_type)
-    if module:
-        handler = getattr(module, f'get_{game_type}_current_player_sid', None)
-        if handler:
-            return handler(game)
+    handler = GAME_HANDLERS.get(('current_player_sid', game['game_type']))
+    if handler:
+        return handler(game)
     return None
 
 
+def get_game_phase(game):
+    """根据游戏类型获取房间所处阶段（waiting / choosing / playing / game_over）"""
+    handler = GAME_HANDLERS.get(('phase', game['game_type']))
+    if handler:
+        return handler(game)
+    return 'game_over' if game['game_over'] else 'playing'
+
+
+def get_game_players(game):
+    """各方座位 -> sid（对局记录用）"""
+    module = GAME_REGISTRY[game['game_type']]
+    if module.seats:
+        return {seat: game[seat] for seat in module.seats}
+    return {player['color']: player['sid'] for player in game.get('players') or () if player['joined']}
+
+
+def archive_game(room_id, game, status):
+    """把这一局写入对局记录存储（status: finished / unfinished），记录号保存在房间状态中
+
+    记录中带有房间规则（如围棋的棋盘大小、打劫规则、计分规则、贴目），走棋记录去掉走棋日志的内部字段
+    """
+    rules_handler = GAME_HANDLERS.get(('rules', game['game_type']))
+    record_id = game_records.append({
+        'room_id': room_id,
+        'game_type': game['game_type'],
+        'status': status,
+        'rules': rules_handler(game) if rules_handler else {},
+        'players': get_game_players(game),
+        'winner': game['winner'],
+        'started_at': game.get('started_at'),
+        'ended_at': time.time(),
+        'moves': [journal.public_move(move) for move in game['moves']],
+    })
+    game['record_id'] = record_id
+    return record_id
+
+
+def archive_finished_game(room_id):
+    """房间事件处理后：对局刚结束时写入对局记录并通知房间内的玩家记录号"""
+    game = games.get(room_id)
+    if game is None or not game['game_over'] or game.get('record_id'):
+        return
+    record_id = archive_game(room_id, game, 'finished')
+    if record_id is not None:
+        socketio.emit('game_recorded', {'record_id': format(record_id, 'x')}, to=room_id)
+
+
+def archive_pending_game(room_id, game):
+    """房间删除或重新开局前：尚未记录的对局按配置写入（已结束的总是记录，未结束的在 record_unfinished 时记录）"""
+    if game.get('record_id'):
+        return
+    if game['game_over']:
+        archive_game(room_id, game, 'finished')
+    elif game_records.record_unfinished and game['moves']:
+        archive_game(room_id, game, 'unfinished')
+
+
+def remove_game_room(room_id):
+    """删除房间及其成员索引"""
+    if game_records.enabled():
+        game = games.get(room_id)
+        if game is not None:
+            archive_pending_game(room_id, game)
+    if room_id in games:
+        del games[room_id]
+    room_index.remove_room(room_id)
+    room_ids.release_room_id(room_id)
+    room_reaper.forget(room_id)
+    if spectators.forget_room(room_id):
+        watch_room = spectators.watch_room(room_id)
+        socketio.emit('watch_ended', {'room_id': room_id, 'message': '对局已结束，房间已关闭'}, to=watch_room)
+        socketio.close_room(watch_room)
+
+
+def touch_room(room_id):
+    """记录房间活跃时间，刷新其回收截止时间"""
+    game = games.get(room_id)
+    if game is None:
+        room_reaper.forget(room_id)
+        return
+    game['last_active'] = time.time()
+    room_reaper.touch(room_id, get_game_phase(game), game['last_active'], game['game_type'])
+    spectators.invalidate(room_id)
+
+
+def close_room(room_id, reason):
+    """回收房间：通知房间内玩家后删除（reason: idle 空闲超时 / evicted 超过房间上限）"""
+    game = games.get(room_id)
+    if game is None:
+        room_reaper.forget(room_id)
+        return
+    if reason == 'idle':
+        # 其他 worker 可能刚处理过该房间的事件，以房间状态中的活跃时间为准
+        phase = get_game_phase(game)
+        last_active = game.get('last_active', 0)
+        if last_active + room_reaper.ttl[phase] > time.time():
+            room_reaper.touch(room_id, phase, last_active)
+            return
+    message = '房间长时间无操作，已关闭' if reason == 'idle' else '服务器房间已满，长时间未活跃的房间已关闭'
+    socketio.emit('room_closed', {'room_id': room_id, 'reason': reason, 'message': message}, to=room_id)
+    socketio.close_room(room_id)
+    remove_game_room(room_id)
+    room_reaper.record_reaped(reason)
+    logger.info("Room closed (%s): %s", reason, room_id)
+
+
+def room_reaper_loop():
+    """后台任务：定期回收空闲超时的房间"""
+    while True:
+        socketio.sleep(room_reaper.tick)
+        try:
+            for room_id in room_reaper.collect_expired():
+                room_executor.run_in_room(room_id, run_room_task, room_id, close_room, room_id, 'idle', force=True)
+        except Exception as e:
+            logger.exception("Error in room_reaper_loop")
+
+
+def spectator_flush_loop():
+    """后台任务：按节流周期把各房间累积的事件作为一个 batch 事件转发给观众"""
+    while True:
+        socketio.sleep(spectators.throttle)
+        try:
+            for room_id, events in spectators.drain():
+                socketio.emit('batch', events, to=spectators.watch_room(room_id))
+        except Exception as e:
+            logger.exception("Error in spectator_flush_loop")
+
+
+def go_estimate_loop():
+    """后台任务：每个节流间隔补发一次期间被推迟的围棋形势估计（每个房间只估计最新局面）"""
+    go_estimate.load_numpy()
+    while True:
+        socketio.sleep(go_estimate.interval)
+        for room_id in go_estimate.drain():
+            try:
+                room_executor.run_in_room(room_id, run_room_task, room_id, flush_go_estimate, room_id)
+            except (room_executor.RoomBusy, room_store.RoomLockTimeout):
+                # 房间正忙：留到下个周期
+                go_estimate.defer(room_id)
+            except Exception as e:
+                logger.exception("Error in go_estimate_loop")
+
+
+def flush_go_estimate(room_id):
+    """补发一个房间被推迟的形势估计（房间可能已经关闭）"""
+    game = games.get(room_id)
+    if game is not None and game['game_type'] == 'go':
+        go_module.flush_go_estimate(game, room_id)
+
+
+def event_loop_lag_loop():
+    """周期性测量事件循环延迟：sleep 实际耗时超出预期的部分即事件循环被其他任务占用的时间"""
+    while True:
+        started_at = time.perf_counter()
+        socketio.sleep(EVENT_LOOP_LAG_INTERVAL)
+        metrics.EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started_at - EVENT_LOOP_LAG_INTERVAL))
+
+
 def execute_game_undo(game, last_move):
     """根据游戏类型执行悔棋"""
-    game_type = game['game_type']
-    module = GAME_MODULES.get(game_type)
-    if module:
-        handler = getattr(module, f'execute_{game_type}_undo', None)
-        if handler:
-            handler(game, last_move)
+    handler = GAME_HANDLERS.get(('undo', game['game_type']))
+    if handler:
+        handler(game, last_move)
+
+
+def room_serialized(handler):
+    """按房间串行执行事件处理函数（按 data 中的 room_id 进入对应房间的邮箱）"""
+    @functools.wraps(handler)
+    def wrapper(data):
+        room_id = data.get('room_id') if isinstance(data, dict) else None
+        if room_id is None:
+            return handler(data)
+        # 房间号作为邮箱的键，列表、字典等客户端数据不能进入执行器
+        if isinstance(room_id, bool) or not isinstance(room_id, (str, int)):
+            logger.warning("Invalid room_id, event rejected")
+            emit('error', {'message': '房间号无效'})
+            return None
+        try:
+            return room_executor.run_in_room(room_id, run_room_event, room_id, handler, data)
+        except (room_executor.RoomBusy, room_store.RoomLockTimeout):
+            logger.warning("Room busy, event rejected")
+            emit('error', {'message': '房间繁忙，请稍后重试'})
+    return wrapper
+
+
+def instrumented(event, handler):
+    """为 Socket.IO 事件处理函数加上日志上下文，并记录处理耗时与未捕获的异常"""
+    @functools.wraps(handler)
+    def wrapper(sid, *args):
+        data = args[0] if event != 'connect' and args and isinstance(args[0], dict) else {}
+        started_at = time.perf_counter()
+        with game_logging.log_context(sid=sid, event=event, room_id=data.get('room_id'),
+                                      game_type=data.get('game_type')):
+            try:
+                return handler(sid, *args)
+            except Exception:
+                metrics.EVENT_ERRORS.inc(event=event, game_type=game_logging.get_log_context().get('game_type') or '')
+                raise
+            finally:
+                latency = time.perf_counter() - started_at
+                game_type = game_logging.get_log_context().get('game_type') or ''
+                metrics.EVENT_LATENCY.observe(latency, event=event, game_type=game_type)
+                latency_ms = round(latency * 1000, 3)
+                if latency_ms >= SLOW_EVENT_MS:
+                    logger.warning("Slow event: %.1f ms", latency_ms, extra={'latency_ms': latency_ms})
+                else:
+                    logger.debug("Event handled", extra={'latency_ms': latency_ms})
+    return wrapper
+
+
+def instrument_event_handlers():
+    """包装所有已注册的事件处理函数（在所有 @socketio.on 之后调用）"""
+    for handlers in socketio.server.handlers.values():
+        for event, handler in list(handlers.items()):
+            handlers[event] = instrumented(event, handler)
+
+
+def run_room_event(room_id, handler, *args):
+    """在房间存储事务中执行玩家事件：读取最新房间状态，处理完成后刷新活跃时间并写回"""
+    with games.transaction(room_id):
+        game = games.get(room_id)
+        if game is not None:
+            game_logging.update_log_context(game_type=game['game_type'])
+        result = handler(*args)
+        if game_records.enabled():
+            archive_finished_game(room_id)
+        touch_room(room_id)
+        return result
+
+
+def run_room_task(room_id, handler, *args):
+    """在房间存储事务中执行服务器内部任务（不刷新房间活跃时间）"""
+    with games.transaction(room_id):
+        return handler(*args)
+
+
+def store_new_room(game_type, game):
+    """分配房间号并保存新房间，返回房间号（号码用尽时返回 None）
+
+    多个 worker 共享存储时各自的号码池可能分配到相同号码，被占用时换一个号码重试；
+    房间也可能由其他 worker 删除而号码没有回到本进程的池中，号码池用尽时按存储中的房间重建一次再分配；
+    分片部署时只使用归属当前 worker 的号码
+    """
+    skipped = []
+    reconciled = False
+    try:
+        for _ in range(ROOM_ID_ATTEMPTS * sharding.shard_count):
+            room_id = room_ids.allocate_room_id(game_type)
+            if room_id is None:
+                if reconciled or not games.shared:
+                    return None
+                reconciled = True
+                # 重建会按存储重新标记已占用的号码，之前跳过的号码先回收
+                for skipped_id in skipped:
+                    room_ids.release_room_id(skipped_id)
+                skipped.clear()
+                room_ids.reconcile_room_ids(list(games))
+                continue
+            if sharding.is_local_room(room_id) and games.add_room(room_id, game):
+                return room_id
+            skipped.append(room_id)
+        return None
+    finally:
+        for room_id in skipped:
+            room_ids.release_room_id(room_id)
 
 
 @app.route('/')
@@ -133,18 +445,42 @@ def index():
     return "Game Server is Running!"
 
 
+@app.route('/replays/<record_id>')
+def replay_endpoint(record_id):
+    """按记录号（十六进制）读取一局的对局记录（JSON）"""
+    try:
+        data = game_records.lookup(int(record_id, 16))
+    except ValueError:
+        data = None
+    if data is None:
+        return {'error': '对局记录不存在'}, 404
+    return data, 200, {'Content-Type': 'application/json; charset=utf-8'}
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """运行指标（Prometheus 文本格式）"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
 @socketio.on('connect')
 def handle_connect():
     """客户端连接"""
     try:
-        print(f"Client connected: {request.sid}")  # pyright: ignore[reportAttributeAccessIssue]
-        emit('connected', {'sid': request.sid})  # pyright: ignore[reportAttributeAccessIssue]
+        logger.info("Client connected: %s", request.sid)  # pyright: ignore[reportAttributeAccessIssue]
+        metrics.CONNECTED_CLIENTS.inc()
+        if request.args.get('batch') == '1':
+            BATCH_CLIENTS.add(request.sid)  # pyright: ignore[reportAttributeAccessIssue]
+        protocol = wire.register_client(request.sid, request.args.get('wire'))  # pyright: ignore[reportAttributeAccessIssue]
+        token = sessions.issue_token(request.sid)  # pyright: ignore[reportAttributeAccessIssue]
+        emit('connected', {'sid': request.sid, 'wire': protocol, 'token': token})  # pyright: ignore[reportAttributeAccessIssue]
     except Exception as e:
-        print(f"Error in handle_connect: {e}")
+        logger.exception("Error in handle_connect")
         return False
 
 
 @socketio.on('start_game')
+@room_serialized
 def handle_start_game(data):
     """房主开始游戏"""
     try:
@@ -156,135 +492,228 @@ def handle_start_game(data):
 
         game = games[room_id]
 
-        if game['game_type'] != 'chinese_checkers':
+        start_handler = GAME_HANDLERS.get(('start_game', game['game_type']))
+        if start_handler is None:
             emit('error', {'message': '该游戏不支持此功能'})
             return
 
-        success, error_msg = chinese_checkers.start_chinese_checkers_game(game, room_id, sid)
+        success, error_msg = start_handler(game, room_id, sid)
         if not success:
             emit('error', {'message': error_msg})
             return
+        refresh_spectators(room_id, game)
         
     except Exception as e:
-        print(f"Error in handle_start_game: {e}")
+        logger.exception("Error in handle_start_game")
         emit('error', {'message': '开始游戏失败'})
 
 
+def handle_room_disconnect(room_id, sid):
+    """处理玩家断开后其所在的单个房间"""
+    game = games.get(room_id)
+    if game is None:
+        return
+    disconnect_handler = GAME_HANDLERS.get(('disconnect', game['game_type']))
+    opponent_sids = disconnect_handler(game, sid) if disconnect_handler else []
+    if not opponent_sids:
+        return
+
+    # 通知其他玩家已断开
+    for opponent_sid in opponent_sids:
+        if opponent_sid and opponent_sid != sid:
+            try:
+                socketio.emit('player_disconnected', {'message': '对手已断开连接'}, to=opponent_sid)
+            except Exception as e:
+                logger.warning("Error notifying opponent: %s", e)
+    remove_game_room(room_id)
+    logger.info("Room removed: %s", room_id)
+
+
+def handle_room_away(room_id, sid, token):
+    """玩家断线：保留其座位等待重连（令牌 -> 旧 sid 记入 away），宽限期结束仍未恢复时按断线处理"""
+    game = games.get(room_id)
+    if game is None:
+        return
+    disconnect_handler = GAME_HANDLERS.get(('disconnect', game['game_type']))
+    opponent_sids = disconnect_handler(game, sid) if disconnect_handler else []
+    away = game.get('away') or {}
+    away[token] = sid
+    game['away'] = away
+
+    for opponent_sid in opponent_sids:
+        if opponent_sid and opponent_sid not in away.values():
+            socketio.emit('player_away', {
+                'message': '对手连接中断，等待重新连接...',
+                'grace_seconds': sessions.grace_seconds,
+            }, to=opponent_sid)
+    socketio.start_background_task(expire_away, room_id, token)
+
+
+def expire_away(room_id, token):
+    """后台任务：断线保留时间结束后在房间邮箱中检查玩家是否已恢复"""
+    socketio.sleep(sessions.grace_seconds)
+    try:
+        room_executor.run_in_room(room_id, run_room_task, room_id, finish_away, room_id, token, force=True)
+    except Exception as e:
+        logger.exception("Error in expire_away")
+
+
+def finish_away(room_id, token):
+    """断线玩家未在宽限期内恢复：按原来的断线流程通知对手并删除房间"""
+    game = games.get(room_id)
+    away = game.get('away') if game is not None else None
+    if not away or token not in away:
+        return
+    sid = away.pop(token)
+    handle_room_disconnect(room_id, sid)
+
+
+def room_snapshot(room_id, game):
+    """局面快照的通用字段"""
+    return {
+        'room_id': room_id,
+        'game_type': game['game_type'],
+        'phase': get_game_phase(game),
+        'current_player': game['current_player'],
+        'game_over': game['game_over'],
+        'winner': game['winner'],
+        'move_count': len(game.get('moves') or ()),
+    }
+
+
+def build_snapshot(room_id, game, sid):
+    """断线重连后发给玩家的局面快照：通用字段 + 游戏模块提供的该玩家可见的局面"""
+    snapshot = room_snapshot(room_id, game)
+    handler = GAME_HANDLERS.get(('snapshot', game['game_type']))
+    if handler:
+        snapshot.update(handler(game, sid))
+    return snapshot
+
+
+def build_spectator_snapshot(room_id, game):
+    """观战快照：通用字段 + 游戏模块提供的各方都能看到的局面"""
+    snapshot = room_snapshot(room_id, game)
+    snapshot['spectator'] = True
+    handler = GAME_HANDLERS.get(('spectate', game['game_type']))
+    if handler:
+        snapshot.update(handler(game))
+    return snapshot
+
+
+def refresh_spectators(room_id, game):
+    """开局、布阵等只分别发给各玩家的事件之后，给观众发送新的局面快照"""
+    if spectators.is_watched(room_id):
+        emit_to_spectators(room_id, 'watching', build_spectator_snapshot(room_id, game))
+
+
+def start_watching(room_id, sid):
+    """在房间邮箱中执行：发送快照并订阅观战子房间，与玩家事件串行，快照之后的事件都会转发给该观众"""
+    game = games.get(room_id)
+    if game is None:
+        emit('error', {'message': '房间不存在'})
+        return
+    watch_room = spectators.watch_room(room_id)
+    # 节流累积的事件已反映在新快照中，先发给已有的观众
+    pending = spectators.take(room_id)
+    if pending:
+        socketio.emit('batch', pending, to=watch_room)
+
+    # 快照编码后按房间缓存，玩家处理事件后失效（touch_room）
+    snapshot = spectators.cached_snapshot(room_id)
+    if snapshot is None:
+        snapshot = transport.Encoded(build_spectator_snapshot(room_id, game))
+        spectators.store_snapshot(room_id, snapshot)
+    join_room(watch_room)
+    spectators.add_spectator(room_id, sid)
+    emit('watching', snapshot)
+
+
 @socketio.on('disconnect')
 def handle_disconnect():
     """客户端断开连接"""
     try:
         sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
-        print(f"Client disconnected: {sid}")
-
-        # 清理断开玩家所在的房间
-        rooms_to_remove = []
-        for room_id, game in list(games.items()):
-            game_type = game['game_type']
-            module = GAME_MODULES.get(game_type)
-            
-            # 获取对应的 disconnect 处理函数
-            if module:
-                disconnect_handler = getattr(module, f'handle_{game_type}_disconnect', None)
-                if disconnect_handler:
-                    opponent_sids = disconnect_handler(game, sid)
-                else:
-                    # chinese_checkers 等没有 disconnect 函数的游戏，使用 gobang 的处理
-                    opponent_sids = gobang.handle_gobang_disconnect(game, sid)
+        logger.info("Client disconnected: %s", sid)
+        metrics.CONNECTED_CLIENTS.dec()
+        BATCH_CLIENTS.discard(sid)
+        wire.remove_client(sid)
+        token = sessions.drop_token(sid)
+        spectators.remove_sid(sid)
+
+        # 只处理断开玩家所在的房间（通过反向索引查找），每个房间在其邮箱中串行处理；
+        # 配置了断线保留时间时先保留座位等待重连
+        for room_id in room_index.remove_sid(sid):
+            if token and sessions.grace_seconds > 0:
+                room_executor.run_in_room(room_id, run_room_event, room_id, handle_room_away,
+                                          room_id, sid, token, force=True)
             else:
-                opponent_sids = []
-
-            if opponent_sids:
-                # 通知其他玩家已断开
-                for opponent_sid in opponent_sids:
-                    if opponent_sid and opponent_sid != sid:
-                        try:
-                            socketio.emit('player_disconnected', {'message': '对手已断开连接'}, to=opponent_sid)
-                        except Exception as e:
-                            print(f"Error notifying opponent: {e}")
-                rooms_to_remove.append(room_id)
-
-        for room_id in rooms_to_remove:
-            if room_id in games:
-                del games[room_id]
-                print(f"Room removed: {room_id}")
+                room_executor.run_in_room(room_id, run_room_event, room_id, handle_room_disconnect,
+                                          room_id, sid, force=True)
     except Exception as e:
-        print(f"Error in handle_disconnect: {e}")
+        logger.exception("Error in handle_disconnect")
 
 
 @socketio.on('create_room')
 def handle_create_room(data):
     """创建游戏房间"""
+    room_id = None
     try:
         game_type = data.get('game_type', 'gobang')  # 默认五子棋
-        
-        # 生成不重复的房间号（只使用数字）
-        max_attempts = 10
-        room_id = None
-        for _ in range(max_attempts):
-            potential_id = str(random.randint(1000, 9999))
-            if potential_id not in games:
-                room_id = potential_id
-                break
-        
-        if room_id is None:
-            emit('error', {'message': '无法创建房间，请稍后重试'})
-            return
-        
+        if game_type not in GAME_REGISTRY:
+            game_type = 'gobang'
+        module = GAME_REGISTRY[game_type]
+
         sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
 
         # 根据游戏类型初始化游戏数据
-        if game_type == 'chinese_chess':
-            games[room_id] = chinese_chess.initialize_chinese_chess_game(sid)
-            games[room_id]['red_player'] = sid
-            player_color = 'red'
-        elif game_type == 'go':
-            games[room_id] = go.initialize_go_game(sid)
-            games[room_id]['black_player'] = sid
-            player_color = 'black'
-        elif game_type == 'army_chess':
-            games[room_id] = army_chess_module.initialize_army_chess_game(sid)
-            games[room_id]['red_player'] = sid
-            player_color = 'red'
-        elif game_type == 'flip_army_chess':
-            games[room_id] = flip_army_chess_module.initialize_flip_army_chess_game(sid)
-            games[room_id]['red_player'] = sid
-            player_color = 'red'
-        elif game_type == 'othello':
-            games[room_id] = othello.initialize_othello_game(sid)
-            games[room_id]['black_player'] = sid
-            player_color = 'black'
-        elif game_type == 'chinese_checkers':
-            games[room_id] = chinese_checkers.initialize_chinese_checkers_game(sid)
-            player_color = 'red'
-        elif game_type == 'doudizhu':
-            games[room_id] = doudizhu_module.initialize_doudizhu_game(sid)
-            player_number = 1
-        elif game_type == 'international_chess':
-            games[room_id] = international_chess.initialize_international_chess_game(sid)
-            games[room_id]['white_player'] = sid
-            player_color = 'white'
-        else:  # gobang default
-            games[room_id] = gobang.initialize_gobang_game(sid)
-            games[room_id]['black_player'] = sid
-            player_color = 'black'
+        game = GAME_HANDLERS[('create_room', game_type)](sid)
+        options_handler = GAME_HANDLERS.get(('room_options', game_type))
+        try:
+            room_settings = options_handler(game, data) if options_handler else None
+        except ValueError as e:
+            emit('error', {'message': str(e)})
+            return
+        if module.creator_seat:
+            game[module.creator_seat] = sid
+
+        # 房间数达到上限时淘汰最近最少活跃的空闲房间
+        for evicted_room_id in room_reaper.rooms_to_evict():
+            room_executor.run_in_room(evicted_room_id, run_room_task, evicted_room_id,
+                                      close_room, evicted_room_id, 'evicted', force=True)
+        if room_reaper.is_full():
+            emit('error', {'message': '服务器房间已满，请稍后再试'})
+            return
+
+        # 从房间号池中分配房间号并保存房间
+        game['last_active'] = game['started_at'] = time.time()
+        room_id = store_new_room(game_type, game)
+        if room_id is None:
+            emit('error', {'message': '无法创建房间，请稍后重试'})
+            return
+        room_reaper.touch(room_id, get_game_phase(game), game['last_active'], game['game_type'])
 
         join_room(room_id)
-        print(f"Room {room_id} created by {sid}, game type: {game_type}")
+        room_index.add_room_member(room_id, sid)
+        logger.info("Room %s created by %s, game type: %s", room_id, sid, game_type,
+                    extra={'room_id': room_id, 'game_type': game_type})
 
         emit('room_created', {
             'room_id': room_id,
             'game_type': game_type,
-            'player_color': player_color if game_type != 'doudizhu' else None,
-            'player_number': player_number if game_type == 'doudizhu' else None,
-            'message': '房间创建成功，等待其他玩家加入...'
+            'player_color': module.creator_color,
+            'player_number': module.creator_number,
+            'message': '房间创建成功，等待其他玩家加入...',
+            **(room_settings or {}),
         })
     except Exception as e:
-        print(f"Error in handle_create_room: {e}")
+        logger.exception("Error in handle_create_room")
+        if room_id is not None and room_id not in games:
+            room_ids.release_room_id(room_id)
         emit('error', {'message': f'创建房间失败: {str(e)}'})
 
 
 @socketio.on('join_room')
+@room_serialized
 def handle_join_room(data):
     """加入游戏房间"""
     try:
@@ -292,6 +721,12 @@ def handle_join_room(data):
         game_type = data.get('game_type')
         sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
 
+        # 房间属于其他分片时，让客户端连接到所属分片后重新加入
+        if room_id and not sharding.is_local_room(room_id):
+            owner = sharding.owner_shard(room_id)
+            emit('shard_redirect', {'room_id': room_id, 'url': sharding.shard_url(owner)})
+            return
+
         if room_id not in games:
             emit('error', {'message': '房间不存在'})
             return
@@ -304,125 +739,103 @@ def handle_join_room(data):
             return
 
         # 根据游戏类型分配玩家身份
-        player_color = None
-        player_number = None
-
-        if game['game_type'] == 'doudizhu':
-            player_number = doudizhu_module.assign_doudizhu_player(game, sid)
-            if player_number is None:
-                emit('error', {'message': '房间已满'})
-                return
-        elif game['game_type'] == 'army_chess':
-            player_color = army_chess_module.assign_army_chess_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
-            else:
-                player_number = 1 if player_color == 'red' else 2
-        elif game['game_type'] == 'flip_army_chess':
-            player_color = flip_army_chess_module.assign_flip_army_chess_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
-            else:
-                player_number = 1 if player_color == 'red' else 2
-        elif game['game_type'] == 'international_chess':
-            if game['white_player'] is None:
-                game['white_player'] = sid
-                player_color = 'white'
-            elif game['black_player'] is None:
-                game['black_player'] = sid
-                player_color = 'black'
-            else:
-                emit('error', {'message': '房间已满'})
-                return
-        elif game['game_type'] == 'chinese_chess':
-            player_color = chinese_chess.assign_chinese_chess_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
-        elif game['game_type'] == 'go':
-            player_color = go.assign_go_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
-        elif game['game_type'] == 'othello':
-            player_color = othello.assign_othello_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
-        elif game['game_type'] == 'international_chess':
-            player_color = international_chess.assign_international_chess_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
-        elif game['game_type'] == 'chinese_checkers':
-            player_color, player_number = chinese_checkers.assign_chinese_checkers_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
-        else:  # gobang default
-            player_color = gobang.assign_gobang_player(game, sid)
-            if player_color is None:
-                emit('error', {'message': '房间已满'})
-                return
+        module = GAME_REGISTRY[game['game_type']]
+        join_info = GAME_HANDLERS[('join_room', module.game_type)](game, sid)
+        if join_info is None:
+            emit('error', {'message': '房间已满'})
+            return
 
         # 先加入房间
         join_room(room_id)
-        if game['game_type'] == 'doudizhu':
-            emit('room_joined', {'room_id': room_id, 'player_number': player_number})
-        elif game['game_type'] == 'chinese_checkers':
-            # 计算已加入的玩家数量
-            joined_count = sum(1 for p in game['players'] if p['joined'])
-            emit('room_joined', {
-                'room_id': room_id, 
-                'player_color': player_color,
-                'joined_count': joined_count
-            })
-            # 向房间内所有玩家广播最新的玩家状态
-            socketio.emit('player_status_update', {
-                'joined_count': joined_count,
-                'players': [{'color': p['color'], 'joined': p['joined']} for p in game['players']]
-            }, to=room_id)
-        else:
-            emit('room_joined', {'room_id': room_id, 'player_color': player_color})
+        room_index.add_room_member(room_id, sid)
+        emit('room_joined', {'room_id': room_id, **join_info})
 
         # 检查是否所有玩家都已加入
-        if game['game_type'] == 'doudizhu':
-            if game['player1'] and game['player2'] and game['player3']:
-                doudizhu_module.start_doudizhu_game(game, room_id)
-        elif game['game_type'] == 'chinese_checkers':
-            # 对于中国跳棋，不再自动开始游戏，由房主手动开始
-            pass
-        else:
-            # 检查是否两个玩家都已加入
-            if game['game_type'] == 'chinese_chess':
-                if game['red_player'] and game['black_player']:
-                    socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
-            elif game['game_type'] == 'go':
-                if game['black_player'] and game['white_player']:
-                    socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
-            elif game['game_type'] == 'army_chess':
-                if game['red_player'] and game['blue_player']:
-                    socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
-            elif game['game_type'] == 'flip_army_chess':
-                if game['red_player'] and game['blue_player']:
-                    socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
-            elif game['game_type'] == 'othello':
-                if game['black_player'] and game['white_player']:
-                    socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
-            elif game['game_type'] == 'international_chess':
-                if game['white_player'] and game['black_player']:
-                    socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
-            else:  # gobang
-                if game['black_player'] and game['white_player']:
-                    socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
+        after_join = GAME_HANDLERS.get(('after_join', module.game_type))
+        if after_join:
+            after_join(game, room_id)
+        elif module.seats and all(game[seat] for seat in module.seats):
+            socketio.emit('waiting_for_choices', {'message': '双方已连接，请选择先后手'}, to=room_id)
     except Exception as e:
-        print(f"Error in handle_join_room: {e}")
+        logger.exception("Error in handle_join_room")
         emit('error', {'message': f'加入房间失败: {str(e)}'})
 
 
+@socketio.on('resume')
+@room_serialized
+def handle_resume(data):
+    """断线重连后回到原座位：data 为 {room_id, token}，token 为断线前的连接收到的令牌"""
+    try:
+        room_id = data.get('room_id')
+        token = data.get('token')
+        sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
+
+        # 房间属于其他分片时，让客户端连接到所属分片后重新恢复
+        if room_id and not sharding.is_local_room(room_id):
+            owner = sharding.owner_shard(room_id)
+            emit('shard_redirect', {'room_id': room_id, 'url': sharding.shard_url(owner)})
+            return
+
+        game = games.get(room_id)
+        away = game.get('away') if game is not None else None
+        if not away or token not in away:
+            emit('resume_failed', {'room_id': room_id, 'message': '无法恢复对局：房间已关闭或已超过重连时限'})
+            return
+
+        # 座位字段中的旧 sid 改为新连接的 sid
+        old_sid = away.pop(token)
+        GAME_HANDLERS[('rebind', game['game_type'])](game, old_sid, sid)
+        join_room(room_id)
+        room_index.add_room_member(room_id, sid)
+        logger.info("Player resumed in room %s: %s -> %s", room_id, old_sid, sid)
+
+        emit('resumed', build_snapshot(room_id, game, sid))
+        socketio.emit('player_reconnected', {'message': '对手已重新连接'}, to=room_id, skip_sid=sid)
+    except Exception as e:
+        logger.exception("Error in handle_resume")
+        emit('error', {'message': '恢复对局失败'})
+
+
+@socketio.on('watch_room')
+def handle_watch_room(data):
+    """观战：收到当前局面快照（watching）后接收房间内各方都能看到的事件，不占座位"""
+    try:
+        room_id = data.get('room_id')
+        sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
+
+        # 房间属于其他分片时，让客户端连接到所属分片后重新观战
+        if room_id and not sharding.is_local_room(room_id):
+            owner = sharding.owner_shard(room_id)
+            emit('shard_redirect', {'room_id': room_id, 'url': sharding.shard_url(owner)})
+            return
+
+        if room_id not in games:
+            emit('error', {'message': '房间不存在'})
+            return
+
+        # 观战不刷新房间的活跃时间
+        room_executor.run_in_room(room_id, run_room_task, room_id, start_watching, room_id, sid)
+    except (room_executor.RoomBusy, room_store.RoomLockTimeout):
+        logger.warning("Room busy, watch rejected")
+        emit('error', {'message': '房间繁忙，请稍后重试'})
+    except Exception as e:
+        logger.exception("Error in handle_watch_room")
+        emit('error', {'message': '观战失败'})
+
+
+@socketio.on('stop_watching')
+def handle_stop_watching(data):
+    """退出观战"""
+    try:
+        room_id = data.get('room_id')
+        leave_room(spectators.watch_room(room_id))
+        spectators.remove_spectator(room_id, request.sid)  # pyright: ignore[reportAttributeAccessIssue]
+    except Exception as e:
+        logger.exception("Error in handle_stop_watching")
+
+
 @socketio.on('choose_color')
+@room_serialized
 def handle_choose_color(data):
     """玩家选择先手或后手"""
     try:
@@ -436,57 +849,23 @@ def handle_choose_color(data):
         game = games[room_id]
 
         # 记录玩家的选择
-        if game['game_type'] == 'chinese_chess':
-            chinese_chess.record_chinese_chess_choice(game, sid, choice)
-        elif game['game_type'] == 'go':
-            go.record_go_choice(game, sid, choice)
-        elif game['game_type'] == 'army_chess':
-            army_chess_module.record_army_chess_choice(game, sid, choice)
-        elif game['game_type'] == 'flip_army_chess':
-            flip_army_chess_module.record_flip_army_chess_choice(game, sid, choice)
-        elif game['game_type'] == 'othello':
-            othello.record_othello_choice(game, sid, choice)
-        elif game['game_type'] == 'international_chess':
-            international_chess.record_international_chess_choice(game, sid, choice)
-        elif game['game_type'] == 'chinese_checkers':
-            chinese_checkers.record_chinese_checkers_choice(game, sid, choice)
-        else:  # gobang
-            if game['black_player'] == sid:
-                game['black_choice'] = choice
-            elif game['white_player'] == sid:
-                game['white_choice'] = choice
+        game_type = game['game_type']
+        record_choice = GAME_HANDLERS.get(('choose_color', game_type))
+        if record_choice is None:
+            return
+        record_choice(game, sid, choice)
 
         # 检查是否两人都已选择
-        if game['game_type'] == 'chinese_chess':
-            if chinese_chess.should_start_chinese_chess(game):
-                chinese_chess.handle_chinese_chess_game_start(game)
-        elif game['game_type'] == 'go':
-            if go.should_start_go(game):
-                go.handle_go_game_start(game)
-        elif game['game_type'] == 'army_chess':
-            if army_chess_module.should_start_army_chess(game):
-                army_chess_module.determine_army_chess_first_player(game)
-                army_chess_module.notify_arrange_start(game)
-        elif game['game_type'] == 'flip_army_chess':
-            if flip_army_chess_module.should_start_flip_army_chess(game):
-                flip_army_chess_module.handle_flip_army_chess_game_start(game)
-        elif game['game_type'] == 'othello':
-            if othello.should_start_othello(game):
-                othello.handle_othello_game_start(game)
-        elif game['game_type'] == 'international_chess':
-            if international_chess.should_start_international_chess(game):
-                international_chess.handle_international_chess_game_start(game)
-        elif game['game_type'] == 'chinese_checkers':
-            if chinese_checkers.should_start_chinese_checkers(game):
-                chinese_checkers.determine_chinese_checkers_first_player(game)
-        else:  # gobang
-            if gobang.should_start_gobang(game):
-                gobang.handle_gobang_game_start(game)
+        should_start = GAME_HANDLERS.get(('should_start', game_type))
+        if should_start and should_start(game):
+            GAME_HANDLERS[('begin_game', game_type)](game)
+            refresh_spectators(room_id, game)
     except Exception as e:
-        print(f"Error in handle_choose_color: {e}")
+        logger.exception("Error in handle_choose_color")
 
 
 @socketio.on('arrange_complete')
+@room_serialized
 def handle_arrange_complete(data):
     """玩家完成布阵"""
     try:
@@ -513,11 +892,13 @@ def handle_arrange_complete(data):
         # 检查双方是否都已完成布阵
         if game['red_arranged'] and game['blue_arranged']:
             army_chess_module.start_arranged_game(game, room_id)
+        refresh_spectators(room_id, game)
     except Exception as e:
-        print(f"Error in handle_arrange_complete: {e}")
+        logger.exception("Error in handle_arrange_complete")
 
 
 @socketio.on('make_move')
+@room_serialized
 def handle_make_move(data):
     """玩家移动棋子（路由函数）"""
     try:
@@ -528,22 +909,17 @@ def handle_make_move(data):
             return
 
         game = games[room_id]
-        game_type = game['game_type']
-        module = GAME_MODULES.get(game_type)
-        
-        if module:
-            # chinese_chess 使用 handle_chess_move，其他使用标准命名
-            if game_type == 'chinese_chess':
-                module.handle_chess_move(game, room_id, sid, data)
-            else:
-                move_handler = getattr(module, f'handle_{game_type}_move', None)
-                if move_handler:
-                    move_handler(game, room_id, sid, data)
+        move_handler = GAME_HANDLERS.get(('make_move', game['game_type']))
+        if move_handler:
+            # 一步棋发给房间的事件（move_made、check、turn_changed、game_over 等）合并发送
+            with transport.batch(room_id):
+                move_handler(game, room_id, sid, data)
     except Exception as e:
-        print(f"Error in handle_make_move: {e}")
+        logger.exception("Error in handle_make_move")
 
 
 @socketio.on('play_again')
+@room_serialized
 def handle_play_again(data):
     """再玩一局"""
     try:
@@ -553,26 +929,22 @@ def handle_play_again(data):
             return
 
         game = games[room_id]
-        game_type = game['game_type']
-        module = GAME_MODULES.get(game_type)
-        
-        if module:
-            # chinese_chess 使用 reset_chess_game，其他使用标准命名
-            if game_type == 'chinese_chess':
-                module.reset_chess_game(game)
-            else:
-                reset_handler = getattr(module, f'reset_{game_type}_game', None)
-                if reset_handler:
-                    reset_handler(game)
-            
-            # chinese_checkers 的消息不同
-            message = '游戏已重置' if game_type == 'chinese_checkers' else '请重新选择先后手'
-            socketio.emit('reset_game', {'message': message}, to=room_id)
+        module = GAME_REGISTRY[game['game_type']]
+        reset_handler = GAME_HANDLERS.get(('play_again', module.game_type))
+        if reset_handler:
+            if game_records.enabled():
+                archive_pending_game(room_id, game)
+            reset_handler(game)
+            game['record_id'] = None
+            game['started_at'] = time.time()
+
+        socketio.emit('reset_game', {'message': module.reset_message}, to=room_id)
     except Exception as e:
-        print(f"Error in handle_play_again: {e}")
+        logger.exception("Error in handle_play_again")
 
 
 @socketio.on('surrender')
+@room_serialized
 def handle_surrender(data):
     """认输"""
     try:
@@ -589,59 +961,37 @@ def handle_surrender(data):
             emit('error', {'message': '游戏已结束'})
             return
 
-        game_type = game['game_type']
-        
-        # doudizhu 不支持认输
-        if game_type == 'doudizhu':
-            emit('error', {'message': '斗地主暂不支持认输'})
+        module = GAME_REGISTRY[game['game_type']]
+        surrender_handler = GAME_HANDLERS.get(('surrender', module.game_type))
+        if surrender_handler is None:
+            emit('error', {'message': f'{module.display_name}暂不支持认输'})
             return
-        
-        # chinese_checkers 特殊处理
-        if game_type == 'chinese_checkers':
-            winner = 1  # 简化处理
-            winner_sid = None
-            loser_sid = sid
-            winner_name = '某位玩家'
-        else:
-            module = GAME_MODULES.get(game_type)
-            if not module:
-                return
-            
-            surrender_handler = getattr(module, f'handle_{game_type}_surrender', None)
-            if not surrender_handler:
-                return
-            
-            winner, winner_sid, loser_sid = surrender_handler(game, sid)
-            
-            winner_name_handler = getattr(module, f'get_{game_type}_winner_name', None)
-            winner_name = winner_name_handler(winner) if winner_name_handler else '某方'
+
+        winner, winner_sid, loser_sid = surrender_handler(game, sid)
+        winner_name_handler = GAME_HANDLERS.get(('winner_name', module.game_type))
+        winner_name = winner_name_handler(winner) if winner_name_handler else '某方'
 
         game['game_over'] = True
         game['winner'] = winner
 
-        # 分别给赢家和输家发送不同的消息
-        # chinese_checkers 和 flip_army_chess 广播，其他发送给特定玩家
-        if game_type in ['chinese_checkers', 'flip_army_chess']:
+        # 部分游戏广播结果，其他分别给赢家和输家发送不同的消息
+        if module.broadcast_game_over:
             socketio.emit('game_over', {
                 'winner': winner,
                 'message': f'{winner_name}获胜！对手认输。'
             }, to=room_id)
         else:
-            # 给赢家发送
-            socketio.emit('game_over', {
-                'winner': winner,
-                'message': f'{winner_name}获胜！对手认输。'
-            }, to=winner_sid)
-            # 给输家发送
-            socketio.emit('game_over', {
-                'winner': winner,
-                'message': '你认输了。'
-            }, to=loser_sid)
+            transport.emit_each('game_over', {'winner': winner}, [
+                (winner_sid, {'message': f'{winner_name}获胜！对手认输。'}),
+                (loser_sid, {'message': '你认输了。'}),
+            ])
+            refresh_spectators(room_id, game)
     except Exception as e:
-        print(f"Error in handle_surrender: {e}")
+        logger.exception("Error in handle_surrender")
 
 
 @socketio.on('leave_room')
+@room_serialized
 def handle_leave_room(data):
     """离开房间"""
     try:
@@ -650,68 +1000,113 @@ def handle_leave_room(data):
 
         if room_id in games:
             leave_room(room_id)
+            room_index.remove_room_member(room_id, sid)
             socketio.emit('player_left', {'sid': sid}, to=room_id)
-            print(f"Player {sid} left room {room_id}")
+            logger.info("Player %s left room %s", sid, room_id)
+            # 离开后断线不再经过这个房间：立即按断线处理座位（对手收到 player_disconnected，房间关闭）
+            handle_room_disconnect(room_id, sid)
+            # 所有玩家都已离开时删除房间（共享存储时其他 worker 上可能还有成员，交由空闲回收处理）
+            if room_id in games and not games.shared and not room_index.get_room_sids(room_id):
+                remove_game_room(room_id)
+                logger.info("Room removed: %s", room_id)
     except Exception as e:
-        print(f"Error in handle_leave_room: {e}")
+        logger.exception("Error in handle_leave_room")
 
 
 # 斗地主相关事件处理
 @socketio.on('choose_landlord')
+@room_serialized
 def handle_choose_landlord_handler(data):
     """玩家选择是否叫地主"""
     try:
         room_id = data.get('room_id')
         sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
-        handle_choose_landlord(games, room_id, sid, data, socketio, emit)
+        handle_choose_landlord(games, room_id, sid, data)
     except Exception as e:
-        print(f"Error in handle_choose_landlord: {e}")
+        logger.exception("Error in handle_choose_landlord")
 
 
 @socketio.on('play_cards')
+@room_serialized
 def handle_play_cards_handler(data):
     """玩家出牌"""
     try:
         room_id = data.get('room_id')
         sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
-        handle_play_cards(games, room_id, sid, data, socketio, emit)
+        with transport.batch(room_id):
+            handle_play_cards(games, room_id, sid, data)
     except Exception as e:
-        print(f"Error in handle_play_cards: {e}")
+        logger.exception("Error in handle_play_cards")
 
 
 @socketio.on('pass_turn')
+@room_serialized
 def handle_pass_turn_handler(data):
-    """玩家不出牌"""
+    """玩家不出牌（斗地主）/ 停一手（围棋）"""
     try:
         room_id = data.get('room_id')
         sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
-        handle_pass_turn(games, room_id, sid, data, socketio, emit)
+        game = games.get(room_id)
+        pass_handler = GAME_HANDLERS.get(('pass_turn', game['game_type'])) if game is not None else None
+        with transport.batch(room_id):
+            if pass_handler:
+                pass_handler(game, room_id, sid, data)
+            else:
+                handle_pass_turn(games, room_id, sid, data)
     except Exception as e:
-        print(f"Error in handle_pass_turn: {e}")
+        logger.exception("Error in handle_pass_turn")
+
+
+# 围棋点目相关事件处理
+@socketio.on('mark_dead')
+@room_serialized
+def handle_mark_dead(data):
+    """点目阶段标记 / 取消标记死子"""
+    try:
+        room_id = data.get('room_id')
+        sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
+        game = games.get(room_id)
+        if game is None or game['game_type'] != 'go':
+            return
+        go_module.handle_go_mark_dead(game, room_id, sid, data)
+    except Exception as e:
+        logger.exception("Error in handle_mark_dead")
+
+
+@socketio.on('accept_score')
+@room_serialized
+def handle_accept_score(data):
+    """确认点目结果"""
+    try:
+        room_id = data.get('room_id')
+        sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
+        game = games.get(room_id)
+        if game is None or game['game_type'] != 'go':
+            return
+        go_module.handle_go_accept_score(game, room_id, sid, data)
+    except Exception as e:
+        logger.exception("Error in handle_accept_score")
 
 
 @socketio.on('undo_request')
+@room_serialized
 def handle_undo_request(data):
     """悔棋请求"""
-    print(f"=== 收到悔棋请求 ===")
-    print(f"请求数据: {data}")
-    
     room_id = data.get('room_id')
     sid = request.sid  # pyright: ignore[reportAttributeAccessIssue]
-    
-    print(f"房间ID: {room_id}, 请求者SID: {sid}")
-    
+    logger.debug("收到悔棋请求: %s", data)
+
     if room_id not in games:
-        print(f"房间 {room_id} 不存在")
+        logger.debug("房间 %s 不存在", room_id)
         return
     
     game = games[room_id]
-    print(f"游戏类型: {game['game_type']}")
-    print(f"游戏状态: {'已结束' if game['game_over'] else '进行中'}")
-    print(f"移动记录数: {len(game.get('moves', []))}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("游戏状态: %s, 移动记录数: %d",
+                     '已结束' if game['game_over'] else '进行中', len(game.get('moves', [])))
 
-    # 斗地主和军棋不支持悔棋
-    if game['game_type'] in UNDO_UNSUPPORTED_GAMES:
+    # 未注册悔棋处理的游戏（斗地主、军棋等）不支持悔棋
+    if ('undo', game['game_type']) not in GAME_HANDLERS:
         emit('error', {'message': '该游戏不支持悔棋'})
         return
 
@@ -727,28 +1122,27 @@ def handle_undo_request(data):
 
     # 获取当前玩家编号
     current_player = game['current_player']
-    print(f"当前玩家编号: {current_player}")
-        
+
     # 根据游戏类型获取当前轮到的玩家 sid
     player_sid = get_game_current_player_sid(game)
-    print(f"当前轮到玩家SID: {player_sid}")
+    logger.debug("当前玩家编号: %s, 当前轮到玩家SID: %s", current_player, player_sid)
 
     # 检查是否已经有待处理的悔棋请求
     if game.get('undo_requested', False):
-        print(f"已经有待处理的悔棋请求")
+        logger.debug("已经有待处理的悔棋请求")
         emit('error', {'message': '已经有待处理的悔棋请求'})
         return
 
     # 只能悔自己刚才走的那一步（轮到对方的时候请求）
     if sid == player_sid:
-        print(f"请求者SID {sid} 与目标玩家SID {player_sid} 相同，不能请求悔棋自己的棋")
+        logger.debug("请求者与当前轮到的玩家相同，不能请求悔棋自己的棋")
         emit('error', {'message': '只能请求悔棋自己的棋'})
         return
 
     # 检查是否连续悔棋（上次悔棋的玩家不能连续悔棋）
     last_undo_player = game.get('last_undo_player')
     if last_undo_player == sid:
-        print(f"玩家 {sid} 不能连续悔棋")
+        logger.debug("玩家 %s 不能连续悔棋", sid)
         emit('error', {'message': '不能连续悔棋'})
         return
 
@@ -757,17 +1151,16 @@ def handle_undo_request(data):
     game['undo_requester_sid'] = sid
 
     # 通知对方有悔棋请求
-    print(f"发送悔棋请求给玩家: {player_sid}")
-    print(f"发送数据: {{'player': {current_player}, 'room_id': '{room_id}'}}")
     socketio.emit('undo_request', {
         'player': current_player,
         'room_id': room_id
     }, to=player_sid)
 
-    print(f"Undo request from {sid} in room {room_id}")
+    logger.info("Undo request from %s in room %s", sid, room_id)
 
 
 @socketio.on('undo_response')
+@room_serialized
 def handle_undo_response(data):
     """悔棋响应"""
     room_id = data.get('room_id')
@@ -779,8 +1172,8 @@ def handle_undo_response(data):
 
     game = games[room_id]
 
-    # 斗地主和军棋不支持悔棋
-    if game['game_type'] in UNDO_UNSUPPORTED_GAMES:
+    # 未注册悔棋处理的游戏（斗地主、军棋等）不支持悔棋
+    if ('undo', game['game_type']) not in GAME_HANDLERS:
         return
 
     # 检查游戏是否结束
@@ -802,12 +1195,10 @@ def handle_undo_response(data):
         if not game.get('moves'):
             return
 
+        # 按走棋日志撤销最后一步（棋盘、被吃 / 被翻的子、易位权和当前玩家一并恢复）
         last_move = game['moves'].pop()
         execute_game_undo(game, last_move)
 
-        # 切换回之前的玩家
-        game['current_player'] = last_move['player']
-
         # 记录悔棋玩家（申请者），防止连续悔棋
         if requester_sid:
             game['last_undo_player'] = requester_sid
@@ -825,14 +1216,24 @@ def handle_undo_response(data):
         # 只有被吃的棋子才添加 captured 字段
         if last_move.get('captured') is not None:
             if game['game_type'] == 'chinese_chess':
-                undo_data['captured_name'] = last_move['captured']['name']
-                undo_data['captured_type'] = last_move['captured']['type']
-                undo_data['captured_color'] = last_move['captured']['color']
+                captured = chinese_chess.piece_info(last_move['captured'])
+                undo_data['captured_name'] = captured['name']
+                undo_data['captured_type'] = captured['type']
+                undo_data['captured_color'] = captured['color']
+            elif game['game_type'] == 'go':
+                # 围棋悔棋时放回被提的子
+                undo_data['captured'] = last_move['captured']
+        if last_move.get('flipped'):
+            # 黑白棋悔棋时翻回被翻转的子
+            undo_data['flipped'] = last_move['flipped']
         socketio.emit('undo_move', undo_data, to=room_id)
+        if game['game_type'] == 'go' and game['estimate']:
+            # 棋盘已改变，按悔棋后的局面重新估计（撤销停一手时也会回到对局）
+            go_module.publish_go_estimate(game, room_id)
 
-        print(f"Undo approved in room {room_id}")
+        logger.info("Undo approved in room %s", room_id)
     else:
-        print(f"Undo rejected in room {room_id}")
+        logger.info("Undo rejected in room %s", room_id)
 
     # 通知申请者结果
     if requester_sid:
@@ -847,6 +1248,7 @@ def handle_undo_response(data):
 
 
 @socketio.on('draw_request')
+@room_serialized
 def handle_draw_request(data):
     """和棋请求"""
     room_id = data.get('room_id')
@@ -862,33 +1264,20 @@ def handle_draw_request(data):
         socketio.emit('error', {'message': '游戏已结束'}, to=sid)
         return
 
-    game_type = game['game_type']
-    module = GAME_MODULES.get(game_type)
-    
-    # 根据游戏类型获取对手 sid
-    if module:
-        opponent_handler = getattr(module, f'get_{game_type}_opponent_sid', None)
-        if opponent_handler:
-            opponent_sid = opponent_handler(game, sid)
-        else:
-            # chinese_checkers, doudizhu 等没有 opponent 函数的游戏
-            opponent_sid = None
-    elif game_type == 'checkers':
-        # 特殊处理 checkers 类型
-        current_player = game['current_player']
-        opponent_sid = game['red_player'] if current_player == 1 else game['blue_player']
-    else:
-        opponent_sid = None
+    # 根据游戏类型获取对手 sid（中国跳棋、斗地主等没有对手函数的游戏不支持）
+    opponent_handler = GAME_HANDLERS.get(('opponent_sid', game['game_type']))
+    opponent_sid = opponent_handler(game, sid) if opponent_handler else None
 
     if opponent_sid:
         # 通知对方有和棋请求
         socketio.emit('draw_request', {
             'room_id': room_id
         }, to=opponent_sid)
-        print(f"Draw request from {sid} in room {room_id}")
+        logger.info("Draw request from %s in room %s", sid, room_id)
 
 
 @socketio.on('draw_response')
+@room_serialized
 def handle_draw_response(data):
     """和棋响应"""
     room_id = data.get('room_id')
@@ -913,19 +1302,58 @@ def handle_draw_response(data):
             'message': '双方同意和棋！'
         }, to=room_id)
 
-        print(f"Draw approved in room {room_id}")
+        logger.info("Draw approved in room %s", room_id)
     else:
-        print(f"Draw rejected in room {room_id}")
+        logger.info("Draw rejected in room %s", room_id)
+
+
+# 采集时读取的房间、执行器与日志指标
+metrics.Gauge('game_rooms', 'Resident rooms by phase', ('phase',),
+              callback=lambda: {(phase,): count for phase, count in
+                                room_reaper.get_reaper_stats()['rooms_by_phase'].items()})
+metrics.Gauge('game_rooms_by_type', 'Resident rooms by game type', ('game_type',),
+              callback=lambda: {(game_type,): count for game_type, count in
+                                room_reaper.get_reaper_stats()['rooms_by_game_type'].items()})
+metrics.Counter('game_rooms_closed_total', 'Rooms closed by the reaper', ('reason',),
+                callback=lambda: {('idle',): room_reaper.get_reaper_stats()['reaped_total'],
+                                  ('evicted',): room_reaper.get_reaper_stats()['evicted_total']})
+metrics.Counter('game_rooms_rejected_total', 'Room creations rejected because the server is full',
+                callback=lambda: {(): room_reaper.get_reaper_stats()['rejected_total']})
+metrics.Gauge('game_room_ids_in_use', 'Allocated room ids by namespace', ('namespace',),
+              callback=lambda: {(namespace,): pool['in_use'] for namespace, pool in
+                                room_ids.get_room_id_stats().items()})
+metrics.Gauge('game_room_queued_events', 'Events waiting in room mailboxes',
+              callback=lambda: {(): room_executor.get_executor_stats()['queued_events']})
+metrics.Counter('game_room_events_rejected_total', 'Events rejected because a room mailbox was full',
+                callback=lambda: {(): room_executor.get_executor_stats()['rejected_total']})
+metrics.Counter('game_room_queue_wait_seconds_total', 'Time events spent waiting in room mailboxes',
+                callback=lambda: {(): room_executor.get_executor_stats()['wait_seconds_total']})
+metrics.Gauge('game_spectators', 'Spectators watching rooms on this worker',
+              callback=lambda: {(): len(spectators.sid_rooms)})
+metrics.Counter('game_records_written_total', 'Game records committed to the record store',
+                callback=lambda: {(): game_records.get_record_stats()['appended_total']})
+metrics.Counter('game_records_dropped_total', 'Game records dropped because the record queue was full or a write failed',
+                callback=lambda: {(): game_records.get_record_stats()['dropped_total']})
+metrics.Counter('game_record_commits_total', 'Group commits (one fsync each) to the record store',
+                callback=lambda: {(): game_records.get_record_stats()['commits_total']})
+metrics.Counter('game_log_records_dropped_total', 'Log records dropped because the log queue was full',
+                callback=lambda: {(): game_logging.get_logging_stats()['dropped_total']})
+logging.getLogger().addHandler(metrics.ErrorCountingHandler(metrics.EVENT_ERRORS, game_logging.get_log_context))
+
+instrument_event_handlers()
+
+# 启动空闲房间回收与事件循环延迟测量任务
+socketio.start_background_task(room_reaper_loop)
+socketio.start_background_task(event_loop_lag_loop)
+if spectators.throttle:
+    socketio.start_background_task(spectator_flush_loop)
+if go_estimate.available():
+    socketio.start_background_task(go_estimate_loop)
 
 
 if __name__ == '__main__':
-    print("="*50)
-    print("Online Game Server Starting")
-    print("Supported Games: Gobang, Chinese Chess, Go, Othello, Army Chess, Dou Dizhu, Checkers")
-    print("="*50)
-    print(f"Async mode: {ASYNC_MODE}")
-    print(f"Host: 0.0.0.0")
-    print(f"Port: 5000")
-    print("="*50)
+    logger.info("Online Game Server Starting")
+    logger.info("Supported Games: %s", ', '.join(module.display_name for module in GAME_REGISTRY.values()))
+    logger.info("Async mode: %s, listening on 0.0.0.0:5000", ASYNC_MODE)
 
     socketio.run(app, host='0.0.0.0', port=5000, debug=False, allow_unsafe_werkzeug=True)
@@ -0,0 +1,3 @@
+"""
+规则函数基准测试（见 bench_rules.py）
+"""
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+规则函数基准测试
+对 positions.py 中的每个用例测量每秒调用次数（ops/sec）与单次调用的内存分配峰值，
+并与仓库中的基准结果（baseline.json）比较，任一用例退化超过阈值时退出码为 1。
+
+为了让不同机器上的结果可以比较，每个用例与一段固定的纯 Python 参考负载交替计时，
+比较时使用 ops/sec 与参考负载速度的比值。
+
+用法（在 server 目录下）:
+    python3 -m benchmarks.bench_rules                     # 运行并与基准比较
+    python3 -m benchmarks.bench_rules --filter go.        # 只运行名称包含 go. 的用例
+    python3 -m benchmarks.bench_rules --update-baseline   # 更新基准结果
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.positions import build_cases
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+# 每轮计时的最短时长（秒）与轮数，取最快的一轮
+MIN_ROUND_SECONDS = 0.02
+ROUNDS = 7
+# 内存峰值低于该值（字节）的变化不算退化
+ALLOCATION_SLACK = 1024
+
+
+def reference_workload():
+    """参考负载：字典、列表与整数运算的混合，代表规则函数的典型操作"""
+    table = {}
+    for i in range(200):
+        table[(i % 15, i % 7)] = table.get((i % 15, i % 7), 0) + i
+    return sorted(table.values())[-1]
+
+
+def calibrate(func, args):
+    """确定每轮调用次数，使一轮至少持续 MIN_ROUND_SECONDS"""
+    number = 1
+    while True:
+        started_at = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= MIN_ROUND_SECONDS:
+            return number
+        number *= 2 if elapsed == 0 else max(2, int(MIN_ROUND_SECONDS / elapsed * 1.2))
+
+
+def time_round(func, args, number):
+    started_at = time.perf_counter()
+    for _ in range(number):
+        func(*args)
+    return time.perf_counter() - started_at
+
+
+def measure_speed(func, args, reference_number):
+    """返回 (每秒调用次数, 参考负载每秒次数)
+
+    用例与参考负载交替计时，各取最快的一轮，使两者处在相同的 CPU 状态下（频率调整、其他进程干扰）
+    """
+    number = calibrate(func, args)
+    best = best_reference = float('inf')
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(ROUNDS):
+            best = min(best, time_round(func, args, number))
+            best_reference = min(best_reference, time_round(reference_workload, (), reference_number))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return number / best, reference_number / best_reference
+
+
+def measure_allocations(func, args):
+    """返回单次调用的内存分配峰值（字节）"""
+    func(*args)  # 预热，排除首次调用的缓存分配
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - before)
+
+
+def run(name_filter=None):
+    """运行所有（或名称包含 name_filter 的）用例"""
+    reference_number = calibrate(reference_workload, ())
+    references = []
+    results = {}
+    for name, func, args in build_cases():
+        if name_filter and name_filter not in name:
+            continue
+        ops, reference = measure_speed(func, args, reference_number)
+        references.append(reference)
+        results[name] = {
+            'ops_per_sec': round(ops, 1),
+            'relative_speed': round(ops / reference, 6),
+            'peak_alloc_bytes': measure_allocations(func, args),
+        }
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'reference_ops_per_sec': round(max(references, default=0), 1),
+        'cases': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """与基准比较，返回 [(用例, 说明)] 形式的退化列表"""
+    regressions = []
+    for name, result in current['cases'].items():
+        expected = baseline.get('cases', {}).get(name)
+        if expected is None:
+            continue
+        speed_ratio = result['relative_speed'] / expected['relative_speed']
+        if speed_ratio < 1 - threshold:
+            regressions.append((name, f'speed {speed_ratio:.0%} of baseline'))
+        allowed = expected['peak_alloc_bytes'] * (1 + threshold) + ALLOCATION_SLACK
+        if result['peak_alloc_bytes'] > allowed:
+            regressions.append((name, f"peak allocation {result['peak_alloc_bytes']} B "
+                                      f"(baseline {expected['peak_alloc_bytes']} B)"))
+    return regressions
+
+
+def print_results(current, baseline):
+    print(f"Python {current['python']} ({current['implementation']}), "
+          f"reference workload {current['reference_ops_per_sec']:.0f} ops/sec")
+    print(f"{'case':<56}{'ops/sec':>12}{'vs base':>9}{'peak alloc':>12}")
+    for name, result in current['cases'].items():
+        expected = baseline.get('cases', {}).get(name)
+        change = f"{result['relative_speed'] / expected['relative_speed']:.0%}" if expected else 'new'
+        print(f"{name:<56}{result['ops_per_sec']:>12.0f}{change:>9}{result['peak_alloc_bytes']:>10} B")
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='规则函数基准测试')
+    parser.add_argument('--filter', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='允许的退化比例（默认 0.25，即慢 25%% 以上视为退化）')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='基准结果文件')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果更新基准结果')
+    parser.add_argument('--json', help='把本次结果写入 JSON 文件')
+    options = parser.parse_args(argv)
+
+    baseline = load_baseline(options.baseline)
+    current = run(options.filter)
+    print_results(current, baseline)
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if options.update_baseline:
+        if options.filter and baseline:
+            # 只更新本次运行的用例
+            baseline.setdefault('cases', {}).update(current['cases'])
+            current = dict(current, cases=baseline['cases'])
+        with open(options.baseline, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {options.baseline}')
+        return 0
+
+    if baseline.get('python') and baseline['python'].rsplit('.', 1)[0] != current['python'].rsplit('.', 1)[0]:
+        print(f"WARNING: baseline was recorded with Python {baseline['python']}")
+    regressions = compare(current, baseline, options.threshold)
+    for name, reason in regressions:
+        print(f'REGRESSION {name}: {reason}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+基准测试的局面语料
+每个用例为 (名称, 函数, 参数)。局面由固定随机种子按规则对弈生成，每次运行完全相同：
+- opening / midgame：开局局面与随机对弈若干步后的中盘局面
+- worst：让函数走完最长路径的局面（长连线、大棋块、全盘扫描、无解的搜索等）
+被测函数不能修改传入的局面（只测试 check_move 等只读的函数）
+棋盘与各游戏的房间状态一致，为一维 bytearray / array（下标 row * 列数 + col）
+"""
+
+import random
+from array import array
+
+from games.go_groups import build_groups
+from games import army_chess, chinese_checkers, chinese_chess, doudizhu, go, go_estimate, gobang, international_chess, othello
+
+SEED = 20240601
+
+
+# ---------- 五子棋 ----------
+
+def gobang_midgame(moves=60):
+    """双方在中心附近随机落子，直到出现胜负前的最后一步"""
+    rng = random.Random(SEED)
+    size = gobang.BOARD_SIZE
+    board = bytearray(size * size)
+    last = None
+    player = 1
+    for _ in range(moves):
+        empty = [(r, c) for r in range(3, 12) for c in range(3, 12) if board[r * size + c] == 0]
+        row, col = rng.choice(empty)
+        board[row * size + col] = player
+        if gobang.check_gobang_winner(board, row, col):
+            board[row * size + col] = 0
+            break
+        last = (row, col)
+        player = 3 - player
+    return board, last
+
+
+def gobang_worst():
+    """中心棋子四个方向都是被挡住的四连：每个方向都要扫到底且不成五"""
+    size = gobang.BOARD_SIZE
+    board = bytearray(size * size)
+    row, col = 7, 7
+    board[row * size + col] = 1
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for step in (1, 2, 3):
+            board[(row + dr * step) * size + col + dc * step] = 1
+        board[(row + dr * 4) * size + col + dc * 4] = 2
+        board[(row - dr) * size + col - dc] = 2
+    return board, (row, col)
+
+
+# ---------- 围棋 ----------
+
+GO_GEOMETRY = go.GEOMETRIES[go.DEFAULT_BOARD_SIZE]
+
+
+def go_midgame(moves=160):
+    """随机对弈（跳过自杀手），返回局面、棋块与最后一步"""
+    rng = random.Random(SEED)
+    size = go.DEFAULT_BOARD_SIZE
+    board = bytearray(size * size)
+    groups = build_groups(board, GO_GEOMETRY)
+    player = 1
+    last = None
+    for _ in range(moves):
+        empty = [point for point, stone in enumerate(board) if stone == 0]
+        rng.shuffle(empty)
+        for point in empty:
+            captured = groups.check_move(board, point, player)
+            if captured is None:
+                continue
+            board[point] = player
+            groups.place(board, point)
+            for root in captured:
+                for stone in groups.stones[root]:
+                    board[stone] = 0
+                groups.remove(board, root)
+            last = divmod(point, size)
+            break
+        player = 3 - player
+    return board, groups, last
+
+
+def go_crowded_point(board):
+    """四周都有棋子的空点：check_move 要查看四个相邻棋块"""
+    for point, stone in enumerate(board):
+        if stone == 0 and len(GO_GEOMETRY.neighbors[point]) == 4 and all(board[n] for n in GO_GEOMETRY.neighbors[point]):
+            return point
+    return next(point for point, stone in enumerate(board) if stone == 0)
+
+
+def go_large_group():
+    """一整块黑棋占满棋盘，只留一口气：白棋落在最后一口气上提掉 360 个棋子"""
+    board = bytearray([1]) * (go.DEFAULT_BOARD_SIZE * go.DEFAULT_BOARD_SIZE)
+    board[-1] = 0
+    return board
+
+
+def go_scattered_groups():
+    """棋盘上交错分布的 181 个单子：重建时每个单子各成一块"""
+    size = go.DEFAULT_BOARD_SIZE
+    return bytearray(1 if (r + c) % 2 == 0 else 0 for r in range(size) for c in range(size))
+
+
+# ---------- 黑白棋 ----------
+
+def othello_midgame(moves=30):
+    rng = random.Random(SEED)
+    board = othello.initialize_othello_board()
+    player = 1
+    for _ in range(moves):
+        valid = othello.get_valid_othello_moves(board, player)
+        if not valid:
+            player = 3 - player
+            continue
+        row, col = rng.choice(valid)
+        for point in othello.get_othello_flips(board, row, col, player):
+            board[point] = player
+        board[row * othello.BOARD_SIZE + col] = player
+        player = 3 - player
+    valid = othello.get_valid_othello_moves(board, player)
+    return board, player, valid[0]
+
+
+def othello_worst():
+    """落子点八个方向都能一直翻到棋盘边缘"""
+    size = othello.BOARD_SIZE
+    board = bytearray([2]) * (size * size)
+    row, col = 3, 3
+    board[row * size + col] = 0
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            if dr == 0 and dc == 0:
+                continue
+            r, c = row + dr, col + dc
+            while 0 <= r + dr < size and 0 <= c + dc < size:
+                r, c = r + dr, c + dc
+            board[r * size + c] = 1
+    return board, (row, col)
+
+
+# ---------- 中国象棋 ----------
+
+def chinese_chess_midgame(plies=40):
+    """双方随机走合法的着法（不吃将）"""
+    rng = random.Random(SEED)
+    board = chinese_chess.initialize_chess_board()
+    cols = chinese_chess.COLS
+    color = 0
+    for _ in range(plies):
+        candidates = []
+        for src, piece in enumerate(board):
+            if not piece or (piece & chinese_chess.BLACK) != color:
+                continue
+            fr, fc = divmod(src, cols)
+            for dst, target in enumerate(board):
+                if target and ((target & chinese_chess.BLACK) == color or
+                               (target & chinese_chess.TYPE_MASK) == chinese_chess.KING):
+                    continue
+                tr, tc = divmod(dst, cols)
+                if chinese_chess.is_valid_chess_move(board, fr, fc, tr, tc, piece):
+                    candidates.append((src, dst))
+        if not candidates:
+            break
+        src, dst = rng.choice(candidates)
+        board[dst] = board[src]
+        board[src] = 0
+        color ^= chinese_chess.BLACK
+    return board
+
+
+# ---------- 国际象棋 ----------
+
+def international_chess_midgame(plies=30):
+    rng = random.Random(SEED)
+    board = international_chess.initialize_international_chess_board()
+    color = 1
+    size = international_chess.BOARD_SIZE
+    for _ in range(plies):
+        candidates = []
+        for square, piece in enumerate(board):
+            if international_chess.get_piece_color(piece) != color:
+                continue
+            row, col = divmod(square, size)
+            for tr, tc in international_chess.get_valid_international_chess_moves(board, row, col):
+                if abs(board[tr * size + tc]) != international_chess.WHITE_KING:
+                    candidates.append((square, tr * size + tc))
+        if not candidates:
+            break
+        src, dst = rng.choice(candidates)
+        board[dst] = board[src]
+        board[src] = 0
+        color = -color
+    return board
+
+
+def international_chess_stalemate():
+    """黑王被逼和：has_valid_moves 要模拟黑方所有着法并逐一检查将军"""
+    size = international_chess.BOARD_SIZE
+    board = array('b', bytes(size * size))
+    board[7 * size + 7] = international_chess.BLACK_KING
+    board[5 * size + 6] = international_chess.WHITE_QUEEN
+    board[0] = international_chess.WHITE_KING
+    for col in range(1, 6):
+        board[size + col] = international_chess.WHITE_PAWN
+    board[3] = international_chess.WHITE_ROOK
+    board[2] = international_chess.WHITE_BISHOP
+    return board
+
+
+# ---------- 军棋 ----------
+
+def army_chess_railway_case(blocked):
+    """工兵从左上角铁路到右下角；blocked 时终点被围住，BFS 要搜完整个铁路网后失败"""
+    cols = army_chess.COLS
+    board = bytearray(army_chess.ROWS * cols)
+    board[1 * cols + 0] = army_chess.RED | army_chess.PIECE_CODES['工兵']
+    board[5 * cols + 2] = army_chess.BLUE | army_chess.PIECE_CODES['连长']
+    if blocked:
+        board[9 * cols + 4] = army_chess.BLUE | army_chess.PIECE_CODES['排长']
+        board[10 * cols + 3] = army_chess.BLUE | army_chess.PIECE_CODES['排长']
+    return board, 1, 0, 10, 4
+
+
+# ---------- 中国跳棋 ----------
+
+def chinese_checkers_midgame(plies=36):
+    """红方与蓝方随机走合法着法"""
+    rng = random.Random(SEED)
+    board = chinese_checkers.initialize_chinese_checkers_board()
+    cols = chinese_checkers.COLS
+    colors = [chinese_checkers.COLOR_CODES['red'], chinese_checkers.COLOR_CODES['blue']]
+    last = None
+    for ply in range(plies):
+        color = colors[ply % 2]
+        pieces = [divmod(square, cols) for square, piece in enumerate(board) if piece == color]
+        rng.shuffle(pieces)
+        for row, col in pieces:
+            moves = chinese_checkers.get_all_possible_moves(board, row, col)
+            if moves:
+                move = rng.choice(moves)
+                board[move['to_row'] * cols + move['to_col']] = color
+                board[row * cols + col] = 0
+                last = (move['to_row'], move['to_col'])
+                break
+    return board, last
+
+
+def chinese_checkers_jump_lattice():
+    """中心一个棋子，周围一圈都是可连续跳跃的落点：搜索所有跳跃路径"""
+    cols = chinese_checkers.COLS
+    board = bytearray(chinese_checkers.ROWS * cols)
+    center = (8, 12)
+    directions = [(-1, -1), (-1, 1), (0, -2), (0, 2), (1, -1), (1, 1)]
+    landings = {center} | {(center[0] + 2 * dr, center[1] + 2 * dc) for dr, dc in directions}
+    for row, col in landings:
+        for dr, dc in directions:
+            mid = (row + dr, col + dc)
+            if mid not in landings and chinese_checkers.is_valid_position(*mid):
+                board[mid[0] * cols + mid[1]] = chinese_checkers.COLOR_CODES['blue']
+    board[center[0] * cols + center[1]] = chinese_checkers.COLOR_CODES['red']
+    return board, center
+
+
+# ---------- 斗地主 ----------
+
+def _cards(ranks):
+    return [{'rank': rank, 'suit': index % 4} for index, rank in enumerate(ranks)]
+
+
+DOUDIZHU_HANDS = {
+    'single': _cards([9]),
+    'straight_12': _cards(range(3, 15)),
+    'airplane_pair': _cards([5, 5, 5, 6, 6, 6, 9, 9, 11, 11]),
+    # 20 张不成牌型：依次尝试所有牌型后返回 None
+    'invalid_20': _cards([3, 3, 4, 5, 5, 6, 7, 7, 7, 8, 9, 9, 10, 11, 11, 12, 13, 13, 14, 14]),
+}
+
+
+def build_cases():
+    """生成所有用例：[(名称, 函数, 参数), ...]"""
+    cases = []
+
+    board, last = gobang_midgame()
+    cases.append(('gobang.check_gobang_winner/midgame', gobang.check_gobang_winner, (board, *last)))
+    board, last = gobang_worst()
+    cases.append(('gobang.check_gobang_winner/worst', gobang.check_gobang_winner, (board, *last)))
+
+    board, groups, _ = go_midgame()
+    player = 1 if board.count(1) <= board.count(2) else 2
+    cases.append(('go.GoGroups.check_move/midgame', groups.check_move, (board, go_crowded_point(board), player)))
+    large = go_large_group()
+    cases.append(('go.GoGroups.check_move/worst', build_groups(large, GO_GEOMETRY).check_move, (large, len(large) - 1, 2)))
+    cases.append(('go.build_groups/midgame', build_groups, (board, GO_GEOMETRY)))
+    cases.append(('go.build_groups/worst', build_groups, (go_scattered_groups(), GO_GEOMETRY)))
+    cases.append(('go.count_go_area/midgame', go.count_go_area, (board, set(), GO_GEOMETRY)))
+    cases.append(('go.count_go_area/worst', go.count_go_area, (go_scattered_groups(), set(), GO_GEOMETRY)))
+    if go_estimate.available():
+        cases.append(('go.estimate_ownership/midgame', go_estimate.estimate_ownership, (board, GO_GEOMETRY)))
+
+    board, player, move = othello_midgame()
+    cases.append(('othello.get_othello_flips/midgame', othello.get_othello_flips, (board, *move, player)))
+    worst_board, move = othello_worst()
+    cases.append(('othello.get_othello_flips/worst', othello.get_othello_flips, (worst_board, *move, 1)))
+    cases.append(('othello.get_valid_othello_moves/midgame', othello.get_valid_othello_moves, (board, player)))
+
+    cases.append(('chinese_chess.is_check/opening', chinese_chess.is_check,
+                  (chinese_chess.initialize_chess_board(), 'red')))
+    cases.append(('chinese_chess.is_check/midgame', chinese_chess.is_check, (chinese_chess_midgame(), 'red')))
+
+    opening = international_chess.initialize_international_chess_board()
+    cases.append(('international_chess.is_check/opening', international_chess.is_check, (opening, 1)))
+    cases.append(('international_chess.is_check/midgame', international_chess.is_check,
+                  (international_chess_midgame(), 1)))
+    cases.append(('international_chess.has_valid_moves/opening', international_chess.has_valid_moves,
+                  (opening, 1)))
+    cases.append(('international_chess.has_valid_moves/worst', international_chess.has_valid_moves,
+                  (international_chess_stalemate(), -1)))
+
+    cases.append(('army_chess._check_sapper_railway_path/midgame', army_chess._check_sapper_railway_path,
+                  army_chess_railway_case(blocked=False)))
+    cases.append(('army_chess._check_sapper_railway_path/worst', army_chess._check_sapper_railway_path,
+                  army_chess_railway_case(blocked=True)))
+
+    board, last = chinese_checkers_midgame()
+    cases.append(('chinese_checkers.get_all_jump_steps/midgame', chinese_checkers.get_all_jump_steps,
+                  (board, *last)))
+    board, center = chinese_checkers_jump_lattice()
+    cases.append(('chinese_checkers.get_all_jump_steps/worst', chinese_checkers.get_all_jump_steps,
+                  (board, *center)))
+
+    for name, cards in DOUDIZHU_HANDS.items():
+        cases.append((f'doudizhu.check_card_type/{name}', doudizhu.check_card_type, (cards,)))
+    return cases
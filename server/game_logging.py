@@ -0,0 +1,233 @@
+"""
+日志
+- 各模块使用 logging.getLogger(...)，日志级别可按模块配置，调试输出在生产级别下直接被过滤
+- 处理函数只把日志记录放入队列，由后台线程批量格式化并写出，不在事件处理中同步写 stdout；
+  eventlet 模式下后台线程为真实的系统线程，写日志不会阻塞 eventlet hub
+- 队列已满时丢弃记录并计数，不阻塞事件处理
+- 支持 JSON 结构化输出：房间事件中的日志自动附带 room_id / sid / game_type / event 等字段
+"""
+
+import atexit
+import contextlib
+import json
+import logging
+import logging.handlers
+import sys
+import threading
+
+try:
+    from eventlet import patcher as _eventlet_patcher
+    _os_threading = _eventlet_patcher.original('threading')
+    _os_queue = _eventlet_patcher.original('queue')
+except ImportError:
+    import queue as _os_queue
+    _os_threading = threading
+
+DEFAULT_LEVEL = 'INFO'
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 256
+# 结构化字段：由日志上下文或 extra 参数提供
+CONTEXT_FIELDS = ('room_id', 'sid', 'game_type', 'event', 'latency_ms')
+
+# 当前 greenlet / 线程的日志上下文（eventlet 模式下 threading.local 按 greenlet 隔离）
+_context = threading.local()
+
+listener = None
+queue_handler = None
+stats = {'dropped_total': 0}
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """在上下文中记录的日志自动附带给定字段"""
+    previous = getattr(_context, 'fields', None)
+    merged = dict(previous) if previous else {}
+    merged.update(fields)
+    _context.fields = merged
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+def update_log_context(**fields):
+    """补充当前日志上下文中的字段（如处理过程中才确定的 game_type）"""
+    current = getattr(_context, 'fields', None)
+    if current is not None:
+        current.update(fields)
+
+
+def get_log_context():
+    """获取当前日志上下文中的字段"""
+    return getattr(_context, 'fields', None) or {}
+
+
+class ContextFilter(logging.Filter):
+    """把日志上下文中的字段写入日志记录（在调用方执行，之后才进入队列）"""
+
+    def filter(self, record):
+        fields = getattr(_context, 'fields', None)
+        if fields:
+            for key, value in fields.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，附带结构化字段"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = [f'{key}={getattr(record, key)}' for key in CONTEXT_FIELDS
+                  if getattr(record, key, None) is not None]
+        return f"{line} [{' '.join(fields)}]" if fields else line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列已满时丢弃记录而不是阻塞"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except _os_queue.Full:
+            stats['dropped_total'] += 1
+
+    def prepare(self, record):
+        # 在调用方合并消息参数（参数可能是之后会被修改的房间状态），格式化留给后台线程
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BatchingListener:
+    """后台系统线程：从队列中批量取出日志记录，格式化后一次写出"""
+
+    def __init__(self, log_queue, stream, formatter, batch_size=DEFAULT_BATCH_SIZE):
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.batch_size = batch_size
+        self.thread = None
+
+    def start(self):
+        self.thread = _os_threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=1)
+        except _os_queue.Full:
+            pass
+        self.thread.join(timeout=5)
+        self.thread = None
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except _os_queue.Empty:
+                    break
+            stopping = None in batch
+            lines = []
+            for item in batch:
+                if item is None:
+                    continue
+                try:
+                    lines.append(self.formatter.format(item))
+                except Exception as e:
+                    lines.append(f'Error formatting log record: {e}')
+            if lines:
+                try:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if stopping:
+                return
+
+
+def configure_logging(options):
+    """根据配置初始化日志
+
+    options 示例（config.yaml 中的 logging 节）:
+        level: INFO                 # 全局级别
+        format: json                # json / text
+        modules:                    # 按模块设置级别
+          games.chinese_checkers: DEBUG
+        file: /var/log/game.log     # 不设置时输出到 stdout
+        queue_size: 10000
+        batch_size: 256
+    """
+    global listener, queue_handler
+    options = options or {}
+    stop_logging()
+
+    root = logging.getLogger()
+    if queue_handler is not None:
+        root.removeHandler(queue_handler)
+
+    log_queue = _os_queue.Queue(int(options.get('queue_size', DEFAULT_QUEUE_SIZE)))
+    formatter = JsonFormatter() if options.get('format', 'text') == 'json' else TextFormatter()
+    path = options.get('file')
+    stream = open(path, 'a', encoding='utf-8') if path else sys.stdout
+    listener = BatchingListener(log_queue, stream, formatter,
+                                int(options.get('batch_size', DEFAULT_BATCH_SIZE)))
+    listener.start()
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root.addHandler(queue_handler)
+    root.setLevel(str(options.get('level', DEFAULT_LEVEL)).upper())
+    for name, level in (options.get('modules') or {}).items():
+        logging.getLogger(name).setLevel(str(level).upper())
+
+
+def stop_logging():
+    """写出队列中剩余的日志并停止后台线程"""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+def get_logging_stats():
+    """获取日志统计信息"""
+    result = dict(stats)
+    result['queued'] = queue_handler.queue.qsize() if queue_handler is not None else 0
+    return result
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,324 @@
+"""
+对局记录存储
+对局结束（以及可选的未完成即被删除的房间）时把走棋记录、玩家、结果与时间写入只追加的段文件，供争议处理和数据分析使用。
+
+- 记录在事件处理中编码为一行 JSON 后放入队列，由后台系统线程批量写出（eventlet 模式下不阻塞 hub）
+- 组提交：一批记录一次写入段文件、一次 fsync，再把这批记录的索引项追加到索引文件并 fsync；
+  索引项只指向已经落盘的数据，进程崩溃后段文件末尾未被索引的部分直接忽略
+- 段文件写满 segment_bytes 后换下一个；每个写入方（分片）使用独立的子目录，互不加锁
+- 索引为定长二进制项（记录号、段号、偏移、长度），记录号单调递增，按记录号二分查找，
+  查找时以 mmap 映射索引文件，按偏移只读取这一条记录，不加载整个段文件
+
+记录号为 64 位整数（HTTP 接口中为十六进制）：毫秒时间戳 << 20 | 写入方序号 << 12 | 同一毫秒内的序号
+
+目录结构:
+    <path>/writer-000/segment-000001.jsonl    每行一条记录
+    <path>/writer-000/index.bin               24 字节一项：<记录号 u64, 段号 u32, 偏移 u64, 长度 u32>
+"""
+
+import atexit
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+    from eventlet import patcher as _eventlet_patcher
+    _os_threading = _eventlet_patcher.original('threading')
+    _os_queue = _eventlet_patcher.original('queue')
+except ImportError:
+    import queue as _os_queue
+    _os_threading = threading
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_COMMIT_INTERVAL_MS = 50
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_QUEUE_SIZE = 10000
+
+INDEX_ENTRY = struct.Struct('<QIQI')
+WRITER_BITS = 8
+SEQUENCE_BITS = 12
+
+# 未配置 path 时不记录
+path = None
+writer_index = 0
+# 房间未结束就被删除时是否也记录（status 为 unfinished）
+record_unfinished = False
+
+writer = None
+stats = {'appended_total': 0, 'dropped_total': 0, 'commits_total': 0, 'bytes_total': 0}
+_id_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def writer_dir(index):
+    return os.path.join(path, f'writer-{index:03d}')
+
+
+def segment_path(directory, segment):
+    return os.path.join(directory, f'segment-{segment:06d}.jsonl')
+
+
+def _encode(record):
+    return (json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+
+
+class RecordWriter:
+    """后台系统线程：从队列中批量取出已编码的记录，组提交写入段文件和索引"""
+
+    def __init__(self, directory, record_queue, segment_bytes, commit_interval, batch_size):
+        self.directory = directory
+        self.queue = record_queue
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        self.batch_size = batch_size
+        self.thread = None
+        os.makedirs(directory, exist_ok=True)
+
+        # 截掉写了一半的索引项；段文件从实际末尾继续追加
+        self.index_file = open(os.path.join(directory, 'index.bin'), 'ab')
+        size = self.index_file.tell()
+        if size % INDEX_ENTRY.size:
+            self.index_file.truncate(size - size % INDEX_ENTRY.size)
+            self.index_file.seek(0, os.SEEK_END)
+        segments = sorted(name for name in os.listdir(directory) if name.startswith('segment-'))
+        self.segment = int(segments[-1][8:14]) if segments else 1
+        self.segment_file = open(segment_path(directory, self.segment), 'ab')
+
+    def last_record_id(self):
+        """索引中最后一条记录的记录号（新记录号必须比它大）"""
+        size = self.index_file.tell()
+        if not size:
+            return 0
+        with open(self.index_file.name, 'rb') as f:
+            f.seek(size - INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[0]
+
+    def start(self):
+        self.thread = _os_threading.Thread(target=self._run, name='record-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=1)
+        except _os_queue.Full:
+            pass
+        self.thread.join(timeout=10)
+        self.thread = None
+        self.segment_file.close()
+        self.index_file.close()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            # 等待一个提交周期，让同一时期结束的对局一起提交
+            deadline = time.monotonic() + self.commit_interval
+            while item is not None and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except _os_queue.Empty:
+                    break
+                batch.append(item)
+            stopping = None in batch
+            records = [item for item in batch if item is not None]
+            if records:
+                try:
+                    self._commit(records)
+                except Exception:
+                    stats['dropped_total'] += len(records)
+            if stopping:
+                return
+
+    def _commit(self, records):
+        """一批记录：写入段文件并 fsync，再追加索引项并 fsync"""
+        entries = []
+        chunks = []
+        offset = self.segment_file.tell()
+        for record_id, data in records:
+            if offset and offset + len(data) > self.segment_bytes:
+                self._write_segment(chunks)
+                chunks = []
+                self.segment_file.close()
+                self.segment += 1
+                self.segment_file = open(segment_path(self.directory, self.segment), 'ab')
+                offset = 0
+            entries.append(INDEX_ENTRY.pack(record_id, self.segment, offset, len(data)))
+            chunks.append(data)
+            offset += len(data)
+        self._write_segment(chunks)
+        self.index_file.write(b''.join(entries))
+        self.index_file.flush()
+        os.fsync(self.index_file.fileno())
+        stats['commits_total'] += 1
+        stats['appended_total'] += len(records)
+        stats['bytes_total'] += sum(len(data) for _, data in records)
+
+    def _write_segment(self, chunks):
+        if chunks:
+            self.segment_file.write(b''.join(chunks))
+            self.segment_file.flush()
+            os.fsync(self.segment_file.fileno())
+
+
+class IndexReader:
+    """一个写入方的索引：mmap 映射后按记录号二分查找，索引增长后重新映射"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.map = None
+        self.count = 0
+
+    def _remap(self):
+        index_path = os.path.join(self.directory, 'index.bin')
+        try:
+            size = os.path.getsize(index_path)
+        except OSError:
+            return
+        count = size // INDEX_ENTRY.size
+        if count == self.count or not count:
+            return
+        with open(index_path, 'rb') as f:
+            new_map = mmap.mmap(f.fileno(), count * INDEX_ENTRY.size, access=mmap.ACCESS_READ)
+        if self.map is not None:
+            self.map.close()
+        self.map = new_map
+        self.count = count
+
+    def _search(self, record_id):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry = INDEX_ENTRY.unpack_from(self.map, middle * INDEX_ENTRY.size)
+            if entry[0] < record_id:
+                low = middle + 1
+            elif entry[0] > record_id:
+                high = middle
+            else:
+                return entry
+        return None
+
+    def find(self, record_id):
+        """返回 (段号, 偏移, 长度)，不存在时为 None"""
+        entry = self._search(record_id) if self.count else None
+        if entry is None:
+            # 可能是映射之后才提交的记录
+            self._remap()
+            entry = self._search(record_id) if self.count else None
+        return entry[1:] if entry else None
+
+
+def configure_game_records(options, index=0):
+    """根据配置启动对局记录写入（index 为写入方序号，多进程部署时每个分片不同）
+
+    options 示例（config.yaml 中的 game_records 节）:
+        path: /var/lib/game_server/records   # 不设置时不记录
+        record_unfinished: false              # 未结束即被删除的房间也记录
+        segment_bytes: 67108864
+        commit_interval_ms: 50                # 组提交等待时间
+        batch_size: 512
+        queue_size: 10000
+    """
+    global path, writer_index, record_unfinished, writer, _last_ms, _sequence
+    options = options or {}
+    stop_game_records()
+    path = options.get('path')
+    record_unfinished = bool(options.get('record_unfinished', False))
+    if not path:
+        return
+    if not 0 <= index < 1 << WRITER_BITS:
+        raise ValueError(f'对局记录写入方序号超出范围: {index}')
+    writer_index = index
+    writer = RecordWriter(
+        writer_dir(index),
+        _os_queue.Queue(int(options.get('queue_size', DEFAULT_QUEUE_SIZE))),
+        int(options.get('segment_bytes', DEFAULT_SEGMENT_BYTES)),
+        float(options.get('commit_interval_ms', DEFAULT_COMMIT_INTERVAL_MS)) / 1000,
+        int(options.get('batch_size', DEFAULT_BATCH_SIZE)),
+    )
+    last_id = writer.last_record_id()
+    _last_ms, _sequence = last_id >> (WRITER_BITS + SEQUENCE_BITS), last_id & ((1 << SEQUENCE_BITS) - 1)
+    writer.start()
+
+
+def enabled():
+    return writer is not None
+
+
+def new_record_id():
+    """分配单调递增的记录号"""
+    global _last_ms, _sequence
+    with _id_lock:
+        now = int(time.time() * 1000)
+        if now > _last_ms:
+            _last_ms, _sequence = now, 0
+        else:
+            # 同一毫秒内（或时钟回拨）递增序号，序号用尽时借用下一毫秒
+            _sequence += 1
+            if _sequence >> SEQUENCE_BITS:
+                _last_ms, _sequence = _last_ms + 1, 0
+        return (_last_ms << (WRITER_BITS + SEQUENCE_BITS)) | (writer_index << SEQUENCE_BITS) | _sequence
+
+
+def append(record):
+    """编码并提交一条对局记录，返回记录号；未启用或队列已满时返回 None"""
+    if writer is None:
+        return None
+    record_id = new_record_id()
+    record['id'] = format(record_id, 'x')
+    try:
+        writer.queue.put_nowait((record_id, _encode(record)))
+    except _os_queue.Full:
+        stats['dropped_total'] += 1
+        return None
+    return record_id
+
+
+def lookup(record_id):
+    """按记录号读取一条记录（已编码的 JSON bytes），不存在时返回 None"""
+    if not path:
+        return None
+    index = (record_id >> SEQUENCE_BITS) & ((1 << WRITER_BITS) - 1)
+    directory = writer_dir(index)
+    with _readers_lock:
+        reader = _readers.get(index)
+        if reader is None:
+            reader = _readers[index] = IndexReader(directory)
+        location = reader.find(record_id)
+    if location is None:
+        return None
+    segment, offset, length = location
+    try:
+        with open(segment_path(directory, segment), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+    except OSError:
+        return None
+
+
+def stop_game_records():
+    """写出队列中剩余的记录并停止后台线程"""
+    global writer
+    if writer is not None:
+        writer.stop()
+        writer = None
+
+
+def get_record_stats():
+    """获取对局记录统计信息"""
+    result = dict(stats)
+    result['queued'] = writer.queue.qsize() if writer is not None else 0
+    return result
+
+
+atexit.register(stop_game_records)
@@ -7,3 +7,5 @@ from .othello import *
 from .doudizhu import *
 from .chinese_checkers import *
 from .international_chess import *
+from . import flip_army_chess
+from .registry import GAME_REGISTRY, GameModule, register_game_module, get_game_module, build_dispatch_table
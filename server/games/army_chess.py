@@ -3,93 +3,166 @@
 包含工兵铁路路径、行营移动、路径显示等所有功能
 """
 
+import logging
 import random
+from collections import deque
+
+from . import journal, transport
+from .registry import GameModule, register_game_module
+from .state import GameState
+
+logger = logging.getLogger(__name__)
+
+# 棋盘 12 行 5 列，一维 bytearray，下标 row * COLS + col
+ROWS = 12
+COLS = 5
+
+# 棋子编码：低 4 位为棋子类型（PIECE_TYPES 的下标，工兵到司令按大小排列），RED / BLUE 位表示所属一方，0 表示空位
+PIECE_TYPES = (None, '工兵', '排长', '连长', '营长', '团长', '旅长', '师长', '军长', '司令', '地雷', '军旗', '炸弹')
+PIECE_CODES = {name: code for code, name in enumerate(PIECE_TYPES) if name}
+TYPE_MASK = 0x0F
+RED = 0x10
+BLUE = 0x20
+COLOR_BITS = {'red': RED, 'blue': BLUE}
+
+
+def _squares(*positions):
+    return frozenset(row * COLS + col for row, col in positions)
+
+
+# 行营和大本营位置定义
+CAMPS = _squares(
+    (2, 1), (2, 3), (3, 2), (4, 1), (4, 3),  # 上半区（红方）
+    (7, 1), (7, 3), (8, 2), (9, 1), (9, 3),  # 下半区（蓝方）
+)
+HEADQUARTERS = _squares((0, 1), (0, 3), (11, 1), (11, 3))
+
+# 铁路位置定义
+# 横向铁路: 第1、5、6、10行的所有列
+RAILWAY_HORIZONTAL = _squares(*((row, col) for row in (1, 5, 6, 10) for col in range(COLS)))
+# 纵向铁路: 第0列和第4列的第1-10行, 第2列的第5-6行
+RAILWAY_VERTICAL = _squares(*((row, col) for col in (0, 4) for row in range(1, 11)), (5, 2), (6, 2))
+# 所有铁路位置
+RAILWAYS = RAILWAY_HORIZONTAL | RAILWAY_VERTICAL
+
+
+def _build_railway_neighbors():
+    """铁路上每个位置沿铁路相邻的位置：横向相邻须在横向铁路上，纵向相邻须在纵向铁路上"""
+    neighbors = {}
+    for square in RAILWAYS:
+        row, col = divmod(square, COLS)
+        adjacent = []
+        # 方向：上下左右
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            new_row, new_col = row + dr, col + dc
+            if not (0 <= new_row < ROWS and 0 <= new_col < COLS):
+                continue
+            new_square = new_row * COLS + new_col
+            if new_square in (RAILWAY_HORIZONTAL if dr == 0 else RAILWAY_VERTICAL):
+                adjacent.append(new_square)
+        neighbors[square] = tuple(adjacent)
+    return neighbors
+
+
+RAILWAY_NEIGHBORS = _build_railway_neighbors()
+
+
+def piece_type_name(piece):
+    return PIECE_TYPES[piece & TYPE_MASK]
+
+
+def piece_color_name(piece):
+    return 'red' if piece & RED else 'blue'
+
+
+def piece_positions(board, color_bit):
+    """一方所有棋子的位置 [{'row', 'col'}]（二进制协议中为格子下标）"""
+    squares = [square for square, piece in enumerate(board) if piece & color_bit]
+    return transport.compact([{'row': square // COLS, 'col': square % COLS} for square in squares], bytes(squares))
 
-# 全局变量，由主程序设置
-socketio = None
-games = None
+
+class ArmyChessState(GameState):
+    """军棋房间状态"""
+    __slots__ = (
+        'red_player', 'blue_player', 'red_choice', 'blue_choice', 'board',
+        'red_arranged', 'blue_arranged', 'red_mines', 'blue_mines', 'red_lost', 'blue_lost',
+    )
 
 
 def initialize_army_chess_game(sid):
     """初始化军棋游戏数据"""
-    return {
-        'game_type': 'army_chess',
-        'red_player': None,
-        'blue_player': None,
-        'red_choice': None,
-        'blue_choice': None,
-        'board': [[None]*5 for _ in range(12)],
-        'red_pieces': {},
-        'blue_pieces': {},
-        'current_player': 1,
-        'game_over': False,
-        'winner': None,
-        'moves': [],
-        'red_arranged': False,
-        'blue_arranged': False,
-        'red_mines': 3,
-        'blue_mines': 3,
-        'red_lost': [],
-        'blue_lost': []
-    }
+    return ArmyChessState(
+        game_type='army_chess',
+        red_player=None,
+        blue_player=None,
+        red_choice=None,
+        blue_choice=None,
+        board=bytearray(ROWS * COLS),
+        red_arranged=False,
+        blue_arranged=False,
+        red_mines=3,
+        blue_mines=3,
+        red_lost=[],
+        blue_lost=[],
+    )
 
 
 def assign_army_chess_player(game, sid):
     """分配军棋玩家颜色"""
-    if game['red_player'] is None:
-        game['red_player'] = sid
+    if game.red_player is None:
+        game.red_player = sid
         return 'red'
-    elif game['blue_player'] is None:
-        game['blue_player'] = sid
+    elif game.blue_player is None:
+        game.blue_player = sid
         return 'blue'
     return None
 
 
 def record_army_chess_choice(game, sid, choice):
     """记录军棋玩家的先后手选择"""
-    if game['red_player'] == sid:
-        game['red_choice'] = choice
-    elif game['blue_player'] == sid:
-        game['blue_choice'] = choice
+    if game.red_player == sid:
+        game.red_choice = choice
+    elif game.blue_player == sid:
+        game.blue_choice = choice
 
 
 def should_start_army_chess(game):
     """检查是否可以开始军棋游戏"""
-    return game['red_choice'] is not None and game['blue_choice'] is not None
+    return game.red_choice is not None and game.blue_choice is not None
 
 
 def determine_army_chess_first_player(game):
     """确定军棋先后手并可能交换玩家"""
-    if game['red_choice'] == game['blue_choice']:
+    if game.red_choice == game.blue_choice:
         # 选择相同，随机决定
-        first_player_sid = random.choice([game['red_player'], game['blue_player']])
-        is_red_first = (first_player_sid == game['red_player'])
+        first_player_sid = random.choice([game.red_player, game.blue_player])
+        is_red_first = (first_player_sid == game.red_player)
     else:
         # 选择不同，先选先手的为先手
-        first_choice_sid = game['red_player'] if game['red_choice'] == 'first' else game['blue_player']
-        is_red_first = (first_choice_sid == game['red_player'])
+        first_choice_sid = game.red_player if game.red_choice == 'first' else game.blue_player
+        is_red_first = (first_choice_sid == game.red_player)
 
     # 如果蓝方先手，交换红蓝身份
     if not is_red_first:
-        game['red_player'], game['blue_player'] = game['blue_player'], game['red_player']
-        game['red_choice'], game['blue_choice'] = game['blue_choice'], game['red_choice']
+        game.red_player, game.blue_player = game.blue_player, game.red_player
+        game.red_choice, game.blue_choice = game.blue_choice, game.red_choice
 
     return is_red_first
 
 
 def get_army_chess_current_player_sid(game):
     """获取当前轮到的玩家sid"""
-    return game['red_player'] if game['current_player'] == 1 else game['blue_player']
+    return game.red_player if game.current_player == 1 else game.blue_player
 
 
 def get_army_chess_opponent_sid(game, sid):
     """获取对手的sid"""
-    return game['blue_player'] if sid == game['red_player'] else game['red_player']
+    return game.blue_player if sid == game.red_player else game.red_player
 
 
 def handle_army_chess_disconnect(game, sid):
     """处理军棋玩家断开连接，返回对手sid列表"""
-    if game['red_player'] == sid or game['blue_player'] == sid:
+    if game.red_player == sid or game.blue_player == sid:
         opponent = get_army_chess_opponent_sid(game, sid)
         return [opponent] if opponent else []
     return []
@@ -97,9 +170,9 @@ def handle_army_chess_disconnect(game, sid):
 
 def handle_army_chess_surrender(game, sid):
     """处理军棋认输，返回(赢家编号, 赢家sid, 输家sid)"""
-    winner = 2 if sid == game['red_player'] else 1
-    winner_sid = game['red_player'] if winner == 1 else game['blue_player']
-    loser_sid = game['blue_player'] if winner == 1 else game['red_player']
+    winner = 2 if sid == game.red_player else 1
+    winner_sid = game.red_player if winner == 1 else game.blue_player
+    loser_sid = game.blue_player if winner == 1 else game.red_player
     return winner, winner_sid, loser_sid
 
 
@@ -156,269 +229,146 @@ def resolve_army_chess_battle(attacker_type, defender_type):
         return 'both_die'
 
 
-def _check_sapper_railway_path(from_row, from_col, to_row, to_col,
-                                railways, railway_horizontal, railway_vertical,
-                                pieces_dict, opponent_pieces, from_key):
+def find_railway_path(occupied, from_square, to_square):
     """
-    检查工兵是否可以通过铁路网络从起点到达终点（允许拐弯）
-    使用BFS算法查找路径，要求路径上无棋子阻挡
+    在铁路网络上查找从起点到终点的路径（允许拐弯），路径上除起点和终点外不能有棋子
+    occupied[square] 为真表示该位置有阻挡的棋子；使用BFS算法，返回路径上的所有位置，找不到时返回 None
     """
-    from collections import deque
+    if from_square not in RAILWAYS or to_square not in RAILWAYS:
+        return None
 
-    # 检查起点和终点是否都在铁路上
-    start_key = f"{from_row}_{from_col}"
-    end_key = f"{to_row}_{to_col}"
-    if start_key not in railways or end_key not in railways:
-        return False
-
-    # BFS查找
-    queue = deque([(from_row, from_col)])
-    visited = {start_key}
-
-    # 方向：上下左右
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    queue = deque([from_square])
+    parents = {from_square: None}
 
     while queue:
-        cur_row, cur_col = queue.popleft()
+        square = queue.popleft()
 
         # 找到目标
-        if cur_row == to_row and cur_col == to_col:
-            return True
-
-        # 检查四个方向
-        for dr, dc in directions:
-            new_row = cur_row + dr
-            new_col = cur_col + dc
-            new_key = f"{new_row}_{new_col}"
-
-            # 检查是否越界
-            if not (0 <= new_row < 12 and 0 <= new_col < 5):
-                continue
-
-            # 检查是否在铁路上
-            if new_key not in railways:
-                continue
+        if square == to_square:
+            path = []
+            while square is not None:
+                path.append(square)
+                square = parents[square]
+            path.reverse()
+            return path
 
-            # 检查是否访问过
-            if new_key in visited:
+        for new_square in RAILWAY_NEIGHBORS[square]:
+            if new_square in parents:
                 continue
-
             # 检查路径上是否有棋子（不包括起点和终点）
-            if new_key != end_key:
-                if new_key in opponent_pieces or new_key in pieces_dict:
-                    continue
-
-            # 对于横向移动，检查是否在横向铁路上
-            if dr == 0:  # 横向
-                check_row = cur_row
-                if f"{check_row}_{new_col}" not in railway_horizontal and f"{new_row}_{new_col}" not in railway_horizontal:
-                    continue
-            # 对于纵向移动，检查是否在纵向铁路上
-            elif dc == 0:  # 纵向
-                check_col = cur_col
-                if f"{new_row}_{check_col}" not in railway_vertical and f"{new_row}_{new_col}" not in railway_vertical:
-                    continue
-
-            visited.add(new_key)
-            queue.append((new_row, new_col))
-
-    return False
-
-
-def get_sapper_railway_path(from_row, from_col, to_row, to_col,
-                            railways, railway_horizontal, railway_vertical,
-                            pieces_dict, opponent_pieces):
-    """
-    获取工兵在铁路上的完整路径（用于显示）
-    使用BFS算法查找路径，返回路径上的所有点
-    """
-    from collections import deque
-
-    # 检查起点和终点是否都在铁路上
-    start_key = f"{from_row}_{from_col}"
-    end_key = f"{to_row}_{to_col}"
-    if start_key not in railways or end_key not in railways:
-        return []
-
-    # BFS查找，记录路径
-    queue = deque([(from_row, from_col, [(from_row, from_col)])])
-    visited = {start_key}
-
-    # 方向：上下左右
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-
-    while queue:
-        cur_row, cur_col, path = queue.popleft()
+            if new_square != to_square and occupied[new_square]:
+                continue
+            parents[new_square] = square
+            queue.append(new_square)
 
-        # 找到目标
-        if cur_row == to_row and cur_col == to_col:
-            return path
+    return None
 
-        # 检查四个方向
-        for dr, dc in directions:
-            new_row = cur_row + dr
-            new_col = cur_col + dc
-            new_key = f"{new_row}_{new_col}"
 
-            # 检查是否越界
-            if not (0 <= new_row < 12 and 0 <= new_col < 5):
-                continue
+def _check_sapper_railway_path(occupied, from_row, from_col, to_row, to_col):
+    """检查工兵是否可以通过铁路网络从起点到达终点（允许拐弯）"""
+    return find_railway_path(occupied, from_row * COLS + from_col, to_row * COLS + to_col) is not None
 
-            # 检查是否在铁路上
-            if new_key not in railways:
-                continue
 
-            # 检查是否访问过
-            if new_key in visited:
-                continue
+def get_sapper_railway_path(occupied, from_row, from_col, to_row, to_col):
+    """获取工兵在铁路上的完整路径（用于显示），返回 [(row, col)]"""
+    path = find_railway_path(occupied, from_row * COLS + from_col, to_row * COLS + to_col)
+    return [divmod(square, COLS) for square in path] if path else []
 
-            # 检查路径上是否有棋子（不包括起点和终点）
-            if new_key != end_key:
-                if new_key in opponent_pieces or new_key in pieces_dict:
-                    continue
-
-            # 对于横向移动，检查是否在横向铁路上
-            if dr == 0:  # 横向
-                check_row = cur_row
-                if f"{check_row}_{new_col}" not in railway_horizontal and f"{new_row}_{new_col}" not in railway_horizontal:
-                    continue
-            # 对于纵向移动，检查是否在纵向铁路上
-            elif dc == 0:  # 纵向
-                check_col = cur_col
-                if f"{new_row}_{check_col}" not in railway_vertical and f"{new_row}_{new_col}" not in railway_vertical:
-                    continue
-
-            visited.add(new_key)
-            queue.append((new_row, new_col, path + [(new_row, new_col)]))
 
-    return []
+def _check_straight_railway_path(occupied, from_row, from_col, to_row, to_col):
+    """检查非工兵棋子沿同一条直线铁路的移动：路径上所有格子都在铁路上且无棋子阻挡"""
+    if from_row == to_row:
+        railway = RAILWAY_HORIZONTAL
+        squares = range(from_row * COLS + min(from_col, to_col), from_row * COLS + max(from_col, to_col) + 1)
+    elif from_col == to_col:
+        railway = RAILWAY_VERTICAL
+        squares = range(min(from_row, to_row) * COLS + from_col, max(from_row, to_row) * COLS + from_col + 1, COLS)
+    else:
+        return False
+    ends = (from_row * COLS + from_col, to_row * COLS + to_col)
+    for square in squares:
+        if square not in railway:
+            return False
+        if square not in ends and occupied[square]:
+            return False
+    return True
+
+
+def _emit_lost_pieces(game):
+    """广播阵亡棋子列表（只发给每个玩家自己的阵亡列表）"""
+    if game.red_player:
+        transport.emit('lost_pieces', {
+            'pieces': game.red_lost
+        }, to=game.red_player)
+    if game.blue_player:
+        transport.emit('lost_pieces', {
+            'pieces': game.blue_lost
+        }, to=game.blue_player)
 
 
 def handle_army_chess_move(game, room_id, sid, data):
     """处理军旗移动 - 完整版"""
-    from flask_socketio import emit
-
     from_row = data.get('from_row')
     from_col = data.get('from_col')
     to_row = data.get('to_row')
     to_col = data.get('to_col')
 
     # 检查游戏是否结束
-    if game['game_over']:
-        emit('error', {'message': '游戏已结束'})
+    if game.game_over:
+        transport.emit('error', {'message': '游戏已结束'}, to=sid)
         return
 
     # 检查是否轮到该玩家
-    current_sid = game['red_player'] if game['current_player'] == 1 else game['blue_player']
+    current_sid = game.red_player if game.current_player == 1 else game.blue_player
     if sid != current_sid:
-        emit('error', {'message': '不是你的回合'})
+        transport.emit('error', {'message': '不是你的回合'}, to=sid)
         return
 
     # 检查位置是否有效 (12x5 棋盘)
-    if not (0 <= from_row < 12 and 0 <= from_col < 5 and 
-            0 <= to_row < 12 and 0 <= to_col < 5):
-        emit('error', {'message': '位置超出范围'})
+    if not (0 <= from_row < ROWS and 0 <= from_col < COLS and
+            0 <= to_row < ROWS and 0 <= to_col < COLS):
+        transport.emit('error', {'message': '位置超出范围'}, to=sid)
         return
 
     # 获取当前玩家颜色和棋子信息
-    current_color = 'red' if game['current_player'] == 1 else 'blue'
-    from_key = f"{from_row}_{from_col}"
-    to_key = f"{to_row}_{to_col}"
-    
-    pieces_dict = game['red_pieces'] if current_color == 'red' else game['blue_pieces']
-    
+    board = game.board
+    current_color = 'red' if game.current_player == 1 else 'blue'
+    own_bit = COLOR_BITS[current_color]
+    from_square = from_row * COLS + from_col
+    to_square = to_row * COLS + to_col
+
     # 检查起点是否有自己的棋子
-    if from_key not in pieces_dict:
-        emit('error', {'message': '起点没有你的棋子'})
+    moving_piece = board[from_square]
+    if not moving_piece & own_bit:
+        transport.emit('error', {'message': '起点没有你的棋子'}, to=sid)
         return
-    
-    moving_piece = pieces_dict[from_key]
-    piece_type = moving_piece['type']
-    
+
+    piece_type = piece_type_name(moving_piece)
+
     # 检查地雷、军旗不能移动
     if piece_type in ['地雷', '军旗']:
-        emit('error', {'message': f'{piece_type}不能移动'})
+        transport.emit('error', {'message': f'{piece_type}不能移动'}, to=sid)
         return
-    
-    # 行营和大本营位置定义
-    camps = {
-        '2_1', '2_3', '3_2', '4_1', '4_3',  # 上半区（红方）
-        '7_1', '7_3', '8_2', '9_1', '9_3',  # 下半区（蓝方）
-    }
-    headquarters = {'0_1', '0_3', '11_1', '11_3'}
-    
-    # 铁路位置定义
-    # 横向铁路: 第1、5、6、10行的所有列
-    railway_horizontal = {
-        '1_0', '1_1', '1_2', '1_3', '1_4',
-        '5_0', '5_1', '5_2', '5_3', '5_4',
-        '6_0', '6_1', '6_2', '6_3', '6_4',
-        '10_0', '10_1', '10_2', '10_3', '10_4',
-    }
-    # 纵向铁路: 第0列和第4列的第1-10行, 第2列的第5-6行
-    railway_vertical = {
-        # 左列 (col 0)
-        '1_0', '2_0', '3_0', '4_0', '5_0', '6_0', '7_0', '8_0', '9_0', '10_0',
-        # 右列 (col 4)
-        '1_4', '2_4', '3_4', '4_4', '5_4', '6_4', '7_4', '8_4', '9_4', '10_4',
-        # 中列 (col 2)
-        '5_2', '6_2',
-    }
-    # 所有铁路位置
-    railways = railway_horizontal | railway_vertical
-    
+
     # 检查起点是否在大本营（大本营中的棋子不能移动）
-    if from_key in headquarters:
-        emit('error', {'message': '大本营中的棋子不能移动'})
+    if from_square in HEADQUARTERS:
+        transport.emit('error', {'message': '大本营中的棋子不能移动'}, to=sid)
         return
-    
+
     # 检查移动是否合法
     dr = abs(to_row - from_row)
     dc = abs(to_col - from_col)
-    
+
     # 斜向移动的特殊规则：只有行营和行营的相邻格子之间可以斜向移动
-    is_from_camp = from_key in camps
-    is_to_camp = to_key in camps
-    
-    # 判断目标位置是否是行营的相邻位置
-    is_diagonal_adjacent_to_camp = False
-    if is_to_camp or (is_from_camp and not is_to_camp):
-        # 如果目标在行营，或者从行营出发，检查是否是行营的相邻格子
-        for row_offset in [-1, 1]:
-            for col_offset in [-1, 1]:
-                adj_row = from_row + row_offset
-                adj_col = from_col + col_offset
-                adj_key = f"{adj_row}_{adj_col}"
-                if adj_key in camps and adj_row == to_row and adj_col == to_col:
-                    is_diagonal_adjacent_to_camp = True
-                    break
-            if is_diagonal_adjacent_to_camp:
-                break
-    
-    # 判断起点是否是行营的相邻位置（用于从非行营进入行营的情况）
-    is_from_diagonal_adjacent_to_camp = False
-    if not is_from_camp and is_to_camp:
-        for row_offset in [-1, 1]:
-            for col_offset in [-1, 1]:
-                adj_row = to_row + row_offset
-                adj_col = to_col + col_offset
-                adj_key = f"{adj_row}_{adj_col}"
-                if adj_key in camps and adj_row == from_row and adj_col == from_col:
-                    is_from_diagonal_adjacent_to_camp = True
-                    break
-            if is_from_diagonal_adjacent_to_camp:
-                break
-    
+    is_from_camp = from_square in CAMPS
+    is_to_camp = to_square in CAMPS
+
     # 移动规则验证
     valid_move = False
 
-    # 提前定义 opponent_pieces 用于铁路移动检查
-    opponent_color = 'blue' if current_color == 'red' else 'red'
-    opponent_pieces = game['blue_pieces'] if current_color == 'red' else game['red_pieces']
-
     # 1. 铁路长距离移动：起点和终点都在铁路上
-    is_from_railway = from_key in railways
-    is_to_railway = to_key in railways
+    is_from_railway = from_square in RAILWAYS
+    is_to_railway = to_square in RAILWAYS
 
     # 工兵的特殊规则：可以在铁路上拐弯
     is_sapper = piece_type == '工兵'
@@ -426,97 +376,43 @@ def handle_army_chess_move(game, room_id, sid, data):
     if is_from_railway and is_to_railway:
         if is_sapper:
             # 工兵可以在铁路上任意移动（允许拐弯），使用BFS查找路径
-            valid_move = _check_sapper_railway_path(from_row, from_col, to_row, to_col,
-                                                    railways, railway_horizontal, railway_vertical,
-                                                    pieces_dict, opponent_pieces, from_key)
+            valid_move = _check_sapper_railway_path(board, from_row, from_col, to_row, to_col)
         else:
-            # 其他棋子只能在同一直线上移动
-            if from_row == to_row:
-                # 横向移动，检查路径上所有格子是否都是铁路且无棋子阻挡
-                min_col = min(from_col, to_col)
-                max_col = max(from_col, to_col)
-                path_clear = True
-                path_blocked = False
-                for c in range(min_col, max_col + 1):
-                    key = f"{from_row}_{c}"
-                    if key not in railway_horizontal:
-                        path_clear = False
-                        break
-                    # 检查路径上是否有棋子（不包括起点和终点）
-                    if c != from_col and c != to_col:
-                        if key in opponent_pieces or key in pieces_dict:
-                            path_blocked = True
-                            break
-                if path_clear and not path_blocked:
-                    valid_move = True
-            elif from_col == to_col:
-                # 纵向移动，检查路径上所有格子是否都是铁路且无棋子阻挡
-                min_row = min(from_row, to_row)
-                max_row = max(from_row, to_row)
-                path_clear = True
-                path_blocked = False
-                for r in range(min_row, max_row + 1):
-                    key = f"{r}_{from_col}"
-                    if key not in railway_vertical:
-                        path_clear = False
-                        break
-                    # 检查路径上是否有棋子（不包括起点和终点）
-                    if r != from_row and r != to_row:
-                        if key in opponent_pieces or key in pieces_dict:
-                            path_blocked = True
-                            break
-                if path_clear and not path_blocked:
-                    valid_move = True
-    
+            # 其他棋子只能在同一直线上移动，路径上所有格子都是铁路且无棋子阻挡
+            valid_move = _check_straight_railway_path(board, from_row, from_col, to_row, to_col)
+
     # 2. 上下左右移动一步（非铁路或短距离）
     if not valid_move:
         if (dr == 1 and dc == 0) or (dr == 0 and dc == 1):
             valid_move = True
-    
+
     # 3. 斜向移动：在行营与相邻格子之间，或两个相邻的行营之间
     if not valid_move and dr == 1 and dc == 1:
-        # 从行营到相邻格子
-        if is_from_camp and not is_to_camp:
-            valid_move = True
-        # 从相邻格子到行营
-        elif not is_from_camp and is_to_camp:
+        if is_from_camp or is_to_camp:
             valid_move = True
-        # 从一个行营到另一个紧挨着的行营
-        elif is_from_camp and is_to_camp:
-            valid_move = True
-    
+
     if not valid_move:
-        emit('error', {'message': '不合法的移动'})
+        transport.emit('error', {'message': '不合法的移动'}, to=sid)
         return
 
-    # 目标位置没有棋子，直接移动
-    if to_key not in opponent_pieces and to_key not in pieces_dict:
-        # 更新棋子位置
-        pieces_dict[to_key] = pieces_dict.pop(from_key)
-        game['board'][to_row][to_col] = {'color': current_color}
-        game['board'][from_row][from_col] = None
+    target_piece = board[to_square]
 
+    # 目标位置没有棋子，直接移动
+    if not target_piece:
         # 计算移动路径（如果是工兵沿铁路移动）
         move_path = []
         is_sapper_move = False
-        if piece_type == '工兵' and (from_key in railways and to_key in railways):
+        if is_sapper and is_from_railway and is_to_railway:
             # 检查是否是工兵沿铁路移动
             if not (dr == 1 and dc == 0) and not (dr == 0 and dc == 1):
                 # 不是相邻一步，可能是工兵沿铁路移动
-                path = get_sapper_railway_path(from_row, from_col, to_row, to_col,
-                                                railways, railway_horizontal, railway_vertical,
-                                                pieces_dict, opponent_pieces)
+                path = get_sapper_railway_path(board, from_row, from_col, to_row, to_col)
                 if path:
                     move_path = path
                     is_sapper_move = True
 
-        # 添加移动日志
-        color_name = '红方' if current_color == 'red' else '蓝方'
-        move_type = '沿铁路移动' if is_sapper_move else '移动'
-        print(f"[军棋移动] {color_name}{piece_type} 从 ({from_row},{from_col}) {move_type}到 ({to_row},{to_col})")
-
-        # 记录上一步移动（用于给对方提示）
-        game['last_move'] = {
+        # 记录移动并更新棋子位置
+        move = journal.record_move(game, {
             'player': current_color,
             'from_row': from_row,
             'from_col': from_col,
@@ -526,10 +422,17 @@ def handle_army_chess_move(game, room_id, sid, data):
             'is_attack': False,
             'is_sapper_railway': is_sapper_move,
             'path': move_path
-        }
+        })
+        move.set_square(to_square, moving_piece)
+        move.set_square(from_square, 0)
+
+        # 添加移动日志
+        color_name = '红方' if current_color == 'red' else '蓝方'
+        move_type = '沿铁路移动' if is_sapper_move else '移动'
+        logger.info("[军棋移动] %s%s 从 (%s,%s) %s到 (%s,%s)", color_name, piece_type, from_row, from_col, move_type, to_row, to_col)
 
         # 广播移动
-        socketio.emit('move_made', {
+        transport.emit('move_made', {
             'player': current_color,
             'from_row': from_row,
             'from_col': from_col,
@@ -537,28 +440,26 @@ def handle_army_chess_move(game, room_id, sid, data):
             'to_col': to_col,
             'is_sapper_railway': is_sapper_move,
             'path': move_path,
-            'current_player': 3 - game['current_player']
+            'current_player': 3 - game.current_player
         }, to=room_id)
-        
+
         # 切换玩家
-        game['current_player'] = 3 - game['current_player']
+        move.set_field('current_player', 3 - game.current_player)
         return
-    
+
     # 目标位置有自己的棋子，不能移动
-    if to_key in pieces_dict:
-        emit('error', {'message': '不能移动到自己的棋子位置'})
+    if target_piece & own_bit:
+        transport.emit('error', {'message': '不能移动到自己的棋子位置'}, to=sid)
         return
-    
+
     # 目标位置有敌方棋子，检查是否在行营中（行营中的单位不能被攻击）
-    if to_key in opponent_pieces:
-        if to_key in camps:
-            emit('error', {'message': '不能攻击行营中的棋子'})
-            return
-        
-        # 不在行营中，可以进行战斗
-        target_piece = opponent_pieces[to_key]
-        target_type = target_piece['type']
-    
+    if is_to_camp:
+        transport.emit('error', {'message': '不能攻击行营中的棋子'}, to=sid)
+        return
+
+    # 不在行营中，可以进行战斗
+    target_type = piece_type_name(target_piece)
+
     # 战斗逻辑
     battle_result = resolve_army_chess_battle(piece_type, target_type)
 
@@ -566,263 +467,206 @@ def handle_army_chess_move(game, room_id, sid, data):
     attacker_color_name = '红方' if current_color == 'red' else '蓝方'
     defender_color_name = '蓝方' if current_color == 'red' else '红方'
     if battle_result == 'attacker_win':
-        print(f"[军棋战斗] {attacker_color_name}{piece_type} ({from_row},{from_col}) 攻击 {defender_color_name}{target_type} ({to_row},{to_col}) -> {attacker_color_name}获胜")
+        logger.info("[军棋战斗] %s%s (%s,%s) 攻击 %s%s (%s,%s) -> %s获胜", attacker_color_name, piece_type, from_row, from_col, defender_color_name, target_type, to_row, to_col, attacker_color_name)
     elif battle_result == 'defender_win':
-        print(f"[军棋战斗] {attacker_color_name}{piece_type} ({from_row},{from_col}) 攻击 {defender_color_name}{target_type} ({to_row},{to_col}) -> {defender_color_name}获胜")
+        logger.info("[军棋战斗] %s%s (%s,%s) 攻击 %s%s (%s,%s) -> %s获胜", attacker_color_name, piece_type, from_row, from_col, defender_color_name, target_type, to_row, to_col, defender_color_name)
     else:  # both_die
-        print(f"[军棋战斗] {attacker_color_name}{piece_type} ({from_row},{from_col}) 攻击 {defender_color_name}{target_type} ({to_row},{to_col}) -> 同归于尽")
+        logger.info("[军棋战斗] %s%s (%s,%s) 攻击 %s%s (%s,%s) -> 同归于尽", attacker_color_name, piece_type, from_row, from_col, defender_color_name, target_type, to_row, to_col)
+
+    own_lost = 'red_lost' if current_color == 'red' else 'blue_lost'
+    opponent_lost = 'blue_lost' if current_color == 'red' else 'red_lost'
+
+    # 记录移动
+    move = journal.record_move(game, {
+        'player': current_color,
+        'from_row': from_row,
+        'from_col': from_col,
+        'to_row': to_row,
+        'to_col': to_col,
+        'piece_type': piece_type,
+        'is_attack': True,
+        'target_type': target_type,
+        'battle_result': battle_result
+    })
 
     if battle_result == 'attacker_win':
         # 攻击方胜，防守方阵亡
-        del opponent_pieces[to_key]
-        pieces_dict[to_key] = pieces_dict.pop(from_key)
-        game['board'][to_row][to_col] = {'color': current_color}
-        game['board'][from_row][from_col] = None
+        move.set_square(to_square, moving_piece)
+        move.set_square(from_square, 0)
 
         # 记录阵亡棋子
-        lost_key = 'red_lost' if current_color == 'blue' else 'blue_lost'
-        game[lost_key].append(target_type)
+        move.set_field(opponent_lost, game[opponent_lost] + [target_type])
 
         # 检查是否夺取军旗
         if target_type == '军旗':
-            game['game_over'] = True
-            game['winner'] = game['current_player']
-            winner_name = '红方' if game['current_player'] == 1 else '蓝方'
-            socketio.emit('game_over', {
-                'winner': game['current_player'],
+            move.set_field('game_over', True)
+            move.set_field('winner', game.current_player)
+            winner_name = '红方' if game.current_player == 1 else '蓝方'
+            transport.emit('game_over', {
+                'winner': game.current_player,
                 'message': f'{winner_name}夺取军旗获胜！'
             }, to=room_id)
             return
-        
-        # 记录上一步移动
-        game['last_move'] = {
-            'player': current_color,
-            'from_row': from_row,
-            'from_col': from_col,
-            'to_row': to_row,
-            'to_col': to_col,
-            'piece_type': piece_type,
-            'is_attack': True,
-            'target_type': target_type,
-            'battle_result': 'attacker_win'
-        }
-
-        socketio.emit('battle_result', {
-            'result': 'attacker_win',
-            'player': current_color,
-            'from_row': from_row,
-            'from_col': from_col,
-            'to_row': to_row,
-            'to_col': to_col,
-            'attack_row': from_row,
-            'attack_col': from_col,
-            'defend_row': to_row,
-            'defend_col': to_col,
-            'current_player': 3 - game['current_player']
-        }, to=room_id)
-
-        # 广播阵亡棋子列表（只发给每个玩家自己的阵亡列表）
-        if game['red_player']:
-            socketio.emit('lost_pieces', {
-                'pieces': game['red_lost']
-            }, to=game['red_player'])
-        if game['blue_player']:
-            socketio.emit('lost_pieces', {
-                'pieces': game['blue_lost']
-            }, to=game['blue_player'])
 
     elif battle_result == 'defender_win':
         # 防守方胜，攻击方阵亡
-        del pieces_dict[from_key]
-        game['board'][from_row][from_col] = None
+        move.set_square(from_square, 0)
 
         # 记录攻击方阵亡棋子
-        lost_key = 'red_lost' if current_color == 'red' else 'blue_lost'
-        game[lost_key].append(piece_type)
-
-        socketio.emit('battle_result', {
-            'result': 'defender_win',
-            'player': current_color,
-            'from_row': from_row,
-            'from_col': from_col,
-            'to_row': to_row,
-            'to_col': to_col,
-            'attack_row': from_row,
-            'attack_col': from_col,
-            'defend_row': to_row,
-            'defend_col': to_col,
-            'current_player': 3 - game['current_player']
-        }, to=room_id)
-
-        # 记录上一步移动
-        game['last_move'] = {
-            'player': current_color,
-            'from_row': from_row,
-            'from_col': from_col,
-            'to_row': to_row,
-            'to_col': to_col,
-            'piece_type': piece_type,
-            'is_attack': True,
-            'target_type': target_type,
-            'battle_result': 'defender_win'
-        }
-
-        # 广播阵亡棋子列表（只发给每个玩家自己的阵亡列表）
-        if game['red_player']:
-            socketio.emit('lost_pieces', {
-                'pieces': game['red_lost']
-            }, to=game['red_player'])
-        if game['blue_player']:
-            socketio.emit('lost_pieces', {
-                'pieces': game['blue_lost']
-            }, to=game['blue_player'])
+        move.set_field(own_lost, game[own_lost] + [piece_type])
 
     else:  # both_die
         # 同归于尽
-        del pieces_dict[from_key]
-        del opponent_pieces[to_key]
-        game['board'][from_row][from_col] = None
-        game['board'][to_row][to_col] = None
+        move.set_square(from_square, 0)
+        move.set_square(to_square, 0)
 
         # 记录双方阵亡棋子
-        lost_key = 'red_lost' if current_color == 'red' else 'blue_lost'
-        opponent_lost_key = 'blue_lost' if current_color == 'red' else 'red_lost'
-        game[lost_key].append(piece_type)
-        game[opponent_lost_key].append(target_type)
-
-        socketio.emit('battle_result', {
-            'result': 'both_die',
-            'player': current_color,
-            'from_row': from_row,
-            'from_col': from_col,
-            'to_row': to_row,
-            'to_col': to_col,
-            'attack_row': from_row,
-            'attack_col': from_col,
-            'defend_row': to_row,
-            'defend_col': to_col,
-            'current_player': 3 - game['current_player']
-        }, to=room_id)
-
-        # 记录上一步移动
-        game['last_move'] = {
-            'player': current_color,
-            'from_row': from_row,
-            'from_col': from_col,
-            'to_row': to_row,
-            'to_col': to_col,
-            'piece_type': piece_type,
-            'is_attack': True,
-            'target_type': target_type,
-            'battle_result': 'both_die'
-        }
-
-        # 广播阵亡棋子列表（只发给每个玩家自己的阵亡列表）
-        if game['red_player']:
-            socketio.emit('lost_pieces', {
-                'pieces': game['red_lost']
-            }, to=game['red_player'])
-        if game['blue_player']:
-            socketio.emit('lost_pieces', {
-                'pieces': game['blue_lost']
-            }, to=game['blue_player'])
+        move.set_field(own_lost, game[own_lost] + [piece_type])
+        move.set_field(opponent_lost, game[opponent_lost] + [target_type])
+
+    transport.emit('battle_result', {
+        'result': battle_result,
+        'player': current_color,
+        'from_row': from_row,
+        'from_col': from_col,
+        'to_row': to_row,
+        'to_col': to_col,
+        'attack_row': from_row,
+        'attack_col': from_col,
+        'defend_row': to_row,
+        'defend_col': to_col,
+        'current_player': 3 - game.current_player
+    }, to=room_id)
+
+    _emit_lost_pieces(game)
 
     # 切换玩家
-    game['current_player'] = 3 - game['current_player']
+    move.set_field('current_player', 3 - game.current_player)
 
 
 def reset_army_chess_game(game):
     """重置军棋游戏"""
-    game['board'] = [[None]*5 for _ in range(12)]
-    game['current_player'] = 1
-    game['game_over'] = False
-    game['winner'] = None
-    game['moves'] = []
-    game['red_choice'] = None
-    game['blue_choice'] = None
-    game['red_arranged'] = False
-    game['blue_arranged'] = False
-    game['red_mines'] = 3
-    game['blue_mines'] = 3
-    game['red_pieces'] = {}
-    game['blue_pieces'] = {}
-    game['red_lost'] = []
-    game['blue_lost'] = []
+    game.board = bytearray(ROWS * COLS)
+    game.current_player = 1
+    game.game_over = False
+    game.winner = None
+    game.moves = []
+    game.red_choice = None
+    game.blue_choice = None
+    game.red_arranged = False
+    game.blue_arranged = False
+    game.red_mines = 3
+    game.blue_mines = 3
+    game.red_lost = []
+    game.blue_lost = []
 
 
 def handle_arrange_pieces(game, sid, pieces):
     """处理军棋布阵，返回是否双方都已完成布阵"""
     # 验证玩家身份并保存棋子位置
-    if sid == game['red_player']:
-        game['red_arranged'] = True
-        game['red_pieces'] = {}
-        game['red_lost'] = []  # 红方阵亡棋子列表
-        # 保存红方棋子信息
-        for piece_data in pieces:
-            row = piece_data['row']
-            col = piece_data['col']
-            piece_type = piece_data['type']
-            key = f"{row}_{col}"
-            game['red_pieces'][key] = {
-                'type': piece_type,
-                'color': 'red'
-            }
-            # 在棋盘上标记有棋子（但不显示类型）
-            game['board'][row][col] = {'color': 'red'}
-
-    elif sid == game['blue_player']:
-        game['blue_arranged'] = True
-        game['blue_pieces'] = {}
-        game['blue_lost'] = []  # 蓝方阵亡棋子列表
-        # 保存蓝方棋子信息
-        for piece_data in pieces:
-            row = piece_data['row']
-            col = piece_data['col']
-            piece_type = piece_data['type']
-            key = f"{row}_{col}"
-            game['blue_pieces'][key] = {
-                'type': piece_type,
-                'color': 'blue'
-            }
-            # 在棋盘上标记有棋子
-            game['board'][row][col] = {'color': 'blue'}
+    if sid == game.red_player:
+        color = 'red'
+    elif sid == game.blue_player:
+        color = 'blue'
+    else:
+        return game.red_arranged and game.blue_arranged
+
+    color_bit = COLOR_BITS[color]
+    board = game.board
+    # 重新布阵时先移除该方之前的棋子
+    for square, piece in enumerate(board):
+        if piece & color_bit:
+            board[square] = 0
+    for piece_data in pieces:
+        board[piece_data['row'] * COLS + piece_data['col']] = color_bit | PIECE_CODES[piece_data['type']]
+
+    if color == 'red':
+        game.red_arranged = True
+        game.red_lost = []  # 红方阵亡棋子列表
+    else:
+        game.blue_arranged = True
+        game.blue_lost = []  # 蓝方阵亡棋子列表
 
     # 检查双方是否都已完成布阵
-    return game['red_arranged'] and game['blue_arranged']
+    return game.red_arranged and game.blue_arranged
 
 
 def start_arranged_game(game, room_id):
     """开始布阵完成的军棋游戏"""
-    game['current_player'] = 1  # 红方先手
+    game.current_player = 1  # 红方先手
 
-    # 通知红方游戏开始，包含对方棋子位置（但不含类型）
-    blue_positions = [{'row': int(k.split('_')[0]), 'col': int(k.split('_')[1])}
-                     for k in game['blue_pieces'].keys()]
-    socketio.emit('game_begin', {
+    # 通知双方游戏开始，各自包含对方棋子位置（但不含类型）
+    transport.emit_each('game_begin', {
         'message': '双方布阵完成，游戏开始！',
         'current_player': 1,
-        'opponent_pieces': blue_positions
-    }, to=game['red_player'])
-
-    # 通知蓝方游戏开始，包含对方棋子位置（但不含类型）
-    red_positions = [{'row': int(k.split('_')[0]), 'col': int(k.split('_')[1])}
-                    for k in game['red_pieces'].keys()]
-    socketio.emit('game_begin', {
-        'message': '双方布阵完成，游戏开始！',
-        'current_player': 1,
-        'opponent_pieces': red_positions
-    }, to=game['blue_player'])
+    }, [
+        (game.red_player, {'opponent_pieces': piece_positions(game.board, BLUE)}),
+        (game.blue_player, {'opponent_pieces': piece_positions(game.board, RED)}),
+    ])
 
 
 def notify_arrange_start(game):
     """通知双方开始布阵"""
-    socketio.emit('game_start', {
-        'message': '游戏开始！请布置您的棋子',
-        'first_player': 'red',
-        'player_color': 'red'
-    }, to=game['red_player'])
-    socketio.emit('game_start', {
+    transport.emit_each('game_start', {
         'message': '游戏开始！请布置您的棋子',
         'first_player': 'red',
-        'player_color': 'blue'
-    }, to=game['blue_player'])
+    }, [
+        (game.red_player, {'player_color': 'red'}),
+        (game.blue_player, {'player_color': 'blue'}),
+    ])
+
+
+def handle_army_chess_game_start(game):
+    """军棋确定先后手并通知双方开始布阵"""
+    determine_army_chess_first_player(game)
+    notify_arrange_start(game)
+
+
+def get_army_chess_public_snapshot(game):
+    """观战快照：双方棋子的位置（不含类型）和布阵进度"""
+    return {
+        'red_pieces': piece_positions(game.board, RED),
+        'blue_pieces': piece_positions(game.board, BLUE),
+        'red_arranged': game.red_arranged,
+        'blue_arranged': game.blue_arranged,
+    }
+
+
+def get_army_chess_snapshot(game, sid):
+    """断线重连后发给玩家的局面快照：己方棋子含类型，对方棋子只有位置"""
+    color = 'red' if sid == game.red_player else 'blue'
+    own_bit, opponent_bit = (RED, BLUE) if color == 'red' else (BLUE, RED)
+    return {
+        'player_color': color,
+        'choice': game[f'{color}_choice'],
+        'arranged': game[f'{color}_arranged'],
+        'pieces': [
+            {'row': square // COLS, 'col': square % COLS, 'type': piece_type_name(piece)}
+            for square, piece in enumerate(game.board) if piece & own_bit
+        ],
+        'opponent_pieces': piece_positions(game.board, opponent_bit),
+        'lost_pieces': game[f'{color}_lost'],
+    }
+
+
+register_game_module(GameModule(
+    game_type='army_chess',
+    display_name='军棋',
+    initialize=initialize_army_chess_game,
+    creator_seat='red_player',
+    creator_color='red',
+    seats=('red_player', 'blue_player'),
+    assign_player=assign_army_chess_player,
+    record_choice=record_army_chess_choice,
+    should_start=should_start_army_chess,
+    begin_game=handle_army_chess_game_start,
+    move=handle_army_chess_move,
+    reset=reset_army_chess_game,
+    surrender=handle_army_chess_surrender,
+    winner_name=get_army_chess_winner_name,
+    current_player_sid=get_army_chess_current_player_sid,
+    opponent_sid=get_army_chess_opponent_sid,
+    disconnect=handle_army_chess_disconnect,
+    snapshot=get_army_chess_snapshot,
+    spectate=get_army_chess_public_snapshot,
+))
@@ -4,210 +4,199 @@
 使用六角星棋盘
 """
 
-# 全局变量（将在app_new.py中设置）
-socketio = None
-games = None
+import logging
 
+from . import journal, transport, zobrist
+from .registry import GameModule, rebind_fields, register_game_module
+from .state import GameState
 
-def initialize_chinese_checkers_game(sid):
-    """初始化中国跳棋游戏数据"""
-    return {
-        'game_type': 'chinese_checkers',
-        'players': [
-            {'sid': sid, 'color': 'red', 'joined': True},
-            {'sid': None, 'color': 'green', 'joined': False},
-            {'sid': None, 'color': 'yellow', 'joined': False},
-            {'sid': None, 'color': 'blue', 'joined': False},
-            {'sid': None, 'color': 'orange', 'joined': False},
-            {'sid': None, 'color': 'purple', 'joined': False}
-        ],
-        'board': initialize_chinese_checkers_board(),
-        'current_player': 1,  # 红方先手
-        'game_over': False,
-        'game_started': False,  # 新增：游戏是否已开始
-        'winner': None,
-        'moves': [],
-        'last_move': None,      # 记录上一步移动
-        'last_move_path': [],   # 记录完整的跳跃路径
-        'undo_requested': False,  # 是否有待处理的悔棋请求
-        'last_undo_player': None  # 上次悔棋的玩家sid
-    }
+logger = logging.getLogger(__name__)
 
 
-def initialize_chinese_checkers_board():
-    """初始化中国跳棋棋盘（六角星形）"""
-    # 使用二维数组表示六角星棋盘
-    # 棋盘大小为17x25，根据用户定义的新布局
-    board = [[None]*25 for _ in range(17)]
-    
-    # 根据用户重新定义的坐标初始化棋子
-    
+# 棋盘 17 行 25 列；棋盘为一维 bytearray，下标 row * COLS + col，0 表示空位，
+# 其余为 COLORS 中的下标 + 1
+ROWS = 17
+COLS = 25
+COLORS = ('red', 'green', 'yellow', 'blue', 'orange', 'purple')
+COLOR_CODES = {color: index + 1 for index, color in enumerate(COLORS)}
+
+# 各方起始位置（倒三角形 / 正三角形）
+START_POSITIONS = {
     # 红方（上方）- 倒三角形
-    red_positions = [
+    'red': (
         (0, 12),                           # 第1层：1个棋子（顶端）
         (1, 11), (1, 13),                  # 第2层：2个棋子
         (2, 10), (2, 12), (2, 14),         # 第3层：3个棋子
         (3, 9), (3, 11), (3, 13), (3, 15)  # 第4层：4个棋子
-    ]
-    for row, col in red_positions:
-        board[row][col] = {'color': 'red', 'type': 'piece'}
-    
+    ),
     # 绿方（左上）- 倒三角形
-    green_positions = [
+    'green': (
         (4, 0), (4, 2), (4, 4), (4, 6),    # 第1层：4个棋子
         (5, 1), (5, 3), (5, 5),            # 第2层：3个棋子
         (6, 2), (6, 4),                    # 第3层：2个棋子
         (7, 3)                             # 第4层：1个棋子
-    ]
-    for row, col in green_positions:
-        board[row][col] = {'color': 'green', 'type': 'piece'}
-    
+    ),
     # 黄方（右上）- 倒三角形
-    yellow_positions = [
+    'yellow': (
         (4, 18), (4, 20), (4, 22), (4, 24),  # 第1层：4个棋子
         (5, 19), (5, 21), (5, 23),           # 第2层：3个棋子
         (6, 20), (6, 22),                    # 第3层：2个棋子
         (7, 21)                              # 第4层：1个棋子
-    ]
-    for row, col in yellow_positions:
-        board[row][col] = {'color': 'yellow', 'type': 'piece'}
-    
+    ),
     # 蓝方（下方）- 正三角形
-    blue_positions = [
+    'blue': (
         (13, 9), (13, 11), (13, 13), (13, 15),  # 第1层：4个棋子
         (14, 10), (14, 12), (14, 14),           # 第2层：3个棋子
         (15, 11), (15, 13),                     # 第3层：2个棋子
         (16, 12)                                # 第4层：1个棋子（底端）
-    ]
-    for row, col in blue_positions:
-        board[row][col] = {'color': 'blue', 'type': 'piece'}
-    
+    ),
     # 橙方（右下）- 正三角形
-    orange_positions = [
+    'orange': (
         (9, 21),                             # 第1层：1个棋子
         (10, 20), (10, 22),                  # 第2层：2个棋子
         (11, 19), (11, 21), (11, 23),        # 第3层：3个棋子
         (12, 18), (12, 20), (12, 22), (12, 24)  # 第4层：4个棋子
-    ]
-    for row, col in orange_positions:
-        board[row][col] = {'color': 'orange', 'type': 'piece'}
-    
+    ),
     # 紫方（左下）- 正三角形
-    purple_positions = [
+    'purple': (
         (9, 3),                              # 第1层：1个棋子
         (10, 2), (10, 4),                    # 第2层：2个棋子
         (11, 1), (11, 3), (11, 5),           # 第3层：3个棋子
         (12, 0), (12, 2), (12, 4), (12, 6)   # 第4层：4个棋子
-    ]
-    for row, col in purple_positions:
-        board[row][col] = {'color': 'purple', 'type': 'piece'}
-    
+    ),
+}
+
+# 各方目标区域（对角）
+TARGET_ZONES = {
+    'red': ((13, 9), (13, 11), (13, 13), (13, 15), (14, 10), (14, 12), (14, 14), (15, 11), (15, 13), (16, 12)),
+    'green': ((9, 18), (9, 20), (9, 22), (9, 24), (10, 19), (10, 21), (10, 23), (11, 20), (11, 22), (12, 21)),
+    'yellow': ((9, 0), (9, 2), (9, 4), (9, 6), (10, 1), (10, 3), (10, 5), (11, 2), (11, 4), (12, 3)),
+    'blue': ((0, 12), (1, 11), (1, 13), (2, 10), (2, 12), (2, 14), (3, 9), (3, 11), (3, 13), (3, 15)),
+    'orange': ((4, 0), (4, 2), (4, 4), (4, 6), (5, 1), (5, 3), (5, 5), (6, 2), (6, 4), (7, 3)),
+    'purple': ((4, 18), (4, 20), (4, 22), (4, 24), (5, 19), (5, 21), (5, 23), (6, 20), (6, 22), (7, 21)),
+}
+
+# 基于用户定义的有效位置集合
+VALID_POSITIONS = frozenset({
+    # 中心区域 - 六角星中心
+    (4, 8), (4, 10), (4, 12), (4, 14), (4, 16),
+    (5, 7), (5, 9), (5, 11), (5, 13), (5, 15), (5, 17),
+    (6, 6), (6, 8), (6, 10), (6, 12), (6, 14), (6, 16), (6, 18),
+    (7, 5), (7, 7), (7, 9), (7, 11), (7, 13), (7, 15), (7, 17), (7, 19),
+    (8, 4), (8, 6), (8, 8), (8, 10), (8, 12), (8, 14), (8, 16), (8, 18), (8, 20),
+    (9, 5), (9, 7), (9, 9), (9, 11), (9, 13), (9, 15), (9, 17), (9, 19),
+    (10, 6), (10, 8), (10, 10), (10, 12), (10, 14), (10, 16), (10, 18),
+    (11, 7), (11, 9), (11, 11), (11, 13), (11, 15), (11, 17),
+    (12, 8), (12, 10), (12, 12), (12, 14), (12, 16),
+}.union(*START_POSITIONS.values()))
+
+# 六角网格的 6 个方向
+DIRECTIONS = (
+    (-1, -1), (-1, 1),  # 左上、右上
+    (0, -2), (0, 2),    # 左边（隔一列）、右边（隔一列）
+    (1, -1), (1, 1)     # 左下、右下
+)
+
+
+def _build_adjacency():
+    """预计算每个有效位置的相邻位置下标，以及跳跃的 (中间位置, 落点) 下标"""
+    neighbors = [()] * (ROWS * COLS)
+    jumps = [()] * (ROWS * COLS)
+    for row, col in VALID_POSITIONS:
+        square_neighbors = []
+        square_jumps = []
+        for dr, dc in DIRECTIONS:
+            mid = (row + dr, col + dc)
+            land = (row + 2 * dr, col + 2 * dc)
+            if mid in VALID_POSITIONS:
+                square_neighbors.append(mid[0] * COLS + mid[1])
+                if land in VALID_POSITIONS:
+                    square_jumps.append((mid[0] * COLS + mid[1], land[0] * COLS + land[1]))
+        neighbors[row * COLS + col] = tuple(square_neighbors)
+        jumps[row * COLS + col] = tuple(square_jumps)
+    return tuple(neighbors), tuple(jumps)
+
+
+NEIGHBORS, JUMPS = _build_adjacency()
+
+
+# Zobrist 局面哈希键表
+ZOBRIST = zobrist.ZobristTable(
+    'chinese_checkers', ROWS * COLS, tuple(COLOR_CODES.values()),
+    {'current_player': tuple(range(1, len(COLORS) + 1))},
+)
+
+
+class ChineseCheckersState(GameState):
+    """中国跳棋房间状态"""
+    __slots__ = (
+        'players', 'board', 'game_started', 'last_move_path',
+        'red_player', 'blue_player', 'red_choice', 'blue_choice',
+    )
+
+    zobrist = ZOBRIST
+
+
+def initialize_chinese_checkers_game(sid):
+    """初始化中国跳棋游戏数据"""
+    return zobrist.reset_hash(ChineseCheckersState(
+        game_type='chinese_checkers',
+        players=[
+            {'sid': sid, 'color': 'red', 'joined': True},
+            {'sid': None, 'color': 'green', 'joined': False},
+            {'sid': None, 'color': 'yellow', 'joined': False},
+            {'sid': None, 'color': 'blue', 'joined': False},
+            {'sid': None, 'color': 'orange', 'joined': False},
+            {'sid': None, 'color': 'purple', 'joined': False}
+        ],
+        board=initialize_chinese_checkers_board(),
+        game_started=False,  # 游戏是否已开始
+        last_move_path=[],   # 记录上一步的完整跳跃路径（上一步本身即 moves[-1]）
+        # 双人先后手选择（旧流程），未加入时为 None
+        red_player=None,
+        blue_player=None,
+        red_choice=None,
+        blue_choice=None,
+    ))
+
+
+def initialize_chinese_checkers_board():
+    """初始化中国跳棋棋盘（六角星形）"""
+    board = bytearray(ROWS * COLS)
+    for color, positions in START_POSITIONS.items():
+        for row, col in positions:
+            board[row * COLS + col] = COLOR_CODES[color]
     return board
 
 
+def piece_info(piece):
+    """棋子编码转换为客户端使用的棋子字典，空位为 None"""
+    if not piece:
+        return None
+    return {'color': COLORS[piece - 1], 'type': 'piece'}
+
+
+def board_to_wire(board):
+    """一维棋盘转换为客户端使用的二维列表"""
+    return transport.compact([[piece_info(piece) for piece in board[start:start + COLS]]
+                              for start in range(0, ROWS * COLS, COLS)], bytes(board))
+
+
 def is_valid_position(row, col):
     """检查位置是否在棋盘有效范围内"""
-    if not (0 <= row < 17 and 0 <= col < 25):
-        return False
-    
-    # 基于用户定义的有效位置集合
-    valid_positions = {
-        # 上方三角形区域（红方起始位置）- 倒三角形
-        (0, 12),
-        (1, 11), (1, 13),
-        (2, 10), (2, 12), (2, 14),
-        (3, 9), (3, 11), (3, 13), (3, 15),
-        
-        # 左上三角形区域（绿方起始位置）- 倒三角形
-        (4, 0), (4, 2), (4, 4), (4, 6),
-        (5, 1), (5, 3), (5, 5),
-        (6, 2), (6, 4),
-        (7, 3),
-        
-        # 右上三角形区域（黄方起始位置）- 倒三角形
-        (4, 18), (4, 20), (4, 22), (4, 24),
-        (5, 19), (5, 21), (5, 23),
-        (6, 20), (6, 22),
-        (7, 21),
-        
-        # 中心区域 - 六角星中心
-        (4, 8), (4, 10), (4, 12), (4, 14), (4, 16),
-        (5, 7), (5, 9), (5, 11), (5, 13), (5, 15), (5, 17),
-        (6, 6), (6, 8), (6, 10), (6, 12), (6, 14), (6, 16), (6, 18),
-        (7, 5), (7, 7), (7, 9), (7, 11), (7, 13), (7, 15), (7, 17), (7, 19),
-        (8, 4), (8, 6), (8, 8), (8, 10), (8, 12), (8, 14), (8, 16), (8, 18), (8, 20),
-        (9, 5), (9, 7), (9, 9), (9, 11), (9, 13), (9, 15), (9, 17), (9, 19),
-        (10, 6), (10, 8), (10, 10), (10, 12), (10, 14), (10, 16), (10, 18),
-        (11, 7), (11, 9), (11, 11), (11, 13), (11, 15), (11, 17),
-        (12, 8), (12, 10), (12, 12), (12, 14), (12, 16),
-        
-        # 下方三角形区域（蓝方起始位置）- 正三角形
-        (13, 9), (13, 11), (13, 13), (13, 15),
-        (14, 10), (14, 12), (14, 14),
-        (15, 11), (15, 13),
-        (16, 12),
-        
-        # 右下三角形区域（橙方起始位置）- 正三角形
-        (9, 21),
-        (10, 20), (10, 22),
-        (11, 19), (11, 21), (11, 23),
-        (12, 18), (12, 20), (12, 22), (12, 24),
-        
-        # 左下三角形区域（紫方起始位置）- 正三角形
-        (9, 3),
-        (10, 2), (10, 4),
-        (11, 1), (11, 3), (11, 5),
-        (12, 0), (12, 2), (12, 4), (12, 6)
-    }
-    
-    return (row, col) in valid_positions
+    return (row, col) in VALID_POSITIONS
 
 
 def get_neighbors(row, col):
     """获取指定位置的所有相邻位置（6个方向）"""
-    directions = [
-        (-1, -1), (-1, 1),  # 左上、右上
-        (0, -2), (0, 2),    # 左边（隔一列）、右边（隔一列）
-        (1, -1), (1, 1)     # 左下、右下
-    ]
-    
-    neighbors = []
-    for dr, dc in directions:
-        new_row, new_col = row + dr, col + dc
-        if is_valid_position(new_row, new_col):
-            neighbors.append((new_row, new_col))
-    
-    return neighbors
+    return [divmod(square, COLS) for square in NEIGHBORS[row * COLS + col]]
 
 
 def get_jump_positions(board, row, col):
     """获取所有可以跳跃到的位置"""
-    jumps = []
-    
-    # 检查6个方向的跳跃（六角网格）
-    directions = [
-        (-1, -1), (-1, 1),  # 左上、右上
-        (0, -2), (0, 2),    # 左边（隔一列）、右边（隔一列）
-        (1, -1), (1, 1)     # 左下、右下
-    ]
-    
-    for dr, dc in directions:
-        # 检查相邻位置是否有棋子
-        mid_row, mid_col = row + dr, col + dc
-        jump_row, jump_col = row + 2*dr, col + 2*dc
-        
-        # 调试信息
-        # print(f"检查方向({dr},{dc}): 中间({mid_row},{mid_col}), 跳跃({jump_row},{jump_col})")
-        # print(f"  中间有效: {is_valid_position(mid_row, mid_col)}, 有棋子: {board[mid_row][mid_col] is not None}")
-        # print(f"  跳跃有效: {is_valid_position(jump_row, jump_col)}, 为空: {board[jump_row][jump_col] is None}")
-        
-        if (is_valid_position(mid_row, mid_col) and 
-            is_valid_position(jump_row, jump_col) and
-            board[mid_row][mid_col] is not None and  # 中间有棋子
-            board[jump_row][jump_col] is None):      # 跳跃位置为空
-            jumps.append((jump_row, jump_col))
-    
-    return jumps
+    # 中间有棋子且跳跃位置为空
+    return [divmod(land, COLS) for mid, land in JUMPS[row * COLS + col]
+            if board[mid] and not board[land]]
 
 
 def get_all_jump_sequences(board, row, col, visited_positions):
@@ -231,13 +220,9 @@ def get_all_jump_sequences(board, row, col, visited_positions):
             continue
             
         # 创建临时棋盘状态（模拟跳跃）
-        temp_board = []
-        for board_row in board:
-            temp_board.append(board_row[:])
-        
-        piece = temp_board[row][col]
-        temp_board[row][col] = None
-        temp_board[jump_row][jump_col] = piece
+        temp_board = bytearray(board)
+        temp_board[jump_row * COLS + jump_col] = temp_board[row * COLS + col]
+        temp_board[row * COLS + col] = 0
         
         # 递归查找从新位置开始的跳跃序列
         new_visited = current_path[:]  # 创建新的访问记录
@@ -261,10 +246,10 @@ def get_all_possible_moves(board, row, col):
     
     # 1. 平移移动（始终允许）
     neighbors = get_neighbors(row, col)
-    print(f"位置({row},{col})的相邻位置: {neighbors}")
+    logger.debug("位置(%s,%s)的相邻位置: %s", row, col, neighbors)
     
     for n_row, n_col in neighbors:
-        if board[n_row][n_col] is None:  # 相邻位置为空
+        if not board[n_row * COLS + n_col]:  # 相邻位置为空
             moves.append({
                 'type': 'move',
                 'from_row': row,
@@ -276,7 +261,7 @@ def get_all_possible_moves(board, row, col):
     
     # 2. 跳跃移动（包括所有可能的跳跃长度）
     jumps = get_jump_positions(board, row, col)
-    print(f"位置({row},{col})的跳跃位置: {jumps}")
+    logger.debug("位置(%s,%s)的跳跃位置: %s", row, col, jumps)
     
     if len(jumps) > 0:
         # 获取所有可能的跳跃路径，包括中间步骤
@@ -337,34 +322,36 @@ def get_all_jump_steps(board, row, col):
 
 def is_in_target_zone(row, col, player_color):
     """检查位置是否在目标区域（对角）"""
-    target_zones = {
-        'red': [(13, 9), (13, 11), (13, 13), (13, 15), (14, 10), (14, 12), (14, 14), (15, 11), (15, 13), (16, 12)],
-        'green': [(9, 18), (9, 20), (9, 22), (9, 24), (10, 19), (10, 21), (10, 23), (11, 20), (11, 22), (12, 21)],
-        'yellow': [(9, 0), (9, 2), (9, 4), (9, 6), (10, 1), (10, 3), (10, 5), (11, 2), (11, 4), (12, 3)],
-        'blue': [(0, 12), (1, 11), (1, 13), (2, 10), (2, 12), (2, 14), (3, 9), (3, 11), (3, 13), (3, 15)],
-        'orange': [(4, 0), (4, 2), (4, 4), (4, 6), (5, 1), (5, 3), (5, 5), (6, 2), (6, 4), (7, 3)],
-        'purple': [(4, 18), (4, 20), (4, 22), (4, 24), (5, 19), (5, 21), (5, 23), (6, 20), (6, 22), (7, 21)]
-    }
-    
-    return (row, col) in target_zones.get(player_color, [])
+    return (row, col) in TARGET_ZONES.get(player_color, ())
 
 
 def count_pieces_in_target(board, player_color):
     """统计目标区域中的己方棋子数量"""
-    target_zones = {
-        'red': [(13, 9), (13, 11), (13, 13), (13, 15), (14, 10), (14, 12), (14, 14), (15, 11), (15, 13), (16, 12)],
-        'green': [(9, 18), (9, 20), (9, 22), (9, 24), (10, 19), (10, 21), (10, 23), (11, 20), (11, 22), (12, 21)],
-        'yellow': [(9, 0), (9, 2), (9, 4), (9, 6), (10, 1), (10, 3), (10, 5), (11, 2), (11, 4), (12, 3)],
-        'blue': [(0, 12), (1, 11), (1, 13), (2, 10), (2, 12), (2, 14), (3, 9), (3, 11), (3, 13), (3, 15)],
-        'orange': [(4, 0), (4, 2), (4, 4), (4, 6), (5, 1), (5, 3), (5, 5), (6, 2), (6, 4), (7, 3)],
-        'purple': [(4, 18), (4, 20), (4, 22), (4, 24), (5, 19), (5, 21), (5, 23), (6, 20), (6, 22), (7, 21)]
-    }
-    
-    count = 0
-    for row, col in target_zones.get(player_color, []):
-        if board[row][col] and board[row][col]['color'] == player_color:
-            count += 1
-    return count
+    code = COLOR_CODES.get(player_color)
+    return sum(1 for row, col in TARGET_ZONES.get(player_color, ()) if board[row * COLS + col] == code)
+
+
+def log_move_request(board, from_row, from_col, to_row, to_col):
+    """输出移动请求的调试信息：起止位置、起始位置周围情况以及所有可能的移动"""
+    logger.debug("移动请求: 从 (%s,%s) 移动到 (%s,%s)", from_row, from_col, to_row, to_col)
+    logger.debug("起始位置棋子: %s, 目标位置状态: %s",
+                 piece_info(board[from_row * COLS + from_col]), piece_info(board[to_row * COLS + to_col]))
+
+    around = []
+    for nr, nc in get_neighbors(from_row, from_col):
+        piece = piece_info(board[nr * COLS + nc])
+        around.append(f"({nr},{nc}): {'有棋子 ' + str(piece) if piece else '空位'}")
+    logger.debug("起始位置 (%s,%s) 周围情况: %s", from_row, from_col, '; '.join(around))
+
+    options = []
+    for move in get_all_possible_moves(board, from_row, from_col):
+        if move['type'] == 'jump' and 'sequence' in move and len(move['sequence']) > 1:
+            sequence_str = ' -> '.join([f"({r},{c})" for r, c in move['sequence']])
+            options.append(f"连续跳跃 ({from_row},{from_col}) -> {sequence_str}")
+        else:
+            kind = '平移' if move['type'] == 'move' else '单步跳跃'
+            options.append(f"{kind} ({move['to_row']},{move['to_col']})")
+    logger.debug("棋子 (%s,%s) 的所有可能移动: %s", from_row, from_col, '; '.join(options))
 
 
 def handle_chinese_checkers_move(game, room_id, sid, data):
@@ -375,83 +362,42 @@ def handle_chinese_checkers_move(game, room_id, sid, data):
         to_row = data.get('to_row')
         to_col = data.get('to_col')
         
-        print(f"\n=== 移动请求 ===")
-        print(f"从 ({from_row},{from_col}) 移动到 ({to_row},{to_col})")
-        print(f"请求数据: {data}")
+        # 调试输出需要额外计算所有可能的移动，只在开启调试日志时执行
+        if logger.isEnabledFor(logging.DEBUG):
+            log_move_request(game.board, from_row, from_col, to_row, to_col)
         
-        # 显示周围位置信息
-        print(f"起始位置棋子: {game['board'][from_row][from_col]}")
-        print(f"目标位置状态: {game['board'][to_row][to_col]}")
-        print(f"目标位置是否为空: {game['board'][to_row][to_col] is None}")
-        
-        # 检查起始位置周围的棋子分布
-        print(f"起始位置 ({from_row},{from_col}) 周围情况:")
-        directions = [(-1, -1), (-1, 1), (0, -2), (0, 2), (1, -1), (1, 1)]
-        for dr, dc in directions:
-            nr, nc = from_row + dr, from_col + dc
-            if is_valid_position(nr, nc):
-                piece = game['board'][nr][nc]
-                status = "有棋子" if piece else "空位"
-                print(f"  ({nr},{nc}): {status} {piece if piece else ''}")
-        
-        # 显示所有可能的移动
-        print(f"\n棋子 ({from_row},{from_col}) 的所有可能移动:")
-        all_moves = get_all_possible_moves(game['board'], from_row, from_col)
-        
-        # 分别显示平移和跳跃移动
-        moves_list = [move for move in all_moves if move['type'] == 'move']
-        jumps_list = [move for move in all_moves if move['type'] == 'jump']
-        
-        if moves_list:
-            print("  平移移动选项:")
-            for move in moves_list:
-                print(f"    类型: 平移, 到达: ({move['to_row']},{move['to_col']})")
-        
-        if jumps_list:
-            print("  跳跃移动选项:")
-            for move in jumps_list:
-                if 'sequence' in move and len(move['sequence']) > 1:
-                    sequence_str = ' -> '.join([f"({r},{c})" for r, c in move['sequence']])
-                    print(f"    类型: 连续跳跃, 路径: ({from_row},{from_col}) -> {sequence_str}")
-                else:
-                    print(f"    类型: 单步跳跃, 到达: ({move['to_row']},{move['to_col']})")
-        
-        if game['game_over']:
-            socketio.emit('error', {'message': '游戏已结束'}, to=sid)
+        if game.game_over:
+            transport.emit('error', {'message': '游戏已结束'}, to=sid)
             return
         
         # 验证玩家身份
-        current_player = game['current_player']
-        player_info = game['players'][current_player - 1]
+        current_player = game.current_player
+        player_info = game.players[current_player - 1]
         player_sid = player_info['sid']
         player_color = player_info['color']
         
         if sid != player_sid:
-            socketio.emit('error', {'message': '不是你的回合'}, to=sid)
+            transport.emit('error', {'message': '不是你的回合'}, to=sid)
             return
         
         # 验证位置
         if not is_valid_position(from_row, from_col) or not is_valid_position(to_row, to_col):
-            socketio.emit('error', {'message': '无效的位置'}, to=sid)
+            transport.emit('error', {'message': '无效的位置'}, to=sid)
             return
         
         # 验证棋子
-        piece = game['board'][from_row][from_col]
-        if not piece or piece['color'] != player_color:
-            socketio.emit('error', {'message': '无效的棋子'}, to=sid)
+        piece = game.board[from_row * COLS + from_col]
+        if piece != COLOR_CODES[player_color]:
+            transport.emit('error', {'message': '无效的棋子'}, to=sid)
             return
         
         # 验证目标位置为空
-        if game['board'][to_row][to_col] is not None:
-            socketio.emit('error', {'message': '目标位置已被占用'}, to=sid)
+        if game.board[to_row * COLS + to_col]:
+            transport.emit('error', {'message': '目标位置已被占用'}, to=sid)
             return
         
         # 获取所有可能的移动
-        possible_moves = get_all_possible_moves(game['board'], from_row, from_col)
-        
-        print(f"棋子 ({from_row},{from_col}) 的所有可能移动:")
-        for move in possible_moves:
-            print(f"  类型: {move['type']}, 到达: ({move['to_row']},{move['to_col']})")
+        possible_moves = get_all_possible_moves(game.board, from_row, from_col)
         
         # 查找匹配的移动
         selected_move = None
@@ -461,15 +407,10 @@ def handle_chinese_checkers_move(game, room_id, sid, data):
                 break
         
         if not selected_move:
-            print(f"请求移动 ({from_row},{from_col}) -> ({to_row},{to_col}) 不在允许列表中")
-            socketio.emit('error', {'message': '非法移动'}, to=sid)
+            logger.debug("请求移动 (%s,%s) -> (%s,%s) 不在允许列表中", from_row, from_col, to_row, to_col)
+            transport.emit('error', {'message': '非法移动'}, to=sid)
             return
         
-        # 执行移动
-        piece = game['board'][from_row][from_col]
-        game['board'][to_row][to_col] = piece
-        game['board'][from_row][from_col] = None
-        
         # 记录移动和路径
         move_record = {
             'player': current_player,
@@ -486,17 +427,19 @@ def handle_chinese_checkers_move(game, room_id, sid, data):
         else:
             move_record['path'] = [[from_row, from_col], [to_row, to_col]]
         
-        game['moves'].append(move_record)
-        game['last_move'] = move_record
-        game['last_move_path'] = move_record.get('path', [])
+        # 执行移动
+        move = journal.record_move(game, move_record)
+        move.set_square(to_row * COLS + to_col, piece)
+        move.set_square(from_row * COLS + from_col, 0)
+        move.set_field('last_move_path', move_record['path'])
         
         # 检查是否胜利
         winner = None
         game_over_message = ""
         
         # 检查所有玩家的目标区域
-        for i, player in enumerate(game['players']):
-            pieces_in_target = count_pieces_in_target(game['board'], player['color'])
+        for i, player in enumerate(game.players):
+            pieces_in_target = count_pieces_in_target(game.board, player['color'])
             if pieces_in_target >= 10:  # 所有棋子都到达目标区域
                 winner = i + 1
                 winner_color = player['color']
@@ -504,15 +447,15 @@ def handle_chinese_checkers_move(game, room_id, sid, data):
                 break
         
         if winner:
-            game['game_over'] = True
-            game['winner'] = winner
+            move.set_field('game_over', True)
+            move.set_field('winner', winner)
         
         # 切换到下一个玩家（仅在已加入的玩家中轮换）
         # 获取已加入的玩家列表
-        active_players = [i + 1 for i, p in enumerate(game['players']) if p['joined']]
-        current_index = active_players.index(game['current_player'])
+        active_players = [i + 1 for i, p in enumerate(game.players) if p['joined']]
+        current_index = active_players.index(game.current_player)
         next_index = (current_index + 1) % len(active_players)
-        game['current_player'] = active_players[next_index]
+        move.set_field('current_player', active_players[next_index])
         
         # 通知所有玩家
         move_data = {
@@ -520,60 +463,88 @@ def handle_chinese_checkers_move(game, room_id, sid, data):
             'from_col': from_col,
             'to_row': to_row,
             'to_col': to_col,
-            'piece': piece,
-            'current_player': game['current_player'],
+            'piece': piece_info(piece),
+            'current_player': game.current_player,
             'jumped': selected_move['jumped'],
-            'last_move_path': game['last_move_path']
+            'last_move_path': game.last_move_path
         }
         
-        if game['game_over']:
+        if game.game_over:
             move_data['game_over'] = True
             move_data['winner'] = winner
             move_data['message'] = game_over_message
         
-        socketio.emit('move_made', move_data, to=room_id)
+        transport.emit('move_made', move_data, to=room_id)
         
-        print(f"Chinese Checkers move: {player_color} from ({from_row},{from_col}) to ({to_row},{to_col})")
+        logger.info("Chinese Checkers move: %s from (%s,%s) to (%s,%s)",
+                    player_color, from_row, from_col, to_row, to_col)
         
     except Exception as e:
-        print(f"Error in handle_chinese_checkers_move: {e}")
-        socketio.emit('error', {'message': '移动失败'}, to=sid)
+        logger.exception("Error in handle_chinese_checkers_move")
+        transport.emit('error', {'message': '移动失败'}, to=sid)
 
 
 def reset_chinese_checkers_game(game):
     """重置中国跳棋游戏"""
-    game['board'] = initialize_chinese_checkers_board()
-    game['current_player'] = 1
-    game['game_over'] = False
-    game['winner'] = None
-    game['moves'] = []
+    game.board = initialize_chinese_checkers_board()
+    game.current_player = 1
+    game.game_over = False
+    game.winner = None
+    game.moves = []
+    zobrist.reset_hash(game)
+
+
+def handle_chinese_checkers_surrender(game, sid):
+    """处理中国跳棋认输，返回(赢家编号, 赢家sid, 输家sid)"""
+    # 多人游戏简化处理
+    return 1, None, sid
+
+
+def get_chinese_checkers_winner_name(winner):
+    """获取中国跳棋赢家名称"""
+    return '某位玩家'
 
 
 def get_chinese_checkers_current_player_sid(game):
     """获取中国跳棋当前轮到的玩家 sid"""
-    current_player = game['current_player']
-    current_player_info = game['players'][current_player - 1]
+    current_player = game.current_player
+    current_player_info = game.players[current_player - 1]
     return current_player_info['sid']
 
 
-def execute_chinese_checkers_undo(game, last_move):
-    """执行中国跳棋悔棋"""
-    from_row = last_move['from_row']
-    from_col = last_move['from_col']
-    to_row = last_move['to_row']
-    to_col = last_move['to_col']
-    
-    # 恢复棋子到原位置
-    piece = game['board'][to_row][to_col]
-    game['board'][from_row][from_col] = piece
-    game['board'][to_row][to_col] = None
-    
-    # 恢复上一步路径
-    path = last_move.get('path', [])
-    if path:
-        game['last_move_path'] = path
-    else:
-        game['last_move_path'] = [[from_row, from_col], [to_row, to_col]]
+def handle_chinese_checkers_disconnect(game, sid):
+    """处理中国跳棋玩家断开连接，返回其他玩家sid列表"""
+    if not any(p['sid'] == sid for p in game.players):
+        return []
+    return [p['sid'] for p in game.players if p['sid'] and p['sid'] != sid]
+
+
+def rebind_chinese_checkers_player(game, old_sid, new_sid):
+    """断线重连后把玩家列表和座位字段中的旧 sid 改为新 sid"""
+    for player in game.players:
+        if player['sid'] == old_sid:
+            player['sid'] = new_sid
+    rebind_fields(game, old_sid, new_sid)
+
+
+def get_chinese_checkers_public_snapshot(game):
+    """观战快照：各方加入情况、棋盘和上一步的跳跃路径"""
+    return {
+        'players': [{'color': p['color'], 'joined': p['joined']} for p in game.players],
+        'game_started': game.game_started,
+        'board': board_to_wire(game.board),
+        'last_move_path': game.last_move_path,
+    }
+
+
+def get_chinese_checkers_snapshot(game, sid):
+    """断线重连后发给玩家的局面快照"""
+    index = next(i for i, p in enumerate(game.players) if p['sid'] == sid)
+    return {
+        'player_color': game.players[index]['color'],
+        'player_number': index + 1,
+        **get_chinese_checkers_public_snapshot(game),
+    }
 
 
 def assign_chinese_checkers_player(game, sid):
@@ -581,72 +552,98 @@ def assign_chinese_checkers_player(game, sid):
     player_info = None
     player_index = -1
     
-    joined_count = sum(1 for p in game['players'] if p['joined'])
+    joined_count = sum(1 for p in game.players if p['joined'])
     
     if joined_count == 1:
-        for i, player in enumerate(game['players']):
+        for i, player in enumerate(game.players):
             if player['color'] == 'blue' and not player['joined']:
                 player_info = player
                 player_index = i
                 break
         if player_info is None:
-            for i, player in enumerate(game['players']):
+            for i, player in enumerate(game.players):
                 if not player['joined']:
                     player_info = player
                     player_index = i
                     break
     else:
-        for i, player in enumerate(game['players']):
+        for i, player in enumerate(game.players):
             if not player['joined']:
                 player_info = player
                 player_index = i
                 break
     
     if player_info:
-        print(f"设置玩家信息前: {player_info}")
-        print(f"请求SID: {sid}")
         player_info['sid'] = sid
         player_info['joined'] = True
         player_color = player_info['color']
         player_number = player_index + 1
-        print(f"玩家加入房间: 分配颜色 {player_color}, 索引 {player_index}")
-        print(f"设置玩家信息后: {player_info}")
-        print(f"当前房间玩家状态: {[{'color': p['color'], 'sid': p['sid'], 'joined': p['joined']} for p in game['players']]}")
+        logger.debug("玩家 %s 加入房间: 分配颜色 %s, 索引 %s", sid, player_color, player_index)
         return (player_color, player_number)
     
     return (None, None)
 
 
+def join_chinese_checkers_player(game, sid):
+    """中国跳棋玩家加入，返回 room_joined 附加字段或 None（已满）"""
+    player_color, _ = assign_chinese_checkers_player(game, sid)
+    if player_color is None:
+        return None
+    return {
+        'player_color': player_color,
+        'joined_count': sum(1 for p in game.players if p['joined'])
+    }
+
+
+def broadcast_chinese_checkers_status(game, room_id):
+    """向房间内所有玩家广播最新的玩家状态"""
+    transport.emit('player_status_update', {
+        'joined_count': sum(1 for p in game.players if p['joined']),
+        'players': [{'color': p['color'], 'joined': p['joined']} for p in game.players]
+    }, to=room_id)
+
+
 def start_chinese_checkers_game(game, room_id, sid):
     """房主开始中国跳棋游戏，返回 (success, error_message)"""
-    host_player = game['players'][0]
+    host_player = game.players[0]
     if host_player['sid'] != sid:
         return (False, '只有房主可以开始游戏')
     
-    joined_players = [p for p in game['players'] if p['joined']]
+    joined_players = [p for p in game.players if p['joined']]
     if len(joined_players) < 2:
         return (False, '至少需要2个玩家才能开始游戏')
     
-    game['game_started'] = True
+    game.game_started = True
     player_colors = [p['color'] for p in joined_players]
     
-    socketio.emit('game_start', {
+    transport.emit('game_start', {
         'message': f'游戏开始！{len(joined_players)}人游戏，红方先手',
         'first_player': 1,
         'player_colors': player_colors,
-        'board': game['board']
+        'board': board_to_wire(game.board)
     }, to=room_id)
     
-    print(f"Game started in room {room_id} by host {sid}")
+    logger.info("Game started in room %s by host %s", room_id, sid)
     return (True, None)
 
 
+def get_chinese_checkers_phase(game):
+    """中国跳棋房间所处阶段：不足两人时等待加入，人数足够后等待房主开始"""
+    if game.game_over:
+        return 'game_over'
+    if game.game_started:
+        return 'playing'
+    if sum(1 for p in game.players if p['joined']) < 2:
+        return 'waiting'
+    return 'choosing'
+
+
 def record_chinese_checkers_choice(game, sid, choice):
     """记录中国跳棋玩家的先后手选择"""
-    if game.get('red_player') == sid:
-        game['red_choice'] = choice
-    elif game.get('blue_player') == sid:
-        game['blue_choice'] = choice
+    if game.red_player == sid:
+        game.red_choice = choice
+    elif game.blue_player == sid:
+        game.blue_choice = choice
 
 
 def should_start_chinese_checkers(game):
@@ -658,26 +655,45 @@ def determine_chinese_checkers_first_player(game):
     """确定中国跳棋先后手并通知双方"""
     import random
     
-    if game['red_choice'] == game['blue_choice']:
-        first_player_sid = random.choice([game['red_player'], game['blue_player']])
-        is_red_first = (first_player_sid == game['red_player'])
+    if game.red_choice == game.blue_choice:
+        first_player_sid = random.choice([game.red_player, game.blue_player])
+        is_red_first = (first_player_sid == game.red_player)
     else:
-        first_choice_sid = game['red_player'] if game['red_choice'] == 'first' else game['blue_player']
-        is_red_first = (first_choice_sid == game['red_player'])
+        first_choice_sid = game.red_player if game.red_choice == 'first' else game.blue_player
+        is_red_first = (first_choice_sid == game.red_player)
 
     if not is_red_first:
-        game['red_player'], game['blue_player'] = game['blue_player'], game['red_player']
-        game['red_choice'], game['blue_choice'] = game['blue_choice'], game['red_choice']
-
-    socketio.emit('game_start', {
-        'message': '游戏开始！红方先手',
-        'first_player': 'red',
-        'player_color': 'red',
-        'board': game['board']
-    }, to=game['red_player'])
-    socketio.emit('game_start', {
-        'message': '游戏开始！蓝方后手',
-        'first_player': 'red',
-        'player_color': 'blue',
-        'board': game['board']
-    }, to=game['blue_player'])
\ No newline at end of file
+        game.red_player, game.blue_player = game.blue_player, game.red_player
+        game.red_choice, game.blue_choice = game.blue_choice, game.red_choice
+
+    transport.emit_each('game_start', {'first_player': 'red', 'board': board_to_wire(game.board)}, [
+        (game.red_player, {'message': '游戏开始！红方先手', 'player_color': 'red'}),
+        (game.blue_player, {'message': '游戏开始！蓝方后手', 'player_color': 'blue'}),
+    ])
+
+
+register_game_module(GameModule(
+    game_type='chinese_checkers',
+    display_name='中国跳棋',
+    initialize=initialize_chinese_checkers_game,
+    creator_color='red',
+    join=join_chinese_checkers_player,
+    after_join=broadcast_chinese_checkers_status,
+    record_choice=record_chinese_checkers_choice,
+    should_start=should_start_chinese_checkers,
+    begin_game=determine_chinese_checkers_first_player,
+    host_start=start_chinese_checkers_game,
+    move=handle_chinese_checkers_move,
+    reset=reset_chinese_checkers_game,
+    reset_message='游戏已重置',
+    surrender=handle_chinese_checkers_surrender,
+    winner_name=get_chinese_checkers_winner_name,
+    broadcast_game_over=True,
+    current_player_sid=get_chinese_checkers_current_player_sid,
+    disconnect=handle_chinese_checkers_disconnect,
+    rebind=rebind_chinese_checkers_player,
+    snapshot=get_chinese_checkers_snapshot,
+    spectate=get_chinese_checkers_public_snapshot,
+    undo=journal.revert_move,
+    phase=get_chinese_checkers_phase,
+))
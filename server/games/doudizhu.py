@@ -3,10 +3,13 @@
 包含所有高级牌型验证（飞机、连对等）
 """
 
-# 全局变量，由主程序设置
-socketio = None
-games = None
+import logging
 
+from . import transport
+from .registry import GameModule, register_game_module
+from .state import GameState
+
+logger = logging.getLogger(__name__)
 
 def create_doudizhu_deck():
     """创建一副扑克牌(54张)"""
@@ -23,6 +26,11 @@ def create_doudizhu_deck():
     return deck
 
 
+def wire_cards(cards):
+    """发送给客户端的牌（二进制协议中每张牌 1 字节：rank << 2 | suit）"""
+    return transport.compact(cards, bytes(card['rank'] << 2 | card['suit'] for card in cards))
+
+
 def shuffle_deck(deck):
     """洗牌"""
     import random
@@ -233,7 +241,7 @@ def check_game_over(cards):
     return len(cards) == 0
 
 
-def handle_choose_landlord(games, room_id, sid, data, socketio, emit):
+def handle_choose_landlord(games, room_id, sid, data):
     """玩家选择是否叫地主"""
     room_id = data.get('room_id')
     player_number = data.get('player_number')
@@ -244,18 +252,18 @@ def handle_choose_landlord(games, room_id, sid, data, socketio, emit):
 
     game = games[room_id]
 
-    if game['game_type'] != 'doudizhu':
+    if game.game_type != 'doudizhu':
         return
 
     # 记录玩家选择
-    game['landlord_calls'][player_number] = call
+    game.landlord_calls[player_number] = call
 
     # 如果三个玩家都选择了,确定地主
-    if len(game['landlord_calls']) == 3:
+    if len(game.landlord_calls) == 3:
         # 简单逻辑:第一个叫地主的当地主
         landlord = None
         for pn in [1, 2, 3]:
-            if game['landlord_calls'].get(pn, False):
+            if game.landlord_calls.get(pn, False):
                 landlord = pn
                 break
 
@@ -264,18 +272,18 @@ def handle_choose_landlord(games, room_id, sid, data, socketio, emit):
             import random
             landlord = random.randint(1, 3)
 
-        game['landlord'] = landlord
+        game.landlord = landlord
 
         # 地主获得底牌
         landlord_key = f'player{landlord}_cards'
-        game[landlord_key].extend(game['landlord_cards'])
+        game[landlord_key].extend(game.landlord_cards)
         # 重新排序
         game[landlord_key].sort(key=lambda x: x['rank'], reverse=True)
 
         # 通知所有玩家地主已确定
-        socketio.emit('landlord_chosen', {
+        transport.emit('landlord_chosen', {
             'landlord_player': landlord,
-            'landlord_cards': game['landlord_cards']
+            'landlord_cards': wire_cards(game.landlord_cards)
         }, room=room_id)
 
         # 分别发送更新后的手牌
@@ -283,16 +291,16 @@ def handle_choose_landlord(games, room_id, sid, data, socketio, emit):
             player_key = f'player{pn}'
             cards_key = f'player{pn}_cards'
             if game[player_key]:
-                socketio.emit('cards_removed', {
-                    'my_cards': game[cards_key]
+                transport.emit('cards_removed', {
+                    'my_cards': wire_cards(game[cards_key])
                 }, room=game[player_key])
 
         # 从地主开始游戏
-        game['current_player'] = landlord
-        print(f"Landlord chosen: {landlord} in room {room_id}")
+        game.current_player = landlord
+        logger.info("Landlord chosen: %s in room %s", landlord, room_id)
 
 
-def handle_play_cards(games, room_id, sid, data, socketio, emit):
+def handle_play_cards(games, room_id, sid, data):
     """玩家出牌"""
     room_id = data.get('room_id')
     player_number = data.get('player_number')
@@ -303,18 +311,18 @@ def handle_play_cards(games, room_id, sid, data, socketio, emit):
 
     game = games[room_id]
 
-    if game['game_type'] != 'doudizhu':
+    if game.game_type != 'doudizhu':
         return
 
     # 检查是否轮到该玩家
-    if game['current_player'] != player_number:
+    if game.current_player != player_number:
         return
 
     # 验证出牌
-    is_valid, message = validate_cards(cards, game['last_played_cards'])
+    is_valid, message = validate_cards(cards, game.last_played_cards)
 
     if not is_valid:
-        print(f"Invalid cards from player {player_number}: {message}")
+        logger.info("Invalid cards from player %s: %s", player_number, message)
         return
 
     # 从玩家手牌中移除出的牌
@@ -335,27 +343,29 @@ def handle_play_cards(games, room_id, sid, data, socketio, emit):
     for i in sorted(cards_to_remove, reverse=True):
         player_cards.pop(i)
 
-    # 更新游戏状态
-    game['last_played_cards'] = cards
-    game['last_played_player'] = player_number
-    game['pass_count'] = 0
+    # 更新游戏状态（出牌记录与 cards_played 事件一致，用于对局记录）
+    game.moves.append({'player': player_number, 'cards': cards})
+    game.last_played_cards = cards
+    game.last_played_player = player_number
+    game.pass_count = 0
 
     # 检查是否游戏结束
     if check_game_over(player_cards):
-        game['game_over'] = True
-        winner_is_landlord = (player_number == game['landlord'])
+        game.game_over = True
+        game.winner = player_number
+        winner_is_landlord = (player_number == game.landlord)
 
         # 通知所有玩家游戏结束
-        socketio.emit('game_over', {
+        transport.emit('game_over', {
             'message': f'玩家{player_number}胜利!' if winner_is_landlord else f'农民胜利!',
             'winner': player_number
         }, room=room_id)
 
-        print(f"Game over in room {room_id}, winner: player{player_number}")
+        logger.info("Game over in room %s, winner: player%s", room_id, player_number)
         return
 
     # 广播出牌信息
-    socketio.emit('cards_played', {
+    transport.emit('cards_played', {
         'player_number': player_number,
         'cards': cards
     }, room=room_id)
@@ -363,16 +373,16 @@ def handle_play_cards(games, room_id, sid, data, socketio, emit):
     # 通知该玩家更新手牌
     player_sid = game[f'player{player_number}']
     if player_sid:
-        socketio.emit('cards_removed', {
-            'my_cards': player_cards
+        transport.emit('cards_removed', {
+            'my_cards': wire_cards(player_cards)
         }, room=player_sid)
 
     # 轮到下一位玩家
-    game['current_player'] = (player_number % 3) + 1
-    print(f"Player {player_number} played {len(cards)} cards, next: {game['current_player']}")
+    game.current_player = (player_number % 3) + 1
+    logger.info("Player %s played %d cards, next: %s", player_number, len(cards), game.current_player)
 
 
-def handle_pass_turn(games, room_id, sid, data, socketio, emit):
+def handle_pass_turn(games, room_id, sid, data):
     """玩家不出牌"""
     room_id = data.get('room_id')
     player_number = data.get('player_number')
@@ -382,111 +392,180 @@ def handle_pass_turn(games, room_id, sid, data, socketio, emit):
 
     game = games[room_id]
 
-    if game['game_type'] != 'doudizhu':
+    if game.game_type != 'doudizhu':
         return
 
     # 检查是否轮到该玩家
-    if game['current_player'] != player_number:
+    if game.current_player != player_number:
         return
 
     # 如果是首出,不能pass
-    if not game['last_played_cards'] or game['pass_count'] >= 2:
+    if not game.last_played_cards or game.pass_count >= 2:
         return
 
     # 记录pass
-    game['pass_count'] += 1
+    game.moves.append({'player': player_number, 'cards': None})
+    game.pass_count += 1
 
     # 广播pass信息
-    socketio.emit('cards_played', {
+    transport.emit('cards_played', {
         'player_number': player_number,
         'cards': None
     }, room=room_id)
 
     # 如果连续两人pass,下一轮可以任意出牌
-    if game['pass_count'] >= 2:
-        game['last_played_cards'] = []
-        game['pass_count'] = 0
+    if game.pass_count >= 2:
+        game.last_played_cards = []
+        game.pass_count = 0
 
     # 轮到下一位玩家
-    game['current_player'] = (player_number % 3) + 1
-    print(f"Player {player_number} passed, next: {game['current_player']}")
+    game.current_player = (player_number % 3) + 1
+    logger.info("Player %s passed, next: %s", player_number, game.current_player)
+
+
+class DoudizhuState(GameState):
+    """斗地主房间状态；手牌仍为 {'rank','suit'} 字典列表，与客户端出牌数据一致"""
+    __slots__ = (
+        'player1', 'player2', 'player3',
+        'player1_cards', 'player2_cards', 'player3_cards', 'landlord_cards',
+        'landlord', 'landlord_calls', 'last_played_cards', 'last_played_player', 'pass_count',
+    )
 
 
 def initialize_doudizhu_game(sid):
     """初始化斗地主游戏"""
-    return {
-        'game_type': 'doudizhu',
-        'player1': sid,
-        'player2': None,
-        'player3': None,
-        'player1_cards': [],
-        'player2_cards': [],
-        'player3_cards': [],
-        'landlord_cards': [],
-        'landlord': None,
-        'landlord_calls': {},
-        'current_player': None,
-        'last_played_cards': [],
-        'last_played_player': None,
-        'pass_count': 0,
-        'game_over': False,
-        'winner': None
-    }
+    return DoudizhuState(
+        game_type='doudizhu',
+        player1=sid,
+        player2=None,
+        player3=None,
+        player1_cards=[],
+        player2_cards=[],
+        player3_cards=[],
+        landlord_cards=[],
+        landlord=None,
+        landlord_calls={},
+        current_player=None,
+        last_played_cards=[],
+        last_played_player=None,
+        pass_count=0,
+    )
 
 
 def assign_doudizhu_player(game, sid):
     """分配斗地主玩家，返回 player_number 或 None（已满）"""
-    if game['player1'] is None:
-        game['player1'] = sid
+    if game.player1 is None:
+        game.player1 = sid
         return 1
-    elif game['player2'] is None:
-        game['player2'] = sid
+    elif game.player2 is None:
+        game.player2 = sid
         return 2
-    elif game['player3'] is None:
-        game['player3'] = sid
+    elif game.player3 is None:
+        game.player3 = sid
         return 3
     return None
 
 
+def join_doudizhu_player(game, sid):
+    """斗地主玩家加入，返回 room_joined 附加字段或 None（已满）"""
+    player_number = assign_doudizhu_player(game, sid)
+    if player_number is None:
+        return None
+    return {'player_number': player_number}
+
+
+def start_doudizhu_game_when_full(game, room_id):
+    """三名玩家都已加入时开始斗地主游戏"""
+    if game.player1 and game.player2 and game.player3:
+        start_doudizhu_game(game, room_id)
+
+
 def handle_doudizhu_disconnect(game, sid):
     """处理斗地主玩家断线，返回其他玩家sid列表"""
     opponent_sids = []
-    if game['player1'] == sid or game['player2'] == sid or game['player3'] == sid:
-        if game['player1'] != sid and game['player1'] is not None:
-            opponent_sids.append(game['player1'])
-        if game['player2'] != sid and game['player2'] is not None:
-            opponent_sids.append(game['player2'])
-        if game['player3'] != sid and game['player3'] is not None:
-            opponent_sids.append(game['player3'])
+    if game.player1 == sid or game.player2 == sid or game.player3 == sid:
+        if game.player1 != sid and game.player1 is not None:
+            opponent_sids.append(game.player1)
+        if game.player2 != sid and game.player2 is not None:
+            opponent_sids.append(game.player2)
+        if game.player3 != sid and game.player3 is not None:
+            opponent_sids.append(game.player3)
     return opponent_sids
 
 
+def get_doudizhu_phase(game):
+    """斗地主房间所处阶段：等待加入、叫地主、出牌、已结束"""
+    if game.game_over:
+        return 'game_over'
+    if not (game.player1 and game.player2 and game.player3):
+        return 'waiting'
+    if game.landlord is None:
+        return 'choosing'
+    return 'playing'
+
+
 def start_doudizhu_game(game, room_id):
     """开始斗地主游戏"""
     try:
         deck = shuffle_deck(create_doudizhu_deck())
         player1_cards, player2_cards, player3_cards, landlord_cards = deal_cards(deck)
 
-        game['player1_cards'] = player1_cards
-        game['player2_cards'] = player2_cards
-        game['player3_cards'] = player3_cards
-        game['landlord_cards'] = landlord_cards
-        game['landlord'] = None
-        game['landlord_calls'] = {}
-        game['last_played_cards'] = []
-        game['last_played_player'] = None
-        game['pass_count'] = 0
-
-        for i, player_sid in enumerate([game['player1'], game['player2'], game['player3']], 1):
+        game.player1_cards = player1_cards
+        game.player2_cards = player2_cards
+        game.player3_cards = player3_cards
+        game.landlord_cards = landlord_cards
+        game.landlord = None
+        game.landlord_calls = {}
+        game.last_played_cards = []
+        game.last_played_player = None
+        game.pass_count = 0
+
+        for i, player_sid in enumerate([game.player1, game.player2, game.player3], 1):
             cards_key = f'player{i}_cards'
             if game[cards_key]:
-                socketio.emit('cards_dealt', {
-                    'my_cards': game[cards_key],
+                transport.emit('cards_dealt', {
+                    'my_cards': wire_cards(game[cards_key]),
                     'player_number': i
                 }, to=player_sid)
 
-        socketio.emit('game_start', {
+        transport.emit('game_start', {
             'message': '游戏开始！请选择是否叫地主'
         }, to=room_id)
     except Exception as e:
-        print(f"Error in start_doudizhu_game: {e}")
+        logger.exception("Error in start_doudizhu_game")
+
+
+def get_doudizhu_public_snapshot(game):
+    """观战快照：各家剩余张数、地主与底牌、上一手牌（不含手牌）"""
+    return {
+        'card_counts': [len(game[f'player{i}_cards']) for i in (1, 2, 3)],
+        'landlord': game.landlord,
+        'landlord_cards': wire_cards(game.landlord_cards) if game.landlord is not None else [],
+        'last_played_cards': game.last_played_cards,
+        'last_played_player': game.last_played_player,
+    }
+
+
+def get_doudizhu_snapshot(game, sid):
+    """断线重连后发给玩家的局面快照：公开的局面加上自己的手牌"""
+    player_number = next(i for i in (1, 2, 3) if game[f'player{i}'] == sid)
+    return {
+        'player_number': player_number,
+        'my_cards': wire_cards(game[f'player{player_number}_cards']),
+        **get_doudizhu_public_snapshot(game),
+    }
+
+
+register_game_module(GameModule(
+    game_type='doudizhu',
+    display_name='斗地主',
+    initialize=initialize_doudizhu_game,
+    creator_number=1,
+    seats=('player1', 'player2', 'player3'),
+    join=join_doudizhu_player,
+    after_join=start_doudizhu_game_when_full,
+    disconnect=handle_doudizhu_disconnect,
+    snapshot=get_doudizhu_snapshot,
+    spectate=get_doudizhu_public_snapshot,
+    phase=get_doudizhu_phase,
+))
@@ -6,89 +6,99 @@
 - 其他规则与布阵军棋相同
 """
 
+import logging
 import random
 
-# 全局变量，由主程序设置
-socketio = None
-games = None
+from . import journal, transport
+from .army_chess import (
+    BLUE, CAMPS, COLOR_BITS, COLS, PIECE_CODES, RAILWAYS, RED, ROWS,
+    _check_sapper_railway_path, _check_straight_railway_path, get_sapper_railway_path,
+    piece_color_name, piece_type_name,
+)
+from .registry import GameModule, register_game_module
+from .state import GameState
+
+logger = logging.getLogger(__name__)
+
+# 棋盘与棋子编码同布阵军棋（army_chess），另用 FLIPPED 位表示棋子已翻开
+FLIPPED = 0x40
+
+
+class FlipArmyChessState(GameState):
+    """翻子军棋房间状态"""
+    __slots__ = ('red_player', 'blue_player', 'red_choice', 'blue_choice', 'board', 'red_lost', 'blue_lost')
 
 
 def initialize_flip_army_chess_game(sid):
     """初始化翻子军棋游戏数据"""
-    return {
-        'game_type': 'flip_army_chess',
-        'red_player': None,
-        'blue_player': None,
-        'red_choice': None,
-        'blue_choice': None,
-        'board': [[None]*5 for _ in range(12)],
-        'pieces': {},
-        'current_player': 1,
-        'game_over': False,
-        'winner': None,
-        'moves': [],
-        'red_lost': [],
-        'blue_lost': [],
-        'flipped_pieces': set(),
-    }
+    return FlipArmyChessState(
+        game_type='flip_army_chess',
+        red_player=None,
+        blue_player=None,
+        red_choice=None,
+        blue_choice=None,
+        board=bytearray(ROWS * COLS),
+        red_lost=[],
+        blue_lost=[],
+    )
 
 
 def assign_flip_army_chess_player(game, sid):
     """分配翻子军棋玩家颜色"""
-    if game['red_player'] is None:
-        game['red_player'] = sid
+    if game.red_player is None:
+        game.red_player = sid
         return 'red'
-    elif game['blue_player'] is None:
-        game['blue_player'] = sid
+    elif game.blue_player is None:
+        game.blue_player = sid
         return 'blue'
     return None
 
 
 def record_flip_army_chess_choice(game, sid, choice):
     """记录翻子军棋玩家的先后手选择"""
-    if game['red_player'] == sid:
-        game['red_choice'] = choice
-    elif game['blue_player'] == sid:
-        game['blue_choice'] = choice
+    if game.red_player == sid:
+        game.red_choice = choice
+    elif game.blue_player == sid:
+        game.blue_choice = choice
 
 
 def should_start_flip_army_chess(game):
     """检查是否可以开始翻子军棋游戏"""
-    return game['red_choice'] is not None and game['blue_choice'] is not None
+    return game.red_choice is not None and game.blue_choice is not None
 
 
 def determine_flip_army_chess_first_player(game):
     """确定翻子军棋先后手并可能交换玩家"""
-    if game['red_choice'] == game['blue_choice']:
+    if game.red_choice == game.blue_choice:
         # 选择相同，随机决定
-        first_player_sid = random.choice([game['red_player'], game['blue_player']])
-        is_red_first = (first_player_sid == game['red_player'])
+        first_player_sid = random.choice([game.red_player, game.blue_player])
+        is_red_first = (first_player_sid == game.red_player)
     else:
         # 选择不同，先选先手的为先手
-        first_choice_sid = game['red_player'] if game['red_choice'] == 'first' else game['blue_player']
-        is_red_first = (first_choice_sid == game['red_player'])
+        first_choice_sid = game.red_player if game.red_choice == 'first' else game.blue_player
+        is_red_first = (first_choice_sid == game.red_player)
 
     # 如果蓝方先手，交换红蓝身份
     if not is_red_first:
-        game['red_player'], game['blue_player'] = game['blue_player'], game['red_player']
-        game['red_choice'], game['blue_choice'] = game['blue_choice'], game['red_choice']
+        game.red_player, game.blue_player = game.blue_player, game.red_player
+        game.red_choice, game.blue_choice = game.blue_choice, game.red_choice
 
     return is_red_first
 
 
 def get_flip_army_chess_current_player_sid(game):
     """获取当前轮到的玩家sid"""
-    return game['red_player'] if game['current_player'] == 1 else game['blue_player']
+    return game.red_player if game.current_player == 1 else game.blue_player
 
 
 def get_flip_army_chess_opponent_sid(game, sid):
     """获取对手的sid"""
-    return game['blue_player'] if sid == game['red_player'] else game['red_player']
+    return game.blue_player if sid == game.red_player else game.red_player
 
 
 def handle_flip_army_chess_disconnect(game, sid):
     """处理翻子军棋玩家断开连接，返回对手sid列表"""
-    if game['red_player'] == sid or game['blue_player'] == sid:
+    if game.red_player == sid or game.blue_player == sid:
         opponent = get_flip_army_chess_opponent_sid(game, sid)
         return [opponent] if opponent else []
     return []
@@ -96,9 +106,9 @@ def handle_flip_army_chess_disconnect(game, sid):
 
 def handle_flip_army_chess_surrender(game, sid):
     """处理翻子军棋认输，返回(赢家编号, 赢家sid, 输家sid)"""
-    winner = 2 if sid == game['red_player'] else 1
-    winner_sid = game['red_player'] if winner == 1 else game['blue_player']
-    loser_sid = game['blue_player'] if winner == 1 else game['red_player']
+    winner = 2 if sid == game.red_player else 1
+    winner_sid = game.red_player if winner == 1 else game.blue_player
+    loser_sid = game.blue_player if winner == 1 else game.red_player
     return winner, winner_sid, loser_sid
 
 
@@ -176,7 +186,7 @@ def initialize_flip_army_chess_pieces(game):
     - 军旗1枚
     
     布局：
-    - 所有棋子初始都是盖住的（flipped=False）
+    - 所有棋子初始都是盖住的（没有 FLIPPED 位）
     - 随机分布在50个可用位置上（除去10个行营位置）
     - 每个位置有棋子时会显示为橙色背景和'?'符号
     """
@@ -195,157 +205,24 @@ def initialize_flip_army_chess_pieces(game):
         ['军旗'] * 1
     )
 
-    # 行营位置（不能放棋子，共10个）
-    camps = {
-        '2_1', '2_3', '3_2', '4_1', '4_3',  # 上半区5个
-        '7_1', '7_3', '8_2', '9_1', '9_3',  # 下半区5个
-    }
-
-    # 收集所有可用位置（50个）
-    available_positions = []
-    for row in range(12):
-        for col in range(5):
-            key = f"{row}_{col}"
-            if key not in camps:
-                available_positions.append((row, col))
+    # 收集所有可用位置（50个，除去10个行营位置）
+    available_positions = [square for square in range(ROWS * COLS) if square not in CAMPS]
 
     # 验证棋子数量与位置数量
     total_pieces = len(piece_types) * 2  # 50枚
     if total_pieces != len(available_positions):
-        print(f"警告: 棋子数量({total_pieces})与可用位置数量({len(available_positions)})不匹配")
+        logger.warning("棋子数量(%d)与可用位置数量(%d)不匹配", total_pieces, len(available_positions))
 
     # 分别创建红蓝双方的棋子
-    red_pieces = [{'type': p, 'color': 'red'} for p in piece_types]
-    blue_pieces = [{'type': p, 'color': 'blue'} for p in piece_types]
-    all_pieces = red_pieces + blue_pieces
+    all_pieces = [color_bit | PIECE_CODES[p] for color_bit in (RED, BLUE) for p in piece_types]
 
     # 打乱所有棋子的顺序
     random.shuffle(all_pieces)
 
-    # 初始化游戏数据
-    game['pieces'] = {}        # 存储所有棋子信息
-    game['board'] = [[None]*5 for _ in range(12)]  # 初始化棋盘
-    game['flipped_pieces'] = set()  # 记录已翻开的棋子位置
-
     # 将棋子放置到棋盘上（都是盖住状态）
-    for idx, pos in enumerate(available_positions):
-        if idx < len(all_pieces):
-            piece = all_pieces[idx]
-            row, col = pos
-            key = f"{row}_{col}"
-            game['pieces'][key] = piece
-            game['board'][row][col] = {
-                'color': piece['color'],
-                'flipped': False  # 初始都是盖住的
-            }
-
-
-def _check_sapper_railway_path(from_row, from_col, to_row, to_col,
-                                railways, railway_horizontal, railway_vertical,
-                                pieces_dict, opponent_pieces, from_key):
-    """检查工兵是否可以通过铁路网络从起点到达终点（允许拐弯）"""
-    from collections import deque
-
-    start_key = f"{from_row}_{from_col}"
-    end_key = f"{to_row}_{to_col}"
-    if start_key not in railways or end_key not in railways:
-        return False
-
-    queue = deque([(from_row, from_col)])
-    visited = {start_key}
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-
-    while queue:
-        cur_row, cur_col = queue.popleft()
-
-        if cur_row == to_row and cur_col == to_col:
-            return True
-
-        for dr, dc in directions:
-            new_row = cur_row + dr
-            new_col = cur_col + dc
-            new_key = f"{new_row}_{new_col}"
-
-            if not (0 <= new_row < 12 and 0 <= new_col < 5):
-                continue
-
-            if new_key not in railways:
-                continue
-
-            if new_key in visited:
-                continue
-
-            if new_key != end_key:
-                if new_key in opponent_pieces or new_key in pieces_dict:
-                    continue
-
-            if dr == 0:
-                check_row = cur_row
-                if f"{check_row}_{new_col}" not in railway_horizontal and f"{new_row}_{new_col}" not in railway_horizontal:
-                    continue
-            elif dc == 0:
-                check_col = cur_col
-                if f"{new_row}_{check_col}" not in railway_vertical and f"{new_row}_{new_col}" not in railway_vertical:
-                    continue
-
-            visited.add(new_key)
-            queue.append((new_row, new_col))
-
-    return False
-
-
-def get_sapper_railway_path(from_row, from_col, to_row, to_col,
-                            railways, railway_horizontal, railway_vertical,
-                            pieces_dict, opponent_pieces):
-    """获取工兵在铁路上的完整路径（用于显示）"""
-    from collections import deque
-
-    start_key = f"{from_row}_{from_col}"
-    end_key = f"{to_row}_{to_col}"
-    if start_key not in railways or end_key not in railways:
-        return []
-
-    queue = deque([(from_row, from_col, [(from_row, from_col)])])
-    visited = {start_key}
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-
-    while queue:
-        cur_row, cur_col, path = queue.popleft()
-
-        if cur_row == to_row and cur_col == to_col:
-            return path
-
-        for dr, dc in directions:
-            new_row = cur_row + dr
-            new_col = cur_col + dc
-            new_key = f"{new_row}_{new_col}"
-
-            if not (0 <= new_row < 12 and 0 <= new_col < 5):
-                continue
-
-            if new_key not in railways:
-                continue
-
-            if new_key in visited:
-                continue
-
-            if new_key != end_key:
-                if new_key in opponent_pieces or new_key in pieces_dict:
-                    continue
-
-            if dr == 0:
-                check_row = cur_row
-                if f"{check_row}_{new_col}" not in railway_horizontal and f"{new_row}_{new_col}" not in railway_horizontal:
-                    continue
-            elif dc == 0:
-                check_col = cur_col
-                if f"{new_row}_{check_col}" not in railway_vertical and f"{new_row}_{new_col}" not in railway_vertical:
-                    continue
-
-            visited.add(new_key)
-            queue.append((new_row, new_col, path + [(new_row, new_col)]))
-
-    return []
+    game.board = bytearray(ROWS * COLS)
+    for square, piece in zip(available_positions, all_pieces):
+        game.board[square] = piece
 
 
 def handle_flip_army_chess_move(game, room_id, sid, data):
@@ -361,8 +238,6 @@ def handle_flip_army_chess_move(game, room_id, sid, data):
        - 可以移动到空位或攻击敌方已翻开的棋子
        - 大本营中的棋子可以移动（与布阵军棋不同）
     """
-    from flask_socketio import emit
-
     from_row = data.get('from_row')
     from_col = data.get('from_col')
     to_row = data.get('to_row')
@@ -370,231 +245,182 @@ def handle_flip_army_chess_move(game, room_id, sid, data):
     action = data.get('action', 'move')
 
     # 检查游戏是否已结束
-    if game['game_over']:
-        emit('error', {'message': '游戏已结束'})
+    if game.game_over:
+        transport.emit('error', {'message': '游戏已结束'}, to=sid)
         return
 
     # 检查是否轮到该玩家
-    current_sid = game['red_player'] if game['current_player'] == 1 else game['blue_player']
+    current_sid = game.red_player if game.current_player == 1 else game.blue_player
     if sid != current_sid:
-        emit('error', {'message': '不是你的回合'})
+        transport.emit('error', {'message': '不是你的回合'}, to=sid)
         return
 
     # 获取当前玩家的颜色
-    current_color = 'red' if game['current_player'] == 1 else 'blue'
+    current_color = 'red' if game.current_player == 1 else 'blue'
+
+    board = game.board
 
     # 处理翻棋操作
     if action == 'flip':
         flip_row = from_row
         flip_col = from_col
-        flip_key = f"{flip_row}_{flip_col}"
 
         # 验证位置是否在有效范围内
-        if not (0 <= flip_row < 12 and 0 <= flip_col < 5):
-            emit('error', {'message': '位置超出范围'})
+        if not (0 <= flip_row < ROWS and 0 <= flip_col < COLS):
+            transport.emit('error', {'message': '位置超出范围'}, to=sid)
             return
 
         # 检查该位置是否有棋子
-        if flip_key not in game['pieces']:
-            emit('error', {'message': '该位置没有棋子'})
+        flip_square = flip_row * COLS + flip_col
+        piece = board[flip_square]
+        if not piece:
+            transport.emit('error', {'message': '该位置没有棋子'}, to=sid)
             return
 
         # 检查该棋子是否已经翻开
-        if flip_key in game['flipped_pieces']:
-            emit('error', {'message': '该棋子已经翻开'})
+        if piece & FLIPPED:
+            transport.emit('error', {'message': '该棋子已经翻开'}, to=sid)
             return
 
         # 获取棋子信息
-        piece = game['pieces'][flip_key]
-        piece_color = piece['color']
-        piece_type = piece['type']
+        piece_color = piece_color_name(piece)
+        piece_type = piece_type_name(piece)
 
         # 更新棋子状态为已翻开
-        game['flipped_pieces'].add(flip_key)
-        game['board'][flip_row][flip_col] = {
-            'color': piece_color,
-            'flipped': True,
-            'type': piece_type
-        }
+        move = journal.record_move(game, {
+            'player': current_color,
+            'action': 'flip',
+            'row': flip_row,
+            'col': flip_col,
+            'piece_type': piece_type,
+            'piece_color': piece_color
+        })
+        move.set_square(flip_square, piece | FLIPPED)
 
         # 记录翻棋日志
         color_name = '红方' if piece_color == 'red' else '蓝方'
-        print(f"[翻子军棋翻棋] 位置 ({flip_row},{flip_col}) 翻开 {color_name}{piece_type}")
+        logger.info("[翻子军棋翻棋] 位置 (%s,%s) 翻开 %s%s", flip_row, flip_col, color_name, piece_type)
 
         # 广播翻棋结果（双方都能看到翻开的棋子类型和颜色）
-        socketio.emit('flip_result', {
+        transport.emit('flip_result', {
             'row': flip_row,
             'col': flip_col,
             'color': piece_color,
             'type': piece_type,
-            'current_player': 3 - game['current_player']
+            'current_player': 3 - game.current_player
         }, to=room_id)
 
         # 切换玩家
-        game['current_player'] = 3 - game['current_player']
+        move.set_field('current_player', 3 - game.current_player)
         return
 
     # 处理移动操作
     if action == 'move':
         # 验证移动位置是否在有效范围内
-        if not (0 <= from_row < 12 and 0 <= from_col < 5 and
-                0 <= to_row < 12 and 0 <= to_col < 5):
-            emit('error', {'message': '位置超出范围'})
+        if not (0 <= from_row < ROWS and 0 <= from_col < COLS and
+                0 <= to_row < ROWS and 0 <= to_col < COLS):
+            transport.emit('error', {'message': '位置超出范围'}, to=sid)
             return
 
-        from_key = f"{from_row}_{from_col}"
-        to_key = f"{to_row}_{to_col}"
+        from_square = from_row * COLS + from_col
+        to_square = to_row * COLS + to_col
+        own_bit = COLOR_BITS[current_color]
 
         # 检查起点是否有棋子
-        if from_key not in game['pieces']:
-            emit('error', {'message': '起点没有棋子'})
+        piece = board[from_square]
+        if not piece:
+            transport.emit('error', {'message': '起点没有棋子'}, to=sid)
             return
 
         # 检查起点棋子是否已翻开
-        if from_key not in game['flipped_pieces']:
-            emit('error', {'message': '该棋子还未翻开，不能移动'})
+        if not piece & FLIPPED:
+            transport.emit('error', {'message': '该棋子还未翻开，不能移动'}, to=sid)
             return
 
         # 检查是否是自己的棋子
-        piece = game['pieces'][from_key]
-        if piece['color'] != current_color:
-            emit('error', {'message': '这不是你的棋子'})
+        if not piece & own_bit:
+            transport.emit('error', {'message': '这不是你的棋子'}, to=sid)
             return
 
         # 获取棋子类型
-        piece_type = piece['type']
+        piece_type = piece_type_name(piece)
 
         # 地雷和军旗不能移动
         if piece_type in ['地雷', '军旗']:
-            emit('error', {'message': f'{piece_type}不能移动'})
+            transport.emit('error', {'message': f'{piece_type}不能移动'}, to=sid)
             return
 
         # 如果终点有己方棋子，直接返回错误
-        if to_key in game['pieces'] and game['pieces'][to_key]['color'] == current_color:
-            emit('error', {'message': '不能移动到自己的棋子位置'})
+        target_piece = board[to_square]
+        if target_piece & own_bit:
+            transport.emit('error', {'message': '不能移动到自己的棋子位置'}, to=sid)
             return
 
-        # 行营和大本营位置定义
-        camps = {
-            '2_1', '2_3', '3_2', '4_1', '4_3',
-            '7_1', '7_3', '8_2', '9_1', '9_3',
-        }
-
-        # 铁路位置定义（横向和纵向）
-        railway_horizontal = {
-            '1_0', '1_1', '1_2', '1_3', '1_4',
-            '5_0', '5_1', '5_2', '5_3', '5_4',
-            '6_0', '6_1', '6_2', '6_3', '6_4',
-            '10_0', '10_1', '10_2', '10_3', '10_4',
-        }
-        railway_vertical = {
-            '1_0', '2_0', '3_0', '4_0', '5_0', '6_0', '7_0', '8_0', '9_0', '10_0',
-            '1_4', '2_4', '3_4', '4_4', '5_4', '6_4', '7_4', '8_4', '9_4', '10_4',
-            '5_2', '6_2',
-        }
-        railways = railway_horizontal | railway_vertical
-
         # 计算移动距离
         dr = abs(to_row - from_row)
         dc = abs(to_col - from_col)
 
-        # 检查起点和终点是否在行营中
-        is_from_camp = from_key in camps
-        is_to_camp = to_key in camps
+        # 检查终点是否在行营中
+        is_to_camp = to_square in CAMPS
 
         # 移动规则验证
         # 支持：普通移动、铁路移动、斜向移动
         # 限制：大本营中的棋子可以移动（与布阵军棋不同）
         valid_move = False
 
-        opponent_color = 'blue' if current_color == 'red' else 'red'
-        opponent_pieces = {k: v for k, v in game['pieces'].items() if v['color'] == opponent_color and k in game['flipped_pieces']}
-        my_pieces = {k: v for k, v in game['pieces'].items() if v['color'] == current_color and k in game['flipped_pieces']}
+        # 铁路上只有已翻开的棋子阻挡移动
+        flipped = bytes(p & FLIPPED for p in board)
 
-        is_from_railway = from_key in railways
-        is_to_railway = to_key in railways
+        is_from_railway = from_square in RAILWAYS
+        is_to_railway = to_square in RAILWAYS
         is_sapper = piece_type == '工兵'
 
         if is_from_railway and is_to_railway:
             if is_sapper:
-                valid_move = _check_sapper_railway_path(from_row, from_col, to_row, to_col,
-                                                        railways, railway_horizontal, railway_vertical,
-                                                        my_pieces, opponent_pieces, from_key)
+                valid_move = _check_sapper_railway_path(flipped, from_row, from_col, to_row, to_col)
             else:
-                if from_row == to_row:
-                    min_col = min(from_col, to_col)
-                    max_col = max(from_col, to_col)
-                    path_clear = True
-                    path_blocked = False
-                    for c in range(min_col, max_col + 1):
-                        key = f"{from_row}_{c}"
-                        if key not in railway_horizontal:
-                            path_clear = False
-                            break
-                        if c != from_col and c != to_col:
-                            if key in opponent_pieces or key in my_pieces:
-                                path_blocked = True
-                                break
-                    if path_clear and not path_blocked:
-                        valid_move = True
-                elif from_col == to_col:
-                    min_row = min(from_row, to_row)
-                    max_row = max(from_row, to_row)
-                    path_clear = True
-                    path_blocked = False
-                    for r in range(min_row, max_row + 1):
-                        key = f"{r}_{from_col}"
-                        if key not in railway_vertical:
-                            path_clear = False
-                            break
-                        if r != from_row and r != to_row:
-                            if key in opponent_pieces or key in my_pieces:
-                                path_blocked = True
-                                break
-                    if path_clear and not path_blocked:
-                        valid_move = True
+                valid_move = _check_straight_railway_path(flipped, from_row, from_col, to_row, to_col)
 
         if not valid_move:
             if (dr == 1 and dc == 0) or (dr == 0 and dc == 1):
                 valid_move = True
-            else:
-                is_diagonal_adjacent_to_camp = False
-                if is_to_camp or (is_from_camp and not is_to_camp):
-                    for row_offset in [-1, 1]:
-                        for col_offset in [-1, 1]:
-                            adj_row = from_row + row_offset
-                            adj_col = from_col + col_offset
-                            adj_key = f"{adj_row}_{adj_col}"
-                            if adj_key in camps and adj_row == to_row and adj_col == to_col:
-                                is_diagonal_adjacent_to_camp = True
-                                break
-                if is_diagonal_adjacent_to_camp:
-                    valid_move = True
+            elif dr == 1 and dc == 1 and is_to_camp:
+                # 斜向移动只能进入相邻的行营
+                valid_move = True
 
         if not valid_move:
-            emit('error', {'message': '不合法的移动'})
+            transport.emit('error', {'message': '不合法的移动'}, to=sid)
             return
 
-        if to_key not in game['pieces']:
-            game['pieces'][to_key] = game['pieces'].pop(from_key)
-            game['board'][to_row][to_col] = game['board'][from_row][from_col]
-            game['board'][from_row][from_col] = None
-
+        if not target_piece:
             move_path = []
             is_sapper_move = False
-            if piece_type == '工兵' and (from_key in railways and to_key in railways):
+            if is_sapper and is_from_railway and is_to_railway:
                 if not (dr == 1 and dc == 0) and not (dr == 0 and dc == 1):
-                    path = get_sapper_railway_path(from_row, from_col, to_row, to_col,
-                                                    railways, railway_horizontal, railway_vertical,
-                                                    my_pieces, opponent_pieces)
+                    path = get_sapper_railway_path(flipped, from_row, from_col, to_row, to_col)
                     if path:
                         move_path = path
                         is_sapper_move = True
 
+            move = journal.record_move(game, {
+                'player': current_color,
+                'action': 'move',
+                'from_row': from_row,
+                'from_col': from_col,
+                'to_row': to_row,
+                'to_col': to_col,
+                'piece_type': piece_type,
+                'is_attack': False,
+                'is_sapper_railway': is_sapper_move,
+                'path': move_path
+            })
+            move.set_square(to_square, piece)
+            move.set_square(from_square, 0)
+
             color_name = '红方' if current_color == 'red' else '蓝方'
-            print(f"[翻子军棋移动] {color_name}{piece_type} 从 ({from_row},{from_col}) 移动到 ({to_row},{to_col})")
+            logger.info("[翻子军棋移动] %s%s 从 (%s,%s) 移动到 (%s,%s)", color_name, piece_type, from_row, from_col, to_row, to_col)
 
-            socketio.emit('move_made', {
+            transport.emit('move_made', {
                 'player': current_color,
                 'from_row': from_row,
                 'from_col': from_col,
@@ -602,160 +428,110 @@ def handle_flip_army_chess_move(game, room_id, sid, data):
                 'to_col': to_col,
                 'is_sapper_railway': is_sapper_move,
                 'path': move_path,
-                'current_player': 3 - game['current_player']
+                'current_player': 3 - game.current_player
             }, to=room_id)
 
-            game['current_player'] = 3 - game['current_player']
+            move.set_field('current_player', 3 - game.current_player)
             return
 
         # 处理攻击敌方棋子的情况（终点位置有敌方棋子且已翻开）
-        elif to_key in opponent_pieces:
-            if to_key in camps:
-                emit('error', {'message': '不能攻击行营中的棋子'})
-                return
+        if not target_piece & FLIPPED:
+            return
 
-            target_piece = opponent_pieces[to_key]
+        if is_to_camp:
+            transport.emit('error', {'message': '不能攻击行营中的棋子'}, to=sid)
+            return
 
-            if to_key not in game['flipped_pieces']:
-                emit('error', {'message': '不能攻击未翻开的棋子'})
-                return
+        target_type = piece_type_name(target_piece)
+
+        battle_result = resolve_army_chess_battle(piece_type, target_type)
+
+        attacker_color_name = '红方' if current_color == 'red' else '蓝方'
+        defender_color_name = '蓝方' if current_color == 'red' else '红方'
+        own_lost = 'red_lost' if current_color == 'red' else 'blue_lost'
+        opponent_lost = 'blue_lost' if current_color == 'red' else 'red_lost'
+
+        move = journal.record_move(game, {
+            'player': current_color,
+            'action': 'move',
+            'from_row': from_row,
+            'from_col': from_col,
+            'to_row': to_row,
+            'to_col': to_col,
+            'piece_type': piece_type,
+            'is_attack': True,
+            'target_type': target_type,
+            'battle_result': battle_result
+        })
 
-            target_type = target_piece['type']
-
-            battle_result = resolve_army_chess_battle(piece_type, target_type)
-
-            attacker_color_name = '红方' if current_color == 'red' else '蓝方'
-            defender_color_name = '蓝方' if current_color == 'red' else '红方'
-
-            if battle_result == 'attacker_win':
-                print(f"[翻子军棋战斗] {attacker_color_name}{piece_type} 攻击 {defender_color_name}{target_type} -> {attacker_color_name}获胜")
-                del game['pieces'][to_key]
-                game['flipped_pieces'].discard(to_key)
-                game['pieces'][to_key] = game['pieces'].pop(from_key)
-                game['board'][to_row][to_col] = game['board'][from_row][from_col]
-                game['board'][from_row][from_col] = None
-
-                lost_key = 'red_lost' if current_color == 'blue' else 'blue_lost'
-                game[lost_key].append(target_type)
-
-                if target_type == '军旗':
-                    game['game_over'] = True
-                    game['winner'] = game['current_player']
-                    winner_name = '红方' if game['current_player'] == 1 else '蓝方'
-                    socketio.emit('game_over', {
-                        'winner': game['current_player'],
-                        'message': f'{winner_name}夺取军旗获胜！'
-                    }, to=room_id)
-                    return
-
-                socketio.emit('battle_result', {
-                    'result': 'attacker_win',
-                    'player': current_color,
-                    'from_row': from_row,
-                    'from_col': from_col,
-                    'to_row': to_row,
-                    'to_col': to_col,
-                    'attack_row': from_row,
-                    'attack_col': from_col,
-                    'defend_row': to_row,
-                    'defend_col': to_col,
-                    'current_player': 3 - game['current_player']
-                }, to=room_id)
+        if battle_result == 'attacker_win':
+            logger.info("[翻子军棋战斗] %s%s 攻击 %s%s -> %s获胜", attacker_color_name, piece_type, defender_color_name, target_type, attacker_color_name)
+            move.set_square(to_square, piece)
+            move.set_square(from_square, 0)
 
-                if game['red_player']:
-                    socketio.emit('lost_pieces', {
-                        'pieces': game['red_lost']
-                    }, to=game['red_player'])
-                if game['blue_player']:
-                    socketio.emit('lost_pieces', {
-                        'pieces': game['blue_lost']
-                    }, to=game['blue_player'])
-
-            elif battle_result == 'defender_win':
-                print(f"[翻子军棋战斗] {attacker_color_name}{piece_type} 攻击 {defender_color_name}{target_type} -> {defender_color_name}获胜")
-                del game['pieces'][from_key]
-                game['flipped_pieces'].discard(from_key)
-                game['board'][from_row][from_col] = None
-
-                lost_key = 'red_lost' if current_color == 'red' else 'blue_lost'
-                game[lost_key].append(piece_type)
-
-                socketio.emit('battle_result', {
-                    'result': 'defender_win',
-                    'player': current_color,
-                    'from_row': from_row,
-                    'from_col': from_col,
-                    'to_row': to_row,
-                    'to_col': to_col,
-                    'attack_row': from_row,
-                    'attack_col': from_col,
-                    'defend_row': to_row,
-                    'defend_col': to_col,
-                    'current_player': 3 - game['current_player']
+            move.set_field(opponent_lost, game[opponent_lost] + [target_type])
+
+            if target_type == '军旗':
+                move.set_field('game_over', True)
+                move.set_field('winner', game.current_player)
+                winner_name = '红方' if game.current_player == 1 else '蓝方'
+                transport.emit('game_over', {
+                    'winner': game.current_player,
+                    'message': f'{winner_name}夺取军旗获胜！'
                 }, to=room_id)
+                return
 
-                if game['red_player']:
-                    socketio.emit('lost_pieces', {
-                        'pieces': game['red_lost']
-                    }, to=game['red_player'])
-                if game['blue_player']:
-                    socketio.emit('lost_pieces', {
-                        'pieces': game['blue_lost']
-                    }, to=game['blue_player'])
+        elif battle_result == 'defender_win':
+            logger.info("[翻子军棋战斗] %s%s 攻击 %s%s -> %s获胜", attacker_color_name, piece_type, defender_color_name, target_type, defender_color_name)
+            move.set_square(from_square, 0)
 
-            else:
-                print(f"[翻子军棋战斗] {attacker_color_name}{piece_type} 攻击 {defender_color_name}{target_type} -> 同归于尽")
-                del game['pieces'][from_key]
-                del game['pieces'][to_key]
-                game['flipped_pieces'].discard(from_key)
-                game['flipped_pieces'].discard(to_key)
-                game['board'][from_row][from_col] = None
-                game['board'][to_row][to_col] = None
-
-                lost_key = 'red_lost' if current_color == 'red' else 'blue_lost'
-                opponent_lost_key = 'blue_lost' if current_color == 'red' else 'red_lost'
-                game[lost_key].append(piece_type)
-                game[opponent_lost_key].append(target_type)
-
-                socketio.emit('battle_result', {
-                    'result': 'both_die',
-                    'player': current_color,
-                    'from_row': from_row,
-                    'from_col': from_col,
-                    'to_row': to_row,
-                    'to_col': to_col,
-                    'attack_row': from_row,
-                    'attack_col': from_col,
-                    'defend_row': to_row,
-                    'defend_col': to_col,
-                    'current_player': 3 - game['current_player']
-                }, to=room_id)
+            move.set_field(own_lost, game[own_lost] + [piece_type])
+
+        else:
+            logger.info("[翻子军棋战斗] %s%s 攻击 %s%s -> 同归于尽", attacker_color_name, piece_type, defender_color_name, target_type)
+            move.set_square(from_square, 0)
+            move.set_square(to_square, 0)
+
+            move.set_field(own_lost, game[own_lost] + [piece_type])
+            move.set_field(opponent_lost, game[opponent_lost] + [target_type])
+
+        transport.emit('battle_result', {
+            'result': battle_result,
+            'player': current_color,
+            'from_row': from_row,
+            'from_col': from_col,
+            'to_row': to_row,
+            'to_col': to_col,
+            'attack_row': from_row,
+            'attack_col': from_col,
+            'defend_row': to_row,
+            'defend_col': to_col,
+            'current_player': 3 - game.current_player
+        }, to=room_id)
 
-                if game['red_player']:
-                    socketio.emit('lost_pieces', {
-                        'pieces': game['red_lost']
-                    }, to=game['red_player'])
-                if game['blue_player']:
-                    socketio.emit('lost_pieces', {
-                        'pieces': game['blue_lost']
-                    }, to=game['blue_player'])
+        if game.red_player:
+            transport.emit('lost_pieces', {
+                'pieces': game.red_lost
+            }, to=game.red_player)
+        if game.blue_player:
+            transport.emit('lost_pieces', {
+                'pieces': game.blue_lost
+            }, to=game.blue_player)
 
-            game['current_player'] = 3 - game['current_player']
+        move.set_field('current_player', 3 - game.current_player)
 
 
 def reset_flip_army_chess_game(game):
     """重置翻子军棋游戏"""
-    game['board'] = [[None]*5 for _ in range(12)]
-    game['current_player'] = 1
-    game['game_over'] = False
-    game['winner'] = None
-    game['moves'] = []
-    game['red_choice'] = None
-    game['blue_choice'] = None
-    game['red_lost'] = []
-    game['blue_lost'] = []
-    game['pieces'] = {}
-    game['flipped_pieces'] = set()
+    game.board = bytearray(ROWS * COLS)
+    game.current_player = 1
+    game.game_over = False
+    game.winner = None
+    game.moves = []
+    game.red_choice = None
+    game.blue_choice = None
+    game.red_lost = []
+    game.blue_lost = []
 
 
 def handle_flip_army_chess_game_start(game):
@@ -763,27 +539,76 @@ def handle_flip_army_chess_game_start(game):
     determine_flip_army_chess_first_player(game)
     initialize_flip_army_chess_pieces(game)
     
-    all_piece_positions = []
-    for key in game['pieces']:
-        row = int(key.split('_')[0])
-        col = int(key.split('_')[1])
-        all_piece_positions.append({
-            'row': row,
-            'col': col,
-            'flipped': False
-        })
+    squares = [square for square, piece in enumerate(game.board) if piece]
+    all_piece_positions = transport.compact([
+        {'row': square // COLS, 'col': square % COLS, 'flipped': False}
+        for square in squares
+    ], bytes(squares))
     
-    socketio.emit('game_start', {
+    transport.emit_each('game_start', {
         'message': '游戏开始！',
         'first_player': 'red',
-        'player_color': 'red',
         'current_player': 1,
         'pieces': all_piece_positions
-    }, to=game['red_player'])
-    socketio.emit('game_start', {
-        'message': '游戏开始！',
-        'first_player': 'red',
-        'player_color': 'blue',
-        'current_player': 1,
-        'pieces': all_piece_positions
-    }, to=game['blue_player'])
+    }, [
+        (game.red_player, {'player_color': 'red'}),
+        (game.blue_player, {'player_color': 'blue'}),
+    ])
+
+
+def get_flip_army_chess_public_snapshot(game):
+    """观战快照：盖住的棋子只有位置，翻开的棋子含颜色和类型"""
+    covered = []
+    flipped = []
+    for square, piece in enumerate(game.board):
+        if not piece:
+            continue
+        if piece & FLIPPED:
+            flipped.append({
+                'row': square // COLS, 'col': square % COLS,
+                'color': piece_color_name(piece), 'type': piece_type_name(piece),
+            })
+        else:
+            covered.append(square)
+    return {
+        'pieces': transport.compact([
+            {'row': square // COLS, 'col': square % COLS, 'flipped': False}
+            for square in covered
+        ], bytes(covered)),
+        'flipped_pieces': flipped,
+    }
+
+
+def get_flip_army_chess_snapshot(game, sid):
+    """断线重连后发给玩家的局面快照：公开的局面加上自己的阵亡棋子"""
+    color = 'red' if sid == game.red_player else 'blue'
+    return {
+        'player_color': color,
+        'choice': game[f'{color}_choice'],
+        'lost_pieces': game[f'{color}_lost'],
+        **get_flip_army_chess_public_snapshot(game),
+    }
+
+
+register_game_module(GameModule(
+    game_type='flip_army_chess',
+    display_name='翻子军棋',
+    initialize=initialize_flip_army_chess_game,
+    creator_seat='red_player',
+    creator_color='red',
+    seats=('red_player', 'blue_player'),
+    assign_player=assign_flip_army_chess_player,
+    record_choice=record_flip_army_chess_choice,
+    should_start=should_start_flip_army_chess,
+    begin_game=handle_flip_army_chess_game_start,
+    move=handle_flip_army_chess_move,
+    reset=reset_flip_army_chess_game,
+    broadcast_game_over=True,
+    surrender=handle_flip_army_chess_surrender,
+    winner_name=get_flip_army_chess_winner_name,
+    current_player_sid=get_flip_army_chess_current_player_sid,
+    opponent_sid=get_flip_army_chess_opponent_sid,
+    disconnect=handle_flip_army_chess_disconnect,
+    snapshot=get_flip_army_chess_snapshot,
+    spectate=get_flip_army_chess_public_snapshot,
+))
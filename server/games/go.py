@@ -2,201 +2,554 @@
 围棋游戏逻辑
 """
 
-# 全局变量，由主程序设置
-socketio = None
-games = None
+import time
+
+from . import go_estimate, journal, transport, zobrist
+from .go_groups import build_groups
+from .registry import GameModule, register_game_module
+from .state import GameState, board_rows
+
+# 棋盘大小（建房时 create_room 的 board_size）；棋盘为一维 bytearray，下标 row * size + col，0 空 / 1 黑 / 2 白
+BOARD_SIZES = (9, 13, 19)
+DEFAULT_BOARD_SIZE = 19
+
+# 交叉点所在的边线（GoGeometry.edges 中的位）
+EDGE_TOP = 1
+EDGE_RIGHT = 2
+EDGE_BOTTOM = 4
+EDGE_LEFT = 8
+
+
+class GoGeometry:
+    """一种棋盘大小的几何数据：边线、相邻点和 Zobrist 键表，模块加载时每种大小建一份，同样大小的房间共用"""
+
+    __slots__ = ('size', 'points', 'edges', 'neighbors', 'zobrist', 'side_to_move_key')
+
+    def __init__(self, size):
+        self.size = size
+        self.points = size * size
+        self.edges = bytes(
+            (EDGE_TOP if row == 0 else 0) | (EDGE_RIGHT if col == size - 1 else 0)
+            | (EDGE_BOTTOM if row == size - 1 else 0) | (EDGE_LEFT if col == 0 else 0)
+            for row in range(size) for col in range(size)
+        )
+        # 每个交叉点的相邻点下标（右、下、左、上中不在边线外的）
+        self.neighbors = tuple(
+            tuple(neighbor for neighbor, edge in (
+                (point + 1, EDGE_RIGHT), (point + size, EDGE_BOTTOM), (point - 1, EDGE_LEFT), (point - size, EDGE_TOP),
+            ) if not self.edges[point] & edge)
+            for point in range(self.points)
+        )
+        # 19 路沿用原来的键表名，局面哈希与之前一致
+        self.zobrist = zobrist.ZobristTable('go' if size == 19 else f'go{size}', self.points, (1, 2),
+                                            {'current_player': (1, 2)})
+        # 轮到黑 / 白两个键的异或：局面哈希异或它即为同一棋盘轮到另一方时的哈希
+        self.side_to_move_key = self.zobrist.field_key('current_player', 1) ^ self.zobrist.field_key('current_player', 2)
+
+    def __reduce__(self):
+        # 房间状态序列化（pickle）时只保存棋盘大小，载入时取回共用的几何数据
+        return get_go_geometry, (self.size,)
+
+
+def get_go_geometry(size):
+    return GEOMETRIES[size]
+
+
+GEOMETRIES = {size: GoGeometry(size) for size in BOARD_SIZES}
+
+# 打劫规则（建房时 create_room 的 ko_rule）：
+# simple 只禁止立即提回劫；positional 禁止重复之前出现过的棋盘（不论轮到谁）；
+# situational 禁止重复之前出现过的 棋盘 + 轮到的一方
+KO_RULES = ('simple', 'positional', 'situational')
+DEFAULT_KO_RULE = 'positional'
+
+# 计分规则（建房时 create_room 的 scoring / komi）：
+# area 数子（中国规则）：活子 + 围住的空点；territory 数目（日本规则）：围住的空点 + 提子 + 死子
+SCORING_RULES = ('area', 'territory')
+DEFAULT_SCORING_RULE = 'area'
+DEFAULT_KOMI = {'area': 7.5, 'territory': 6.5}
+MAX_KOMI = 150
+# 点目结果缓存：(棋盘大小, 局面哈希, 死子哈希) -> 归属与计数，所有房间共用
+SCORE_CACHE_SIZE = 1024
+_score_cache = {}
+
+
+class GoState(GameState):
+    """围棋房间状态"""
+    # geometry：棋盘大小对应的 GoGeometry
+    # groups：棋盘上的棋块（games.go_groups.GoGroups），为 None 时下一步棋前从棋盘重建
+    # passes：连续停一手的次数，达到 2 时进入点目阶段；prisoners：(黑方提子数, 白方提子数)
+    # dead_stones：点目阶段标记的死子下标；score_accepted：已确认点目结果的玩家编号
+    # estimate：是否在每步棋后发送形势估计；estimate_at：上次发送的时间（time.monotonic()）
+    __slots__ = (
+        'black_player', 'white_player', 'black_choice', 'white_choice', 'board', 'geometry', 'groups',
+        'ko_rule', 'scoring', 'komi', 'passes', 'prisoners', 'dead_stones', 'score_accepted',
+        'estimate', 'estimate_at',
+    )
+
+    @property
+    def zobrist(self):
+        return self.geometry.zobrist
 
 
 def initialize_go_game(sid):
     """初始化围棋游戏数据"""
-    return {
-        'game_type': 'go',
-        'black_player': None,
-        'white_player': None,
-        'black_choice': None,
-        'white_choice': None,
-        'board': [[0]*19 for _ in range(19)],
-        'current_player': 1,
-        'game_over': False,
-        'winner': None,
-        'moves': [],
-        'undo_requested': False,
-        'last_undo_player': None
-    }
-
-
-def get_go_liberties(board, row, col, player, visited=None):
-    """获取围棋棋子的气（自由度）"""
-    if visited is None:
-        visited = set()
-    
-    if (row, col) in visited:
-        return set(), set()
-    
-    visited.add((row, col))
-    
-    if not (0 <= row < 19 and 0 <= col < 19):
-        return set(), visited
-    
-    if board[row][col] == 0:
-        return {(row, col)}, visited
-    
-    if board[row][col] != player:
-        return set(), visited
-    
-    liberties = set()
-    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-    
-    for dr, dc in directions:
-        new_row, new_col = row + dr, col + dc
-        if 0 <= new_row < 19 and 0 <= new_col < 19:
-            if board[new_row][new_col] == 0:
-                liberties.add((new_row, new_col))
-            elif board[new_row][new_col] == player and (new_row, new_col) not in visited:
-                group_liberties, visited = get_go_liberties(board, new_row, new_col, player, visited)
-                liberties.update(group_liberties)
-    
-    return liberties, visited
-
-
-def capture_dead_groups(board, player):
-    """提取死子（没有气的棋子组）"""
-    captured = []
-    checked = set()
-    
-    for row in range(19):
-        for col in range(19):
-            if board[row][col] == player and (row, col) not in checked:
-                liberties, group = get_go_liberties(board, row, col, player)
-                checked.update(group)
-                
-                if not liberties:  # 没有气，被提
-                    for r, c in group:
-                        board[r][c] = 0
-                        captured.append((r, c))
-    
-    return captured
+    return zobrist.reset_hash(GoState(
+        game_type='go',
+        black_player=None,
+        white_player=None,
+        black_choice=None,
+        white_choice=None,
+        board=bytearray(GEOMETRIES[DEFAULT_BOARD_SIZE].points),
+        geometry=GEOMETRIES[DEFAULT_BOARD_SIZE],
+        groups=None,
+        ko_rule=DEFAULT_KO_RULE,
+        scoring=DEFAULT_SCORING_RULE,
+        komi=DEFAULT_KOMI[DEFAULT_SCORING_RULE],
+        passes=0,
+        prisoners=(0, 0),
+        dead_stones=set(),
+        score_accepted=(),
+        estimate=False,
+        estimate_at=0.0,
+    ))
+
+
+def configure_go_room(game, data):
+    """按建房数据设置棋盘大小、打劫规则、计分规则、贴目和形势估计"""
+    board_size = data.get('board_size') or DEFAULT_BOARD_SIZE
+    if not isinstance(board_size, int) or board_size not in GEOMETRIES:
+        raise ValueError(f'不支持的棋盘大小: {board_size}')
+    ko_rule = data.get('ko_rule') or DEFAULT_KO_RULE
+    if ko_rule not in KO_RULES:
+        raise ValueError(f'不支持的打劫规则: {ko_rule}')
+    scoring = data.get('scoring') or DEFAULT_SCORING_RULE
+    if scoring not in SCORING_RULES:
+        raise ValueError(f'不支持的计分规则: {scoring}')
+    komi = data.get('komi')
+    if komi is None:
+        komi = DEFAULT_KOMI[scoring]
+    elif isinstance(komi, bool) or not isinstance(komi, (int, float)) or not -MAX_KOMI <= komi <= MAX_KOMI \
+            or komi * 2 != int(komi * 2):
+        raise ValueError(f'贴目必须是 {MAX_KOMI} 以内的整数或半目: {komi}')
+    estimate = data.get('estimate')
+    if estimate is None:
+        estimate = go_estimate.enabled_by_default
+    elif not isinstance(estimate, bool):
+        raise ValueError(f'estimate 必须是 true 或 false: {estimate}')
+    if board_size != game.geometry.size:
+        game.geometry = GEOMETRIES[board_size]
+        game.board = bytearray(game.geometry.points)
+        game.groups = None
+        zobrist.reset_hash(game)
+    game.ko_rule = ko_rule
+    game.scoring = scoring
+    game.komi = komi
+    # 未安装 NumPy 时不提供形势估计
+    game.estimate = estimate and go_estimate.available()
+    return get_go_rules(game)
+
+
+def get_go_groups(game):
+    """房间的棋块，没有时（新开局、悔棋后）从棋盘重建"""
+    groups = game.get('groups')
+    if groups is None:
+        groups = game.groups = build_groups(game.board, game.geometry)
+    return groups
+
+
+def undo_go_move(game, move):
+    """悔棋：按走棋日志恢复棋盘，棋块在下一步棋前重建；撤销第二次停一手时退出点目阶段"""
+    journal.revert_move(game, move)
+    if not move.get('pass'):
+        game.groups = None
+    if game.passes < 2:
+        game.dead_stones = set()
+        game.score_accepted = ()
+
+
+def get_go_hash_after_move(game, point, player, captured_points):
+    """player 在 point 落子并提掉 captured_points 后的局面哈希（轮到对方），不修改棋盘"""
+    geometry = game.geometry
+    table = geometry.zobrist
+    key = game.position_hash ^ geometry.side_to_move_key ^ table.square_key(point, player)
+    opponent = 3 - player
+    for captured_point in captured_points:
+        key ^= table.square_key(captured_point, opponent)
+    return key
+
+
+def get_go_ko_violation(game, key, captured_count):
+    """落子后的局面 key 违反房间的打劫规则时返回错误提示，否则返回 None
+
+    局面历史即走棋日志维护的 position_counts（每步棋之前的局面），随悔棋一起撤销，查询为 O(1)
+    """
+    if game.ko_rule == 'simple':
+        # 只有提一子才可能立即还原对方上一步之前的局面
+        if captured_count == 1 and game.moves and game.moves[-1].get('hash') == key:
+            return '打劫：不能立即提回，请先在别处落子'
+        return None
+    history = game.position_counts
+    if key in history or (game.ko_rule == 'positional' and (key ^ game.geometry.side_to_move_key) in history):
+        return '全局同形：不能重复之前出现过的局面'
+    return None
 
 
 def handle_go_move(game, room_id, sid, data):
     """处理围棋落子"""
-    from flask_socketio import emit
-
     row = data.get('row')
     col = data.get('col')
 
     # 检查游戏是否结束
-    if game['game_over']:
-        emit('error', {'message': '游戏已结束'})
+    if game.game_over:
+        transport.emit('error', {'message': '游戏已结束'}, to=sid)
+        return
+
+    if game.passes >= 2:
+        transport.emit('error', {'message': '正在点目，请标记死子或确认结果'}, to=sid)
         return
 
     # 检查是否轮到该玩家
-    current_sid = game['black_player'] if game['current_player'] == 1 else game['white_player']
+    current_sid = game.black_player if game.current_player == 1 else game.white_player
     if sid != current_sid:
-        emit('error', {'message': '不是你的回合'})
+        transport.emit('error', {'message': '不是你的回合'}, to=sid)
         return
 
     # 检查位置是否有效
-    if not (0 <= row < 19 and 0 <= col < 19):
-        emit('error', {'message': '位置超出范围'})
+    size = game.geometry.size
+    if not (0 <= row < size and 0 <= col < size):
+        transport.emit('error', {'message': '位置超出范围'}, to=sid)
         return
 
-    if game['board'][row][col] != 0:
-        emit('error', {'message': '该位置已有棋子'})
+    board = game.board
+    point = row * size + col
+    if board[point] != 0:
+        transport.emit('error', {'message': '该位置已有棋子'}, to=sid)
         return
 
-    # 落子
-    current_player = game['current_player']
+    # 由相邻棋块的气判断提子和自杀手，合法后再经由走棋日志正式落子
+    current_player = game.current_player
     opponent = 3 - current_player
-    game['board'][row][col] = current_player
-
-    # 检查对方是否有被吃掉的子（但还不移除）
-    captured_opponent = []
-    checked = set()
-    for r in range(19):
-        for c in range(19):
-            if game['board'][r][c] == opponent and (r, c) not in checked:
-                liberties, group = get_go_liberties(game['board'], r, c, opponent)
-                checked.update(group)
-                if not liberties:  # 对方这个组没有气
-                    captured_opponent.extend(list(group))
-    
-    # 检查自己是否被吃（在对方还没移除的情况下）
-    liberties_self, _ = get_go_liberties(game['board'], row, col, current_player)
-    
-    if not liberties_self and not captured_opponent:
-        # 自己没有气，且没有吃掉对方的子，这是自杀手
-        game['board'][row][col] = 0
-        emit('error', {'message': '不能下在此处，这是自杀手'})
+    groups = get_go_groups(game)
+    captured_roots = groups.check_move(board, point, current_player)
+    if captured_roots is None:
+        transport.emit('error', {'message': '不能下在此处，这是自杀手'}, to=sid)
+        return
+
+    captured_points = sorted(p for root in captured_roots for p in groups.stones[root])
+    ko_error = get_go_ko_violation(
+        game, get_go_hash_after_move(game, point, current_player, captured_points), len(captured_points))
+    if ko_error:
+        transport.emit('error', {'message': ko_error}, to=sid)
         return
-    
-    # 现在移除对方被吃掉的子
-    for r, c in captured_opponent:
-        game['board'][r][c] = 0
 
-    # 记录移动
-    game['moves'].append({
+    # 记录移动（被吃掉的子随日志一起保存，悔棋时放回）
+    captured = [divmod(p, size) for p in captured_points]
+    move = journal.record_move(game, {
         'player': current_player,
         'row': row,
-        'col': col
+        'col': col,
+        'captured': captured
     })
+    move.set_square(point, current_player)
+    groups.place(board, point)
+
+    # 移除对方被吃掉的子
+    for captured_point in captured_points:
+        move.set_square(captured_point, 0)
+    for root in captured_roots:
+        groups.remove(board, root)
+    if captured_points:
+        prisoners = list(game.prisoners)
+        prisoners[current_player - 1] += len(captured_points)
+        move.set_field('prisoners', tuple(prisoners))
+    if game.passes:
+        move.set_field('passes', 0)
 
     # 清除悔棋标记（新一步棋后允许再次悔棋）
-    game['last_undo_player'] = None
+    game.last_undo_player = None
 
     # 广播落子信息（包含被吃掉的子）
-    socketio.emit('move_made', {
+    transport.emit('move_made', {
         'player': current_player,
         'row': row,
         'col': col,
-        'captured': captured_opponent  # 发送被吃掉的子的坐标列表
+        # 发送被吃掉的子的坐标列表
+        'captured': captured
     }, room=room_id)
 
     # 切换玩家
-    game['current_player'] = opponent
-    socketio.emit('turn_changed', {
-        'current_player': game['current_player']
+    move.set_field('current_player', opponent)
+    transport.emit('turn_changed', {
+        'current_player': game.current_player
     }, room=room_id)
 
+    if game.estimate:
+        publish_go_estimate(game, room_id)
+
+
+def handle_go_pass(game, room_id, sid, data):
+    """处理围棋停一手（pass_turn），双方连续停一手后进入点目阶段"""
+    if game.game_over:
+        transport.emit('error', {'message': '游戏已结束'}, to=sid)
+        return
+    if game.passes >= 2:
+        transport.emit('error', {'message': '正在点目，请标记死子或确认结果'}, to=sid)
+        return
+    if sid != get_go_current_player_sid(game):
+        transport.emit('error', {'message': '不是你的回合'}, to=sid)
+        return
+
+    current_player = game.current_player
+    move = journal.record_move(game, {'player': current_player, 'pass': True})
+    move.set_field('passes', game.passes + 1)
+    move.set_field('current_player', 3 - current_player)
+    game.last_undo_player = None
+
+    transport.emit('player_passed', {'player': current_player}, room=room_id)
+    if game.passes >= 2:
+        transport.emit('scoring_started', {
+            'message': '双方连续停一手，请标记死子后确认结果',
+            'score': get_go_score(game),
+        }, room=room_id)
+        if game.estimate:
+            clear_go_estimate(game, room_id)
+    else:
+        transport.emit('turn_changed', {
+            'current_player': game.current_player
+        }, room=room_id)
+
+
+def count_go_area(board, dead_stones, geometry):
+    """一次遍历棋盘统计归属（死子按空点计）
+
+    每片空点（含死子）只泛洪一次，记录它接触到的活子颜色，只接触一种颜色时为该方的地。
+    返回 (归属 bytearray（0 公气 / 1 黑地 / 2 白地）, [_, 黑活子, 白活子], [_, 黑地, 白地])
+    """
+    neighbors = geometry.neighbors
+    owner = bytearray(geometry.points)
+    seen = bytearray(geometry.points)
+    stones = [0, 0, 0]
+    territory = [0, 0, 0]
+    for start in range(geometry.points):
+        stone = board[start]
+        if stone and start not in dead_stones:
+            stones[stone] += 1
+            continue
+        if seen[start]:
+            continue
+        seen[start] = 1
+        region = [start]
+        borders = 0
+        # 遍历过程中 region 不断追加，循环即为广度优先泛洪
+        for point in region:
+            for neighbor in neighbors[point]:
+                if board[neighbor] and neighbor not in dead_stones:
+                    borders |= board[neighbor]
+                elif not seen[neighbor]:
+                    seen[neighbor] = 1
+                    region.append(neighbor)
+        if borders == 1 or borders == 2:
+            territory[borders] += len(region)
+            for point in region:
+                owner[point] = borders
+    return owner, stones, territory
+
+
+def _get_go_area(game):
+    """当前局面和死子标记下的归属与计数，按 (棋盘大小, 局面哈希, 死子哈希) 缓存"""
+    board = game.board
+    geometry = game.geometry
+    dead_key = 0
+    dead = [0, 0, 0]
+    for point in game.dead_stones:
+        dead_key ^= geometry.zobrist.square_key(point, board[point])
+        dead[board[point]] += 1
+    key = (geometry.size, game.position_hash, dead_key)
+    area = _score_cache.get(key)
+    if area is None:
+        owner, stones, territory = count_go_area(board, game.dead_stones, geometry)
+        area = (transport.compact(board_rows(owner, geometry.size), bytes(owner)), stones, territory, dead)
+        if len(_score_cache) >= SCORE_CACHE_SIZE:
+            del _score_cache[next(iter(_score_cache))]
+        _score_cache[key] = area
+    return area
+
+
+def get_go_score(game):
+    """按房间的计分规则和贴目计算当前点目结果"""
+    ownership, stones, territory, dead = _get_go_area(game)
+    if game.scoring == 'area':
+        black = stones[1] + territory[1]
+        white = stones[2] + territory[2] + game.komi
+    else:
+        black = territory[1] + game.prisoners[0] + dead[2]
+        white = territory[2] + game.prisoners[1] + dead[1] + game.komi
+    winner = 1 if black > white else 2 if white > black else None
+    return {
+        'scoring': game.scoring,
+        'komi': game.komi,
+        'black': black,
+        'white': white,
+        'winner': winner,
+        'dead_stones': [divmod(point, game.geometry.size) for point in sorted(game.dead_stones)],
+        'ownership': ownership,
+    }
+
+
+def get_go_score_message(score):
+    """点目结果的文字说明"""
+    if score['winner'] is None:
+        return '和棋'
+    margin = abs(score['black'] - score['white'])
+    unit = '子' if score['scoring'] == 'area' else '目'
+    return f"{get_go_winner_name(score['winner'])}胜 {margin:g} {unit}"
+
+
+def _get_scoring_player(game, sid):
+    """点目阶段操作的玩家编号，不在点目阶段或不是对局双方时返回 None（并提示）"""
+    if game.game_over or game.passes < 2:
+        transport.emit('error', {'message': '现在不是点目阶段'}, to=sid)
+        return None
+    if sid == game.black_player:
+        return 1
+    if sid == game.white_player:
+        return 2
+    return None
+
+
+def handle_go_mark_dead(game, room_id, sid, data):
+    """点目阶段标记 / 取消标记死子：(row, col) 所在的整块棋，双方需重新确认"""
+    if _get_scoring_player(game, sid) is None:
+        return
+    row = data.get('row')
+    col = data.get('col')
+    size = game.geometry.size
+    if not (isinstance(row, int) and isinstance(col, int) and 0 <= row < size and 0 <= col < size):
+        transport.emit('error', {'message': '位置超出范围'}, to=sid)
+        return
+    point = row * size + col
+    if game.board[point] == 0:
+        transport.emit('error', {'message': '该位置没有棋子'}, to=sid)
+        return
+
+    stones = get_go_groups(game).group_stones(point)
+    if point in game.dead_stones:
+        game.dead_stones.difference_update(stones)
+    else:
+        game.dead_stones.update(stones)
+    game.score_accepted = ()
+    transport.emit('score_update', {'score': get_go_score(game)}, room=room_id)
+
+
+def handle_go_accept_score(game, room_id, sid, data):
+    """确认点目结果，双方都确认后按结果结束对局"""
+    player = _get_scoring_player(game, sid)
+    if player is None or player in game.score_accepted:
+        return
+    game.score_accepted = tuple(sorted(game.score_accepted + (player,)))
+    if len(game.score_accepted) < 2:
+        transport.emit('score_accepted', {'player': player}, room=room_id)
+        return
+
+    score = get_go_score(game)
+    game.game_over = True
+    game.winner = score['winner']
+    transport.emit('game_over', {
+        'winner': score['winner'],
+        'message': f'点目结束，{get_go_score_message(score)}',
+        'score': score,
+    }, room=room_id)
+
+
+def get_go_estimate(game):
+    """当前局面的形势估计：势力归属和按房间计分规则、贴目估算的双方得分
+
+    数子时得分为归属于该方的点（含活子）；数目时为该方势力内的空点、被围住的对方棋子（按死子计）和提子
+    """
+    owner = go_estimate.estimate_ownership(game.board, game.geometry)
+    owned, territory = go_estimate.count_ownership(owner, game.board)
+    if game.scoring == 'area':
+        black = owned[1]
+        white = owned[2] + game.komi
+    else:
+        black = territory[1] + game.prisoners[0]
+        white = territory[2] + game.prisoners[1] + game.komi
+    return {
+        'move': len(game.moves),
+        'ownership': transport.compact(owner.tolist(), owner.tobytes()),
+        'black': black,
+        'white': white,
+        'lead': black - white,
+    }
+
+
+def publish_go_estimate(game, room_id):
+    """向房间发送形势估计（estimate），距上次发送不足节流间隔时登记房间，由后台任务在间隔结束后补发"""
+    now = time.monotonic()
+    if now - game.estimate_at < go_estimate.interval:
+        go_estimate.defer(room_id)
+        return
+    game.estimate_at = now
+    transport.emit('estimate', get_go_estimate(game), room=room_id)
+
+
+def clear_go_estimate(game, room_id):
+    """进入点目阶段后不再估计：发送 ownership 为 None 的 estimate，客户端清除显示的形势（不节流）"""
+    game.estimate_at = time.monotonic()
+    transport.emit('estimate', {'move': len(game.moves), 'ownership': None}, room=room_id)
+
+
+def flush_go_estimate(game, room_id):
+    """补发节流期间被推迟的形势估计（对局已结束或进入点目阶段时不再发送）"""
+    if game.estimate and not game.game_over and game.passes < 2:
+        publish_go_estimate(game, room_id)
+
 
 def reset_go_game(game):
     """重置围棋游戏"""
-    game['board'] = [[0]*19 for _ in range(19)]
-    game['current_player'] = 1
-    game['game_over'] = False
-    game['winner'] = None
-    game['moves'] = []
-    game['black_choice'] = None
-    game['white_choice'] = None
+    game.board = bytearray(game.geometry.points)
+    game.groups = None
+    game.passes = 0
+    game.prisoners = (0, 0)
+    game.dead_stones = set()
+    game.score_accepted = ()
+    game.current_player = 1
+    game.game_over = False
+    game.winner = None
+    game.moves = []
+    game.black_choice = None
+    game.white_choice = None
+    zobrist.reset_hash(game)
 
 
 def assign_go_player(game, sid):
     """分配围棋玩家颜色"""
-    if game['black_player'] is None:
-        game['black_player'] = sid
+    if game.black_player is None:
+        game.black_player = sid
         return 'black'
-    elif game['white_player'] is None:
-        game['white_player'] = sid
+    elif game.white_player is None:
+        game.white_player = sid
         return 'white'
     return None
 
 
 def record_go_choice(game, sid, choice):
     """记录围棋玩家的先后手选择"""
-    if game['black_player'] == sid:
-        game['black_choice'] = choice
-    elif game['white_player'] == sid:
-        game['white_choice'] = choice
+    if game.black_player == sid:
+        game.black_choice = choice
+    elif game.white_player == sid:
+        game.white_choice = choice
 
 
 def should_start_go(game):
     """检查是否可以开始围棋游戏"""
-    return game['black_choice'] is not None and game['white_choice'] is not None
+    return game.black_choice is not None and game.white_choice is not None
 
 
 def determine_go_first_player(game):
     """确定围棋先后手"""
-    if game['black_choice'] == 'first':
+    if game.black_choice == 'first':
         # 黑棋先手
         is_black_first = True
     else:
@@ -207,17 +560,17 @@ def determine_go_first_player(game):
 
 def get_go_current_player_sid(game):
     """获取当前轮到的玩家sid"""
-    return game['black_player'] if game['current_player'] == 1 else game['white_player']
+    return game.black_player if game.current_player == 1 else game.white_player
 
 
 def get_go_opponent_sid(game, sid):
     """获取对手的sid"""
-    return game['white_player'] if sid == game['black_player'] else game['black_player']
+    return game.white_player if sid == game.black_player else game.black_player
 
 
 def handle_go_disconnect(game, sid):
     """处理围棋玩家断开连接，返回对手sid"""
-    if game['black_player'] == sid or game['white_player'] == sid:
+    if game.black_player == sid or game.white_player == sid:
         opponent = get_go_opponent_sid(game, sid)
         return [opponent] if opponent else []
     return []
@@ -225,9 +578,9 @@ def handle_go_disconnect(game, sid):
 
 def handle_go_surrender(game, sid):
     """处理围棋认输，返回(赢家编号, 赢家sid, 输家sid)"""
-    winner = 2 if sid == game['black_player'] else 1
-    winner_sid = game['black_player'] if winner == 1 else game['white_player']
-    loser_sid = game['white_player'] if winner == 1 else game['black_player']
+    winner = 2 if sid == game.black_player else 1
+    winner_sid = game.black_player if winner == 1 else game.white_player
+    loser_sid = game.white_player if winner == 1 else game.black_player
     return winner, winner_sid, loser_sid
 
 
@@ -236,43 +589,84 @@ def get_go_winner_name(winner):
     return '黑棋' if winner == 1 else '白棋'
 
 
-def execute_go_undo(game, last_move):
-    """执行围棋悔棋"""
-    row = last_move['row']
-    col = last_move['col']
-    game['board'][row][col] = 0
-
-
 def handle_go_game_start(game):
     """围棋确定先后手并通知双方开始游戏"""
     import random
     
-    if game['black_choice'] == game['white_choice']:
-        first_player_sid = random.choice([game['black_player'], game['white_player']])
-        is_black_first = (first_player_sid == game['black_player'])
+    if game.black_choice == game.white_choice:
+        first_player_sid = random.choice([game.black_player, game.white_player])
+        is_black_first = (first_player_sid == game.black_player)
     else:
-        first_choice_sid = game['black_player'] if game['black_choice'] == 'first' else game['white_player']
-        is_black_first = (first_choice_sid == game['black_player'])
+        first_choice_sid = game.black_player if game.black_choice == 'first' else game.white_player
+        is_black_first = (first_choice_sid == game.black_player)
 
     if is_black_first:
-        socketio.emit('game_start', {
-            'message': '游戏开始！黑棋先手',
-            'first_player': 'black',
-            'player_color': 'black'
-        }, to=game['black_player'])
-        socketio.emit('game_start', {
-            'message': '游戏开始！白棋后手',
-            'first_player': 'black',
-            'player_color': 'white'
-        }, to=game['white_player'])
+        transport.emit_each('game_start', {'first_player': 'black', **get_go_rules(game)}, [
+            (game.black_player, {'message': '游戏开始！黑棋先手', 'player_color': 'black'}),
+            (game.white_player, {'message': '游戏开始！白棋后手', 'player_color': 'white'}),
+        ])
     else:
-        socketio.emit('game_start', {
-            'message': '游戏开始！黑棋后手',
-            'first_player': 'white',
-            'player_color': 'white'
-        }, to=game['black_player'])
-        socketio.emit('game_start', {
-            'message': '游戏开始！白棋先手',
-            'first_player': 'white',
-            'player_color': 'black'
-        }, to=game['white_player'])
+        transport.emit_each('game_start', {'first_player': 'white', **get_go_rules(game)}, [
+            (game.black_player, {'message': '游戏开始！黑棋后手', 'player_color': 'white'}),
+            (game.white_player, {'message': '游戏开始！白棋先手', 'player_color': 'black'}),
+        ])
+
+
+def get_go_rules(game):
+    """房间的对局规则（开局和快照中发给客户端）"""
+    return {
+        'board_size': game.geometry.size, 'ko_rule': game.ko_rule, 'scoring': game.scoring, 'komi': game.komi,
+        'estimate': game.estimate,
+    }
+
+
+def get_go_public_snapshot(game):
+    """观战快照：棋盘、规则、提子数，点目阶段附带当前点目结果"""
+    snapshot = {
+        **get_go_rules(game),
+        'board': transport.compact(board_rows(game.board, game.geometry.size), bytes(game.board)),
+        'prisoners': game.prisoners,
+        'passes': game.passes,
+    }
+    if game.passes >= 2:
+        snapshot['score'] = get_go_score(game)
+        snapshot['score_accepted'] = game.score_accepted
+    return snapshot
+
+
+def get_go_snapshot(game, sid):
+    """断线重连后发给玩家的局面快照"""
+    is_black = sid == game.black_player
+    return {
+        'player': 1 if is_black else 2,
+        'player_color': 'black' if is_black else 'white',
+        'choice': game.black_choice if is_black else game.white_choice,
+        **get_go_public_snapshot(game),
+    }
+
+
+register_game_module(GameModule(
+    game_type='go',
+    display_name='围棋',
+    initialize=initialize_go_game,
+    room_options=configure_go_room,
+    creator_seat='black_player',
+    creator_color='black',
+    seats=('black_player', 'white_player'),
+    assign_player=assign_go_player,
+    record_choice=record_go_choice,
+    should_start=should_start_go,
+    begin_game=handle_go_game_start,
+    move=handle_go_move,
+    pass_turn=handle_go_pass,
+    reset=reset_go_game,
+    surrender=handle_go_surrender,
+    winner_name=get_go_winner_name,
+    current_player_sid=get_go_current_player_sid,
+    opponent_sid=get_go_opponent_sid,
+    disconnect=handle_go_disconnect,
+    snapshot=get_go_snapshot,
+    spectate=get_go_public_snapshot,
+    rules=get_go_rules,
+    undo=undo_go_move,
+))
@@ -0,0 +1,143 @@
+"""
+围棋形势估计
+开启了形势估计的房间每步棋后收到 estimate 事件：每个交叉点的归属（0 未定 / 1 黑 / 2 白）和按房间计分规则估算的双方得分。
+
+- 归属用 Bouzy 膨胀 / 腐蚀算子估计：棋子初值 ±64，先膨胀 DILATIONS 次（不与对方影响相邻的点按同号邻点数增长），
+  再腐蚀 EROSIONS 次（按异号或为 0 的邻点数衰减），剩下的正 / 负区域即黑 / 白的势力范围
+- 每次膨胀 / 腐蚀都是对整个棋盘数组的 NumPy 向量运算（四个方向的切片相加），不逐点循环，19 路一次估计远小于 1 毫秒
+- 同一房间每秒最多发送 max_per_second 次：间隔内的落子只登记房间，由服务器的后台任务在周期结束时补发最新局面的估计
+- NumPy 为可选依赖，未安装时不提供形势估计（建房时 estimate 被忽略）；第一次估计时才导入，
+  只导入规则模块（其他游戏、机器人、基准测试）时不加载 NumPy
+"""
+
+import importlib.util
+import threading
+
+# 第一次估计时导入的 numpy 模块；_available 缓存 NumPy 是否已安装
+_numpy = None
+_available = None
+
+DEFAULT_MAX_PER_SECOND = 2
+# Bouzy 算子的膨胀 / 腐蚀次数与棋子初值
+DILATIONS = 5
+EROSIONS = 10
+STONE_VALUE = 64
+
+# 同一房间两次估计之间的最短间隔（秒）
+interval = 1 / DEFAULT_MAX_PER_SECOND
+# 建房时未指定 estimate 的房间是否开启
+enabled_by_default = False
+
+# 等待补发估计的房间
+_pending = set()
+_lock = threading.Lock()
+# 棋盘大小 -> 每个点在棋盘内的邻点数（NumPy 数组）
+_degrees = {}
+
+
+def configure_go_estimate(options):
+    """根据配置设置形势估计的发送频率
+
+    options 示例（config.yaml 中的 go_estimate 节）:
+        max_per_second: 2     # 每个房间每秒最多发送的估计次数
+        default: false        # 建房时未指定 estimate 的围棋房间是否开启
+    """
+    global interval, enabled_by_default
+    options = options or {}
+    max_per_second = float(options.get('max_per_second', DEFAULT_MAX_PER_SECOND))
+    if max_per_second <= 0:
+        raise ValueError(f'形势估计频率必须为正数: {max_per_second}')
+    interval = 1 / max_per_second
+    enabled_by_default = bool(options.get('default', False))
+
+
+def available():
+    """是否可以提供形势估计（已安装 NumPy，只查找不导入）"""
+    global _available
+    if _available is None:
+        _available = importlib.util.find_spec('numpy') is not None
+    return _available
+
+
+def load_numpy():
+    """导入 NumPy（服务器启动后台任务时预先调用，避免第一次估计时在事件处理中导入）"""
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+
+def defer(room_id):
+    """间隔内的落子：登记房间，周期结束时补发"""
+    with _lock:
+        _pending.add(room_id)
+
+
+def drain():
+    """取出等待补发估计的房间"""
+    with _lock:
+        pending = list(_pending)
+        _pending.clear()
+    return pending
+
+
+def _get_degrees(numpy, geometry):
+    degrees = _degrees.get(geometry.size)
+    if degrees is None:
+        degrees = numpy.array([len(neighbors) for neighbors in geometry.neighbors], dtype=numpy.int16)
+        degrees = _degrees[geometry.size] = degrees.reshape(geometry.size, geometry.size)
+    return degrees
+
+
+def estimate_influence(board, geometry):
+    """Bouzy 膨胀 / 腐蚀后的势力值（size × size 的 int16 数组，正为黑、负为白、0 为未定）"""
+    numpy = load_numpy()
+    size = geometry.size
+    cells = numpy.frombuffer(board, dtype=numpy.uint8).reshape(size, size)
+    field = (cells == 1).astype(numpy.int16) - (cells == 2)
+    field *= STONE_VALUE
+    degrees = _get_degrees(numpy, geometry)
+    # 每个点的势力符号编码为 1（正）/ 16（负）/ 0，四周补一圈 0；四个方向的邻点即补边数组的四个错位切片，
+    # 相加后低 4 位为正邻点数、高位为负邻点数，棋盘外的点不计入
+    signs = numpy.zeros((size + 2, size + 2), dtype=numpy.int8)
+    inner = signs[1:-1, 1:-1]
+    up, down, left, right = signs[:-2, 1:-1], signs[2:, 1:-1], signs[1:-1, :-2], signs[1:-1, 2:]
+
+    def count_neighbors():
+        numpy.remainder(numpy.sign(field), 17, out=inner, casting='unsafe')
+        total = up + down + left + right
+        return total & 15, total >> 4
+
+    for _ in range(DILATIONS):
+        positive, negative = count_neighbors()
+        # 不与对方影响相邻的点按同号邻点数增长（为 0 且两方都相邻的点不变）
+        field += positive * ((field >= 0) & (negative == 0)) - negative * ((field <= 0) & (positive == 0))
+
+    for _ in range(EROSIONS):
+        positive, negative = count_neighbors()
+        # 按不同号（含 0）的棋盘内邻点数衰减，不越过 0
+        field = numpy.where(field > 0, numpy.maximum(field - degrees + positive, 0),
+                            numpy.minimum(field + degrees - negative, 0))
+
+    return field
+
+
+def estimate_ownership(board, geometry):
+    """每个点的归属（size × size 的 uint8 数组，0 未定 / 1 黑 / 2 白）"""
+    numpy = load_numpy()
+    field = estimate_influence(board, geometry)
+    return (field > 0).view(numpy.uint8) + (field < 0).view(numpy.uint8) * 2
+
+
+def count_ownership(owner, board):
+    """按归属计数：返回 ([_, 黑, 白] 归属该方的点数, [_, 黑, 白] 其中不是该方棋子的点数（空点和被围住的对方棋子）)"""
+    numpy = load_numpy()
+    cells = numpy.frombuffer(board, dtype=numpy.uint8).reshape(owner.shape)
+    owned = [0, 0, 0]
+    territory = [0, 0, 0]
+    for player in (1, 2):
+        mask = owner == player
+        owned[player] = int(numpy.count_nonzero(mask))
+        territory[player] = owned[player] - int(numpy.count_nonzero(mask & (cells == player)))
+    return owned, territory
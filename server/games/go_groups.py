@@ -0,0 +1,125 @@
+"""
+围棋棋块（并查集）
+棋盘上的每块棋是并查集中的一个集合，根节点上保存这块棋的全部棋子和气的集合，落子时增量维护：
+- 落子只查看落点的四个相邻点：新子自成一块，与相邻的己方棋块合并（小块并入大块），相邻棋块都少一口气
+- 相邻的对方棋块只剩落点这一口气时被提，提子代价与被提的棋子数成正比，被提的点成为四周棋块的气
+- 没有提子、没有空的相邻点、相邻己方棋块也没有落点以外的气时为自杀手，不需要试落子再扫描棋盘
+不再逐点遍历整个棋盘，也没有递归，大棋块不会超出递归深度。
+
+GoGroups 只读 board 判断颜色，棋盘本身仍由走棋日志修改：规则代码先用 check_move 判断合法性和被提的棋块，
+经由日志改动棋盘后再调用 place / remove 同步棋块。悔棋等直接改写棋盘的操作之后用 build_groups 从棋盘重建。
+"""
+
+
+class GoGroups:
+    """一个棋盘上的全部棋块"""
+
+    __slots__ = ('geometry', 'parent', 'stones', 'liberties')
+
+    def __init__(self, geometry):
+        """geometry 为棋盘几何（games.go.GoGeometry），提供点数和每个点的相邻点"""
+        self.geometry = geometry
+        # 点 -> 并查集父节点（空点和根节点指向自己）
+        self.parent = list(range(geometry.points))
+        # 根节点 -> 这块棋的棋子下标列表 / 气的下标集合
+        self.stones = {}
+        self.liberties = {}
+
+    def find(self, point):
+        """棋子所在棋块的根节点（路径减半）"""
+        parent = self.parent
+        while parent[point] != point:
+            parent[point] = parent[parent[point]]
+            point = parent[point]
+        return point
+
+    def group_liberties(self, point):
+        """棋子所在棋块的气（不要修改返回的集合）"""
+        return self.liberties[self.find(point)]
+
+    def group_stones(self, point):
+        """棋子所在棋块的全部棋子（不要修改返回的列表）"""
+        return self.stones[self.find(point)]
+
+    def check_move(self, board, point, player):
+        """player 在空点 point 落子：返回将被提的对方棋块根节点列表，自杀手返回 None（不修改任何状态）"""
+        liberties = self.liberties
+        captured = []
+        alive = False
+        opponent = 3 - player
+        for neighbor in self.geometry.neighbors[point]:
+            stone = board[neighbor]
+            if stone == 0:
+                alive = True
+                continue
+            root = self.find(neighbor)
+            if stone == opponent:
+                if len(liberties[root]) == 1 and root not in captured:
+                    captured.append(root)
+            elif len(liberties[root]) > 1:
+                # 合并后这块棋还有落点以外的气
+                alive = True
+        if not alive and not captured:
+            return None
+        return captured
+
+    def place(self, board, point):
+        """board[point] 已落子：新子成块，与相邻的己方棋块合并，相邻棋块去掉这口气"""
+        player = board[point]
+        liberties = self.liberties
+        root = point
+        self.stones[root] = [point]
+        liberties[root] = set()
+        for neighbor in self.geometry.neighbors[point]:
+            stone = board[neighbor]
+            if stone == 0:
+                liberties[root].add(neighbor)
+                continue
+            other = self.find(neighbor)
+            liberties[other].discard(point)
+            if stone == player and other != root:
+                root = self._union(root, other)
+
+    def _union(self, root, other):
+        """合并两块棋，按棋子数把小块并入大块，返回新的根节点"""
+        stones = self.stones
+        liberties = self.liberties
+        if len(stones[other]) > len(stones[root]):
+            root, other = other, root
+        self.parent[other] = root
+        stones[root].extend(stones.pop(other))
+        liberties[root] |= liberties.pop(other)
+        return root
+
+    def remove(self, board, root):
+        """root 所在棋块已从 board 上提掉：拆散这块棋，被提的点成为四周棋块的气"""
+        parent = self.parent
+        liberties = self.liberties
+        del liberties[root]
+        captured = self.stones.pop(root)
+        for point in captured:
+            parent[point] = point
+        neighbors = self.geometry.neighbors
+        for point in captured:
+            for neighbor in neighbors[point]:
+                if board[neighbor]:
+                    liberties[self.find(neighbor)].add(point)
+
+
+def build_groups(board, geometry):
+    """从棋盘重建全部棋块（初始化、悔棋后使用），O(棋盘大小)"""
+    groups = GoGroups(geometry)
+    neighbors = geometry.neighbors
+    for point, stone in enumerate(board):
+        if not stone:
+            continue
+        groups.stones[point] = [point]
+        groups.liberties[point] = {neighbor for neighbor in neighbors[point] if board[neighbor] == 0}
+        # 按下标顺序建块，只需与下标更小的己方棋子合并
+        root = point
+        for neighbor in neighbors[point]:
+            if neighbor < point and board[neighbor] == stone:
+                other = groups.find(neighbor)
+                if other != root:
+                    root = groups._union(root, other)
+    return groups
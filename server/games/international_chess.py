@@ -2,34 +2,59 @@
 国际象棋游戏逻辑
 """
 
-# 全局变量，由主程序设置
-socketio = None
-games = None
+from array import array
+
+from . import journal, transport, zobrist
+from .registry import GameModule, register_game_module
+from .state import GameState, board_rows
+
+# 棋盘大小；棋盘为一维有符号字节数组 array('b')，下标 row * BOARD_SIZE + col
+BOARD_SIZE = 8
+
+
+# Zobrist 局面哈希键表；过路兵由上一步推出，不单独计入
+ZOBRIST = zobrist.ZobristTable(
+    'international_chess', BOARD_SIZE * BOARD_SIZE,
+    tuple(piece for piece in range(-6, 7) if piece),
+    {
+        'current_player': (1, -1),
+        **{flag: (True,) for flag in (
+            'white_king_moved', 'black_king_moved',
+            'white_rook_h1_moved', 'white_rook_a1_moved', 'black_rook_h8_moved', 'black_rook_a8_moved',
+        )},
+    },
+)
+
+
+class InternationalChessState(GameState):
+    """国际象棋房间状态"""
+    __slots__ = (
+        'white_player', 'black_player', 'white_choice', 'black_choice', 'board',
+        # 王车易位状态
+        'white_king_moved', 'black_king_moved',
+        'white_rook_h1_moved', 'white_rook_a1_moved', 'black_rook_h8_moved', 'black_rook_a8_moved',
+    )
+
+    zobrist = ZOBRIST
 
 
 def initialize_international_chess_game(sid):
     """初始化国际象棋游戏数据"""
-    return {
-        'game_type': 'international_chess',
-        'white_player': None,
-        'black_player': None,
-        'white_choice': None,
-        'black_choice': None,
-        'board': initialize_international_chess_board(),
-        'current_player': 1,
-        'game_over': False,
-        'winner': None,
-        'moves': [],
-        'white_choice': None,
-        'black_choice': None,
+    return zobrist.reset_hash(InternationalChessState(
+        game_type='international_chess',
+        white_player=None,
+        black_player=None,
+        white_choice=None,
+        black_choice=None,
+        board=initialize_international_chess_board(),
         # 王车易位状态
-        'white_king_moved': False,
-        'black_king_moved': False,
-        'white_rook_h1_moved': False,
-        'white_rook_a1_moved': False,
-        'black_rook_h8_moved': False,
-        'black_rook_a8_moved': False
-    }
+        white_king_moved=False,
+        black_king_moved=False,
+        white_rook_h1_moved=False,
+        white_rook_a1_moved=False,
+        black_rook_h8_moved=False,
+        black_rook_a8_moved=False,
+    ))
 
 
 # 棋子编码：正数为白方，负数为黑方
@@ -48,39 +73,47 @@ BLACK_BISHOP = -4
 BLACK_KNIGHT = -5
 BLACK_PAWN = -6
 
+# 车从初始位置离开时置位的易位权字段：(颜色, 行, 列) -> 字段名
+ROOK_MOVED_FLAGS = {
+    (1, 0, 7): 'white_rook_h1_moved',
+    (1, 0, 0): 'white_rook_a1_moved',
+    (-1, 7, 7): 'black_rook_h8_moved',
+    (-1, 7, 0): 'black_rook_a8_moved',
+}
+
 
 def initialize_international_chess_board():
     """初始化国际象棋棋盘 (8x8)"""
     # 0表示空位，正数白方，负数黑方
-    board = [[0] * 8 for _ in range(8)]
+    board = array('b', bytes(BOARD_SIZE * BOARD_SIZE))
 
     # 白方棋子 (第1行，索引0) - 视觉上的底部
-    board[0][0] = WHITE_ROOK
-    board[0][1] = WHITE_KNIGHT
-    board[0][2] = WHITE_BISHOP
-    board[0][3] = WHITE_QUEEN
-    board[0][4] = WHITE_KING
-    board[0][5] = WHITE_BISHOP
-    board[0][6] = WHITE_KNIGHT
-    board[0][7] = WHITE_ROOK
+    board[0] = WHITE_ROOK
+    board[1] = WHITE_KNIGHT
+    board[2] = WHITE_BISHOP
+    board[3] = WHITE_QUEEN
+    board[4] = WHITE_KING
+    board[5] = WHITE_BISHOP
+    board[6] = WHITE_KNIGHT
+    board[7] = WHITE_ROOK
 
     # 白方兵 (第2行，索引1)
     for col in range(8):
-        board[1][col] = WHITE_PAWN
+        board[1 * BOARD_SIZE + col] = WHITE_PAWN
 
     # 黑方兵 (第7行，索引6)
     for col in range(8):
-        board[6][col] = BLACK_PAWN
+        board[6 * BOARD_SIZE + col] = BLACK_PAWN
 
     # 黑方棋子 (第8行，索引7) - 视觉上的顶部
-    board[7][0] = BLACK_ROOK
-    board[7][1] = BLACK_KNIGHT
-    board[7][2] = BLACK_BISHOP
-    board[7][3] = BLACK_QUEEN
-    board[7][4] = BLACK_KING
-    board[7][5] = BLACK_BISHOP
-    board[7][6] = BLACK_KNIGHT
-    board[7][7] = BLACK_ROOK
+    board[7 * BOARD_SIZE + 0] = BLACK_ROOK
+    board[7 * BOARD_SIZE + 1] = BLACK_KNIGHT
+    board[7 * BOARD_SIZE + 2] = BLACK_BISHOP
+    board[7 * BOARD_SIZE + 3] = BLACK_QUEEN
+    board[7 * BOARD_SIZE + 4] = BLACK_KING
+    board[7 * BOARD_SIZE + 5] = BLACK_BISHOP
+    board[7 * BOARD_SIZE + 6] = BLACK_KNIGHT
+    board[7 * BOARD_SIZE + 7] = BLACK_ROOK
 
     return board
 
@@ -105,14 +138,14 @@ def is_path_clear(board, start_row, start_col, end_row, end_col):
         # 水平移动
         step = 1 if end_col > start_col else -1
         for col in range(start_col + step, end_col, step):
-            if board[start_row][col] != 0:
+            if board[start_row * BOARD_SIZE + col] != 0:
                 return False
         return True
     elif start_col == end_col:
         # 垂直移动
         step = 1 if end_row > start_row else -1
         for row in range(start_row + step, end_row, step):
-            if board[row][start_col] != 0:
+            if board[row * BOARD_SIZE + start_col] != 0:
                 return False
         return True
     elif abs(end_row - start_row) == abs(end_col - start_col):
@@ -121,7 +154,7 @@ def is_path_clear(board, start_row, start_col, end_row, end_col):
         col_step = 1 if end_col > start_col else -1
         row, col = start_row + row_step, start_col + col_step
         while (row, col) != (end_row, end_col):
-            if board[row][col] != 0:
+            if board[row * BOARD_SIZE + col] != 0:
                 return False
             row += row_step
             col += col_step
@@ -131,7 +164,7 @@ def is_path_clear(board, start_row, start_col, end_row, end_col):
 
 def get_valid_international_chess_moves(board, row, col, game=None):
     """获取棋子在当前位置的所有合法移动"""
-    piece = board[row][col]
+    piece = board[row * BOARD_SIZE + col]
     if piece == 0:
         return []
 
@@ -163,7 +196,7 @@ def get_king_moves(board, row, col, color, game=None):
     for dr, dc in directions:
         new_row, new_col = row + dr, col + dc
         if is_valid_international_chess_position(new_row, new_col):
-            target = board[new_row][new_col]
+            target = board[new_row * BOARD_SIZE + new_col]
             if get_piece_color(target) != color:
                 moves.append((new_row, new_col))
 
@@ -191,17 +224,17 @@ def get_castling_moves(board, row, col, color, game):
         # 短易位 (王翼)
         if not game.get('white_king_moved', False):
             # 车在 h1 (0, 7)
-            if board[0][7] == WHITE_ROOK and not game.get('white_rook_h1_moved', False):
+            if board[7] == WHITE_ROOK and not game.get('white_rook_h1_moved', False):
                 # 检查中间格子 f1, g1 是否为空
-                if board[0][5] == 0 and board[0][6] == 0:
+                if board[5] == 0 and board[6] == 0:
                     # 检查 f1, g1 是否被攻击
                     if not is_square_attacked(board, 0, 5, -1) and not is_square_attacked(board, 0, 6, -1):
                         moves.append((0, 6))  # 短易位
 
             # 长易位 (后翼)
-            if board[0][0] == WHITE_ROOK and not game.get('white_rook_a1_moved', False):
+            if board[0] == WHITE_ROOK and not game.get('white_rook_a1_moved', False):
                 # 检查中间格子 b1, c1, d1 是否为空
-                if board[0][1] == 0 and board[0][2] == 0 and board[0][3] == 0:
+                if board[1] == 0 and board[2] == 0 and board[3] == 0:
                     # 检查 c1, d1 是否被攻击 (b1 不需要检查)
                     if not is_square_attacked(board, 0, 2, -1) and not is_square_attacked(board, 0, 3, -1):
                         moves.append((0, 2))  # 长易位
@@ -209,17 +242,17 @@ def get_castling_moves(board, row, col, color, game):
         # 短易位 (王翼)
         if not game.get('black_king_moved', False):
             # 车在 h8 (7, 7)
-            if board[7][7] == BLACK_ROOK and not game.get('black_rook_h8_moved', False):
+            if board[7 * BOARD_SIZE + 7] == BLACK_ROOK and not game.get('black_rook_h8_moved', False):
                 # 检查中间格子 f8, g8 是否为空
-                if board[7][5] == 0 and board[7][6] == 0:
+                if board[7 * BOARD_SIZE + 5] == 0 and board[7 * BOARD_SIZE + 6] == 0:
                     # 检查 f8, g8 是否被攻击
                     if not is_square_attacked(board, 7, 5, 1) and not is_square_attacked(board, 7, 6, 1):
                         moves.append((7, 6))  # 短易位
 
             # 长易位 (后翼)
-            if board[7][0] == BLACK_ROOK and not game.get('black_rook_a8_moved', False):
+            if board[7 * BOARD_SIZE + 0] == BLACK_ROOK and not game.get('black_rook_a8_moved', False):
                 # 检查中间格子 b8, c8, d8 是否为空
-                if board[7][1] == 0 and board[7][2] == 0 and board[7][3] == 0:
+                if board[7 * BOARD_SIZE + 1] == 0 and board[7 * BOARD_SIZE + 2] == 0 and board[7 * BOARD_SIZE + 3] == 0:
                     # 检查 c8, d8 是否被攻击 (b8 不需要检查)
                     if not is_square_attacked(board, 7, 2, 1) and not is_square_attacked(board, 7, 3, 1):
                         moves.append((7, 2))  # 长易位
@@ -230,30 +263,29 @@ def get_castling_moves(board, row, col, color, game):
 def is_square_attacked(board, row, col, attacker_color):
     """检查指定格子是否被对方攻击"""
     # 检查所有敌方棋子是否能攻击到该格子
-    for r in range(8):
-        for c in range(8):
-            piece = board[r][c]
-            if get_piece_color(piece) == attacker_color:
-                piece_type = abs(piece)
-                if piece_type == 1:  # 王
-                    if max(abs(r - row), abs(c - col)) == 1:
-                        return True
-                elif piece_type == 2:  # 后
-                    if is_path_clear(board, r, c, row, col):
-                        return True
-                elif piece_type == 3:  # 车
-                    if (r == row or c == col) and is_path_clear(board, r, c, row, col):
-                        return True
-                elif piece_type == 4:  # 象
-                    if abs(r - row) == abs(c - col) and is_path_clear(board, r, c, row, col):
-                        return True
-                elif piece_type == 5:  # 马
-                    if (abs(r - row), abs(c - col)) in [(2, 1), (1, 2)]:
-                        return True
-                elif piece_type == 6:  # 兵
-                    direction = 1 if attacker_color == 1 else -1
-                    if r + direction == row and abs(c - col) == 1:
-                        return True
+    for square, piece in enumerate(board):
+        if get_piece_color(piece) == attacker_color:
+            r, c = divmod(square, BOARD_SIZE)
+            piece_type = abs(piece)
+            if piece_type == 1:  # 王
+                if max(abs(r - row), abs(c - col)) == 1:
+                    return True
+            elif piece_type == 2:  # 后
+                if is_path_clear(board, r, c, row, col):
+                    return True
+            elif piece_type == 3:  # 车
+                if (r == row or c == col) and is_path_clear(board, r, c, row, col):
+                    return True
+            elif piece_type == 4:  # 象
+                if abs(r - row) == abs(c - col) and is_path_clear(board, r, c, row, col):
+                    return True
+            elif piece_type == 5:  # 马
+                if (abs(r - row), abs(c - col)) in [(2, 1), (1, 2)]:
+                    return True
+            elif piece_type == 6:  # 兵
+                direction = 1 if attacker_color == 1 else -1
+                if r + direction == row and abs(c - col) == 1:
+                    return True
     return False
 
 
@@ -267,7 +299,7 @@ def get_queen_moves(board, row, col, color):
             new_row, new_col = row + dr * i, col + dc * i
             if not is_valid_international_chess_position(new_row, new_col):
                 break
-            target = board[new_row][new_col]
+            target = board[new_row * BOARD_SIZE + new_col]
             if target == 0:
                 moves.append((new_row, new_col))
             elif get_piece_color(target) != color:
@@ -283,7 +315,7 @@ def get_queen_moves(board, row, col, color):
             new_row, new_col = row + dr * i, col + dc * i
             if not is_valid_international_chess_position(new_row, new_col):
                 break
-            target = board[new_row][new_col]
+            target = board[new_row * BOARD_SIZE + new_col]
             if target == 0:
                 moves.append((new_row, new_col))
             elif get_piece_color(target) != color:
@@ -305,7 +337,7 @@ def get_rook_moves(board, row, col, color):
             new_row, new_col = row + dr * i, col + dc * i
             if not is_valid_international_chess_position(new_row, new_col):
                 break
-            target = board[new_row][new_col]
+            target = board[new_row * BOARD_SIZE + new_col]
             if target == 0:
                 moves.append((new_row, new_col))
             elif get_piece_color(target) != color:
@@ -327,7 +359,7 @@ def get_bishop_moves(board, row, col, color):
             new_row, new_col = row + dr * i, col + dc * i
             if not is_valid_international_chess_position(new_row, new_col):
                 break
-            target = board[new_row][new_col]
+            target = board[new_row * BOARD_SIZE + new_col]
             if target == 0:
                 moves.append((new_row, new_col))
             elif get_piece_color(target) != color:
@@ -347,7 +379,7 @@ def get_knight_moves(board, row, col, color):
     for dr, dc in jumps:
         new_row, new_col = row + dr, col + dc
         if is_valid_international_chess_position(new_row, new_col):
-            target = board[new_row][new_col]
+            target = board[new_row * BOARD_SIZE + new_col]
             if get_piece_color(target) != color:
                 moves.append((new_row, new_col))
 
@@ -360,18 +392,18 @@ def get_pawn_moves(board, row, col, color, game=None):
 
     if color == 1:  # 白方兵向上走 (row 增加)
         # 前进一格
-        if is_valid_international_chess_position(row + 1, col) and board[row + 1][col] == 0:
+        if is_valid_international_chess_position(row + 1, col) and board[(row + 1) * BOARD_SIZE + col] == 0:
             moves.append((row + 1, col))
             # 初始位置可以走两格（row=1是白兵初始位置）
-            if row == 1 and is_valid_international_chess_position(row + 2, col) and board[row + 2][col] == 0:
+            if row == 1 and is_valid_international_chess_position(row + 2, col) and board[(row + 2) * BOARD_SIZE + col] == 0:
                 moves.append((row + 2, col))
         # 吃子（斜前方）
         if is_valid_international_chess_position(row + 1, col - 1):
-            target = board[row + 1][col - 1]
+            target = board[(row + 1) * BOARD_SIZE + col - 1]
             if target != 0 and get_piece_color(target) == -1:
                 moves.append((row + 1, col - 1))
         if is_valid_international_chess_position(row + 1, col + 1):
-            target = board[row + 1][col + 1]
+            target = board[(row + 1) * BOARD_SIZE + col + 1]
             if target != 0 and get_piece_color(target) == -1:
                 moves.append((row + 1, col + 1))
 
@@ -387,18 +419,18 @@ def get_pawn_moves(board, row, col, color, game=None):
                         moves.append((row + 1, last['to']['col']))
     else:  # 黑方兵向下走 (row 减小)
         # 前进一格
-        if is_valid_international_chess_position(row - 1, col) and board[row - 1][col] == 0:
+        if is_valid_international_chess_position(row - 1, col) and board[(row - 1) * BOARD_SIZE + col] == 0:
             moves.append((row - 1, col))
             # 初始位置可以走两格（row=6是黑兵初始位置）
-            if row == 6 and is_valid_international_chess_position(row - 2, col) and board[row - 2][col] == 0:
+            if row == 6 and is_valid_international_chess_position(row - 2, col) and board[(row - 2) * BOARD_SIZE + col] == 0:
                 moves.append((row - 2, col))
         # 吃子（斜前方）
         if is_valid_international_chess_position(row - 1, col - 1):
-            target = board[row - 1][col - 1]
+            target = board[(row - 1) * BOARD_SIZE + col - 1]
             if target != 0 and get_piece_color(target) == 1:
                 moves.append((row - 1, col - 1))
         if is_valid_international_chess_position(row - 1, col + 1):
-            target = board[row - 1][col + 1]
+            target = board[(row - 1) * BOARD_SIZE + col + 1]
             if target != 0 and get_piece_color(target) == 1:
                 moves.append((row - 1, col + 1))
 
@@ -418,66 +450,50 @@ def is_check(board, color, game=None):
     """检查指定颜色的王是否被将军"""
     # 找到王的当前位置
     king_piece = WHITE_KING if color == 1 else BLACK_KING
-    king_row, king_col = None, None
-
-    for row in range(8):
-        for col in range(8):
-            if board[row][col] == king_piece:
-                king_row, king_col = row, col
-                break
-        if king_row is not None:
-            break
-
-    if king_row is None:
+    if king_piece not in board:
         return False  # 王不在棋盘上（被吃掉了）
+    king_row, king_col = divmod(board.index(king_piece), BOARD_SIZE)
 
     # 检查敌方棋子是否能攻击到王
     enemy_color = -1 if color == 1 else 1
 
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if get_piece_color(piece) == enemy_color:
-                moves = get_valid_international_chess_moves(board, row, col, game)
-                if (king_row, king_col) in moves:
-                    return True
+    for square, piece in enumerate(board):
+        if get_piece_color(piece) == enemy_color:
+            row, col = divmod(square, BOARD_SIZE)
+            moves = get_valid_international_chess_moves(board, row, col, game)
+            if (king_row, king_col) in moves:
+                return True
 
     return False
 
 
 def has_valid_moves(board, color, game=None):
     """检查指定颜色是否有合法移动"""
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if get_piece_color(piece) == color:
-                moves = get_valid_international_chess_moves(board, row, col, game)
-                for new_row, new_col in moves:
-                    # 模拟移动
-                    original = board[new_row][new_col]
-                    board[new_row][new_col] = board[row][col]
-                    board[row][col] = 0
-                    in_check = is_check(board, color, game)
-                    # 还原
-                    board[row][col] = board[new_row][new_col]
-                    board[new_row][new_col] = original
-                    if not in_check:
-                        return True
+    for square in range(BOARD_SIZE * BOARD_SIZE):
+        piece = board[square]
+        if get_piece_color(piece) == color:
+            row, col = divmod(square, BOARD_SIZE)
+            moves = get_valid_international_chess_moves(board, row, col, game)
+            for new_row, new_col in moves:
+                target = new_row * BOARD_SIZE + new_col
+                # 模拟移动
+                original = board[target]
+                board[target] = piece
+                board[square] = 0
+                in_check = is_check(board, color, game)
+                # 还原
+                board[square] = piece
+                board[target] = original
+                if not in_check:
+                    return True
     return False
 
 
 def check_international_chess_winner(board):
     """检查国际象棋胜负"""
     # 检查双方是否都有王
-    white_king_exists = False
-    black_king_exists = False
-
-    for row in range(8):
-        for col in range(8):
-            if board[row][col] == WHITE_KING:
-                white_king_exists = True
-            elif board[row][col] == BLACK_KING:
-                black_king_exists = True
+    white_king_exists = WHITE_KING in board
+    black_king_exists = BLACK_KING in board
 
     if not white_king_exists:
         return -1  # 黑方获胜
@@ -504,7 +520,7 @@ def check_international_chess_draw(board):
         return True
 
     # 检查棋盘上是否只剩下王（理论上不可能，但也作为平局条件）
-    pieces = [abs(p) for row in board for p in row if p != 0]
+    pieces = [abs(p) for p in board if p != 0]
     if len(pieces) == 2:
         return True  # 王对王
 
@@ -513,82 +529,66 @@ def check_international_chess_draw(board):
 
 def handle_international_chess_move(game, room_id, sid, data):
     """处理国际象棋移动"""
-    from flask_socketio import emit
-
     row = data.get('row')
     col = data.get('col')
     to_row = data.get('to_row')
     to_col = data.get('to_col')
 
     # 检查游戏是否结束
-    if game['game_over']:
-        emit('error', {'message': '游戏已结束'})
+    if game.game_over:
+        transport.emit('error', {'message': '游戏已结束'}, to=sid)
         return
 
     # 检查是否轮到该玩家
-    current_sid = game['white_player'] if game['current_player'] == 1 else game['black_player']
+    current_sid = game.white_player if game.current_player == 1 else game.black_player
     if sid != current_sid:
-        emit('error', {'message': '不是你的回合'})
+        transport.emit('error', {'message': '不是你的回合'}, to=sid)
         return
 
     # 检查位置是否有效
     if not all(is_valid_international_chess_position(r, c) for r, c in [(row, col), (to_row, to_col)]):
-        emit('error', {'message': '位置超出范围'})
+        transport.emit('error', {'message': '位置超出范围'}, to=sid)
         return
 
     # 检查是否有棋子
-    piece = game['board'][row][col]
+    piece = game.board[row * BOARD_SIZE + col]
     if piece == 0:
-        emit('error', {'message': '该位置没有棋子'})
+        transport.emit('error', {'message': '该位置没有棋子'}, to=sid)
         return
 
     # 检查是否是自己的棋子
     color = get_piece_color(piece)
-    if color != game['current_player']:
-        emit('error', {'message': '这是对方的棋子'})
+    if color != game.current_player:
+        transport.emit('error', {'message': '这是对方的棋子'}, to=sid)
         return
 
     # 检查是否是合法移动
-    valid_moves = get_valid_international_chess_moves(game['board'], row, col, game)
+    valid_moves = get_valid_international_chess_moves(game.board, row, col, game)
     if (to_row, to_col) not in valid_moves:
-        emit('error', {'message': '非法移动'})
+        transport.emit('error', {'message': '非法移动'}, to=sid)
         return
 
     # 检查移动后是否会导致己方被将军
-    original = game['board'][to_row][to_col]
-    game['board'][to_row][to_col] = game['board'][row][col]
-    game['board'][row][col] = 0
-
-    if is_check(game['board'], color, game):
-        # 还原棋盘
-        game['board'][row][col] = game['board'][to_row][to_col]
-        game['board'][to_row][to_col] = original
-        emit('error', {'message': '移动后会被将军'})
+    original = game.board[to_row * BOARD_SIZE + to_col]
+    game.board[to_row * BOARD_SIZE + to_col] = game.board[row * BOARD_SIZE + col]
+    game.board[row * BOARD_SIZE + col] = 0
+
+    in_check = is_check(game.board, color, game)
+    # 还原棋盘，合法的移动再经由走棋日志执行
+    game.board[row * BOARD_SIZE + col] = piece
+    game.board[to_row * BOARD_SIZE + to_col] = original
+    if in_check:
+        transport.emit('error', {'message': '移动后会被将军'}, to=sid)
         return
 
-    # 处理王车易位
+    # 王车易位
     castling_move = None
     piece_type = abs(piece)
     if piece_type == 1 and abs(col - to_col) == 2:  # 王移动两格 = 易位
         castling_move = 'short' if to_col > col else 'long'
-        # 移动车
-        if color == 1:  # 白方
-            if castling_move == 'short':
-                game['board'][0][5] = game['board'][0][7]  # 车从 h1 到 f1
-                game['board'][0][7] = 0
-            else:  # long
-                game['board'][0][3] = game['board'][0][0]  # 车从 a1 到 d1
-                game['board'][0][0] = 0
-        else:  # 黑方
-            if castling_move == 'short':
-                game['board'][7][5] = game['board'][7][7]  # 车从 h8 到 f8
-                game['board'][7][7] = 0
-            else:  # long
-                game['board'][7][3] = game['board'][7][0]  # 车从 a8 到 d8
-                game['board'][7][0] = 0
-
-    # 记录移动
-    game['moves'].append({
+
+    # 记录移动（棋盘改动与易位权变化随日志一起保存，悔棋时原样恢复）
+    move = journal.record_move(game, {
         'from': {'row': row, 'col': col},
         'to': {'row': to_row, 'col': to_col},
         'piece': piece,
@@ -596,41 +596,36 @@ def handle_international_chess_move(game, room_id, sid, data):
         'player': color,
         'castling': castling_move
     })
+    move.set_square(to_row * BOARD_SIZE + to_col, piece)
+    move.set_square(row * BOARD_SIZE + col, 0)
+
+    if castling_move:
+        # 移动车：短易位 h 列车到 f 列，长易位 a 列车到 d 列
+        back_rank = 0 if color == 1 else 7 * BOARD_SIZE
+        rook_from, rook_to = (back_rank + 7, back_rank + 5) if castling_move == 'short' else (back_rank, back_rank + 3)
+        move.set_square(rook_to, game.board[rook_from])
+        move.set_square(rook_from, 0)
 
     # 更新王和车的移动状态
+    moved_flag = None
     if piece_type == 1:  # 王
-        if color == 1:
-            game['white_king_moved'] = True
-        else:
-            game['black_king_moved'] = True
+        moved_flag = 'white_king_moved' if color == 1 else 'black_king_moved'
     elif piece_type == 3:  # 车
-        if color == 1:
-            if row == 0 and col == 7:
-                game['white_rook_h1_moved'] = True
-            elif row == 0 and col == 0:
-                game['white_rook_a1_moved'] = True
-        else:
-            if row == 7 and col == 7:
-                game['black_rook_h8_moved'] = True
-            elif row == 7 and col == 0:
-                game['black_rook_a8_moved'] = True
+        moved_flag = ROOK_MOVED_FLAGS.get((color, row, col))
+    if moved_flag and not game.get(moved_flag, False):
+        move.set_field(moved_flag, True)
 
     # 处理吃过路兵
     en_passant_capture = None
     if piece_type == 6 and abs(to_row - row) == 1 and original == 0:
-        # 兵斜走一格且目标是空的 = 吃过路兵
-        if color == 1:  # 白方
-            if game['board'][row][to_col] != 0:  # 原位置有黑兵
-                en_passant_capture = {'row': row, 'col': to_col}
-                game['board'][row][to_col] = 0  # 吃掉对方兵
-        else:  # 黑方
-            if game['board'][row][to_col] != 0:
-                en_passant_capture = {'row': row, 'col': to_col}
-                game['board'][row][to_col] = 0  # 吃掉对方兵
+        # 兵斜走一格且目标是空的 = 吃过路兵，吃掉原位置旁边的对方兵
+        if game.board[row * BOARD_SIZE + to_col] != 0:
+            en_passant_capture = {'row': row, 'col': to_col}
+            move.set_square(row * BOARD_SIZE + to_col, 0)
 
     # 广播移动信息
-    socketio.emit('move_made', {
-        'player': game['current_player'],
+    transport.emit('move_made', {
+        'player': game.current_player,
         'from': {'row': row, 'col': col},
         'to': {'row': to_row, 'col': to_col},
         'piece': piece,
@@ -640,78 +635,79 @@ def handle_international_chess_move(game, room_id, sid, data):
     }, room=room_id)
 
     # 检查胜负
-    winner = check_international_chess_winner(game['board'])
+    winner = check_international_chess_winner(game.board)
     if winner:
-        game['game_over'] = True
-        game['winner'] = winner
+        move.set_field('game_over', True)
+        move.set_field('winner', winner)
         winner_name = '白方' if winner == 1 else '黑方'
-        socketio.emit('game_over', {
+        transport.emit('game_over', {
             'winner': winner,
             'message': f'{winner_name}获胜！'
         }, room=room_id)
         return
 
     # 检查平局
-    if check_international_chess_draw(game['board']):
-        game['game_over'] = True
-        socketio.emit('game_over', {
+    if check_international_chess_draw(game.board):
+        move.set_field('game_over', True)
+        transport.emit('game_over', {
             'winner': 0,
             'message': '和棋！'
         }, room=room_id)
         return
 
     # 切换玩家
-    game['current_player'] = -game['current_player']
-    socketio.emit('turn_changed', {
-        'current_player': game['current_player']
+    move.set_field('current_player', -game.current_player)
+    transport.emit('turn_changed', {
+        'current_player': game.current_player
     }, room=room_id)
 
 
 def reset_international_chess_game(game):
     """重置国际象棋游戏"""
-    game['board'] = initialize_international_chess_board()
-    game['current_player'] = 1
-    game['game_over'] = False
-    game['winner'] = None
-    game['moves'] = []
-    game['white_choice'] = None
-    game['black_choice'] = None
+    game.board = initialize_international_chess_board()
+    game.current_player = 1
+    game.game_over = False
+    game.winner = None
+    game.moves = []
+    game.white_choice = None
+    game.black_choice = None
     # 重置王车易位状态
-    game['white_king_moved'] = False
-    game['black_king_moved'] = False
-    game['white_rook_h1_moved'] = False
-    game['white_rook_a1_moved'] = False
-    game['black_rook_h8_moved'] = False
-    game['black_rook_a8_moved'] = False
+    game.white_king_moved = False
+    game.black_king_moved = False
+    game.white_rook_h1_moved = False
+    game.white_rook_a1_moved = False
+    game.black_rook_h8_moved = False
+    game.black_rook_a8_moved = False
+    zobrist.reset_hash(game)
 
 
 def assign_international_chess_player(game, sid):
     """分配国际象棋玩家颜色"""
-    if game['white_player'] is None:
-        game['white_player'] = sid
+    if game.white_player is None:
+        game.white_player = sid
         return 'white'
-    elif game['black_player'] is None:
-        game['black_player'] = sid
+    elif game.black_player is None:
+        game.black_player = sid
         return 'black'
     return None
 
 
 def record_international_chess_choice(game, sid, choice):
     """记录国际象棋玩家的先后手选择"""
-    if game['white_player'] == sid:
-        game['white_choice'] = choice
-    elif game['black_player'] == sid:
-        game['black_choice'] = choice
+    if game.white_player == sid:
+        game.white_choice = choice
+    elif game.black_player == sid:
+        game.black_choice = choice
 
 
 def should_start_international_chess(game):
     """检查是否可以开始国际象棋游戏"""
-    return game['white_choice'] is not None and game['black_choice'] is not None
+    return game.white_choice is not None and game.black_choice is not None
 
 
 def determine_international_chess_first_player(game):
     """确定国际象棋先后手"""
-    if game['white_choice'] == 'first':
+    if game.white_choice == 'first':
         # 白棋先手（国际象棋默认）
         is_white_first = True
     else:
@@ -722,17 +718,17 @@ def determine_international_chess_first_player(game):
 
 def get_international_chess_current_player_sid(game):
     """获取当前轮到的玩家sid"""
-    return game['white_player'] if game['current_player'] == 1 else game['black_player']
+    return game.white_player if game.current_player == 1 else game.black_player
 
 
 def get_international_chess_opponent_sid(game, sid):
     """获取对手的sid"""
-    return game['black_player'] if sid == game['white_player'] else game['white_player']
+    return game.black_player if sid == game.white_player else game.white_player
 
 
 def handle_international_chess_disconnect(game, sid):
     """处理国际象棋玩家断开连接，返回对手sid"""
-    if game['white_player'] == sid or game['black_player'] == sid:
+    if game.white_player == sid or game.black_player == sid:
         opponent = get_international_chess_opponent_sid(game, sid)
         return [opponent] if opponent else []
     return []
@@ -740,9 +736,9 @@ def handle_international_chess_disconnect(game, sid):
 
 def handle_international_chess_surrender(game, sid):
     """处理国际象棋认输，返回(赢家编号, 赢家sid, 输家sid)"""
-    winner = -1 if sid == game['white_player'] else 1
-    winner_sid = game['white_player'] if winner == 1 else game['black_player']
-    loser_sid = game['black_player'] if winner == 1 else game['white_player']
+    winner = -1 if sid == game.white_player else 1
+    winner_sid = game.white_player if winner == 1 else game.black_player
+    loser_sid = game.black_player if winner == 1 else game.white_player
     return winner, winner_sid, loser_sid
 
 
@@ -756,65 +752,80 @@ def get_international_chess_winner_name(winner):
         return '平局'
 
 
-def execute_international_chess_undo(game, last_move):
-    """执行国际象棋悔棋"""
-    from_row = last_move['from']['row']
-    from_col = last_move['from']['col']
-    to_row = last_move['to']['row']
-    to_col = last_move['to']['col']
-    # 恢复棋子到原位置
-    game['board'][from_row][from_col] = game['board'][to_row][to_col]
-    # 恢复被吃的棋子
-    if last_move.get('captured') != 0:
-        game['board'][to_row][to_col] = last_move['captured']
-    else:
-        game['board'][to_row][to_col] = 0
-
-
 def handle_international_chess_game_start(game):
     """国际象棋确定先后手并通知双方开始游戏"""
     import random
     
-    if game['white_choice'] == game['black_choice']:
-        first_player_sid = random.choice([game['white_player'], game['black_player']])
-        is_white_first = (first_player_sid == game['white_player'])
+    if game.white_choice == game.black_choice:
+        first_player_sid = random.choice([game.white_player, game.black_player])
+        is_white_first = (first_player_sid == game.white_player)
     else:
-        first_choice_sid = game['white_player'] if game['white_choice'] == 'first' else game['black_player']
-        is_white_first = (first_choice_sid == game['white_player'])
+        first_choice_sid = game.white_player if game.white_choice == 'first' else game.black_player
+        is_white_first = (first_choice_sid == game.white_player)
 
+    board = transport.compact(board_rows(game.board, BOARD_SIZE), game.board.tobytes())
     if is_white_first:
-        game['current_player'] = 1
-        socketio.emit('game_start', {
-            'message': '游戏开始！白方先手',
-            'first_player': 'white',
-            'player': 1,
-            'player_color': 'white',
-            'board': game['board'],
-            'current_player': 1
-        }, to=game['white_player'])
-        socketio.emit('game_start', {
+        game.current_player = 1
+        zobrist.reset_hash(game)
+        transport.emit_each('game_start', {
             'message': '游戏开始！白方先手',
             'first_player': 'white',
-            'player': 2,
-            'player_color': 'black',
-            'board': game['board'],
+            'board': board,
             'current_player': 1
-        }, to=game['black_player'])
+        }, [
+            (game.white_player, {'player': 1, 'player_color': 'white'}),
+            (game.black_player, {'player': 2, 'player_color': 'black'}),
+        ])
     else:
-        game['current_player'] = -1
-        socketio.emit('game_start', {
-            'message': '游戏开始！黑方先手',
-            'first_player': 'black',
-            'player': 2,
-            'player_color': 'white',
-            'board': game['board'],
-            'current_player': -1
-        }, to=game['white_player'])
-        socketio.emit('game_start', {
+        game.current_player = -1
+        zobrist.reset_hash(game)
+        transport.emit_each('game_start', {
             'message': '游戏开始！黑方先手',
             'first_player': 'black',
-            'player': 1,
-            'player_color': 'black',
-            'board': game['board'],
+            'board': board,
             'current_player': -1
-        }, to=game['black_player'])
+        }, [
+            (game.white_player, {'player': 2, 'player_color': 'white'}),
+            (game.black_player, {'player': 1, 'player_color': 'black'}),
+        ])
+
+
+def get_international_chess_public_snapshot(game):
+    """观战快照：棋盘"""
+    return {
+        'board': transport.compact(board_rows(game.board, BOARD_SIZE), game.board.tobytes()),
+    }
+
+
+def get_international_chess_snapshot(game, sid):
+    """断线重连后发给玩家的局面快照"""
+    is_white = sid == game.white_player
+    return {
+        'player_color': 'white' if is_white else 'black',
+        'choice': game.white_choice if is_white else game.black_choice,
+        **get_international_chess_public_snapshot(game),
+    }
+
+
+register_game_module(GameModule(
+    game_type='international_chess',
+    display_name='国际象棋',
+    initialize=initialize_international_chess_game,
+    creator_seat='white_player',
+    creator_color='white',
+    seats=('white_player', 'black_player'),
+    assign_player=assign_international_chess_player,
+    record_choice=record_international_chess_choice,
+    should_start=should_start_international_chess,
+    begin_game=handle_international_chess_game_start,
+    move=handle_international_chess_move,
+    reset=reset_international_chess_game,
+    surrender=handle_international_chess_surrender,
+    winner_name=get_international_chess_winner_name,
+    current_player_sid=get_international_chess_current_player_sid,
+    opponent_sid=get_international_chess_opponent_sid,
+    disconnect=handle_international_chess_disconnect,
+    snapshot=get_international_chess_snapshot,
+    spectate=get_international_chess_public_snapshot,
+    undo=journal.revert_move,
+))
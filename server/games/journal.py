@@ -0,0 +1,137 @@
+"""
+走棋日志
+每一步棋加入 game.moves 时附带 'delta'：这一步对房间状态的精确改动，按发生顺序排列的 (键, 旧值, 新值)。
+键为整数时表示棋盘下标（game.board[键]），为字符串时表示房间字段（当前玩家、易位权、吃子列表等）。
+
+- 悔棋：倒序写回旧值，代价与这一步改动的格子数成正比，不需要各游戏自己推算被吃的子、被翻的子
+- 多步悔棋：take_back(game, n) 依次撤销最后 n 步
+- 复盘：replay 从初始局面按顺序写入新值，不需要重新执行规则判断
+
+规则代码在校验通过后调用 record_move 登记这一步，之后对棋盘和字段的修改都经由返回的 MoveRecorder 进行。
+字段的旧值按引用保存，列表类字段需要整体替换（game.red_lost + [...]）而不是原地 append。
+
+房间状态类挂有 Zobrist 表（games.zobrist）时，日志同时增量维护 position_hash 和 position_counts。
+"""
+
+
+class MoveRecorder:
+    """记录一步棋的改动，同时把改动写入房间状态"""
+
+    __slots__ = ('game', 'changes')
+
+    def __init__(self, game, changes):
+        self.game = game
+        self.changes = changes
+
+    def set_square(self, index, value):
+        """修改棋盘 game.board[index]"""
+        game = self.game
+        board = game.board
+        old = board[index]
+        self.changes.append((index, old, value))
+        board[index] = value
+        table = game.zobrist
+        if table is not None:
+            game.position_hash ^= table.square_key(index, old) ^ table.square_key(index, value)
+
+    def set_field(self, name, value):
+        """修改房间字段 game.<name>"""
+        game = self.game
+        old = getattr(game, name)
+        self.changes.append((name, old, value))
+        setattr(game, name, value)
+        table = game.zobrist
+        if table is not None:
+            game.position_hash ^= table.field_key(name, old) ^ table.field_key(name, value)
+
+
+# 日志在每步棋中附加的内部字段（不发给客户端，也不写入对局记录）
+INTERNAL_FIELDS = ('delta', 'hash')
+
+
+def public_move(move):
+    """去掉日志内部字段后的一步棋（对局记录用）"""
+    return {key: value for key, value in move.items() if key not in INTERNAL_FIELDS}
+
+
+def record_move(game, move):
+    """把一步棋加入 game.moves，返回记录这一步改动的 MoveRecorder"""
+    changes = move['delta'] = []
+    if game.zobrist is not None:
+        # 走这步之前的局面计入历史
+        key = move['hash'] = game.position_hash
+        game.position_counts[key] = game.position_counts.get(key, 0) + 1
+    game.moves.append(move)
+    return MoveRecorder(game, changes)
+
+
+def _hash_change(table, key, old, new):
+    """一项改动对局面哈希的影响（异或后即为改动前 / 改动后的哈希）"""
+    if key.__class__ is int:
+        return table.square_key(key, old) ^ table.square_key(key, new)
+    return table.field_key(key, old) ^ table.field_key(key, new)
+
+
+def apply_delta(game, delta):
+    """按顺序写入新值（重做 / 复盘）"""
+    board = game.board
+    for key, _, new in delta:
+        if key.__class__ is int:
+            board[key] = new
+        else:
+            setattr(game, key, new)
+    _rehash(game, delta)
+
+
+def revert_delta(game, delta):
+    """倒序写回旧值（悔棋）"""
+    board = game.board
+    for key, old, _ in reversed(delta):
+        if key.__class__ is int:
+            board[key] = old
+        else:
+            setattr(game, key, old)
+    _rehash(game, delta)
+
+
+def _rehash(game, delta):
+    """按改动更新局面哈希；异或与顺序无关，重做和悔棋共用"""
+    table = game.zobrist
+    if table is None:
+        return
+    position_hash = game.position_hash
+    for key, old, new in delta:
+        position_hash ^= _hash_change(table, key, old, new)
+    game.position_hash = position_hash
+
+
+def revert_move(game, move):
+    """撤销一步已从 game.moves 中取出的棋"""
+    revert_delta(game, move.get('delta', ()))
+    key = move.get('hash')
+    if key is not None:
+        count = game.position_counts.get(key, 0) - 1
+        if count > 0:
+            game.position_counts[key] = count
+        else:
+            game.position_counts.pop(key, None)
+
+
+def take_back(game, count=1):
+    """撤销最后 count 步，返回被撤销的走棋记录（最后一步在前）"""
+    undone = []
+    while game.moves and len(undone) < count:
+        move = game.moves.pop()
+        revert_move(game, move)
+        undone.append(move)
+    return undone
+
+
+def replay(game, moves):
+    """在 game 的当前局面上依次重做 moves（通常是重置后的初始局面）"""
+    for move in moves:
+        if game.zobrist is not None:
+            key = move['hash'] = game.position_hash
+            game.position_counts[key] = game.position_counts.get(key, 0) + 1
+        apply_delta(game, move.get('delta', ()))
+        game.moves.append(move)
@@ -2,81 +2,103 @@
 黑白棋游戏逻辑
 """
 
-# 全局变量，由主程序设置
-socketio = None
-games = None
+from . import journal, transport, zobrist
+from .registry import GameModule, register_game_module
+from .state import GameState, board_rows
+
+# 棋盘大小；棋盘为一维 bytearray，下标 row * BOARD_SIZE + col，0 空 / 1 黑 / 2 白
+BOARD_SIZE = 8
+
+
+# Zobrist 局面哈希键表
+ZOBRIST = zobrist.ZobristTable('othello', BOARD_SIZE * BOARD_SIZE, (1, 2), {'current_player': (1, 2)})
+
+
+class OthelloState(GameState):
+    """黑白棋房间状态"""
+    __slots__ = ('black_player', 'white_player', 'black_choice', 'white_choice', 'board')
+    zobrist = ZOBRIST
 
 
 def initialize_othello_game(sid):
     """初始化黑白棋游戏数据"""
-    return {
-        'game_type': 'othello',
-        'black_player': None,
-        'white_player': None,
-        'black_choice': None,
-        'white_choice': None,
-        'board': initialize_othello_board(),
-        'current_player': 1,
-        'game_over': False,
-        'winner': None,
-        'moves': [],
-        'undo_requested': False,
-        'last_undo_player': None
-    }
+    return zobrist.reset_hash(OthelloState(
+        game_type='othello',
+        black_player=None,
+        white_player=None,
+        black_choice=None,
+        white_choice=None,
+        board=initialize_othello_board(),
+    ))
 
 
 def initialize_othello_board():
     """初始化黑白棋棋盘"""
-    board = [[0]*8 for _ in range(8)]
+    board = bytearray(BOARD_SIZE * BOARD_SIZE)
     # 初始四个棋子：中心位置
-    board[3][3] = 2  # 白
-    board[3][4] = 1  # 黑
-    board[4][3] = 1  # 黑
-    board[4][4] = 2  # 白
+    board[3 * BOARD_SIZE + 3] = 2  # 白
+    board[3 * BOARD_SIZE + 4] = 1  # 黑
+    board[4 * BOARD_SIZE + 3] = 1  # 黑
+    board[4 * BOARD_SIZE + 4] = 2  # 白
     return board
 
 
-def get_othello_flips(board, row, col, player):
-    """获取落子后能翻转的棋子位置"""
-    if board[row][col] != 0:
-        return []
-
-    opponent = 3 - player
-    all_flips = []
-
-    # 8个方向
+def _build_rays():
+    """每个格子向 8 个方向延伸到棋盘边缘的下标序列"""
     directions = [
         (-1, -1), (-1, 0), (-1, 1),
         (0, -1),          (0, 1),
         (1, -1), (1, 0), (1, 1)
     ]
+    rays = []
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            square_rays = []
+            for dr, dc in directions:
+                ray = []
+                r, c = row + dr, col + dc
+                while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+                    ray.append(r * BOARD_SIZE + c)
+                    r += dr
+                    c += dc
+                if len(ray) >= 2:  # 至少隔一个对手棋子才可能翻转
+                    square_rays.append(tuple(ray))
+            rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+RAYS = _build_rays()
 
-    for dr, dc in directions:
-        flips = []
-        r, c = row + dr, col + dc
 
+def get_othello_flips(board, row, col, player):
+    """获取落子后能翻转的棋子下标"""
+    point = row * BOARD_SIZE + col
+    if board[point] != 0:
+        return []
+
+    opponent = 3 - player
+    all_flips = []
+
+    for ray in RAYS[point]:
         # 沿着这个方向前进
-        while 0 <= r < 8 and 0 <= c < 8:
-            if board[r][c] == opponent:
-                flips.append((r, c))
-            elif board[r][c] == player:
+        for distance, square in enumerate(ray):
+            stone = board[square]
+            if stone == opponent:
+                continue
+            if stone == player and distance:
                 # 找到己方棋子，可以翻转中间的对手棋子
-                all_flips.extend(flips)
-                break
-            else:
-                # 遇到空位，这个方向不能翻转
-                break
-            r += dr
-            c += dc
+                all_flips.extend(ray[:distance])
+            # 遇到空位或紧邻己方棋子，这个方向不能翻转
+            break
 
     return all_flips
 
 
 def is_valid_othello_move(board, row, col, player):
     """检查落子是否合法"""
-    if not (0 <= row < 8 and 0 <= col < 8):
+    if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
         return False
-    if board[row][col] != 0:
+    if board[row * BOARD_SIZE + col] != 0:
         return False
 
     flips = get_othello_flips(board, row, col, player)
@@ -86,38 +108,31 @@ def is_valid_othello_move(board, row, col, player):
 def get_valid_othello_moves(board, player):
     """获取所有合法的落子位置"""
     valid_moves = []
-    for row in range(8):
-        for col in range(8):
-            if is_valid_othello_move(board, row, col, player):
+    for point, stone in enumerate(board):
+        if stone == 0:
+            row, col = divmod(point, BOARD_SIZE)
+            if get_othello_flips(board, row, col, player):
                 valid_moves.append((row, col))
     return valid_moves
 
 
 def can_play_othello_move(board, player):
     """检查某个玩家是否有合法落子位置"""
-    return len(get_valid_othello_moves(board, player)) > 0
+    for point, stone in enumerate(board):
+        if stone == 0 and get_othello_flips(board, point // BOARD_SIZE, point % BOARD_SIZE, player):
+            return True
+    return False
 
 
 def is_othello_board_full(board):
     """检查棋盘是否已满"""
-    for row in range(8):
-        for col in range(8):
-            if board[row][col] == 0:
-                return False
-    return True
+    return 0 not in board
 
 
 def determine_othello_winner(board):
     """确定黑白棋胜负"""
-    black_count = 0
-    white_count = 0
-
-    for row in range(8):
-        for col in range(8):
-            if board[row][col] == 1:
-                black_count += 1
-            elif board[row][col] == 2:
-                white_count += 1
+    black_count = board.count(1)
+    white_count = board.count(2)
 
     if black_count > white_count:
         return 1  # 黑棋胜
@@ -129,78 +144,76 @@ def determine_othello_winner(board):
 
 def handle_othello_move(game, room_id, sid, data):
     """处理黑白棋落子"""
-    from flask_socketio import emit
-
     row = data.get('row')
     col = data.get('col')
 
     # 检查游戏是否结束
-    if game['game_over']:
-        emit('error', {'message': '游戏已结束'})
+    if game.game_over:
+        transport.emit('error', {'message': '游戏已结束'}, to=sid)
         return
 
     # 检查是否轮到该玩家
-    current_sid = game['black_player'] if game['current_player'] == 1 else game['white_player']
+    current_sid = game.black_player if game.current_player == 1 else game.white_player
     if sid != current_sid:
-        emit('error', {'message': '不是你的回合'})
+        transport.emit('error', {'message': '不是你的回合'}, to=sid)
         return
 
     # 检查位置是否有效
-    if not (0 <= row < 8 and 0 <= col < 8):
-        emit('error', {'message': '位置超出范围'})
+    if not (0 <= row < BOARD_SIZE and 0 <= col < BOARD_SIZE):
+        transport.emit('error', {'message': '位置超出范围'}, to=sid)
         return
 
-    if game['board'][row][col] != 0:
-        emit('error', {'message': '该位置已有棋子'})
+    if game.board[row * BOARD_SIZE + col] != 0:
+        transport.emit('error', {'message': '该位置已有棋子'}, to=sid)
         return
 
     # 检查是否是合法的落子位置
-    current_player = game['current_player']
-    flips = get_othello_flips(game['board'], row, col, current_player)
+    current_player = game.current_player
+    flips = get_othello_flips(game.board, row, col, current_player)
 
     if not flips:
-        emit('error', {'message': '必须放置在能翻转对手棋子的位置'})
+        transport.emit('error', {'message': '必须放置在能翻转对手棋子的位置'}, to=sid)
         return
 
-    # 执行落子和翻转
-    game['board'][row][col] = current_player
-    for fr, fc in flips:
-        game['board'][fr][fc] = current_player
-
-    # 记录移动
-    game['moves'].append({
+    # 记录移动，执行落子和翻转（被翻转的子随日志一起保存，悔棋时翻回）
+    move = journal.record_move(game, {
         'row': row,
         'col': col,
-        'player': current_player
+        'player': current_player,
+        'flipped': [divmod(point, BOARD_SIZE) for point in flips]
     })
+    move.set_square(row * BOARD_SIZE + col, current_player)
+    for point in flips:
+        move.set_square(point, current_player)
 
     # 检查游戏状态
     opponent = 3 - current_player
 
     # 广播落子信息
-    socketio.emit('move_made', {
+    opponent_can_play = can_play_othello_move(game.board, opponent)
+    transport.emit('move_made', {
         'player': current_player,
         'move': {'row': row, 'col': col},
-        'current_player': opponent if can_play_othello_move(game['board'], opponent) else current_player
+        'current_player': opponent if opponent_can_play else current_player
     }, room=room_id)
 
-    if can_play_othello_move(game['board'], opponent):
+    if opponent_can_play:
         # 对方可以落子，切换回合
-        game['current_player'] = opponent
-    elif can_play_othello_move(game['board'], current_player):
+        move.set_field('current_player', opponent)
+    elif can_play_othello_move(game.board, current_player):
         # 对方无法落子，当前玩家继续
         pass
     else:
         # 双方都无法落子，游戏结束
-        winner = determine_othello_winner(game['board'])
-        game['game_over'] = True
-        game['winner'] = winner
+        winner = determine_othello_winner(game.board)
+        move.set_field('game_over', True)
+        move.set_field('winner', winner)
 
         winner_name = '黑方' if winner == 1 else '白方'
         if winner == 0:
             winner_name = '平局'
 
-        socketio.emit('game_over', {
+        transport.emit('game_over', {
             'winner': winner_name,
             'message': f'{winner_name}！'
         }, room=room_id)
@@ -208,42 +221,43 @@ def handle_othello_move(game, room_id, sid, data):
 
 def reset_othello_game(game):
     """重置黑白棋游戏"""
-    game['board'] = initialize_othello_board()
-    game['current_player'] = 1
-    game['game_over'] = False
-    game['winner'] = None
-    game['moves'] = []
-    game['black_choice'] = None
-    game['white_choice'] = None
+    game.board = initialize_othello_board()
+    game.current_player = 1
+    game.game_over = False
+    game.winner = None
+    game.moves = []
+    game.black_choice = None
+    game.white_choice = None
+    zobrist.reset_hash(game)
 
 
 def assign_othello_player(game, sid):
     """分配黑白棋玩家颜色"""
-    if game['black_player'] is None:
-        game['black_player'] = sid
+    if game.black_player is None:
+        game.black_player = sid
         return 'black'
-    elif game['white_player'] is None:
-        game['white_player'] = sid
+    elif game.white_player is None:
+        game.white_player = sid
         return 'white'
     return None
 
 
 def record_othello_choice(game, sid, choice):
     """记录黑白棋玩家的先后手选择"""
-    if game['black_player'] == sid:
-        game['black_choice'] = choice
-    elif game['white_player'] == sid:
-        game['white_choice'] = choice
+    if game.black_player == sid:
+        game.black_choice = choice
+    elif game.white_player == sid:
+        game.white_choice = choice
 
 
 def should_start_othello(game):
     """检查是否可以开始黑白棋游戏"""
-    return game['black_choice'] is not None and game['white_choice'] is not None
+    return game.black_choice is not None and game.white_choice is not None
 
 
 def determine_othello_first_player(game):
     """确定黑白棋先后手"""
-    if game['black_choice'] == 'first':
+    if game.black_choice == 'first':
         # 黑棋先手
         is_black_first = True
     else:
@@ -254,17 +268,17 @@ def determine_othello_first_player(game):
 
 def get_othello_current_player_sid(game):
     """获取当前轮到的玩家sid"""
-    return game['black_player'] if game['current_player'] == 1 else game['white_player']
+    return game.black_player if game.current_player == 1 else game.white_player
 
 
 def get_othello_opponent_sid(game, sid):
     """获取对手的sid"""
-    return game['white_player'] if sid == game['black_player'] else game['black_player']
+    return game.white_player if sid == game.black_player else game.black_player
 
 
 def handle_othello_disconnect(game, sid):
     """处理黑白棋玩家断开连接，返回对手sid"""
-    if game['black_player'] == sid or game['white_player'] == sid:
+    if game.black_player == sid or game.white_player == sid:
         opponent = get_othello_opponent_sid(game, sid)
         return [opponent] if opponent else []
     return []
@@ -272,9 +286,9 @@ def handle_othello_disconnect(game, sid):
 
 def handle_othello_surrender(game, sid):
     """处理黑白棋认输，返回(赢家编号, 赢家sid, 输家sid)"""
-    winner = 2 if sid == game['black_player'] else 1
-    winner_sid = game['black_player'] if winner == 1 else game['white_player']
-    loser_sid = game['white_player'] if winner == 1 else game['black_player']
+    winner = 2 if sid == game.black_player else 1
+    winner_sid = game.black_player if winner == 1 else game.white_player
+    loser_sid = game.white_player if winner == 1 else game.black_player
     return winner, winner_sid, loser_sid
 
 
@@ -288,32 +302,55 @@ def get_othello_winner_name(winner):
         return '平局'
 
 
-def execute_othello_undo(game, last_move):
-    """执行黑白棋悔棋"""
-    row = last_move['row']
-    col = last_move['col']
-    game['board'][row][col] = 0
-    # 恢复被翻转的棋子
-    if 'flipped' in last_move:
-        for flipped_pos in last_move['flipped']:
-            game['board'][flipped_pos['row']][flipped_pos['col']] = flipped_pos['old_color']
-
-
 def handle_othello_game_start(game):
     """黑白棋开始游戏（黑棋总是先手）"""
-    socketio.emit('game_start', {
-        'message': '游戏开始！黑棋先手',
-        'first_player': 'black',
-        'player': 1,
-        'player_color': 'black',
-        'board': game['board'],
-        'current_player': 1
-    }, to=game['black_player'])
-    socketio.emit('game_start', {
-        'message': '游戏开始！白棋后手',
+    transport.emit_each('game_start', {
         'first_player': 'black',
-        'player': 2,
-        'player_color': 'white',
-        'board': game['board'],
+        'board': transport.compact(board_rows(game.board, BOARD_SIZE), bytes(game.board)),
         'current_player': 1
-    }, to=game['white_player'])
+    }, [
+        (game.black_player, {'message': '游戏开始！黑棋先手', 'player': 1, 'player_color': 'black'}),
+        (game.white_player, {'message': '游戏开始！白棋后手', 'player': 2, 'player_color': 'white'}),
+    ])
+
+
+def get_othello_public_snapshot(game):
+    """观战快照：棋盘"""
+    return {
+        'board': transport.compact(board_rows(game.board, BOARD_SIZE), bytes(game.board)),
+    }
+
+
+def get_othello_snapshot(game, sid):
+    """断线重连后发给玩家的局面快照"""
+    is_black = sid == game.black_player
+    return {
+        'player': 1 if is_black else 2,
+        'player_color': 'black' if is_black else 'white',
+        'choice': game.black_choice if is_black else game.white_choice,
+        **get_othello_public_snapshot(game),
+    }
+
+
+register_game_module(GameModule(
+    game_type='othello',
+    display_name='黑白棋',
+    initialize=initialize_othello_game,
+    creator_seat='black_player',
+    creator_color='black',
+    seats=('black_player', 'white_player'),
+    assign_player=assign_othello_player,
+    record_choice=record_othello_choice,
+    should_start=should_start_othello,
+    begin_game=handle_othello_game_start,
+    move=handle_othello_move,
+    reset=reset_othello_game,
+    surrender=handle_othello_surrender,
+    winner_name=get_othello_winner_name,
+    current_player_sid=get_othello_current_player_sid,
+    opponent_sid=get_othello_opponent_sid,
+    disconnect=handle_othello_disconnect,
+    snapshot=get_othello_snapshot,
+    spectate=get_othello_public_snapshot,
+    undo=journal.revert_move,
+))
@@ -0,0 +1,146 @@
+"""
+游戏模块注册表
+各游戏模块在导入时声明自己的处理函数，服务器据此一次性构建
+(事件, 游戏类型) -> 处理函数 的扁平分发表，事件处理时无需再拼接函数名查找
+"""
+
+# 分发表事件名 -> GameModule 字段名
+DISPATCH_EVENTS = {
+    'create_room': 'initialize',          # initialize(sid) -> game
+    'room_options': 'room_options',       # room_options(game, data) -> room_created 附加字段，按建房数据设置房间规则，非法时抛 ValueError
+    'join_room': 'join',                  # join(game, sid) -> room_joined 附加字段 或 None（已满）
+    'after_join': 'after_join',           # after_join(game, room_id)
+    'choose_color': 'record_choice',      # record_choice(game, sid, choice)
+    'should_start': 'should_start',       # should_start(game) -> bool
+    'begin_game': 'begin_game',           # begin_game(game)，双方选择完先后手后开始
+    'start_game': 'host_start',           # host_start(game, room_id, sid) -> (success, error_message)
+    'make_move': 'move',                  # move(game, room_id, sid, data)
+    'pass_turn': 'pass_turn',             # pass_turn(game, room_id, sid, data)，停一手（斗地主的不出牌由 app 直接处理）
+    'play_again': 'reset',                # reset(game)
+    'surrender': 'surrender',             # surrender(game, sid) -> (winner, winner_sid, loser_sid)
+    'winner_name': 'winner_name',         # winner_name(winner) -> str
+    'current_player_sid': 'current_player_sid',  # current_player_sid(game) -> sid
+    'opponent_sid': 'opponent_sid',       # opponent_sid(game, sid) -> sid
+    'disconnect': 'disconnect',           # disconnect(game, sid) -> [其他玩家sid]
+    'undo': 'undo',                       # undo(game, last_move)
+    'phase': 'phase',                     # phase(game) -> 'waiting' / 'choosing' / 'playing' / 'game_over'
+    'rebind': 'rebind',                   # rebind(game, old_sid, new_sid)，断线重连后把座位改绑到新连接
+    'snapshot': 'snapshot',               # snapshot(game, sid) -> 该玩家可见的局面快照（resumed 附加字段）
+    'spectate': 'spectate',               # spectate(game) -> 观战快照，只含各方都能看到的局面（watching 附加字段）
+    'rules': 'rules',                     # rules(game) -> 建房时设置的房间规则（写入对局记录，供复盘和争议处理）
+}
+
+
+class GameModule:
+    """游戏模块声明"""
+
+    __slots__ = (
+        'game_type', 'display_name', 'creator_seat', 'creator_color', 'creator_number',
+        'seats', 'reset_message', 'broadcast_game_over',
+    ) + tuple(DISPATCH_EVENTS.values())
+
+    def __init__(self, game_type, display_name, initialize, *,
+                 room_options=None, creator_seat=None, creator_color=None, creator_number=None,
+                 seats=None, assign_player=None, join=None, after_join=None,
+                 record_choice=None, should_start=None, begin_game=None, host_start=None,
+                 move=None, pass_turn=None, reset=None, reset_message='请重新选择先后手',
+                 surrender=None, winner_name=None, broadcast_game_over=False,
+                 current_player_sid=None, opponent_sid=None, disconnect=None, undo=None, phase=None,
+                 rebind=None, snapshot=None, spectate=None, rules=None):
+        self.game_type = game_type
+        self.display_name = display_name
+        self.initialize = initialize
+        self.room_options = room_options
+        # 房主创建房间时占用的座位及返回给房主的身份
+        self.creator_seat = creator_seat
+        self.creator_color = creator_color
+        self.creator_number = creator_number
+        # 座位字段，全部坐满后通知双方选择先后手（None 表示不自动通知）
+        self.seats = seats
+        if join is None and assign_player is not None:
+            join = _color_join(assign_player)
+        self.join = join
+        self.after_join = after_join
+        self.record_choice = record_choice
+        self.should_start = should_start
+        self.begin_game = begin_game
+        self.host_start = host_start
+        self.move = move
+        self.pass_turn = pass_turn
+        self.reset = reset
+        self.reset_message = reset_message
+        self.surrender = surrender
+        self.winner_name = winner_name
+        # 认输结果是否广播给整个房间（否则分别发送给赢家和输家）
+        self.broadcast_game_over = broadcast_game_over
+        self.current_player_sid = current_player_sid
+        self.opponent_sid = opponent_sid
+        self.disconnect = disconnect
+        self.undo = undo
+        # 房间所处阶段，用于空闲房间回收；默认按座位是否坐满、是否可以开始判断
+        if phase is None and seats:
+            phase = _seat_phase(seats, should_start)
+        self.phase = phase
+        # 默认改写所有值为旧 sid 的字段（各座位 *_player / playerN、悔棋请求方等）
+        self.rebind = rebind or rebind_fields
+        self.snapshot = snapshot
+        self.spectate = spectate
+        self.rules = rules
+
+
+def _color_join(assign_player):
+    """由只返回颜色的座位分配函数构造 join 处理函数"""
+    def join(game, sid):
+        player_color = assign_player(game, sid)
+        if player_color is None:
+            return None
+        return {'player_color': player_color}
+    return join
+
+
+def rebind_fields(game, old_sid, new_sid):
+    """把房间状态中值为 old_sid 的字段改为 new_sid"""
+    for name, value in game.items():
+        if value == old_sid:
+            game[name] = new_sid
+
+
+def _seat_phase(seats, should_start):
+    """由座位字段和开始条件构造 phase 处理函数"""
+    def phase(game):
+        if game['game_over']:
+            return 'game_over'
+        if not all(game[seat] for seat in seats):
+            return 'waiting'
+        if should_start is not None and not should_start(game):
+            return 'choosing'
+        return 'playing'
+    return phase
+
+
+# game_type -> GameModule
+GAME_REGISTRY = {}
+
+
+def register_game_module(module):
+    """注册游戏模块"""
+    if module.game_type in GAME_REGISTRY:
+        raise ValueError(f'游戏类型重复注册: {module.game_type}')
+    GAME_REGISTRY[module.game_type] = module
+    return module
+
+
+def get_game_module(game_type):
+    """获取游戏模块声明"""
+    return GAME_REGISTRY.get(game_type)
+
+
+def build_dispatch_table():
+    """构建 (事件, 游戏类型) -> 处理函数 的分发表"""
+    table = {}
+    for game_type, module in GAME_REGISTRY.items():
+        for event, field in DISPATCH_EVENTS.items():
+            handler = getattr(module, field)
+            if handler is not None:
+                table[(event, game_type)] = handler
+    return table
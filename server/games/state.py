@@ -0,0 +1,89 @@
+"""
+房间状态对象
+各游戏的房间状态是 GameState 的子类，字段用 __slots__ 声明，没有每个房间一份的属性字典；
+棋盘为一维 bytearray / array（下标 row * 列数 + col），棋子用整数编码，
+发送给客户端时再由各游戏的转换函数生成原有的 JSON 格式（二维列表、棋子字典等）。
+
+为兼容服务器中按键访问房间状态的写法，GameState 同时支持 game['board'] / game.get('board') / 'board' in game，
+未赋值的字段视为不存在的键。规则代码中直接使用属性访问（game.board）。
+"""
+
+
+class GameState:
+    """房间状态基类：服务器通用字段"""
+
+    __slots__ = (
+        'game_type', 'current_player', 'game_over', 'winner', 'moves',
+        'undo_requested', 'undo_requester_sid', 'last_undo_player', 'last_active',
+        'position_hash', 'position_counts', 'away', 'started_at', 'record_id',
+    )
+
+    # 局面哈希表（games.zobrist.ZobristTable），由支持局面哈希的游戏在子类上设置
+    zobrist = None
+
+    # 所有字段名（含父类），由 __init_subclass__ 计算
+    _fields = frozenset(__slots__)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = set()
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get('__slots__', ())
+            fields.update((slots,) if isinstance(slots, str) else slots)
+        cls._fields = frozenset(fields)
+
+    def __init__(self, **fields):
+        self.current_player = 1
+        self.game_over = False
+        self.winner = None
+        self.moves = []
+        self.undo_requested = False
+        self.last_undo_player = None
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(f'{type(self).__name__} 没有字段 {key}')
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self._fields and hasattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self._fields:
+            return default
+        return getattr(self, key, default)
+
+    def keys(self):
+        return [name for name in sorted(self._fields) if hasattr(self, name)]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def __getstate__(self):
+        return dict(self.items())
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.get("game_type")}>'
+
+
+def board_rows(board, width):
+    """一维棋盘转换为二维列表（发送给客户端）"""
+    return [list(board[start:start + width]) for start in range(0, len(board), width)]
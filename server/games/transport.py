@@ -0,0 +1,179 @@
+"""
+事件发送接口
+规则模块只通过本模块向客户端发送事件，不依赖 Flask-SocketIO，可以脱离服务器单独导入和运行
+（机器人、基准测试、批量模拟、子进程）
+- 服务器启动时用 bind_transport(socketio) 绑定实际的发送方：任何提供 emit(event, data, to=...) 的对象
+- 未绑定时事件直接丢弃；record_events() 在代码块内记录发送的事件，用于模拟和调试
+规则模块中没有请求上下文，发给请求方的消息（如错误提示）必须用 to=sid 指定接收方
+
+减少编码和发包次数：
+- emit_each(event, shared, recipients)：同一事件发给多个接收方，公共字段只编码一次，每个接收方只编码自己不同的字段
+  （需要发送方声明 encoded_payloads，并以 WireJSON 作为 SocketIO 的 json 模块；其他发送方收到的是普通字典）
+- batch(target)：代码块内发给 target 的多个事件在块结束时合并发送（发送方提供 emit_batch 时为一个数据包）
+- compact(value, packed)：棋盘、手牌等列表数据附带紧凑编码，使用二进制协议的客户端收到 packed（见服务器的 wire.py）
+"""
+
+import contextlib
+import json
+import threading
+
+# 与 python-socketio 编码数据包时使用的分隔符一致
+_SEPARATORS = (',', ':')
+
+
+def _dumps(data):
+    return json.dumps(data, separators=_SEPARATORS)
+
+
+class Encoded:
+    """已编码为 JSON 的事件数据：text 由 WireJSON 原样拼入数据包，data 为对应的原始数据"""
+
+    __slots__ = ('data', 'text')
+
+    def __init__(self, data, text=None):
+        self.data = data
+        self.text = _dumps(data) if text is None else text
+
+    def patched(self, fields):
+        """在公共数据上加入接收方自己的字段（不能与公共字段重名），只编码 fields"""
+        if not fields:
+            return self
+        if self.text == '{}':
+            return Encoded(fields)
+        return Encoded({**self.data, **fields}, _dumps(fields)[:-1] + ',' + self.text[1:])
+
+
+class Compact(list):
+    """附带紧凑编码的列表数据：JSON 中即列表本身，二进制协议中为 packed（bytes）"""
+
+    __slots__ = ('packed',)
+
+
+def compact(value, packed):
+    """把列表数据 value 标记为二进制协议中发送 packed"""
+    data = Compact(value)
+    data.packed = packed
+    return data
+
+
+class WireJSON:
+    """SocketIO 使用的 json 模块：数据包中的 Encoded 直接使用已编码的文本"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        if obj.__class__ is Encoded:
+            return obj.text
+        if obj.__class__ is list and any(item.__class__ in (Encoded, list) for item in obj):
+            return '[' + ','.join(WireJSON.dumps(item, **kwargs) for item in obj) + ']'
+        return json.dumps(obj, **kwargs)
+
+    @staticmethod
+    def loads(*args, **kwargs):
+        return json.loads(*args, **kwargs)
+
+
+class NullTransport:
+    """丢弃所有事件（未绑定服务器时的默认值）"""
+
+    def emit(self, event, data=None, **kwargs):
+        pass
+
+
+class EventRecorder:
+    """记录发送的事件，events 为 [(事件名, 数据, 接收方)]"""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, data=None, to=None, room=None, **kwargs):
+        if data.__class__ is Encoded:
+            data = data.data
+        self.events.append((event, data, to if to is not None else room))
+
+    def named(self, event):
+        """返回指定事件的 [(数据, 接收方)]"""
+        return [(data, target) for name, data, target in self.events if name == event]
+
+    def clear(self):
+        self.events.clear()
+
+
+_transport = NullTransport()
+# 当前协程中正在合并的事件（batch），eventlet 下 threading.local 按协程隔离
+_local = threading.local()
+
+
+def bind_transport(transport):
+    """绑定发送方（None 表示恢复为丢弃），返回之前绑定的发送方"""
+    global _transport
+    previous = _transport
+    _transport = transport if transport is not None else NullTransport()
+    return previous
+
+
+def get_transport():
+    return _transport
+
+
+def emit(event, data=None, **kwargs):
+    """发送事件；to / room 指定接收方（sid 或房间号）"""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        if len(kwargs) == 1 and kwargs.get('to', kwargs.get('room')) == pending[0]:
+            pending[1].append((event, data))
+            return
+        # 发给其他接收方之前先发出已合并的事件，保持事件顺序
+        _flush(pending)
+    _transport.emit(event, data, **kwargs)
+
+
+def emit_each(event, shared, recipients):
+    """同一事件发给多个接收方：shared 为公共字段，recipients 为 [(接收方, 该接收方的字段)]，接收方为 None 时跳过"""
+    if getattr(_transport, 'encoded_payloads', False):
+        body = Encoded(shared)
+        for target, fields in recipients:
+            if target is not None:
+                emit(event, body.patched(fields), to=target)
+    else:
+        for target, fields in recipients:
+            if target is not None:
+                emit(event, {**shared, **fields}, to=target)
+
+
+def _flush(pending):
+    target, events = pending
+    if not events:
+        return
+    batch_events = events[:]
+    events.clear()
+    send_batch = getattr(_transport, 'emit_batch', None)
+    if len(batch_events) > 1 and send_batch is not None:
+        send_batch(batch_events, target)
+    else:
+        for event, data in batch_events:
+            _transport.emit(event, data, to=target)
+
+
+@contextlib.contextmanager
+def batch(target):
+    """代码块内发给 target 的事件在块结束时一起发送（如一步棋的 move_made、check、turn_changed）；嵌套时沿用外层"""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    pending = _local.pending = (target, [])
+    try:
+        yield
+    finally:
+        _local.pending = None
+        _flush(pending)
+
+
+@contextlib.contextmanager
+def record_events():
+    """在代码块内记录发送的事件：with record_events() as recorder: ..."""
+    recorder = EventRecorder()
+    previous = bind_transport(recorder)
+    try:
+        yield recorder
+    finally:
+        bind_transport(previous)
@@ -0,0 +1,65 @@
+"""
+Zobrist 局面哈希
+每个游戏在模块加载时建一张 ZobristTable：每个格子上每种棋子一个 64 位随机键，
+另外为影响局面身份的字段（轮到谁走、易位权等）的每个取值各一个键。局面哈希是所有非空格子和字段取值的键的异或。
+
+房间状态类把表挂在类属性 zobrist 上，走棋日志（games.journal）每改动一个格子或字段就异或掉旧键、异或上新键，
+落子和悔棋都是 O(1) 更新，不需要重新扫描棋盘：
+- game.position_hash：当前局面的哈希
+- game.position_counts：已出现过的局面（不含当前局面）-> 出现次数，每步棋在 moves 中的 'hash' 是走这步之前的局面
+随机键由游戏名作种子生成，同一局面在不同进程 / worker 中的哈希相同，可以直接用于缓存和统计。
+"""
+
+import random
+
+HASH_BITS = 64
+
+
+class ZobristTable:
+    """一个游戏的 Zobrist 随机键表"""
+
+    __slots__ = ('name', 'squares', 'fields')
+
+    def __init__(self, name, size, values, fields=None):
+        """size 个格子，每格可能的非空取值 values；fields 为 {字段名: 该字段需要区分的取值}，空值（0 / False / None）不计入"""
+        rng = random.Random(f'zobrist:{name}')
+        self.name = name
+        self.squares = tuple({value: rng.getrandbits(HASH_BITS) for value in values} for _ in range(size))
+        self.fields = {
+            field: {value: rng.getrandbits(HASH_BITS) for value in field_values}
+            for field, field_values in (fields or {}).items()
+        }
+
+    def square_key(self, index, value):
+        """格子 index 上为 value 时的键，空格为 0"""
+        return self.squares[index].get(value, 0)
+
+    def field_key(self, name, value):
+        """字段 name 取 value 时的键，不参与哈希的字段或取值为 0"""
+        keys = self.fields.get(name)
+        return keys.get(value, 0) if keys else 0
+
+    def hash_position(self, game):
+        """从头计算局面哈希（初始化、重置时使用）"""
+        key = 0
+        squares = self.squares
+        for index, value in enumerate(game.board):
+            if value:
+                key ^= squares[index].get(value, 0)
+        for name, keys in self.fields.items():
+            key ^= keys.get(game.get(name), 0)
+        return key
+
+
+def reset_hash(game):
+    """按当前棋盘和字段重新计算局面哈希并清空局面历史，返回 game"""
+    game.position_hash = game.zobrist.hash_position(game)
+    game.position_counts = {}
+    return game
+
+
+def position_count(game, key=None):
+    """局面 key（默认当前局面）在本局中出现的次数，含当前局面"""
+    if key is None:
+        key = game.position_hash
+    return game.position_counts.get(key, 0) + (key == game.position_hash)
@@ -1,15 +1,154 @@
 #!/usr/bin/env python3
 """
-使用 Gunicorn + Eventlet 运行生产环境服务器
-推荐用于生产部署
+生产环境多进程启动器
+- 主进程 fork 出多个 worker（默认每个 CPU 核一个），所有 worker 通过 SO_REUSEPORT 共同监听服务端口
+- 每个 worker 是一个房间分片（见 sharding.py），另外监听自己的分片端口（shard_port_base + 序号），
+  加入不属于本分片的房间时客户端会被重定向到所属分片的端口
+- 主进程负责重启异常退出的 worker；收到 SIGTERM / SIGINT 时通知所有 worker 优雅退出：
+  停止接受新连接，等待已有房间结束（最长 drain_timeout 秒）后退出
+文件名沿用旧的 Gunicorn 启动脚本，server.sh 的生产模式直接运行本脚本
+
+用法: python3 gunicorn_start.py
+配置（config.yaml 中的 launcher 节）:
+    launcher:
+      workers: 0          # 0 表示 CPU 核数
+      host: 0.0.0.0
+      port: 5000
+      drain_timeout: 30
 """
 
-import eventlet
-eventlet.monkey_patch()
+import os
+import signal
+import sys
+import time
+
+import yaml
+
+DEFAULT_PORT = 5000
+DEFAULT_DRAIN_TIMEOUT = 30
+# worker 异常退出后重新启动前的等待时间（秒）
+RESPAWN_DELAY = 1.0
+
+
+def load_options():
+    """读取根目录 config.yaml 中的 launcher 配置（分片配置由各 worker 中的 app 读取）"""
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.yaml')
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+    return config.get('launcher') or {}
+
+
+def run_worker(index, count, options):
+    """worker 进程：作为第 index 个分片运行服务器"""
+    os.environ['SHARD_INDEX'] = str(index)
+    os.environ['SHARD_COUNT'] = str(count)
+
+    import eventlet
+    eventlet.monkey_patch()
+    from eventlet import wsgi
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as game_app
+    import sharding
+
+    host = options.get('host', '0.0.0.0')
+    port = int(options.get('port', DEFAULT_PORT))
+    drain_timeout = float(options.get('drain_timeout', DEFAULT_DRAIN_TIMEOUT))
+
+    listeners = [
+        eventlet.listen((host, port), reuse_port=True),
+        eventlet.listen((host, sharding.shard_port(index))),
+    ]
+    servers = [eventlet.spawn(wsgi.server, sock, game_app.app, log_output=False) for sock in listeners]
+    print(f"Worker {index}/{count} (pid {os.getpid()}) listening on {host}:{port} "
+          f"and shard port {sharding.shard_port(index)}")
+
+    stop_requested = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_requested.append(True))
+    while not stop_requested:
+        eventlet.sleep(0.5)
+
+    # 停止接受新连接，已建立的连接继续服务
+    print(f"Worker {index} draining, {len(game_app.games)} rooms active")
+    for sock in listeners:
+        sock.close()
+    game_app.socketio.emit('server_draining', {'message': '服务器即将维护，本局结束后请重新连接'})
+
+    deadline = time.monotonic() + drain_timeout
+    while len(game_app.games) and time.monotonic() < deadline:
+        eventlet.sleep(1)
+    print(f"Worker {index} exiting, {len(game_app.games)} rooms left")
+    for server in servers:
+        server.kill()
+    os._exit(0)
+
+
+def spawn_worker(index, count, options):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(index, count, options)
+        except Exception as e:
+            print(f"Error in worker {index}: {e}")
+        os._exit(1)
+    return pid
+
+
+def main():
+    options = load_options()
+    count = int(options.get('workers') or 0) or os.cpu_count() or 1
+    drain_timeout = float(options.get('drain_timeout', DEFAULT_DRAIN_TIMEOUT))
+
+    print("Game Server starting with multi-process launcher...")
+    print(f"Workers: {count}, port: {options.get('port', DEFAULT_PORT)}")
+
+    children = {}  # pid -> 分片序号
+    for index in range(count):
+        children[spawn_worker(index, count, options)] = index
+
+    stopping = []
+
+    def request_stop(*_):
+        if stopping:
+            return
+        stopping.append(time.monotonic() + drain_timeout + 5)
+        print("Shutting down, draining workers...")
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            # 超过排空时间仍未退出的 worker 强制结束
+            if stopping and time.monotonic() > stopping[0]:
+                for child in children:
+                    try:
+                        os.kill(child, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+            time.sleep(0.2)
+            continue
+        index = children.pop(pid, None)
+        if index is None or stopping:
+            continue
+        print(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+        time.sleep(RESPAWN_DELAY)
+        children[spawn_worker(index, count, options)] = index
+
+    print("All workers stopped")
 
-from app import app, socketio
 
 if __name__ == '__main__':
-    print("Gobang Server starting with Gunicorn + Eventlet...")
-    print("Production mode: Enabled")
-    print("Server will listen on all interfaces")
+    main()
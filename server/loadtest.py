@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+压力测试
+启动一个本地服务器（或连接 --url 指定的服务器），按并发级别逐级增加房间数：
+每个游戏类型同时开 N 个房间，每个房间两个 Socket.IO 客户端按脚本走完整个流程
+（create_room → join_room → choose_color → 合法落子 → 认输 / play_again → 下一局）。
+
+输出:
+- 客户端测得的各事件往返耗时 p50 / p95 / p99
+- 服务器 /metrics 中的事件处理耗时与事件循环延迟（按本级别的增量计算分位数）
+- 每核房间数：并发房间数 / 服务器实际占用的 CPU 核数（仅限由本脚本启动的服务器）
+- 压测端自身的事件循环延迟（过高说明压测端已饱和，结果不可信）
+
+依赖: pip install "python-socketio[client]"
+用法:
+    python3 loadtest.py --levels 10,50,200 --games gobang,go,othello --rounds 2
+    python3 loadtest.py --url http://localhost:5000 --levels 100 --json report.json
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import collections
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import socketio
+
+from games import othello
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+# 在子进程中启动服务器（单进程，端口由参数指定）
+SERVER_BOOT = ("import sys, app; app.socketio.run(app.app, host='127.0.0.1', port=int(sys.argv[1]), "
+               "debug=False, allow_unsafe_werkzeug=True, log_output=False)")
+NOT_YOUR_TURN = '不是你的回合'
+GAME_ENDED = '游戏已结束'
+# 压测端事件循环延迟 p99 超过该值（毫秒）时提示压测端已饱和
+CLIENT_LAG_WARNING_MS = 50
+
+
+class RoomFailed(Exception):
+    """房间脚本无法继续（超时或收到意外的错误）"""
+
+
+class Recorder:
+    """汇总客户端测得的往返耗时与错误"""
+
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.timeouts = collections.Counter()
+        self.rooms_completed = 0
+        self.rooms_failed = 0
+        self.games_played = 0
+
+
+class Player:
+    """一个 Socket.IO 客户端；request() 发送事件并等待指定的响应事件"""
+
+    def __init__(self, url, recorder, timeout):
+        self.recorder = recorder
+        self.timeout = timeout
+        self.waiters = []
+        self.game_over = False
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('*', self.on_event)
+        self.client.connect(url, transports=['websocket'], wait_timeout=timeout)
+
+    def on_event(self, event, data=None):
+        if event == 'game_over':
+            self.game_over = True
+        for waiter in list(self.waiters):
+            names, done, result, match = waiter
+            if event in names and (match is None or event == 'error' or match(data or {})):
+                self.waiters.remove(waiter)
+                result.append((event, data))
+                done.send()
+
+    def expect(self, *names, match=None):
+        """登记等待的事件；match 用于过滤广播事件（如对手上一步的 move_made 可能晚于本次请求到达）"""
+        waiter = (names, eventlet.event.Event(), [], match)
+        self.waiters.append(waiter)
+        return waiter
+
+    def wait(self, waiter, event):
+        try:
+            with eventlet.Timeout(self.timeout):
+                waiter[1].wait()
+        except eventlet.Timeout:
+            self.waiters.remove(waiter)
+            self.recorder.timeouts[event] += 1
+            raise RoomFailed(f'{event} 超时')
+        return waiter[2][0]
+
+    def request(self, event, data, *responses, match=None):
+        """发送事件并等待第一个响应，记录往返耗时"""
+        waiter = self.expect(*responses, 'error', match=match)
+        started_at = time.perf_counter()
+        self.client.emit(event, data)
+        name, payload = self.wait(waiter, event)
+        self.recorder.latencies[event].append(time.perf_counter() - started_at)
+        return name, payload or {}
+
+    def close(self):
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+
+class BoardGame:
+    """双人棋类房间脚本：两名玩家轮流落子，先手不确定时收到“不是你的回合”后换人重试"""
+    size = 15
+
+    def __init__(self, game_type, players, recorder, max_moves):
+        self.game_type = game_type
+        self.players = players
+        self.recorder = recorder
+        self.max_moves = max_moves
+        self.room_id = None
+        self.board = None
+        self.turn = 0
+
+    def reset(self, start_payloads):
+        self.board = [[0] * self.size for _ in range(self.size)]
+        self.turn = 0
+
+    def pick_move(self):
+        empty = [(r, c) for r in range(self.size) for c in range(self.size) if self.board[r][c] == 0]
+        return random.choice(empty) if empty else None
+
+    def is_reply(self, payload, move):
+        """move_made 是否是本次落子的结果"""
+        position = payload.get('move', payload)
+        return (position.get('row'), position.get('col')) == tuple(move)
+
+    def apply(self, row, col, payload):
+        self.board[row][col] = payload.get('player', self.turn + 1)
+
+    def block(self, row, col):
+        """服务器拒绝的位置不再尝试（如围棋的禁入点）"""
+        self.board[row][col] = -1
+
+    def next_turn(self, payload):
+        self.turn = 1 - self.turn
+
+    def play_round(self):
+        """走一局：落子直到分出胜负或达到步数上限，未结束时由当前玩家认输"""
+        swaps = 0
+        moves = 0
+        while moves < self.max_moves and not self.players[0].game_over:
+            move = self.pick_move()
+            if move is None:
+                break
+            player = self.players[self.turn]
+            name, payload = player.request('make_move', {'room_id': self.room_id, 'row': move[0], 'col': move[1]},
+                                           'move_made', match=lambda payload: self.is_reply(payload, move))
+            if name == 'error':
+                message = payload.get('message', '')
+                if message == NOT_YOUR_TURN and swaps < 2:
+                    swaps += 1
+                    self.turn = 1 - self.turn
+                    continue
+                if message == GAME_ENDED:
+                    break
+                self.recorder.errors[f'make_move: {message}'] += 1
+                self.block(*move)
+                continue
+            swaps = 0
+            moves += 1
+            self.apply(move[0], move[1], payload)
+            self.next_turn(payload)
+        if not any(player.game_over for player in self.players):
+            # 对局可能刚刚自然结束，只接受认输产生的 game_over
+            self.players[self.turn].request('surrender', {'room_id': self.room_id}, 'game_over',
+                                            match=lambda payload: '认输' in payload.get('message', ''))
+
+
+class GoGame(BoardGame):
+    size = 19
+
+    def apply(self, row, col, payload):
+        super().apply(row, col, payload)
+        for r, c in payload.get('captured') or []:
+            self.board[r][c] = 0
+
+
+class OthelloGame(BoardGame):
+    """黑白棋：落子位置与翻转由服务器相同的规则函数计算，轮到谁以 move_made 中的 current_player 为准
+
+    棋盘与规则模块相同，为一维 bytearray（下标 row * size + col），翻转结果为下标
+    """
+    size = othello.BOARD_SIZE
+
+    def reset(self, start_payloads):
+        self.board = othello.initialize_othello_board()
+        self.blocked = set()
+        # game_start 中的 player 为各客户端的编号，黑棋（1）先手
+        numbers = [payload.get('player', index + 1) for index, payload in enumerate(start_payloads)]
+        self.numbers = numbers
+        self.turn = numbers.index(1) if 1 in numbers else 0
+
+    def pick_move(self):
+        moves = [move for move in othello.get_valid_othello_moves(self.board, self.numbers[self.turn])
+                 if move not in self.blocked]
+        return random.choice(moves) if moves else None
+
+    def block(self, row, col):
+        # 棋盘只能存放 0 / 1 / 2，被拒绝的位置单独记录
+        self.blocked.add((row, col))
+
+    def apply(self, row, col, payload):
+        player = payload.get('player', self.numbers[self.turn])
+        for point in othello.get_othello_flips(self.board, row, col, player):
+            self.board[point] = player
+        self.board[row * self.size + col] = player
+        self.blocked.clear()
+
+    def next_turn(self, payload):
+        current = payload.get('current_player')
+        if current in self.numbers:
+            self.turn = self.numbers.index(current)
+
+
+SCENARIOS = {
+    'gobang': BoardGame,
+    'go': GoGame,
+    'othello': OthelloGame,
+}
+
+
+def run_room(url, game_type, recorder, options, active):
+    """一个房间的完整流程"""
+    players = []
+    try:
+        players = [Player(url, recorder, options.timeout) for _ in range(2)]
+        game = SCENARIOS[game_type](game_type, players, recorder, options.moves)
+        name, payload = players[0].request('create_room', {'game_type': game_type}, 'room_created')
+        if name == 'error':
+            raise RoomFailed(f"create_room: {payload.get('message')}")
+        game.room_id = payload['room_id']
+        name, payload = players[1].request('join_room', {'room_id': game.room_id, 'game_type': game_type},
+                                           'room_joined')
+        if name == 'error':
+            raise RoomFailed(f"join_room: {payload.get('message')}")
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        try:
+            for round_index in range(options.rounds):
+                if round_index:
+                    players[0].request('play_again', {'room_id': game.room_id}, 'reset_game')
+                for player in players:
+                    player.game_over = False
+                # 两人都选择后双方收到 game_start，后选择的一方的往返耗时即开局耗时
+                first_start = players[0].expect('game_start')
+                players[0].client.emit('choose_color', {'room_id': game.room_id, 'choice': 'first'})
+                name, payload = players[1].request('choose_color', {'room_id': game.room_id, 'choice': 'second'},
+                                                   'game_start')
+                if name == 'error':
+                    raise RoomFailed(f"choose_color: {payload.get('message')}")
+                _, first_payload = players[0].wait(first_start, 'choose_color')
+                game.reset([first_payload or {}, payload])
+                game.play_round()
+                recorder.games_played += 1
+        finally:
+            active[0] -= 1
+        recorder.rooms_completed += 1
+    except RoomFailed as e:
+        recorder.rooms_failed += 1
+        recorder.errors[str(e)] += 1
+    except Exception as e:
+        recorder.rooms_failed += 1
+        recorder.errors[f'{type(e).__name__}: {e}'] += 1
+    finally:
+        for player in players:
+            player.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def scrape_histograms(url, names):
+    """读取 /metrics 中指定直方图的累计桶：{(名称, 标签): [(上界, 累计数), ...]}"""
+    try:
+        with urllib.request.urlopen(url.rstrip('/') + '/metrics', timeout=10) as response:
+            text = response.read().decode()
+    except OSError:
+        return {}
+    buckets = collections.defaultdict(list)
+    for line in text.splitlines():
+        for name in names:
+            if not line.startswith(name + '_bucket{'):
+                continue
+            labels, value = line[len(name) + 8:].rsplit('} ', 1)
+            pairs = dict(part.split('=', 1) for part in labels.split('",') if '=' in part)
+            pairs = {key: item.strip('"') for key, item in pairs.items()}
+            bound = pairs.pop('le')
+            key = (name, tuple(sorted(pairs.items())))
+            buckets[key].append((float('inf') if bound == '+Inf' else float(bound), float(value)))
+    return buckets
+
+
+def histogram_quantile(before, after, fraction):
+    """按两次采集之间的桶增量估算分位数（桶内线性插值）"""
+    previous = dict(before or [])
+    deltas = [(bound, count - previous.get(bound, 0)) for bound, count in after]
+    total = deltas[-1][1] if deltas else 0
+    if total <= 0:
+        return None
+    target = fraction * total
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in deltas:
+        if count >= target:
+            if bound == float('inf'):
+                return lower_bound
+            span = count - lower_count
+            return lower_bound + (bound - lower_bound) * ((target - lower_count) / span if span else 1)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def process_cpu_seconds(pid):
+    """读取进程已用的 CPU 时间（Linux /proc）"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def monitor_local_lag(samples, stop, interval=0.05):
+    """测量压测端自身的事件循环延迟"""
+    while not stop:
+        started_at = time.perf_counter()
+        eventlet.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started_at - interval))
+
+
+def run_level(url, level, options, server):
+    """以每个游戏类型 level 个房间的并发运行一轮"""
+    recorder = Recorder()
+    active = [0, 0]  # 当前 / 峰值并发房间数
+    names = ('game_event_duration_seconds', 'game_event_loop_lag_seconds')
+    before = scrape_histograms(url, names)
+    cpu_before = process_cpu_seconds(server.pid) if server else None
+    lag_samples, stop = [], []
+    eventlet.spawn(monitor_local_lag, lag_samples, stop)
+
+    started_at = time.perf_counter()
+    pool = eventlet.GreenPool(level * len(options.games))
+    for index in range(level):
+        for game_type in options.games:
+            pool.spawn(run_room, url, game_type, recorder, options, active)
+        # 在 ramp 秒内逐步建立连接，避免所有房间同时握手
+        eventlet.sleep(options.ramp / level)
+    pool.waitall()
+    wall = time.perf_counter() - started_at
+    stop.append(True)
+
+    after = scrape_histograms(url, names)
+    cpu_after = process_cpu_seconds(server.pid) if server else None
+    result = {
+        'rooms_per_game_type': level,
+        'peak_rooms': active[1],
+        'rooms_completed': recorder.rooms_completed,
+        'rooms_failed': recorder.rooms_failed,
+        'games_played': recorder.games_played,
+        'wall_seconds': round(wall, 3),
+        'events': {},
+        'server_events': {},
+        'errors': dict(recorder.errors.most_common(10)),
+        'timeouts': dict(recorder.timeouts),
+        'client_loop_lag_ms': {'p99': _ms(percentile(lag_samples, 0.99)), 'max': _ms(max(lag_samples, default=0))},
+    }
+    for event, values in sorted(recorder.latencies.items()):
+        result['events'][event] = {'count': len(values), **{
+            f'p{int(q * 100)}': _ms(percentile(values, q)) for q in (0.5, 0.95, 0.99)}}
+    for (name, labels), buckets in sorted(after.items()):
+        quantiles = {f'p{int(q * 100)}': _ms(histogram_quantile(before.get((name, labels)), buckets, q))
+                     for q in (0.5, 0.95, 0.99)}
+        if name == 'game_event_loop_lag_seconds':
+            result['server_loop_lag_ms'] = quantiles
+        elif any(quantiles.values()):
+            result['server_events'][' '.join(value for _, value in labels if value)] = quantiles
+    if cpu_before is not None and cpu_after is not None and wall > 0:
+        cores = (cpu_after - cpu_before) / wall
+        result['server_cores_used'] = round(cores, 3)
+        result['rooms_per_core'] = round(active[1] / cores, 1) if cores > 0 else None
+    return result
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def print_level(result):
+    print(f"\n== {result['rooms_per_game_type']} rooms per game type: peak {result['peak_rooms']} rooms, "
+          f"{result['games_played']} games, {result['rooms_failed']} failed, {result['wall_seconds']}s ==")
+    print(f"{'event':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for event, row in result['events'].items():
+        print(f"{event:<28}{row['count']:>8}{_fmt(row['p50']):>10}{_fmt(row['p95']):>10}{_fmt(row['p99']):>10}")
+    if result['server_events']:
+        print('server-side handling:')
+        for event, row in result['server_events'].items():
+            print(f"  {event:<26}{'':>8}{_fmt(row['p50']):>10}{_fmt(row['p95']):>10}{_fmt(row['p99']):>10}")
+    if 'server_loop_lag_ms' in result:
+        lag = result['server_loop_lag_ms']
+        print(f"server event-loop lag p50/p95/p99: {_fmt(lag['p50'])} / {_fmt(lag['p95'])} / {_fmt(lag['p99'])} ms")
+    lag = result['client_loop_lag_ms']
+    print(f"load generator lag p99/max: {_fmt(lag['p99'])} / {_fmt(lag['max'])} ms")
+    if (lag['p99'] or 0) > CLIENT_LAG_WARNING_MS:
+        print("WARNING: load generator is saturated, client-side latencies include its own delay; "
+              "run several loadtest.py processes with --url against one server instead")
+    if 'rooms_per_core' in result:
+        print(f"server cores used: {result['server_cores_used']}, rooms per core: {result['rooms_per_core']}")
+    for message, count in result['errors'].items():
+        print(f"  error x{count}: {message}")
+    for event, count in result['timeouts'].items():
+        print(f"  timeout x{count}: {event}")
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:.2f}'
+
+
+def start_server(port, log_path):
+    """启动本地服务器并等待端口可连接"""
+    log = open(log_path, 'a') if log_path else subprocess.DEVNULL
+    server = subprocess.Popen([sys.executable, '-c', SERVER_BOOT, str(port)], cwd=SERVER_DIR,
+                              stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f'服务器启动失败，退出码 {server.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit('服务器启动超时')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def raise_fd_limit():
+    """每个房间占用两个连接，尽量提高打开文件数上限"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='联机游戏服务器压力测试')
+    parser.add_argument('--url', help='连接已运行的服务器（默认启动一个本地服务器）')
+    parser.add_argument('--levels', default='10,50,100', help='逐级增加的每个游戏类型并发房间数')
+    parser.add_argument('--games', default=','.join(SCENARIOS), help='参与测试的游戏类型')
+    parser.add_argument('--rounds', type=int, default=2, help='每个房间的对局数')
+    parser.add_argument('--moves', type=int, default=40, help='每局最多落子数，达到后认输')
+    parser.add_argument('--ramp', type=float, default=2.0, help='每个级别建立所有房间所用的秒数')
+    parser.add_argument('--timeout', type=float, default=15.0, help='单个事件等待响应的超时秒数')
+    parser.add_argument('--server-log', help='本地服务器的日志文件（默认丢弃）')
+    parser.add_argument('--json', help='把完整结果写入 JSON 文件')
+    options = parser.parse_args(argv)
+    options.levels = [int(level) for level in options.levels.split(',') if level]
+    options.games = [game for game in options.games.split(',') if game]
+    unknown = set(options.games) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"不支持的游戏类型: {', '.join(sorted(unknown))}（可选: {', '.join(SCENARIOS)}）")
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    try:
+        import websocket  # noqa: F401  Socket.IO 客户端的 websocket 传输依赖
+    except ImportError:
+        raise SystemExit('缺少客户端依赖，请运行: pip install "python-socketio[client]"')
+    raise_fd_limit()
+
+    server = None
+    url = options.url
+    if url is None:
+        port = free_port()
+        server = start_server(port, options.server_log)
+        url = f'http://127.0.0.1:{port}'
+    print(f'Load testing {url} with games: {", ".join(options.games)}')
+
+    results = []
+    try:
+        for level in options.levels:
+            result = run_level(url, level, options, server)
+            print_level(result)
+            results.append(result)
+    finally:
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump({'url': url, 'games': options.games, 'levels': results}, f, ensure_ascii=False, indent=2)
+    return 1 if any(result['rooms_failed'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
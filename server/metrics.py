@@ -0,0 +1,171 @@
+"""
+运行指标
+- 计数器 / 仪表 / 直方图，按标签值区分，输出 Prometheus 文本格式（/metrics 接口）
+- 记录开销很小：标签组合对应的样本在首次使用时创建并缓存，直方图按桶边界二分查找
+- 计数器和仪表可以提供回调函数，在采集时才读取当前值（如各阶段房间数、执行器统计）
+多进程部署时每个 worker 各自统计，通过各自的分片端口采集
+"""
+
+import bisect
+import logging
+import math
+import threading
+
+# 事件处理耗时的桶边界（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REGISTRY = []
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """指标基类：按标签值保存样本；提供 callback 时在采集时调用，返回 {标签值元组: 数值}"""
+    kind = None
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.callback = callback
+        self.samples = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.render_samples())
+        return lines
+
+    def render_samples(self):
+        if self.callback is None:
+            with self._lock:
+                items = sorted(self.samples.items())
+        else:
+            try:
+                items = sorted(self.callback().items())
+            except Exception as e:
+                logging.getLogger(__name__).warning("Error collecting %s: %s", self.name, e)
+                return []
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Counter(Metric):
+    """只增不减的计数"""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """可增可减的当前值"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.samples[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """按桶统计观测值的分布；样本为 [各桶计数..., 总和, 次数]"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * (len(self.buckets) + 3)
+            sample[index] += 1  # index == len(buckets) 为超出最大边界的计数
+            sample[-2] += value
+            sample[-1] += 1
+
+    def render_samples(self):
+        with self._lock:
+            items = sorted((key, list(sample)) for key, sample in self.samples.items())
+        lines = []
+        bounds = self.buckets + (math.inf,)
+        for key, sample in items:
+            cumulative = 0
+            for bound, count in zip(bounds, sample):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(sample[-2])}')
+            lines.append(f'{self.name}_count{labels} {sample[-1]}')
+        return lines
+
+
+def render():
+    """输出所有指标的文本格式"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class ErrorCountingHandler(logging.Handler):
+    """统计事件处理中记录的错误日志（处理函数捕获异常后只记录日志，不会向外抛出）
+
+    在记录日志的调用方执行，event / game_type 取自当前日志上下文
+    """
+
+    def __init__(self, counter, context_getter):
+        super().__init__(logging.ERROR)
+        self.counter = counter
+        self.context_getter = context_getter
+
+    def emit(self, record):
+        fields = self.context_getter()
+        if not fields.get('event'):
+            return
+        self.counter.inc(event=fields['event'], game_type=fields.get('game_type') or '')
+
+
+# 服务器通用指标
+EVENT_LATENCY = Histogram('game_event_duration_seconds', 'Socket.IO event handling latency',
+                          ('event', 'game_type'))
+EVENT_ERRORS = Counter('game_event_errors_total', 'Errors while handling Socket.IO events',
+                       ('event', 'game_type'))
+EMITS = Counter('game_emits_total', 'Socket.IO events emitted to clients', ('event',))
+CONNECTED_CLIENTS = Gauge('game_connected_clients', 'Currently connected Socket.IO clients')
+EVENT_LOOP_LAG = Histogram('game_event_loop_lag_seconds', 'Delay of a periodic sleep beyond its interval',
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
@@ -0,0 +1,124 @@
+"""
+房间事件串行执行器
+- 每个房间一个先进先出的邮箱，同一房间的事件严格按到达顺序逐个执行
+- 不同房间互不阻塞，可在多个 greenlet / 线程上并行处理
+- 事件由到达它的 greenlet / 线程自己执行（排到队首时被唤醒），
+  因此处理函数中仍可直接使用 request.sid、emit 等请求上下文
+- 邮箱深度有上限，超过时拒绝新事件；记录排队等待时间等统计
+"""
+
+import collections
+import threading
+import time
+
+DEFAULT_MAX_QUEUE_DEPTH = 64
+
+
+class RoomBusy(Exception):
+    """房间待处理事件过多"""
+
+    def __init__(self, room_id):
+        super().__init__(f'房间 {room_id} 待处理事件过多')
+        self.room_id = room_id
+
+
+# room_id -> deque[threading.Event]，队首为正在执行的事件
+mailboxes = {}
+_lock = threading.Lock()
+# 当前 greenlet / 线程正在执行的房间，用于处理嵌套调用
+_local = threading.local()
+
+max_queue_depth = DEFAULT_MAX_QUEUE_DEPTH
+
+stats = {
+    'executed_total': 0,
+    'rejected_total': 0,
+    'wait_count': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0,
+    'max_depth_seen': 0,
+}
+
+
+def configure_room_executor(options):
+    """根据配置设置邮箱深度上限
+
+    options 示例（config.yaml 中的 room_executor 节）:
+        max_queue_depth: 64
+    """
+    global max_queue_depth
+    options = options or {}
+    depth = int(options.get('max_queue_depth', DEFAULT_MAX_QUEUE_DEPTH))
+    if depth < 1:
+        raise ValueError(f'房间邮箱深度必须为正数: {depth}')
+    max_queue_depth = depth
+
+
+def run_in_room(room_id, func, *args, force=False, **kwargs):
+    """在房间邮箱中串行执行 func，返回其结果
+
+    force=True 时忽略深度上限（断线清理等不能丢弃的事件）；
+    邮箱已满时抛出 RoomBusy
+    """
+    running = getattr(_local, 'rooms', None)
+    if running is None:
+        running = _local.rooms = set()
+    if room_id in running:
+        # 已在该房间的邮箱中执行，直接调用避免自锁
+        return func(*args, **kwargs)
+
+    ticket = threading.Event()
+    enqueued_at = time.monotonic()
+    with _lock:
+        mailbox = mailboxes.get(room_id)
+        if mailbox is None:
+            mailbox = mailboxes[room_id] = collections.deque()
+        if not force and len(mailbox) >= max_queue_depth:
+            stats['rejected_total'] += 1
+            raise RoomBusy(room_id)
+        mailbox.append(ticket)
+        depth = len(mailbox)
+        if depth > stats['max_depth_seen']:
+            stats['max_depth_seen'] = depth
+
+    if depth > 1:
+        ticket.wait()
+
+    waited = time.monotonic() - enqueued_at
+    running.add(room_id)
+    try:
+        with _lock:
+            stats['wait_count'] += 1
+            stats['wait_seconds_total'] += waited
+            if waited > stats['wait_seconds_max']:
+                stats['wait_seconds_max'] = waited
+        return func(*args, **kwargs)
+    finally:
+        running.discard(room_id)
+        with _lock:
+            stats['executed_total'] += 1
+            mailbox.popleft()
+            if mailbox:
+                # 唤醒下一个排队的事件
+                mailbox[0].set()
+            elif mailboxes.get(room_id) is mailbox:
+                del mailboxes[room_id]
+
+
+def get_room_queue_depth(room_id):
+    """获取房间当前的待处理事件数（含正在执行的事件）"""
+    with _lock:
+        mailbox = mailboxes.get(room_id)
+        return len(mailbox) if mailbox else 0
+
+
+def get_executor_stats():
+    """获取执行器统计信息"""
+    with _lock:
+        result = dict(stats)
+        result['active_rooms'] = len(mailboxes)
+        result['queued_events'] = sum(len(m) for m in mailboxes.values())
+    result['max_queue_depth'] = max_queue_depth
+    count = result['wait_count']
+    result['wait_seconds_avg'] = result['wait_seconds_total'] / count if count else 0.0
+    return result
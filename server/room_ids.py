@@ -0,0 +1,210 @@
+"""
+房间号分配器
+- 每个命名空间维护一个预洗牌的空闲号码池（稀疏 Fisher-Yates），分配与回收均为 O(1)
+- 房间删除后号码回收到池中，池满前创建房间的耗时保持不变
+- 支持配置房间号位数，以及按游戏类型划分的独立命名空间（通过前缀区分）
+- 各房间的事件可能并行执行，号码池的分配与回收由同一把锁保护
+- 多个 worker 共享房间存储时，房间可能由其他 worker 删除，号码不会回到分配它的 worker 的池中；
+  号码池用尽时按存储中实际存在的房间重建（reconcile_room_ids）
+"""
+
+import random
+import threading
+
+DEFAULT_WIDTH = 4
+DEFAULT_NAMESPACE = 'default'
+
+
+class RoomIdPool:
+    """单个命名空间的房间号池"""
+
+    def __init__(self, width=DEFAULT_WIDTH, prefix=''):
+        if width < 1:
+            raise ValueError(f'房间号位数必须为正数: {width}')
+        self.width = width
+        self.prefix = prefix
+        self.low = 10 ** (width - 1)
+        self.capacity = 10 ** width - self.low
+        # 池中 [0, free_count) 为空闲号码；未出现在 swapped 中的位置 i 存放号码 i
+        self.free_count = self.capacity
+        self.swapped = {}
+        self.allocated_total = 0
+        self.released_total = 0
+        self.exhausted_total = 0
+
+    def allocate(self):
+        """随机取出一个空闲房间号，池空时返回 None"""
+        if self.free_count == 0:
+            self.exhausted_total += 1
+            return None
+        index = random.randrange(self.free_count)
+        last = self.free_count - 1
+        value = self.swapped.get(index, index)
+        # 把池尾的号码换到被取走的位置
+        tail = self.swapped.pop(last, last)
+        if index != last:
+            if tail == index:
+                self.swapped.pop(index, None)
+            else:
+                self.swapped[index] = tail
+        self.free_count = last
+        self.allocated_total += 1
+        return self.format(value)
+
+    def release(self, room_id):
+        """回收房间号，成功返回 True"""
+        value = self.parse(room_id)
+        if value is None:
+            return False
+        position = self.free_count
+        if position >= self.capacity:
+            return False
+        # 池尾之外的位置不保存内容，这里仍按需写入或清除，避免残留的旧项生效
+        if value != position:
+            self.swapped[position] = value
+        else:
+            self.swapped.pop(position, None)
+        self.free_count = position + 1
+        self.released_total += 1
+        return True
+
+    def reset(self, in_use):
+        """按正在使用的池内编号重建号码池，其余号码全部空闲，O(正在使用的号码数)"""
+        in_use = set(in_use)
+        self.free_count = self.capacity - len(in_use)
+        self.swapped = {}
+        # 空闲区 [0, free_count) 中正在使用的号码换成池尾 [free_count, capacity) 中的空闲号码；
+        # 池尾只表示已分配，不记录位置上的号码
+        spare = (value for value in range(self.free_count, self.capacity) if value not in in_use)
+        for value in in_use:
+            if value < self.free_count:
+                self.swapped[value] = next(spare)
+
+    def format(self, value):
+        return f'{self.prefix}{self.low + value}'
+
+    def parse(self, room_id):
+        """把房间号转换为池内编号，不属于本池时返回 None"""
+        if not isinstance(room_id, str) or not room_id.startswith(self.prefix):
+            return None
+        digits = room_id[len(self.prefix):]
+        if len(digits) != self.width or not digits.isdigit():
+            return None
+        return int(digits) - self.low
+
+    def stats(self):
+        in_use = self.capacity - self.free_count
+        return {
+            'prefix': self.prefix,
+            'width': self.width,
+            'capacity': self.capacity,
+            'in_use': in_use,
+            'free': self.free_count,
+            'occupancy': in_use / self.capacity,
+            'allocated_total': self.allocated_total,
+            'released_total': self.released_total,
+            'exhausted_total': self.exhausted_total,
+        }
+
+
+# 命名空间 -> RoomIdPool
+pools = {DEFAULT_NAMESPACE: RoomIdPool()}
+# 游戏类型 -> 命名空间（未配置的游戏类型使用默认命名空间）
+game_namespaces = {}
+# 本进程号码池中已分配（不在空闲池中）的房间号
+allocated = set()
+_lock = threading.Lock()
+
+
+def configure_room_ids(options):
+    """根据配置重建房间号池
+
+    options 示例（config.yaml 中的 room_id 节）:
+        width: 4
+        namespaces:
+          doudizhu: {prefix: 'D', width: 4}
+    """
+    options = options or {}
+    width = int(options.get('width', DEFAULT_WIDTH))
+    new_pools = {DEFAULT_NAMESPACE: RoomIdPool(width)}
+    new_game_namespaces = {}
+    for game_type, ns_options in (options.get('namespaces') or {}).items():
+        ns_options = ns_options or {}
+        prefix = str(ns_options.get('prefix', ''))
+        if not prefix:
+            raise ValueError(f'命名空间 {game_type} 必须配置前缀')
+        new_pools[game_type] = RoomIdPool(int(ns_options.get('width', width)), prefix)
+        new_game_namespaces[game_type] = game_type
+    _check_namespace_overlap(new_pools)
+
+    with _lock:
+        pools.clear()
+        pools.update(new_pools)
+        game_namespaces.clear()
+        game_namespaces.update(new_game_namespaces)
+        allocated.clear()
+
+
+def _check_namespace_overlap(all_pools):
+    """确保不同命名空间不会生成相同的房间号"""
+    items = list(all_pools.items())
+    for i, (name_a, pool_a) in enumerate(items):
+        for name_b, pool_b in items[i + 1:]:
+            if len(pool_a.prefix) + pool_a.width != len(pool_b.prefix) + pool_b.width:
+                continue
+            short, long = sorted((pool_a, pool_b), key=lambda p: len(p.prefix))
+            rest = long.prefix[len(short.prefix):]
+            if long.prefix.startswith(short.prefix) and (rest == '' or rest.isdigit()):
+                raise ValueError(f'房间号命名空间 {name_a} 与 {name_b} 存在重叠')
+
+
+def allocate_room_id(game_type):
+    """为指定游戏类型分配房间号，号码用尽时返回 None"""
+    with _lock:
+        namespace = game_namespaces.get(game_type, DEFAULT_NAMESPACE)
+        room_id = pools[namespace].allocate()
+        if room_id is not None:
+            allocated.add(room_id)
+        return room_id
+
+
+def _namespace_of(room_id):
+    """按房间号的前缀和位数确定所属命名空间（各命名空间不重叠），不属于任何命名空间时返回 None"""
+    for namespace, pool in pools.items():
+        if pool.parse(room_id) is not None:
+            return namespace
+    return None
+
+
+def release_room_id(room_id):
+    """回收房间号；号码不在本进程的池中已分配时（如由其他 worker 分配）忽略，避免重复回收"""
+    with _lock:
+        if room_id not in allocated:
+            return False
+        allocated.discard(room_id)
+        return pools[_namespace_of(room_id)].release(room_id)
+
+
+def reconcile_room_ids(room_ids_in_use):
+    """按存储中实际存在的房间号重建各命名空间的号码池，返回重建后的空闲号码数
+
+    room_ids_in_use 为共享存储中的全部房间号（由调用方在锁外读取）；
+    其他 worker 删除的房间的号码在这里回到本进程的池中
+    """
+    with _lock:
+        in_use = {namespace: [] for namespace in pools}
+        allocated.clear()
+        for room_id in room_ids_in_use:
+            namespace = _namespace_of(room_id)
+            if namespace is not None:
+                in_use[namespace].append(pools[namespace].parse(room_id))
+                allocated.add(room_id)
+        for namespace, pool in pools.items():
+            pool.reset(in_use[namespace])
+        return sum(pool.free_count for pool in pools.values())
+
+
+def get_room_id_stats():
+    """获取各命名空间的占用情况"""
+    with _lock:
+        return {namespace: pool.stats() for namespace, pool in pools.items()}
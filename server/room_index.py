@@ -0,0 +1,80 @@
+"""
+房间成员索引
+维护 sid -> 房间 的反向索引，断线等处理只需访问该玩家所在的房间，
+无需遍历全部房间
+各房间的事件可能并行执行，索引的读写由同一把锁保护
+"""
+
+import threading
+
+# sid -> {room_id, ...}
+sid_rooms = {}
+# room_id -> {sid, ...}
+room_sids = {}
+_lock = threading.Lock()
+
+
+def add_room_member(room_id, sid):
+    """记录玩家加入房间"""
+    if not sid:
+        return
+    with _lock:
+        sid_rooms.setdefault(sid, set()).add(room_id)
+        room_sids.setdefault(room_id, set()).add(sid)
+
+
+def remove_room_member(room_id, sid):
+    """记录玩家离开房间"""
+    with _lock:
+        rooms = sid_rooms.get(sid)
+        if rooms is not None:
+            rooms.discard(room_id)
+            if not rooms:
+                del sid_rooms[sid]
+        members = room_sids.get(room_id)
+        if members is not None:
+            members.discard(sid)
+            if not members:
+                del room_sids[room_id]
+
+
+def remove_room(room_id):
+    """房间删除时清除其全部成员记录"""
+    with _lock:
+        for sid in room_sids.pop(room_id, ()):
+            rooms = sid_rooms.get(sid)
+            if rooms is not None:
+                rooms.discard(room_id)
+                if not rooms:
+                    del sid_rooms[sid]
+
+
+def remove_sid(sid):
+    """玩家断开连接时清除其全部记录，返回其所在的房间列表"""
+    with _lock:
+        rooms = sid_rooms.pop(sid, set())
+        for room_id in rooms:
+            members = room_sids.get(room_id)
+            if members is not None:
+                members.discard(sid)
+                if not members:
+                    del room_sids[room_id]
+        return list(rooms)
+
+
+def get_sid_rooms(sid):
+    """获取玩家所在的房间列表"""
+    with _lock:
+        return list(sid_rooms.get(sid, ()))
+
+
+def get_room_sids(room_id):
+    """获取房间内的玩家 sid 列表"""
+    with _lock:
+        return list(room_sids.get(room_id, ()))
+
+
+def is_room_member(room_id, sid):
+    """检查玩家是否在房间中"""
+    with _lock:
+        return room_id in sid_rooms.get(sid, ())
@@ -0,0 +1,202 @@
+"""
+空闲房间回收
+- 房间每次处理事件后刷新截止时间：最后活跃时间 + 当前阶段的空闲时长（等待加入 / 选择先后手 / 对局中 / 已结束）
+- 截止时间放在计时轮中：刷新时只更新截止时间，到期检查时才按最新截止时间重新排入计时轮（惰性删除），
+  每次刷新和每个时钟周期的开销都是 O(1)
+- 房间总数有上限，超过时按最近最少活跃的顺序淘汰未在对局中的房间
+- 统计当前驻留房间数（按阶段 / 游戏类型）与回收数
+"""
+
+import collections
+import threading
+import time
+
+PHASES = ('waiting', 'choosing', 'playing', 'game_over')
+DEFAULT_TTL = {
+    'waiting': 600,      # 等待其他玩家加入
+    'choosing': 600,     # 选择先后手 / 叫地主等开局前阶段
+    'playing': 1800,     # 对局中
+    'game_over': 300,    # 对局结束后
+}
+DEFAULT_MAX_ROOMS = 10000
+DEFAULT_TICK = 1.0
+WHEEL_SLOTS = 512
+
+
+class TimerWheel:
+    """计时轮：按截止时间所在的时钟周期把键放入对应槽位，超过一圈的键在槽中等待后续轮次"""
+
+    def __init__(self, slots=WHEEL_SLOTS, tick=DEFAULT_TICK, now=None):
+        self.slots = [set() for _ in range(slots)]
+        self.tick = tick
+        self.current = self.to_tick(time.time() if now is None else now)
+
+    def to_tick(self, timestamp):
+        return int(timestamp / self.tick)
+
+    def add(self, key, tick):
+        """把键放到第 tick 个时钟周期，返回实际使用的周期（不早于下一个周期）"""
+        tick = max(tick, self.current + 1)
+        self.slots[tick % len(self.slots)].add(key)
+        return tick
+
+    def advance(self, now, scheduled):
+        """推进到 now，返回到期的键
+
+        scheduled 为 键 -> 排定周期，槽中与之不符的条目是已被重新排定的旧条目，直接丢弃
+        """
+        target = self.to_tick(now)
+        if target - self.current > len(self.slots):
+            # 长时间未推进（如进程挂起）时每个槽只需检查一次
+            self.current = target - len(self.slots)
+        due = []
+        while self.current < target:
+            self.current += 1
+            slot = self.slots[self.current % len(self.slots)]
+            for key in list(slot):
+                tick = scheduled.get(key)
+                if tick is not None and tick > self.current and tick % len(self.slots) == self.current % len(self.slots):
+                    continue  # 后续轮次才到期
+                slot.discard(key)
+                if tick is not None and tick <= self.current:
+                    due.append(key)
+        return due
+
+
+ttl = dict(DEFAULT_TTL)
+max_rooms = DEFAULT_MAX_ROOMS
+tick = DEFAULT_TICK
+
+wheel = TimerWheel()
+# room_id -> 截止时间（time.time()）
+deadlines = {}
+# room_id -> 在计时轮中排定的周期
+scheduled = {}
+# room_id -> 阶段，按最近活跃排序（最旧的在前）
+lru = collections.OrderedDict()
+# room_id -> 游戏类型
+game_types = {}
+_lock = threading.Lock()
+
+stats = {
+    'reaped_total': 0,
+    'evicted_total': 0,
+    'rejected_total': 0,
+}
+
+
+def configure_room_reaper(options):
+    """根据配置设置各阶段空闲时长与房间上限
+
+    options 示例（config.yaml 中的 room_reaper 节）:
+        ttl: {waiting: 600, choosing: 600, playing: 1800, game_over: 300}
+        max_rooms: 10000      # 0 表示不限制
+        tick: 1
+    """
+    global max_rooms, tick, wheel
+    options = options or {}
+    new_ttl = dict(DEFAULT_TTL)
+    for phase, seconds in (options.get('ttl') or {}).items():
+        if phase not in DEFAULT_TTL:
+            raise ValueError(f'未知的房间阶段: {phase}')
+        if float(seconds) <= 0:
+            raise ValueError(f'房间空闲时长必须为正数: {phase}={seconds}')
+        new_ttl[phase] = float(seconds)
+    new_tick = float(options.get('tick', DEFAULT_TICK))
+    if new_tick <= 0:
+        raise ValueError(f'回收周期必须为正数: {new_tick}')
+    with _lock:
+        ttl.clear()
+        ttl.update(new_ttl)
+        max_rooms = int(options.get('max_rooms', DEFAULT_MAX_ROOMS))
+        tick = new_tick
+        wheel = TimerWheel(tick=tick)
+        scheduled.clear()
+        for room_id, deadline in deadlines.items():
+            scheduled[room_id] = wheel.add(room_id, wheel.to_tick(deadline))
+
+
+def touch(room_id, phase, last_active=None, game_type=None):
+    """刷新房间的阶段与截止时间"""
+    if last_active is None:
+        last_active = time.time()
+    deadline = last_active + ttl[phase]
+    with _lock:
+        deadlines[room_id] = deadline
+        lru[room_id] = phase
+        lru.move_to_end(room_id)
+        if game_type is not None:
+            game_types[room_id] = game_type
+        deadline_tick = wheel.to_tick(deadline)
+        # 截止时间推后时沿用已排定的条目，到期检查时再重新排定
+        if room_id not in scheduled or deadline_tick < scheduled[room_id]:
+            scheduled[room_id] = wheel.add(room_id, deadline_tick)
+
+
+def forget(room_id):
+    """房间删除后清除其记录（计时轮中的旧条目在到期检查时丢弃）"""
+    with _lock:
+        deadlines.pop(room_id, None)
+        scheduled.pop(room_id, None)
+        lru.pop(room_id, None)
+        game_types.pop(room_id, None)
+
+
+def collect_expired(now=None):
+    """推进计时轮，返回已超过截止时间的房间"""
+    if now is None:
+        now = time.time()
+    with _lock:
+        expired = []
+        for room_id in wheel.advance(now, scheduled):
+            deadline = deadlines.get(room_id)
+            if deadline is None:
+                scheduled.pop(room_id, None)
+            elif deadline > now:
+                scheduled[room_id] = wheel.add(room_id, wheel.to_tick(deadline))
+            else:
+                scheduled.pop(room_id, None)
+                expired.append(room_id)
+        return expired
+
+
+def rooms_to_evict():
+    """房间数达到上限时，选出最近最少活跃的非对局中房间腾出一个位置"""
+    with _lock:
+        if not max_rooms or len(lru) < max_rooms:
+            return []
+        excess = len(lru) - max_rooms + 1
+        victims = []
+        for room_id, phase in lru.items():
+            if phase != 'playing':
+                victims.append(room_id)
+                if len(victims) == excess:
+                    break
+        return victims
+
+
+def is_full():
+    """房间数是否已达上限（淘汰后仍无空位时拒绝创建新房间）"""
+    with _lock:
+        full = bool(max_rooms) and len(lru) >= max_rooms
+        if full:
+            stats['rejected_total'] += 1
+        return full
+
+
+def record_reaped(reason):
+    """记录一次回收（idle：空闲超时，evicted：超过房间上限被淘汰）"""
+    with _lock:
+        stats['evicted_total' if reason == 'evicted' else 'reaped_total'] += 1
+
+
+def get_reaper_stats():
+    """获取回收统计信息"""
+    with _lock:
+        result = dict(stats)
+        result['resident_rooms'] = len(lru)
+        result['max_rooms'] = max_rooms
+        result['rooms_by_phase'] = collections.Counter(lru.values())
+        result['rooms_by_game_type'] = dict(collections.Counter(game_types.values()))
+    result['rooms_by_phase'] = {phase: result['rooms_by_phase'].get(phase, 0) for phase in PHASES}
+    return result
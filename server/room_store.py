@@ -0,0 +1,381 @@
+"""
+房间状态存储
+- MemoryRoomStore：进程内字典（默认，单进程部署）
+- SQLiteRoomStore：SQLite 数据库文件，同一台机器上的多个 worker 共享
+  （放在 /dev/shm 等内存文件系统上即为共享内存存储）
+- RedisRoomStore：Redis 协议（RESP）后端，可连接 Redis / Valkey 或任何兼容的本地替代服务，
+  不依赖第三方客户端库
+外部存储中的房间状态以 pickle 序列化保存，存储服务只能由本服务的 worker 访问。
+处理房间事件时先获取跨进程的房间锁并读取最新状态，事件处理完成后写回，
+因此多个 worker 可以同时服务同一个房间
+"""
+
+import contextlib
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import MutableMapping
+from urllib.parse import urlparse
+
+DEFAULT_LOCK_TTL = 10.0       # 房间锁的租约时长（秒），持有者崩溃后自动失效
+DEFAULT_LOCK_WAIT = 5.0       # 获取房间锁的最长等待时间（秒）
+LOCK_RETRY_INTERVAL = 0.005
+
+
+class RoomLockTimeout(Exception):
+    """等待房间锁超时"""
+
+    def __init__(self, room_id):
+        super().__init__(f'房间 {room_id} 正被其他进程占用')
+        self.room_id = room_id
+
+
+class MemoryRoomStore(dict):
+    """进程内房间存储：普通字典，事件事务为空操作"""
+
+    # 房间只被当前进程访问，本进程的成员索引即为房间的全部成员
+    shared = False
+
+    def add_room(self, room_id, game):
+        """房间号未被占用时保存新房间，返回是否成功"""
+        if room_id in self:
+            return False
+        self[room_id] = game
+        return True
+
+    def transaction(self, room_id):
+        return contextlib.nullcontext()
+
+    def close(self):
+        pass
+
+
+class RoomStore(MutableMapping):
+    """外部房间存储基类
+
+    子类实现 _load / _save / _insert / _remove / _room_ids / _acquire / _release。
+    事务内读取的房间状态缓存在 active 中，游戏模块直接修改该字典，事务结束时写回
+    """
+
+    shared = True
+
+    def __init__(self, lock_ttl=DEFAULT_LOCK_TTL, lock_wait=DEFAULT_LOCK_WAIT):
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        # room_id -> 当前事务中的房间状态
+        self.active = {}
+        # room_id -> 本进程持有的锁令牌
+        self.held = {}
+
+    def __getitem__(self, room_id):
+        game = self.active.get(room_id)
+        if game is not None:
+            return game
+        payload = self._load(room_id)
+        if payload is None:
+            raise KeyError(room_id)
+        game = pickle.loads(payload)
+        if room_id in self.held:
+            self.active[room_id] = game
+        return game
+
+    def __setitem__(self, room_id, game):
+        self._save(room_id, pickle.dumps(game, pickle.HIGHEST_PROTOCOL))
+        if room_id in self.held:
+            self.active[room_id] = game
+
+    def __delitem__(self, room_id):
+        self.active.pop(room_id, None)
+        if not self._remove(room_id):
+            raise KeyError(room_id)
+
+    def __contains__(self, room_id):
+        # 事务内的检查顺便缓存房间状态，避免紧接着的读取再访问一次存储
+        try:
+            self[room_id]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self._room_ids())
+
+    def __len__(self):
+        return len(self._room_ids())
+
+    def add_room(self, room_id, game):
+        """房间号未被占用时保存新房间，返回是否成功（多个 worker 可能分配到相同号码）"""
+        return self._insert(room_id, pickle.dumps(game, pickle.HIGHEST_PROTOCOL))
+
+    @contextlib.contextmanager
+    def transaction(self, room_id):
+        """房间事件事务：加锁并读取最新状态，结束时写回并释放锁"""
+        if room_id in self.held:
+            yield
+            return
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        while not self._acquire(room_id, token, self.lock_ttl):
+            if time.monotonic() >= deadline:
+                raise RoomLockTimeout(room_id)
+            time.sleep(LOCK_RETRY_INTERVAL)
+        self.held[room_id] = token
+        try:
+            yield
+            game = self.active.get(room_id)
+            if game is not None:
+                self._save(room_id, pickle.dumps(game, pickle.HIGHEST_PROTOCOL))
+        finally:
+            self.active.pop(room_id, None)
+            del self.held[room_id]
+            self._release(room_id, token)
+
+    def close(self):
+        pass
+
+
+class SQLiteRoomStore(RoomStore):
+    """SQLite 房间存储"""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=self.lock_wait, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn_lock = threading.Lock()
+        with self.conn_lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS rooms '
+                              '(room_id TEXT PRIMARY KEY, state BLOB NOT NULL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS room_locks '
+                              '(room_id TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)')
+
+    def _execute(self, sql, params=()):
+        with self.conn_lock:
+            cursor = self.conn.execute(sql, params)
+            return cursor.fetchall(), cursor.rowcount
+
+    def _load(self, room_id):
+        rows, _ = self._execute('SELECT state FROM rooms WHERE room_id = ?', (room_id,))
+        return rows[0][0] if rows else None
+
+    def _save(self, room_id, payload):
+        self._execute('INSERT OR REPLACE INTO rooms (room_id, state) VALUES (?, ?)', (room_id, payload))
+
+    def _insert(self, room_id, payload):
+        _, count = self._execute('INSERT OR IGNORE INTO rooms (room_id, state) VALUES (?, ?)',
+                                 (room_id, payload))
+        return count == 1
+
+    def _remove(self, room_id):
+        _, count = self._execute('DELETE FROM rooms WHERE room_id = ?', (room_id,))
+        return count == 1
+
+    def _room_ids(self):
+        rows, _ = self._execute('SELECT room_id FROM rooms')
+        return [row[0] for row in rows]
+
+    def _acquire(self, room_id, token, ttl):
+        now = time.time()
+        with self.conn_lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute('DELETE FROM room_locks WHERE room_id = ? AND expires_at < ?', (room_id, now))
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO room_locks (room_id, token, expires_at) VALUES (?, ?, ?)',
+                    (room_id, token, now + ttl))
+                acquired = cursor.rowcount == 1
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return acquired
+
+    def _release(self, room_id, token):
+        self._execute('DELETE FROM room_locks WHERE room_id = ? AND token = ?', (room_id, token))
+
+    def close(self):
+        with self.conn_lock:
+            self.conn.close()
+
+
+class RespError(Exception):
+    """RESP 服务返回的错误"""
+
+
+class RespConnection:
+    """最小的 RESP 客户端，只实现本存储用到的命令"""
+
+    def __init__(self, host, port, password=None, db=0, timeout=5.0):
+        self.address = (host, port)
+        self.password = password
+        self.db = db
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        self.sock = socket.create_connection(self.address, timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if self.password:
+            self._call('AUTH', self.password)
+        if self.db:
+            self._call('SELECT', self.db)
+
+    def _close(self):
+        if self.sock is not None:
+            try:
+                self.reader.close()
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.reader = None
+
+    def _call(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('RESP 连接已关闭')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RespError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RespError(f'无法解析的 RESP 回复: {line!r}')
+
+    def call(self, *args):
+        """执行命令，连接断开时重连一次"""
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self._connect()
+                    return self._call(*args)
+                except (ConnectionError, OSError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+
+# 仅当锁令牌匹配时删除锁
+RELEASE_LOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class RedisRoomStore(RoomStore):
+    """Redis 协议房间存储"""
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='game:', **kwargs):
+        super().__init__(**kwargs)
+        parsed = urlparse(url)
+        db = parsed.path.lstrip('/')
+        self.client = RespConnection(parsed.hostname or 'localhost', parsed.port or 6379,
+                                     password=parsed.password, db=int(db) if db else 0)
+        self.prefix = prefix
+        self.index_key = f'{prefix}rooms'
+        self.script_supported = True
+
+    def _key(self, room_id):
+        return f'{self.prefix}room:{room_id}'
+
+    def _lock_key(self, room_id):
+        return f'{self.prefix}lock:{room_id}'
+
+    def _load(self, room_id):
+        return self.client.call('GET', self._key(room_id))
+
+    def _save(self, room_id, payload):
+        self.client.call('SET', self._key(room_id), payload)
+        self.client.call('SADD', self.index_key, room_id)
+
+    def _insert(self, room_id, payload):
+        if self.client.call('SET', self._key(room_id), payload, 'NX') is None:
+            return False
+        self.client.call('SADD', self.index_key, room_id)
+        return True
+
+    def _remove(self, room_id):
+        self.client.call('SREM', self.index_key, room_id)
+        return self.client.call('DEL', self._key(room_id)) == 1
+
+    def _room_ids(self):
+        return [room_id.decode() for room_id in self.client.call('SMEMBERS', self.index_key)]
+
+    def _acquire(self, room_id, token, ttl):
+        reply = self.client.call('SET', self._lock_key(room_id), token, 'NX', 'PX', int(ttl * 1000))
+        return reply is not None
+
+    def _release(self, room_id, token):
+        key = self._lock_key(room_id)
+        if self.script_supported:
+            try:
+                self.client.call('EVAL', RELEASE_LOCK_SCRIPT, 1, key, token)
+                return
+            except RespError:
+                # 不支持脚本的替代服务：退化为先比较再删除
+                self.script_supported = False
+        if self.client.call('GET', key) == token.encode():
+            self.client.call('DEL', key)
+
+    def close(self):
+        self.client.close()
+
+
+def create_room_store(options):
+    """根据配置创建房间存储
+
+    options 示例（config.yaml 中的 room_store 节）:
+        backend: sqlite          # memory / sqlite / redis
+        path: /dev/shm/game_rooms.db
+        url: redis://localhost:6379/0
+        prefix: 'game:'
+        lock_ttl: 10
+        lock_wait: 5
+    """
+    options = options or {}
+    backend = options.get('backend', 'memory')
+    if backend == 'memory':
+        return MemoryRoomStore()
+    lock_options = {
+        'lock_ttl': float(options.get('lock_ttl', DEFAULT_LOCK_TTL)),
+        'lock_wait': float(options.get('lock_wait', DEFAULT_LOCK_WAIT)),
+    }
+    if backend == 'sqlite':
+        return SQLiteRoomStore(options.get('path', 'game_rooms.db'), **lock_options)
+    if backend == 'redis':
+        return RedisRoomStore(options.get('url', 'redis://localhost:6379/0'),
+                              prefix=options.get('prefix', 'game:'), **lock_options)
+    raise ValueError(f'未知的房间存储后端: {backend}')
@@ -14,6 +14,9 @@ VENV_DIR="$APP_DIR/venv"
 # 运行模式: dev (开发) 或 prod (生产)
 RUN_MODE="${RUN_MODE:-dev}"
 
+# 停止服务时等待优雅退出的秒数（需大于 launcher.drain_timeout）
+STOP_TIMEOUT="${STOP_TIMEOUT:-40}"
+
 # 颜色输出
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -94,19 +97,17 @@ start() {
     # 获取Python解释器路径（优先使用虚拟环境）
     if [ -d "$VENV_DIR" ]; then
         PYTHON_CMD="$VENV_DIR/bin/python"
-        GUNICORN_CMD="$VENV_DIR/bin/gunicorn"
     else
         PYTHON_CMD="python3"
-        GUNICORN_CMD="gunicorn"
     fi
 
     # 后台启动应用
     cd "$APP_DIR" || exit 1
 
     if [ "$RUN_MODE" = "prod" ]; then
-        # 生产模式: 使用 Gunicorn + Eventlet
-        print_info "使用 Gunicorn + Eventlet 启动生产服务器"
-        nohup "$GUNICORN_CMD" --worker-class eventlet -w 1 --bind 0.0.0.0:5000 "gunicorn_start:socketio" > "$LOG_FILE" 2>&1 &
+        # 生产模式: 多进程启动器（SO_REUSEPORT + 按房间分片，worker 数见 config.yaml 的 launcher 节）
+        print_info "使用多进程启动器启动生产服务器"
+        nohup "$PYTHON_CMD" -u "$GUNICORN_SCRIPT" > "$LOG_FILE" 2>&1 &
     else
         # 开发模式: 直接运行 (内置eventlet支持)
         print_info "使用 Flask + Eventlet 启动开发服务器"
@@ -158,7 +159,7 @@ stop() {
 
     # 等待进程结束
     local count=0
-    while is_running && [ $count -lt 10 ]; do
+    while is_running && [ $count -lt "$STOP_TIMEOUT" ]; do
         sleep 1
         count=$((count + 1))
     done
@@ -342,7 +343,7 @@ case "$1" in
         echo ""
         echo "示例:"
         echo "  $0 start              # 开发模式启动 (使用eventlet)"
-        echo "  RUN_MODE=prod $0 start # 生产模式启动 (使用Gunicorn+eventlet)"
+        echo "  RUN_MODE=prod $0 start # 生产模式启动 (多进程 + eventlet)"
         echo "  $0 status             # 查看服务状态"
         echo "  $0 logs 100           # 查看最后100行日志"
         echo "  $0 check              # 检查依赖环境"
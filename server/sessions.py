@@ -0,0 +1,48 @@
+"""
+玩家会话
+- 每个连接在 connect 时分配一个随机令牌，随 connected 事件发给客户端
+- 玩家断线后不立即关闭房间：座位在房间状态的 away 字段（令牌 -> 断线前的 sid）中保留 grace_seconds 秒，
+  期间客户端重新连接（新的 sid）并发送 resume {room_id, token} 即可回到原座位，服务器发送局面快照，
+  不需要重建房间或重放走棋记录
+- 宽限期结束仍未恢复时按原来的断线流程处理（通知对手、关闭房间）
+令牌只在签发它的 worker 内与 sid 对应；断线记录保存在房间状态中，由房间所属的 worker 处理恢复。
+"""
+
+import secrets
+import threading
+
+DEFAULT_GRACE_SECONDS = 60
+
+grace_seconds = DEFAULT_GRACE_SECONDS
+
+# sid -> 令牌
+_tokens = {}
+_lock = threading.Lock()
+
+
+def configure_sessions(options):
+    """根据配置设置断线保留时长
+
+    options 示例（config.yaml 中的 session 节）:
+        grace_seconds: 60     # 0 表示断线立即关闭房间
+    """
+    global grace_seconds
+    options = options or {}
+    seconds = float(options.get('grace_seconds', DEFAULT_GRACE_SECONDS))
+    if seconds < 0:
+        raise ValueError(f'断线保留时长不能为负数: {seconds}')
+    grace_seconds = seconds
+
+
+def issue_token(sid):
+    """为新连接签发令牌"""
+    token = secrets.token_urlsafe(16)
+    with _lock:
+        _tokens[sid] = token
+    return token
+
+
+def drop_token(sid):
+    """连接断开，返回该连接的令牌（没有时为 None）"""
+    with _lock:
+        return _tokens.pop(sid, None)
@@ -0,0 +1,98 @@
+"""
+房间分片
+多进程部署时每个 worker 是一个分片，房间按房间号的一致性哈希固定归属某个分片，
+房间状态只保存在所属 worker 的进程内，不会跨进程。
+所有 worker 共同监听服务端口，另外各自监听一个分片端口；
+玩家加入不属于当前 worker 的房间时，被重定向到所属分片的端口
+"""
+
+import bisect
+import hashlib
+import os
+from urllib.parse import urlparse, urlunparse
+
+DEFAULT_REPLICAS = 64
+DEFAULT_SHARD_PORT_BASE = 5100
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """一致性哈希环：每个节点在环上放置 replicas 个虚拟节点"""
+
+    def __init__(self, nodes, replicas=DEFAULT_REPLICAS):
+        points = sorted((_hash(f'{node}#{i}'), node) for node in nodes for i in range(replicas))
+        self.keys = [point[0] for point in points]
+        self.nodes = [point[1] for point in points]
+
+    def get_node(self, key):
+        """获取 key 所属的节点"""
+        index = bisect.bisect(self.keys, _hash(key)) % len(self.keys)
+        return self.nodes[index]
+
+
+# 当前 worker 的分片序号与分片总数（单进程运行时只有一个分片）
+shard_index = 0
+shard_count = 1
+ring = None
+shard_port_base = DEFAULT_SHARD_PORT_BASE
+# 客户端访问分片端口的地址模板，{port} 为分片端口，{shard} 为分片序号
+public_url_template = 'http://localhost:{port}'
+
+
+def configure_sharding(options, server_url, index=None, count=None):
+    """配置分片
+
+    分片序号与总数默认取自启动器设置的环境变量 SHARD_INDEX / SHARD_COUNT。
+    options 示例（config.yaml 中的 sharding 节）:
+        shard_port_base: 5100
+        public_url: 'http://game.example.com:{port}'
+    """
+    global shard_index, shard_count, ring, shard_port_base, public_url_template
+    options = options or {}
+    if index is None:
+        index = int(os.environ.get('SHARD_INDEX', 0))
+    if count is None:
+        count = int(os.environ.get('SHARD_COUNT', 1))
+    if not 0 <= index < count:
+        raise ValueError(f'分片序号超出范围: {index}/{count}')
+    shard_index = index
+    shard_count = count
+    ring = HashRing(range(count), int(options.get('replicas', DEFAULT_REPLICAS))) if count > 1 else None
+    shard_port_base = int(options.get('shard_port_base', DEFAULT_SHARD_PORT_BASE))
+    public_url_template = options.get('public_url') or _default_url_template(server_url)
+
+
+def _default_url_template(server_url):
+    """由 server_url 推导分片地址：保留协议和主机，替换端口"""
+    parsed = urlparse(server_url)
+    netloc = f'{parsed.hostname or "localhost"}:{{port}}'
+    return urlunparse(parsed._replace(netloc=netloc))
+
+
+def is_sharded():
+    return shard_count > 1
+
+
+def owner_shard(room_id):
+    """获取房间所属的分片序号"""
+    if ring is None:
+        return 0
+    return ring.get_node(str(room_id))
+
+
+def is_local_room(room_id):
+    """房间是否属于当前 worker"""
+    return ring is None or owner_shard(room_id) == shard_index
+
+
+def shard_port(index):
+    """分片的专用端口"""
+    return shard_port_base + index
+
+
+def shard_url(index):
+    """客户端连接分片使用的地址"""
+    return public_url_template.format(port=shard_port(index), shard=index)
@@ -0,0 +1,139 @@
+"""
+观战
+- 观众加入房间的观战子房间 watch_room(room_id)，不占座位、不进入玩家所在的 Socket.IO 房间
+- 发给整个房间的事件（落子、轮换、结束等对局各方都能看到的内容）原样转发到观战子房间一次，
+  由 Socket.IO 按房间发送，与观众人数无关，规则模块不需要为观众做任何事；
+  发给单个玩家的事件（手牌、己方棋子类型、错误提示）不转发
+- 新观众收到按房间缓存的已编码局面快照，玩家每处理一个事件后失效，下一个观众加入时才重新生成，
+  大量观众陆续加入时每步棋最多生成一次
+- 配置了 throttle_ms 时转发的事件先在房间内累积，每个周期作为一个 batch 事件 [[事件名, 数据], ...] 发送
+观众只登记在本 worker（分片部署时观众与房间在同一分片）
+"""
+
+import threading
+
+DEFAULT_THROTTLE_MS = 0
+
+# 转发给观众的最短间隔（秒），0 表示立即转发
+throttle = 0.0
+
+# room_id -> {观众 sid, ...}
+room_spectators = {}
+# 观众 sid -> {room_id, ...}
+sid_rooms = {}
+# room_id -> 已编码的观战快照（transport.Encoded）
+_snapshots = {}
+# room_id -> 等待下一个周期转发的 [[事件名, 数据], ...]
+_pending = {}
+_lock = threading.Lock()
+
+
+def configure_spectators(options):
+    """根据配置设置转发节流
+
+    options 示例（config.yaml 中的 spectators 节）:
+        throttle_ms: 200      # 0 表示每个事件立即转发
+    """
+    global throttle
+    options = options or {}
+    throttle_ms = float(options.get('throttle_ms', DEFAULT_THROTTLE_MS))
+    if throttle_ms < 0:
+        raise ValueError(f'观战转发间隔不能为负数: {throttle_ms}')
+    throttle = throttle_ms / 1000
+
+
+def watch_room(room_id):
+    """房间的观战子房间名"""
+    return f'{room_id}:watch'
+
+
+def add_spectator(room_id, sid):
+    with _lock:
+        room_spectators.setdefault(room_id, set()).add(sid)
+        sid_rooms.setdefault(sid, set()).add(room_id)
+
+
+def remove_spectator(room_id, sid):
+    with _lock:
+        _discard(room_id, sid)
+
+
+def _discard(room_id, sid):
+    members = room_spectators.get(room_id)
+    if members is not None:
+        members.discard(sid)
+        if not members:
+            del room_spectators[room_id]
+            _pending.pop(room_id, None)
+    rooms = sid_rooms.get(sid)
+    if rooms is not None:
+        rooms.discard(room_id)
+        if not rooms:
+            del sid_rooms[sid]
+
+
+def remove_sid(sid):
+    """观众断开连接，返回其观战的房间"""
+    with _lock:
+        rooms = sid_rooms.get(sid, set()).copy()
+        for room_id in rooms:
+            _discard(room_id, sid)
+    return rooms
+
+
+def forget_room(room_id):
+    """房间已删除：清除其观众、快照与待转发事件，返回是否有观众"""
+    with _lock:
+        _snapshots.pop(room_id, None)
+        _pending.pop(room_id, None)
+        members = room_spectators.pop(room_id, None)
+        for sid in members or ():
+            rooms = sid_rooms.get(sid)
+            if rooms is not None:
+                rooms.discard(room_id)
+                if not rooms:
+                    del sid_rooms[sid]
+    return bool(members)
+
+
+def is_watched(room_id):
+    return room_id in room_spectators
+
+
+def spectator_count(room_id):
+    return len(room_spectators.get(room_id, ()))
+
+
+def defer(room_id, event, data):
+    """节流时把要转发的事件累积到下一个周期（batch 事件展开为其中的各个事件）"""
+    events = data if event == 'batch' else [[event, data]]
+    with _lock:
+        if room_id in room_spectators:
+            _pending.setdefault(room_id, []).extend(events)
+
+
+def take(room_id):
+    """取出一个房间累积的事件"""
+    with _lock:
+        return _pending.pop(room_id, None)
+
+
+def drain():
+    """取出各房间累积的事件：[(room_id, [[事件名, 数据], ...]), ...]"""
+    with _lock:
+        pending = list(_pending.items())
+        _pending.clear()
+    return pending
+
+
+def cached_snapshot(room_id):
+    return _snapshots.get(room_id)
+
+
+def store_snapshot(room_id, snapshot):
+    _snapshots[room_id] = snapshot
+
+
+def invalidate(room_id):
+    """房间状态可能已改变，丢弃缓存的快照"""
+    _snapshots.pop(room_id, None)
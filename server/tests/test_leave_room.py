@@ -0,0 +1,73 @@
+"""
+离开房间：离开的玩家之后断线时不再经过这个房间，座位在离开时即按断线处理
+运行: cd server && python -m pytest tests
+"""
+
+import unittest
+
+import app as server
+import room_index
+
+
+def received(client, name):
+    return [event['args'][0] for event in client.get_received() if event['name'] == name]
+
+
+class LeaveRoomTest(unittest.TestCase):
+
+    def setUp(self):
+        # 断线立即按断线处理，不保留座位
+        self.grace_seconds = server.sessions.grace_seconds
+        server.sessions.grace_seconds = 0
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            if client.is_connected():
+                client.disconnect()
+        server.sessions.grace_seconds = self.grace_seconds
+
+    def client(self):
+        client = server.socketio.test_client(server.app)
+        client.get_received()
+        self.clients.append(client)
+        return client
+
+    def create_game(self):
+        host, guest = self.client(), self.client()
+        host.emit('create_room', {'game_type': 'gobang'})
+        room_id = received(host, 'room_created')[0]['room_id']
+        guest.emit('join_room', {'room_id': room_id, 'game_type': 'gobang'})
+        host.emit('choose_color', {'room_id': room_id, 'choice': 'first'})
+        guest.emit('choose_color', {'room_id': room_id, 'choice': 'second'})
+        host.get_received()
+        guest.get_received()
+        return host, guest, room_id
+
+    def test_leave_then_disconnect_notifies_opponent(self):
+        host, guest, room_id = self.create_game()
+        host.emit('leave_room', {'room_id': room_id})
+        host.disconnect()
+        self.assertEqual(len(received(guest, 'player_disconnected')), 1)
+        self.assertNotIn(room_id, server.games)
+        self.assertEqual(room_index.get_room_sids(room_id), [])
+
+    def test_leave_while_staying_connected_closes_room(self):
+        host, guest, room_id = self.create_game()
+        host.emit('leave_room', {'room_id': room_id})
+        self.assertEqual(len(received(guest, 'player_disconnected')), 1)
+        self.assertNotIn(room_id, server.games)
+        # 对手之后断线不会再处理已关闭的房间
+        guest.disconnect()
+        self.assertEqual(received(host, 'player_disconnected'), [])
+
+    def test_creator_leaving_empty_room_removes_it(self):
+        host = self.client()
+        host.emit('create_room', {'game_type': 'gobang'})
+        room_id = received(host, 'room_created')[0]['room_id']
+        host.emit('leave_room', {'room_id': room_id})
+        self.assertNotIn(room_id, server.games)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+房间号池与共享房间存储：房间在一个存储客户端（worker）上创建、在另一个上删除时号码不会泄漏
+运行: cd server && python -m pytest tests
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import room_ids
+from room_store import SQLiteRoomStore
+
+
+class SharedStoreRoomIdTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'rooms.db')
+        # 两个客户端模拟共享同一存储的两个 worker；号码池属于 worker_a 所在的进程
+        self.worker_a = SQLiteRoomStore(path)
+        self.worker_b = SQLiteRoomStore(path)
+        # 1 位房间号：9 个号码
+        room_ids.configure_room_ids({'width': 1})
+
+    def tearDown(self):
+        self.worker_a.close()
+        self.worker_b.close()
+        self.directory.cleanup()
+        room_ids.configure_room_ids(None)
+
+    def create_room(self):
+        room_id = room_ids.allocate_room_id('gobang')
+        if room_id is not None:
+            self.assertTrue(self.worker_a.add_room(room_id, {'game_type': 'gobang'}))
+        return room_id
+
+    def test_rooms_removed_on_other_worker_return_to_pool(self):
+        created = [self.create_room() for _ in range(9)]
+        self.assertNotIn(None, created)
+        self.assertIsNone(room_ids.allocate_room_id('gobang'))
+
+        # 其他 worker 删除房间：它的进程没有分配过这些号码，本进程的池不知道号码已空闲
+        for room_id in created[:5]:
+            del self.worker_b[room_id]
+        self.assertIsNone(room_ids.allocate_room_id('gobang'))
+
+        self.assertEqual(room_ids.reconcile_room_ids(list(self.worker_a)), 5)
+        recreated = {self.create_room() for _ in range(5)}
+        self.assertEqual(recreated, set(created[:5]))
+        self.assertIsNone(room_ids.allocate_room_id('gobang'))
+
+        # 仍在存储中的房间在本进程删除时照常回收
+        del self.worker_a[created[5]]
+        self.assertTrue(room_ids.release_room_id(created[5]))
+        self.assertEqual(self.create_room(), created[5])
+
+    def test_release_of_unallocated_id_is_ignored(self):
+        room_id = self.create_room()
+        del self.worker_a[room_id]
+        self.assertTrue(room_ids.release_room_id(room_id))
+        # 重复回收（或回收其他 worker 分配的号码）不会让同一号码在池中出现两次
+        self.assertFalse(room_ids.release_room_id(room_id))
+        self.assertEqual(room_ids.get_room_id_stats()['default']['free'], 9)
+        self.assertEqual(len({self.create_room() for _ in range(9)}), 9)
+
+    def test_reconcile_keeps_rooms_in_use(self):
+        rooms = [self.create_room() for _ in range(4)]
+        for room_id in rooms[:2]:
+            del self.worker_b[room_id]
+        room_ids.reconcile_room_ids(list(self.worker_a))
+        fresh = [self.create_room() for _ in range(7)]
+        self.assertNotIn(None, fresh)
+        self.assertFalse(set(fresh) & set(rooms[2:]))
+        self.assertIsNone(room_ids.allocate_room_id('gobang'))
+
+
+class RoomIdPoolResetTest(unittest.TestCase):
+
+    def test_release_after_reset_does_not_duplicate_ids(self):
+        pool = room_ids.RoomIdPool(1)
+        pool.reset([pool.parse('5')])
+        allocated = [pool.allocate() for _ in range(8)]
+        self.assertIsNone(pool.allocate())
+        for room_id in allocated:
+            if room_id != '9':
+                pool.release(room_id)
+        pool.release('5')
+        pool.release('9')
+        self.assertEqual(sorted(pool.allocate() for _ in range(9)), [str(n) for n in range(1, 10)])
+        self.assertIsNone(pool.allocate())
+
+    def test_reset_then_churn_keeps_ids_unique(self):
+        pool = room_ids.RoomIdPool(2)
+        in_use = set(random.sample(range(pool.capacity), 30))
+        pool.reset(in_use)
+        held = {pool.format(value) for value in in_use}
+        for _ in range(2000):
+            if held and random.random() < 0.5:
+                room_id = random.choice(sorted(held))
+                held.discard(room_id)
+                self.assertTrue(pool.release(room_id))
+            else:
+                room_id = pool.allocate()
+                if room_id is not None:
+                    self.assertNotIn(room_id, held)
+                    held.add(room_id)
+        self.assertEqual(pool.capacity - pool.free_count, len(held))
+
+
+if __name__ == '__main__':
+    unittest.main()
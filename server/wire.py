@@ -0,0 +1,82 @@
+"""
+事件编码协议
+默认所有事件以 JSON 文本发送。客户端连接时带查询参数 wire=msgpack（且服务器安装了 msgpack）时，
+发给该客户端的事件数据改为 MessagePack 编码的 bytes，经 Socket.IO 二进制帧发送（事件名不变）。
+未安装 msgpack 时忽略该参数，客户端按收到的数据类型（bytes / JSON）解码即可兼容两种情况。
+
+二进制协议中，规则模块用 transport.compact 标记的数据发送紧凑编码（bytes）而不是 JSON 中的列表：
+- 中国象棋 board：90 字节，按行排列；低 3 位为兵种（1 将帅 2 士仕 3 象相 4 马 5 车 6 炮 7 兵卒），8 表示黑方，0 为空
+- 国际象棋 board：64 字节 int8，正数白方、负数黑方（1 王 2 后 3 车 4 象 5 马 6 兵）
+- 黑白棋 board：64 字节，0 空 / 1 黑 / 2 白
+- 围棋点目结果 ownership：路数 × 路数 字节，0 公气 / 1 黑地 / 2 白地（死子所在点计入对方的地）
+- 围棋形势估计 ownership：路数 × 路数 字节，0 未定 / 1 黑 / 2 白（清除形势时为 None）
+- 中国跳棋 board：17×25 字节，0 为空，1-6 依次为 red、green、yellow、blue、orange、purple
+- 斗地主手牌、底牌、出的牌：每张牌 1 字节，rank << 2 | suit
+- 军棋 opponent_pieces、翻子军棋 pieces：棋子所在格子的下标（row * 5 + col）各 1 字节
+房间内同时有两种客户端时同一事件发送两次（JSON 一次、MessagePack 一次），每种编码只编码一次。
+"""
+
+from games.transport import Compact, Encoded
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 使用 MessagePack 协议的客户端 sid
+MSGPACK_CLIENTS = set()
+
+
+def register_client(sid, requested):
+    """记录客户端请求的协议，返回实际使用的协议名（'msgpack' / 'json'）"""
+    if requested == 'msgpack' and msgpack is not None:
+        MSGPACK_CLIENTS.add(sid)
+        return 'msgpack'
+    return 'json'
+
+
+def remove_client(sid):
+    MSGPACK_CLIENTS.discard(sid)
+
+
+def _default(obj):
+    cls = obj.__class__
+    if cls is Compact:
+        return obj.packed
+    if cls is Encoded:
+        return obj.data
+    if cls is tuple:
+        return list(obj)
+    if cls is bytearray:
+        return bytes(obj)
+    raise TypeError(f'无法编码的类型: {cls.__name__}')
+
+
+def pack(data):
+    """事件数据编码为 MessagePack（Compact 使用紧凑编码）"""
+    return msgpack.packb(data, default=_default, strict_types=True, use_bin_type=True)
+
+
+def split_emit(emit, manager, event, data, namespace=None, to=None, room=None, skip_sid=None, **kwargs):
+    """按接收方的协议分别发送：JSON 客户端收到 data，MessagePack 客户端收到 pack(data)
+
+    emit 为实际的发送函数（socketio.emit），manager 为 Socket.IO 的客户端管理器（用于查询房间成员）
+    """
+    target = to if to is not None else room
+    namespace = namespace or '/'
+    if skip_sid is None:
+        skip = []
+    elif isinstance(skip_sid, list):
+        skip = skip_sid
+    else:
+        skip = [skip_sid]
+    binary = []
+    text = []
+    for sid, _ in manager.get_participants(namespace, target):
+        if sid not in skip:
+            (binary if sid in MSGPACK_CLIENTS else text).append(sid)
+    if not binary:
+        return emit(event, data, namespace=namespace, to=target, skip_sid=skip_sid, **kwargs)
+    if text:
+        emit(event, data, namespace=namespace, to=target, skip_sid=skip + binary, **kwargs)
+    return emit(event, pack(data), namespace=namespace, to=target, skip_sid=skip + text, **kwargs)